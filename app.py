@@ -1,15 +1,68 @@
-from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify, abort
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+import time
+from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify, abort, Response, g
 from flask import request, redirect, url_for
 from dotenv import load_dotenv
+from markupsafe import Markup
 from classes.util.sqlservice import SqlService
 from classes.util.cryptoservice import CryptoService
 from classes.util.dockerservice import DockerService
+from classes.util.judgequeue import JudgeQueue
+from classes.util.challengecatalog import ChallengeCatalog
+from classes.util.fragmentcache import FragmentCache
+from classes.util.histogram import LatencyHistogram
+from classes.util.prometheus import PrometheusFormatter
+from classes.util.requestprofiler import RequestProfiler
 
 class App:
     def __init__(self):
         load_dotenv()
         self.app = Flask(__name__)
         self.app.secret_key = 'dasdsahdkjsadhasjkhjkdhsajkd'
+
+        # Submissions are judged in the background by a bounded pool of workers
+        self.judge_queue = JudgeQueue(
+            workers=int(os.getenv("JUDGE_WORKERS", "2")),
+            max_depth=int(os.getenv("JUDGE_QUEUE_MAX_DEPTH", "100"))
+        )
+
+        # Challenge list kept pre-sorted in every ordering offered by /challenges
+        self.catalog = ChallengeCatalog(
+            lambda: (SqlService.get_all_challenges(), SqlService.get_challenge_submission_counts()),
+            refresh_sec=float(os.getenv("CATALOG_REFRESH_SEC", "300"))
+        )
+        self.challenges_per_page = int(os.getenv("CHALLENGES_PER_PAGE", "25"))
+        self.challenges_max_per_page = int(os.getenv("CHALLENGES_MAX_PER_PAGE", "100"))
+
+        # Rendered challenge pages: whole pages for anonymous visitors, fragments for logged-in users
+        self.page_cache = FragmentCache(
+            max_size=int(os.getenv("PAGE_CACHE_MAX_SIZE", "1024")),
+            ttl_sec=float(os.getenv("PAGE_CACHE_TTL_SEC", "60"))
+        )
+        self.api_page_size = int(os.getenv("API_PAGE_SIZE", "20"))
+        self.api_max_page_size = int(os.getenv("API_MAX_PAGE_SIZE", "100"))
+        self.test_import_max_rows = int(os.getenv("TEST_IMPORT_MAX_ROWS", "10000"))
+
+        # Latency of every request by endpoint, method and status, served by /metrics
+        self.request_stats = LatencyHistogram()
+        self.app.before_request(self.start_request_timer)
+        self.app.after_request(self.record_request)
+
+        # Opt-in sampling profiler: a share of the requests, or those sending the token in X-Profile
+        self.profiler = RequestProfiler(
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            interval_sec=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+            max_requests=int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+        )
+        self.profile_token = os.getenv("PROFILE_TOKEN", "")
+        self.app.before_request(self.start_profiling)
+        self.app.after_request(self.tag_profiled_response)
+        self.app.teardown_request(self.stop_profiling)
         
         # Routes setup
         self.setup_routes()
@@ -26,6 +79,18 @@ class App:
         self.app.add_url_rule('/insert_challenge', 'insert_challenge', self.insert_challenge)
         self.app.add_url_rule('/submit_challenge', 'submit_challenge', self.submit_challenge, methods=['POST'])
         self.app.add_url_rule('/submission/<int:challenge_id>', 'submission', self.submission, methods=['POST'])
+        self.app.add_url_rule('/submission/job/<job_id>', 'submission_status', self.submission_status)
+        self.app.add_url_rule('/submission/job/<job_id>/events', 'submission_events', self.submission_events)
+        self.app.add_url_rule('/submission/stats', 'submission_stats', self.submission_stats)
+        self.app.add_url_rule('/sql/stats', 'sql_stats', self.sql_stats)
+        self.app.add_url_rule('/metrics', 'metrics', self.metrics)
+        self.app.add_url_rule('/profile', 'profile', self.profile)
+        self.app.add_url_rule('/profile/endpoints/<endpoint>', 'profile_endpoint', self.profile_endpoint)
+        self.app.add_url_rule('/profile/requests/<int:request_id>', 'profile_request', self.profile_request)
+        self.app.add_url_rule('/api/challenges', 'api_challenges', self.api_challenges)
+        self.app.add_url_rule('/api/challenges/<int:challenge_id>', 'api_challenge', self.api_challenge)
+        self.app.add_url_rule('/api/challenges/<int:challenge_id>/submissions', 'api_challenge_submissions', self.api_challenge_submissions)
+        self.app.add_url_rule('/api/submissions/<int:submission_id>', 'api_submission', self.api_submission)
         self.app.add_url_rule('/challenges/<int:challenge_id>', 'generic_challenge', self.generic_challenge, methods=['GET', 'POST'])
         self.app.add_url_rule('/submit_comment/<int:challenge_id>', 'submit_comment', self.submit_comment, methods=['POST'])
         self.app.add_url_rule('/delete_challenge/<int:challenge_id>', 'delete_challenge', self.delete_challenge)
@@ -35,6 +100,7 @@ class App:
         self.app.add_url_rule('/edit_challenge_stub-name/<int:challenge_id>', 'edit_challenge_stub_name', self.edit_challenge_stub_name, methods=['POST'])
         self.app.add_url_rule('/edit_challenge_stub-block/<int:challenge_id>', 'edit_challenge_stub_block', self.edit_challenge_stub_block, methods=['POST'])
         self.app.add_url_rule('/add_test_case/<int:challenge_id>', 'add_test_case', self.add_test_case, methods=['POST'])
+        self.app.add_url_rule('/import_test_cases/<int:challenge_id>', 'import_test_cases', self.import_test_cases, methods=['POST'])
         self.app.add_url_rule('/delete_test_case/<int:challenge_id>/<int:test_case_id>', 'delete_test_case', self.delete_test_case, methods=['POST'])
         self.app.add_url_rule('/delete_comment/<int:challenge_id>/<int:comment_id>', 'delete_comment', self.delete_comment, methods=['POST'])
 
@@ -200,31 +266,73 @@ class App:
     
     def challenges(self):
         """
-        Display all available challenges.
+        Display one page of the available challenges.
+
+        The challenges come from the challenge catalog, which keeps them pre-sorted by name,
+        difficulty, creation date and popularity, so a request only reads the requested page
+        in the ordering chosen with /sort_challenges. It then renders the 'challenges.html'
+        template, passing the page of challenges to the template to be displayed to the user.
 
-        This method fetches a list of all challenges from the database using the
-        SqlService.get_all_challenges method. It then renders the 'challenges.html'
-        template, passing the list of challenges to the template to be displayed to
-        the user.
+        The rendered list is cached on the catalog version of the ordering, and so is the whole
+        page for anonymous visitors (see can_cache_page).
 
         Returns:
-            An HTML page rendered from the 'challenges.html' template with all
-            challenges passed as a context variable.
+            An HTML page rendered from the 'challenges.html' template with the challenges of the
+            page (the 'page' query parameter, 1 by default) passed as a context variable.
+        """
+        sorting_criteria = session.get('sorting_criteria', ChallengeCatalog.DEFAULT_ORDERING)
+        if sorting_criteria not in ChallengeCatalog.ORDERINGS:
+            sorting_criteria = ChallengeCatalog.DEFAULT_ORDERING
+        per_page = min(max(1, request.args.get('per_page', self.challenges_per_page, type=int)), self.challenges_max_per_page)
+
+        privileged = bool(session.get('privileged_mode'))
+        version = self.catalog.get_version(sorting_criteria)
+        # The page is clamped to the available pages before it is used in a cache key, so
+        # out-of-range or junk page numbers share the entry of the page they render
+        challenges, page, pages = self.catalog.page(sorting_criteria, request.args.get('page', 1, type=int), per_page)
+
+        def render():
+            challenges_fragment = self.page_cache.get_or_render(
+                ('challenges_list', sorting_criteria, page, per_page, privileged), version,
+                lambda: Markup(render_template("challenges_list.html", challenges = challenges))
+            )
+            return render_template("challenges.html", challenges_fragment = challenges_fragment, page = page, pages = pages, sorting_criteria = sorting_criteria)
+
+        if self.can_cache_page():
+            return self.page_cache.get_or_render(('challenges_page', sorting_criteria, page, per_page, privileged), version, render)
+        return render()
+
+    def can_cache_page(self):
         """
+        Whether the whole page can be served from the page cache: only for anonymous visitors
+        without pending flash messages, since the navigation bar shows the logged-in user and
+        the flash messages are consumed by the rendering.
+        """
+        return 'user_id' not in session and '_flashes' not in session
 
-        #fetch all the challenges
-        challenges = SqlService.get_all_challenges()
+    def invalidate_challenge_pages(self, challenge_id):
+        """
+        Stops serving the rendered pages and fragments of a challenge, after it was changed.
+        The challenge lists are cached on the catalog version, which changes with the catalog.
 
-        #Sort the challenges by name
-        if( session['sorting_criteria'] == 'name'):
-            challenges = sorted(challenges, key=lambda x: x.name)
-            
-        #Sorting the challenges by their difficulty level
-        else:
-            difficulty_mapping = {'Easy': 1, 'Medium': 2, 'Hard': 3}
-            challenges.sort(key=lambda x: difficulty_mapping.get(x.difficulty, 0))
+        Parameters:
+            challenge_id (int): The ID of the changed challenge.
+        """
+        self.page_cache.bump(('challenge', challenge_id))
 
-        return render_template("challenges.html", challenges = challenges)
+    def refresh_catalog_entry(self, challenge_id):
+        """
+        Updates the position of a challenge in the catalog after it was inserted or edited,
+        or removes it if it has been deleted.
+
+        Parameters:
+            challenge_id (int): The ID of the changed challenge.
+        """
+        challenge = SqlService.get_challenge_by_id(challenge_id)
+        if challenge and not challenge.is_deleted:
+            self.catalog.upsert(challenge)
+        else:
+            self.catalog.remove(challenge_id)
 
     def insert_challenge(self):
         """
@@ -253,7 +361,7 @@ class App:
 
         It attempts to insert the new challenge into the database using the
         `SqlService.insert_challenge` function. If successful, it proceeds to insert the
-        associated test cases using the `SqlService.insert_challenge_test` function.
+        associated test cases at once using the `SqlService.insert_challenge_tests` function.
 
         If the challenge is inserted correctly, a success message is flashed to the user.
         If inserting any test case fails, an error message is flashed instead. In the
@@ -282,12 +390,12 @@ class App:
             if session['privileged_mode']:
                 last_id = SqlService.insert_challenge(session['user_id'],challenge_name,challenge_difficulty, challenge_description, stub_name, stub_block,time_allowed)
 
-                #inserting a challenge test cases
-                for input_case, output_case in zip(input_test_cases,output_test_cases):
-                    last_id_inserted = SqlService.insert_challenge_test(last_id[0]['LAST_INSERT_ID()'],input_case,output_case)
+                #inserting a challenge test cases, in a single transaction
+                if last_id:
+                    SqlService.insert_challenge_tests(last_id[0]['LAST_INSERT_ID()'], list(zip(input_test_cases, output_test_cases)))
             
                 if last_id != None:
-                    challenges = SqlService.get_all_challenges()
+                    self.refresh_catalog_entry(last_id[0]['LAST_INSERT_ID()'])
 
         except RuntimeError as err:
             print(f"Error! {err}")
@@ -296,16 +404,28 @@ class App:
     
 
     def submission(self, challenge_id):
-        
+        """
+        Queue a solution to a challenge for judging.
+
+        The submission is validated right away (unknown challenge, missing test cases, invalid
+        stub) and then handed to the judging queue, so the request returns without waiting for
+        the code to run. The result can be fetched from the status URL (polling) or the events
+        URL (server-sent events) returned in the response.
+
+        Parameters:
+            challenge_id (int): The ID of the challenge the solution is submitted for.
+
+        Returns:
+            A JSON response with the job id, status URL and events URL and a 202 status code, or
+            a JSON error response if the submission is rejected before being queued.
+        """
         if request.method != 'POST':
             abort(405)
 
         user_code = request.form.get('stub-block')
   
         # Retrieve challenge and test data from database
-        challenge = SqlService.get_challenge_by_id(challenge_id)
-        tests = SqlService.get_challenge_tests_by_id(challenge_id)
-
+        challenge, tests = SqlService.get_challenge_with_tests_by_id(challenge_id)
         if not challenge:
             abort(404)  # Challenge not found
 
@@ -322,29 +442,76 @@ class App:
                 flash={"message": msg, "category": "error"}
             ), 400
 
-        result_dict = DockerService.execute_code(challenge, tests, user_code)
+        # The session is not available to the judge workers, capture the account now
+        account_id = session.get('user_id')
+        try:
+            job = self.judge_queue.submit(
+                lambda job: self.judge_submission(challenge, tests, user_code, account_id, job),
+                account_id
+            )
+        except RuntimeError as err:
+            print(f"Error! {err}")
+            return jsonify(
+                message="The judge is busy. Please try again in a moment.",
+                flash={"message": "Too many submissions are waiting to be judged.", "category": "warning"}
+            ), 503
+
+        return jsonify(
+            job_id=job.id,
+            status=job.status,
+            status_url=url_for('submission_status', job_id=job.id),
+            events_url=url_for('submission_events', job_id=job.id)
+        ), 202
+
+    def judge_submission(self, challenge, tests, user_code, account_id, job=None):
+        """
+        Run a submission against the challenge test cases and record it if every test passed.
+
+        This is executed by a judge worker, outside of any request.
+
+        Parameters:
+            challenge (Challenge): The challenge the solution is submitted for.
+            tests (list): The challenge test cases.
+            user_code (str): The submitted code.
+            account_id (int): The ID of the submitting account.
+            job (JudgeJob, optional): The job being judged, which receives an 'output' event
+                with the prints of the submission as the tests run.
+
+        Returns:
+            The result payload (dict) and the HTTP status code describing it.
+        """
+        on_output = (lambda output: job.publish('output', output)) if job else None
+        # Identical resubmissions are served from the verdict cache without running the sandbox
+        result_dict = DockerService.execute_code_cached(challenge, tests, user_code, on_output)
         output_str = "\n".join(result_dict['print_outputs'])
 
-        if result_dict['tests_passed'] == result_dict['tests_total']:
+        # A submission that timed out is rejected, whatever its tests reported before the deadline
+        if result_dict['tests_passed'] == result_dict['tests_total'] and not result_dict['timeout']:
             try:
-                result = SqlService.insert_challenge_submission(challenge_id, session['user_id'], result_dict['exec_time'], result_dict['exec_chars'], user_code)
+                result = SqlService.insert_challenge_submission(challenge.id, account_id, result_dict['exec_time'], result_dict['exec_chars'], user_code)
 
                 if result:
-                    return jsonify(
+                    self.catalog.record_submission(challenge.id)
+                    submission_id = SqlService.get_inserted_id(result)
+                    if submission_id and result_dict.get('test_results'):
+                        SqlService.insert_challenge_submission_metrics(submission_id, result_dict['test_results'])
+                    return dict(
                         message="Correct! Your function returned the expected results for all test cases.",
                         flash={"message": "Submission added successfully!", "category": "success"},
                         printout=output_str,
                         exec_time=result_dict['exec_time'],
-                        exec_chars=result_dict['exec_chars']
+                        exec_chars=result_dict['exec_chars'],
+                        cpu_time=result_dict.get('cpu_time'),
+                        peak_rss_kb=result_dict.get('peak_rss_kb')
                     ), 200
                 else:
-                    return jsonify(
+                    return dict(
                         message="Failed to add your submission.",
                         printout=output_str,
                         flash={"message": "Failed to add submission.", "category": "error"}
                     ), 400
             except Exception as e:
-                return jsonify(
+                return dict(
                     message=str(e),
                     printout=output_str,
                     flash={"message": f"An unexpected error occurred: {e}", "category": "error"}
@@ -352,37 +519,448 @@ class App:
         else:
             # Handling for different types of errors
             if result_dict['error']:
-                return jsonify(
+                return dict(
                     message=result_dict['error'],
                     printout=output_str,
                     flash={"message": result_dict['error'], "category": "error"}
                 ), 400
             elif result_dict['timeout']:
-                return jsonify(
+                return dict(
                     message="Timeout Occurred!",
                     printout=output_str,
                     flash={"message": "A timeout occurred during the execution of your submission.", "category": "warning"}
                 ), 408
-            elif result_dict['exception']:
-                return jsonify(
+            else:
+                return dict(
                     message=result_dict['exception'],
                     printout=output_str,
                     flash={"message": result_dict['exception'], "category": "error"}
                 ), 500
 
+    def get_submission_job(self, job_id):
+        """
+        Returns the judging job with the given id, aborting with 404 if it is unknown, expired
+        or owned by another account.
+        """
+        job = self.judge_queue.get(job_id)
+        if job is None or job.account_id != session.get('user_id'):
+            abort(404)
+        return job
+
+    def submission_status(self, job_id):
+        """
+        Report the status of a judging job.
+
+        The optional 'wait' query parameter (seconds, at most 30) turns the request into a long
+        poll that returns as soon as the job is done. With the optional 'cursor' query parameter
+        (the number of job events already seen, 0 at first) it also returns as soon as new
+        events are published, with the prints streamed since ('output', the data of the
+        'output' events) and the 'cursor' to send next, for clients without server-sent events.
+
+        Parameters:
+            job_id (str): The job id returned when the solution was submitted.
+
+        Returns:
+            The result of the submission with its original status code once the job is done,
+            otherwise the job status with a 202 status code.
+        """
+        job = self.get_submission_job(job_id)
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        cursor = request.args.get('cursor', type=int)
+        events = []
+        if cursor is not None:
+            cursor = max(0, cursor)
+            events = job.next_events(cursor, timeout=wait)
+        elif wait > 0:
+            job.wait(wait)
+
+        if job.done:
+            return jsonify(dict(job.result, job_id=job.id, status=job.status)), job.status_code
+        status = job.to_dict()
+        if cursor is not None:
+            status['output'] = [data for event, data in events if event == 'output']
+            status['cursor'] = cursor + len(events)
+        return jsonify(status), 202
+
+    def submission_events(self, job_id):
+        """
+        Stream the progress of a judging job as server-sent events.
+
+        A 'status' event is sent when the job starts running, 'output' events with the prints of
+        the module body ('test_id' null) and of each test while the tests run, and a 'result'
+        event, holding the result of the submission and its status code, when it is done. Comments are sent while
+        the job is idle to keep the connection open.
+
+        Parameters:
+            job_id (str): The job id returned when the solution was submitted.
+
+        Returns:
+            A 'text/event-stream' response.
+        """
+        job = self.get_submission_job(job_id)
+
+        def stream():
+            cursor = 0
+            while True:
+                events = job.next_events(cursor, timeout=15)
+                for event, data in events:
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                cursor += len(events)
+                if any(event == 'result' for event, _ in events):
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+
+        return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def submission_stats(self):
+        """
+        Report the judging queue metrics: queue depth, running jobs and wait and run times, and
+        the sandbox timeouts ('timeouts': submissions killed at their deadline and whether their
+        sandboxes were reclaimed).
+
+        Returns:
+            A JSON response with the queue statistics.
+        """
+        return jsonify(dict(self.judge_queue.stats(), timeouts=DockerService.get_timeout_stats()))
+
+    def sql_stats(self):
+        """
+        Report the database metrics: the latency histogram of every stored procedure and query
+        ('queries', with their 'name', the largest total time first), the connection pool and
+        the read cache.
+
+        Returns:
+            A JSON response with the database statistics.
+        """
+        queries = [dict(stats, name=name) for name, stats in SqlService.get_query_stats().items()]
+        queries.sort(key=lambda query: query['total_sec'], reverse=True)
+        return jsonify(queries=queries, pool=SqlService.get_pool_stats(), cache=SqlService.get_cache_stats())
+
+    def start_request_timer(self):
+        g.request_started_at = time.perf_counter()
+
+    def record_request(self, response):
+        """
+        Record the latency and status of a request, by endpoint (requests matching no route
+        are grouped under 'unmatched' so that arbitrary URLs cannot create new series).
+
+        Parameters:
+            response (Response): The response.
+
+        Returns:
+            Response: The same response.
+        """
+        started_at = g.get('request_started_at')
+        if started_at is not None:
+            key = (request.endpoint or 'unmatched', request.method, str(response.status_code))
+            self.request_stats.record(key, time.perf_counter() - started_at, error=response.status_code >= 500)
+        return response
+
+    def profile_requested(self):
+        """
+        Check whether the request carries the profiling token in its X-Profile header.
+        """
+        return bool(self.profile_token) and request.headers.get('X-Profile') == self.profile_token
+
+    def start_profiling(self):
+        if request.endpoint in ('profile', 'profile_endpoint', 'profile_request'):
+            return
+        if self.profiler.should_profile(self.profile_requested()):
+            g.profile_id = self.profiler.start(request.endpoint or 'unmatched', request.path)
+
+    def tag_profiled_response(self, response):
+        # Tells the client where to find the stacks of its profiled request
+        if g.get('profile_id'):
+            response.headers['X-Profile-Id'] = str(g.profile_id)
+        return response
+
+    def stop_profiling(self, exception=None):
+        if g.get('profile_id'):
+            self.profiler.stop()
+
+    def can_view_profiles(self):
+        return bool(session.get('privileged_mode')) or self.profile_requested()
+
+    def profile(self):
+        """
+        List the profiled endpoints and the recent profiled requests, for moderators or
+        requests sending the profiling token.
+
+        Requests are profiled when they send the token (PROFILE_TOKEN) in an X-Profile header,
+        and a share of all requests (PROFILE_SAMPLE_RATE) is profiled at random. The response
+        of a profiled request carries its id in an X-Profile-Id header.
+
+        Returns:
+            A JSON response with the profiled 'endpoints' and 'requests', or 403.
+        """
+        if not self.can_view_profiles():
+            abort(403)
+        return jsonify(self.profiler.summary())
+
+    def profile_endpoint(self, endpoint):
+        """
+        Serve the stacks sampled in the profiled requests of an endpoint, summed, as collapsed
+        stacks ("outer;inner count" lines) to be turned into a flame graph, e.g. with
+        flamegraph.pl or speedscope.
+
+        Parameters:
+            endpoint (str): The endpoint, e.g. 'generic_challenge'.
+
+        Returns:
+            A text response with the collapsed stacks, or 403 or 404.
+        """
+        if not self.can_view_profiles():
+            abort(403)
+        stacks = self.profiler.endpoint_stacks(endpoint)
+        if stacks is None:
+            abort(404)
+        return Response(stacks, mimetype='text/plain')
+
+    def profile_request(self, request_id):
+        """
+        Serve the stacks sampled in a recent profiled request as collapsed stacks.
+
+        Parameters:
+            request_id (int): The id sent in the X-Profile-Id header of the profiled response.
+
+        Returns:
+            A text response with the collapsed stacks, or 403 or 404.
+        """
+        if not self.can_view_profiles():
+            abort(403)
+        stacks = self.profiler.request_stacks(request_id)
+        if stacks is None:
+            abort(404)
+        return Response(stacks, mimetype='text/plain')
+
+    def metrics(self):
+        """
+        Report the operational metrics in the Prometheus text exposition format: requests by
+        endpoint, method and status (counts and latency histograms), the judging queue, the
+        sandbox container pool and CPUs, the database connection pool and query latencies,
+        and the read, verdict and page caches.
+
+        Every figure is read from counters kept up to date by the services, so a scrape costs
+        a few lock acquisitions and the formatting of the series.
+
+        Returns:
+            A text response with the metrics.
+        """
+        metrics = PrometheusFormatter()
+        requests = self.request_stats.snapshot()
+        metrics.add('http_requests_total', 'counter', "HTTP requests by endpoint, method and status.",
+                    [(dict(zip(('endpoint', 'method', 'status'), key)), stats['count']) for key, stats in requests.items()])
+        metrics.add_histogram('http_request_duration_seconds', "HTTP request latency.", requests, ('endpoint', 'method', 'status'))
+
+        queue = self.judge_queue.stats()
+        metrics.add('judge_queue_depth', 'gauge', "Submissions waiting for a judge worker.", [(None, queue['depth'])])
+        metrics.add('judge_jobs_running', 'gauge', "Submissions being judged.", [(None, queue['running'])])
+        metrics.add('judge_workers', 'gauge', "Judge workers.", [(None, queue['workers'])])
+        metrics.add('judge_submissions_total', 'counter', "Submissions by outcome in the judging queue.",
+                    [({'outcome': outcome}, queue[outcome]) for outcome in ('submitted', 'rejected', 'completed')])
+        metrics.add('judge_wait_seconds_total', 'counter', "Time submissions spent waiting for a worker.", [(None, queue['wait_sec_total'])])
+        metrics.add('judge_run_seconds_total', 'counter', "Time spent judging submissions.", [(None, queue['run_sec_total'])])
+        metrics.add('judge_timeouts_total', 'counter', "Submissions and test cases that exceeded their time limit.",
+                    [({'kind': kind}, count) for kind, count in DockerService.get_timeout_stats().items()])
+        metrics.add('sandbox_cpus_busy', 'gauge', "CPUs running at least one sandbox.", [(None, DockerService.get_cpu_stats()['busy'])])
+
+        container_pool = DockerService.get_pool_stats()
+        if container_pool:
+            metrics.add('container_pool_containers', 'gauge', "Pooled sandbox containers by state.",
+                        [({'state': state}, container_pool[state]) for state in ('idle', 'leased')])
+            metrics.add('container_pool_events_total', 'counter', "Container pool events.",
+                        [({'event': event}, container_pool[event]) for event in ('created', 'destroyed', 'recycled', 'unhealthy', 'leases')])
+            metrics.add('container_pool_lease_wait_seconds_total', 'counter', "Time spent waiting for a pooled container.",
+                        [(None, container_pool['lease_wait_sec_total'])])
+
+        db_pool = SqlService.get_pool_stats()
+        if db_pool:
+            metrics.add('db_pool_connections', 'gauge', "Pooled database connections by state.",
+                        [({'state': state}, db_pool[state]) for state in ('idle', 'borrowed')])
+            metrics.add('db_pool_max_size', 'gauge', "Maximum number of pooled database connections.", [(None, db_pool['max_size'])])
+            metrics.add('db_pool_events_total', 'counter', "Database connection pool events.",
+                        [({'event': event}, db_pool[event]) for event in ('created', 'closed', 'borrows', 'evicted', 'invalid', 'timeouts')])
+            metrics.add('db_pool_wait_seconds_total', 'counter', "Time spent waiting for a pooled connection.", [(None, db_pool['wait_sec_total'])])
+
+        queries = SqlService.get_query_stats()
+        metrics.add_histogram('db_query_duration_seconds', "Stored procedure and query latency.", queries, ('query',))
+        metrics.add('db_query_errors_total', 'counter', "Failed stored procedure calls and queries.",
+                    [({'query': name}, stats['errors']) for name, stats in queries.items()])
+
+        caches = {'sql': SqlService.get_cache_stats(), 'verdict': DockerService.get_result_cache_stats(), 'page': self.page_cache.stats()}
+        metrics.add('cache_requests_total', 'counter', "Cache lookups by result.",
+                    [({'cache': name, 'result': result}, stats[key]) for name, stats in caches.items() for result, key in (('hit', 'hits'), ('miss', 'misses'))])
+        metrics.add('cache_hit_ratio', 'gauge', "Share of the cache lookups that were hits.",
+                    [({'cache': name}, stats['hits'] / (stats['hits'] + stats['misses']) if stats['hits'] + stats['misses'] else 0.0) for name, stats in caches.items()])
+        metrics.add('cache_entries', 'gauge', "Cached entries.", [({'cache': name}, stats['size']) for name, stats in caches.items()])
+
+        return Response(metrics.render(), content_type=PrometheusFormatter.CONTENT_TYPE)
+
+    @staticmethod
+    def encode_cursor(position):
+        """
+        Encode a keyset position as an opaque, URL-safe pagination cursor.
+
+        Parameters:
+            position (dict): The sort key values of the last item of a page.
+
+        Returns:
+            str: The cursor to pass back to get the next page.
+        """
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, key):
+        """
+        Decode a pagination cursor made by encode_cursor, aborting with 400 if it is malformed.
+
+        Parameters:
+            cursor (str): The cursor passed by the client.
+            key (str): The name of the integer sort key stored in the cursor.
+
+        Returns:
+            int: The sort key value the next page starts after.
+        """
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            value = position[key]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            abort(400)
+        if not isinstance(value, int) or isinstance(value, bool):
+            abort(400)
+        return value
+
+    def get_page_size(self):
+        """
+        Read the 'limit' query parameter, clamped between 1 and the maximum page size.
+        """
+        return min(max(1, request.args.get('limit', self.api_page_size, type=int)), self.api_max_page_size)
+
+    @staticmethod
+    def challenge_summary_to_dict(challenge):
+        return {
+            'id': challenge.id,
+            'created_at': challenge.created_at.isoformat() if challenge.created_at else None,
+            'account_id': challenge.account_id,
+            'name': challenge.name,
+            'difficulty': challenge.difficulty,
+            'stub_name': challenge.stub_name,
+            'time_allowed_sec': challenge.time_allowed_sec
+        }
+
+    @staticmethod
+    def submission_summary_to_dict(submission):
+        return {
+            'id': submission.id,
+            'created_at': submission.created_at.isoformat() if submission.created_at else None,
+            'challenge_id': submission.challenge_id,
+            'account_id': submission.account_id,
+            'exec_time': submission.exec_time,
+            'exec_chars': submission.exec_chars,
+            'cpu_time': submission.cpu_time,
+            'peak_rss_kb': submission.peak_rss_kb
+        }
+
+    def api_challenges(self):
+        """
+        List challenge summaries, one keyset-paginated page at a time.
+
+        Only the columns needed to list the challenges are returned, the description and the stub
+        block are loaded on demand through /api/challenges/<id>. Pages are ordered by challenge id
+        and the 'cursor' query parameter resumes after the last challenge of the previous page, so
+        deep pages cost the same as the first one.
+
+        Returns:
+            A JSON response with the 'challenges' of the page and the 'next_cursor', which is None
+            on the last page.
+        """
+        cursor = request.args.get('cursor')
+        after_id = self.decode_cursor(cursor, 'id') if cursor else 0
+        limit = self.get_page_size()
+
+        # Fetch one extra row to know whether there is a next page
+        challenges = SqlService.get_challenge_summaries(after_id, limit + 1)
+        next_cursor = self.encode_cursor({'id': challenges[limit - 1].id}) if len(challenges) > limit else None
+
+        return jsonify(challenges=[self.challenge_summary_to_dict(challenge) for challenge in challenges[:limit]], next_cursor=next_cursor)
+
+    def api_challenge(self, challenge_id):
+        """
+        Return a challenge with its full description and stub block.
+
+        Parameters:
+            challenge_id (int): The unique identifier of the challenge.
+
+        Returns:
+            A JSON response with the challenge, or 404 if it does not exist.
+        """
+        challenge = SqlService.get_challenge_by_id(challenge_id)
+        if challenge is None:
+            abort(404)
+
+        return jsonify(dict(self.challenge_summary_to_dict(challenge), description=challenge.description, stub_block=challenge.stub_block))
+
+    def api_challenge_submissions(self, challenge_id):
+        """
+        List the logged-in user's submissions for a challenge, newest first, one keyset-paginated page at a time.
+
+        The source code of the submissions is not included, it is loaded on demand through
+        /api/submissions/<id>.
+
+        Parameters:
+            challenge_id (int): The unique identifier of the challenge.
+
+        Returns:
+            A JSON response with the 'submissions' of the page and the 'next_cursor', which is None
+            on the last page, or 401 if the user is not logged in.
+        """
+        account_id = session.get('user_id')
+        if account_id is None:
+            return jsonify({'message': 'login required'}), 401
+
+        cursor = request.args.get('cursor')
+        before_id = self.decode_cursor(cursor, 'id') if cursor else None
+        limit = self.get_page_size()
+
+        submissions = SqlService.get_challenge_submission_summaries(challenge_id, account_id, before_id, limit + 1)
+        next_cursor = self.encode_cursor({'id': submissions[limit - 1].id}) if len(submissions) > limit else None
+
+        return jsonify(submissions=[self.submission_summary_to_dict(submission) for submission in submissions[:limit]], next_cursor=next_cursor)
+
+    def api_submission(self, submission_id):
+        """
+        Return one of the logged-in user's submissions with its source code.
+
+        Parameters:
+            submission_id (int): The unique identifier of the submission.
+
+        Returns:
+            A JSON response with the submission, or 404 if it does not exist or belongs to another account.
+        """
+        submission = SqlService.get_challenge_submission_by_id(submission_id)
+        if submission is None or session.get('user_id') is None or submission.account_id != session.get('user_id'):
+            abort(404)
+
+        return jsonify(dict(self.submission_summary_to_dict(submission), exec_src=submission.exec_src))
+
     def generic_challenge(self, challenge_id):
         """
         Retrieve and display the details of a specific challenge.
 
         This method fetches the details of a given challenge, including its test cases and comments,
         from the database. It retrieves the challenge information by its ID, the associated test cases, 
-        and any comments related to the challenge.
+        and any comments related to the challenge, all in a single stored procedure call.
 
-        If the user is logged in (indicated by the presence of 'id' in the session), it also fetches
+        If the user is logged in (indicated by the presence of 'user_id' in the session), it also fetches
         the user's submissions for this challenge. The submission data, if present, along with the
         challenge details, tests, and comments are then passed to the 'challenge.html' template for
         rendering.
 
+        The test cases and comments are rendered as fragments cached on the content version of the
+        challenge, bumped by the handlers changing it, and the privilege flag. Anonymous visitors
+        are served the whole cached page without querying the database.
+
         Parameters:
             challenge_id (int): The unique identifier of the challenge whose details are to be displayed.
 
@@ -390,23 +968,49 @@ class App:
             The 'challenge.html' template rendered with the challenge details, tests, comments, and user
             submission data (if the user is logged in and has submission data).
         """
-        #Get the challenge details
-        challenge = SqlService.get_challenge_by_id(challenge_id)
-
-        #Get the challenge test cases
-        testcases = SqlService.get_challenge_tests_by_id(challenge_id)
-        comments = SqlService.get_challenge_comments_by_id(challenge_id)
-        if 'user_id' in session:
-            account_id = session['user_id']
-            submission = SqlService.get_challenge_submissions_by_id_and_account_id(challenge_id, account_id)
+        # The version is read first, a change committed while rendering is then never served
+        version = self.page_cache.version(('challenge', challenge_id))
+        if self.can_cache_page():
+            page = self.page_cache.get_or_render(
+                ('challenge_page', challenge_id, bool(session.get('privileged_mode'))), version,
+                lambda: self.render_challenge_page(challenge_id, version)
+            )
         else:
-            submission = None
+            page = self.render_challenge_page(challenge_id, version)
 
-        if challenge:
-            return render_template('challenge.html', challenge=challenge, testcases=testcases, comments = comments, submission = submission)
+        if page:
+            return page
         else: 
             return abort(404)
 
+    def render_challenge_page(self, challenge_id, version):
+        """
+        Renders the page of a challenge with its cached test case and comment fragments.
+
+        Parameters:
+            challenge_id (int): The ID of the challenge.
+            version (int): The content version of the challenge, read before loading it.
+
+        Returns:
+            The rendered 'challenge.html' template, or None if the challenge does not exist.
+        """
+        #Get the challenge details, test cases, comments and the user's submissions in one round-trip
+        account_id = session.get('user_id')
+        challenge, testcases, comments, submission = SqlService.get_challenge_page_by_id(challenge_id, account_id)
+        if not challenge:
+            return None
+
+        privileged = bool(session.get('privileged_mode'))
+        testcases_fragment = self.page_cache.get_or_render(
+            ('challenge_testcases', challenge_id, privileged), version,
+            lambda: Markup(render_template('challenge_testcases.html', challenge=challenge, testcases=testcases))
+        )
+        comments_fragment = self.page_cache.get_or_render(
+            ('challenge_comments', challenge_id, privileged), version,
+            lambda: Markup(render_template('challenge_comments.html', challenge=challenge, comments=comments))
+        )
+        return render_template('challenge.html', challenge=challenge, testcases_fragment=testcases_fragment, comments_fragment=comments_fragment, submission = submission)
+
     def submit_comment(self, challenge_id):
         """
         Submit a comment on a challenge by a logged-in user.
@@ -439,6 +1043,7 @@ class App:
                 #Inserting the comment to the challenge
                 else:
                     insert_id = SqlService.insert_challenge_comment(session['user_id'],challenge_id, comment_title, comment_content)
+                    self.invalidate_challenge_pages(challenge_id)
 
             except RuntimeError as err:
                 print(f"Error! {err}")
@@ -465,6 +1070,8 @@ class App:
         try:
             if session['privileged_mode']:
                 delete_confirmation = SqlService.delete_challenge_by_id(challenge_id)
+                self.catalog.remove(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
 
             #delete_test_confirmation = SqlService.get_challenge_test_by_id(challenge_id)
           
@@ -496,6 +1103,8 @@ class App:
 
             if session['privileged_mode']:
                 SqlService.update_challenge_name_by_id(challenge_id, new_challenge_name['new_challenge_name'])
+                self.refresh_catalog_entry(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 return jsonify({'message': 'ok'}), 200
         except RuntimeError as err:
             print(f"Error occurred while updating challenge name! {err}")
@@ -521,6 +1130,8 @@ class App:
 
             if session['privileged_mode']:
                 SqlService.update_challenge_difficulty_by_id(challenge_id,new_difficulty_level['newValue'])
+                self.refresh_catalog_entry(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 return jsonify({'message': 'ok'}), 200
          except:
              return jsonify({'message': 'unautorized user'}), 403
@@ -549,6 +1160,8 @@ class App:
 
             if session['privileged_mode']:
                 SqlService.update_challenge_description_by_id(challenge_id, new_challenge_discr['new_challenge_discr'])
+                self.refresh_catalog_entry(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 return jsonify({'message': 'ok'}), 200
         
         except RuntimeError as err:
@@ -577,6 +1190,8 @@ class App:
 
             if session['privileged_mode']:
                 SqlService.update_challenge_stub_name_by_id(challenge_id, new_stub_name['stub_name'])
+                self.refresh_catalog_entry(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 return jsonify({'message': 'ok'}), 200
         
         except RuntimeError as err:
@@ -603,6 +1218,8 @@ class App:
             new_stub_block = request.form['stub-block']
             if session['privileged_mode']:
                 SqlService.update_challenge_stub_block_by_id(challenge_id, new_stub_block)
+                self.refresh_catalog_entry(challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 #returning an Okay message to the caller
                 return  redirect(url_for('generic_challenge', challenge_id=challenge_id))
            
@@ -632,6 +1249,7 @@ class App:
 
             if session['privileged_mode']:
                 SqlService.insert_challenge_test(challenge_id, input_parameter, output_parameter)
+                self.invalidate_challenge_pages(challenge_id)
            
         except RuntimeError as err:
             print(f"Error occurred adding new test case. {err}")
@@ -639,6 +1257,95 @@ class App:
         return  redirect(url_for('generic_challenge', challenge_id=challenge_id))
         
 
+    @staticmethod
+    def parse_test_cases(data, format):
+        """
+        Parse imported test cases.
+
+        CSV files hold one test case per row, its input and expected output in two columns,
+        optionally below an 'input,output' header. JSON files hold a list of
+        {"input": ..., "output": ...} objects or of [input, output] pairs. Inputs and outputs
+        are Python literals, given as strings (numbers are accepted too).
+
+        Parameters:
+            data (str): The file content.
+            format (str): 'csv' or 'json'.
+
+        Returns:
+            list: The (input, output) string pairs.
+
+        Raises:
+            ValueError: If the content is malformed.
+        """
+        if format == 'json':
+            try:
+                items = json.loads(data)
+            except json.JSONDecodeError as err:
+                raise ValueError(f"Invalid JSON: {err}")
+            if not isinstance(items, list):
+                raise ValueError("The JSON document must be a list of test cases")
+            rows = []
+            for item in items:
+                if isinstance(item, dict) and 'input' in item and 'output' in item:
+                    rows.append([item['input'], item['output']])
+                elif isinstance(item, list):
+                    rows.append(item)
+                else:
+                    raise ValueError(f"Invalid test case: {item!r}")
+        else:
+            rows = [row for row in csv.reader(io.StringIO(data)) if row]
+            if rows and [column.strip().lower() for column in rows[0]] == ['input', 'output']:
+                rows = rows[1:]
+
+        tests = []
+        for number, row in enumerate(rows, start=1):
+            if len(row) != 2 or not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in row):
+                raise ValueError(f"Test case {number} must have an input and an output")
+            tests.append((str(row[0]), str(row[1])))
+        return tests
+
+    def import_test_cases(self, challenge_id):
+        """
+        Import the test cases of a challenge from a CSV or JSON file (see parse_test_cases).
+
+        The file is sent as the 'file' field of a multipart form or as the request body; it is
+        read as JSON if its name ends with '.json' or its content type is 'application/json',
+        and as CSV otherwise. All the test cases are inserted in a single transaction, at most
+        TEST_IMPORT_MAX_ROWS at a time.
+
+        Parameters:
+            challenge_id (int): The ID of the challenge the test cases are added to.
+
+        Returns:
+            A JSON response with the number of 'imported' test cases, or an error with a 400
+            (malformed file), 403 (not a moderator), 404 (unknown challenge), 413 (too many
+            test cases) or 500 (database error) status code.
+        """
+        if not session.get('privileged_mode'):
+            return jsonify(message="Only moderators can import test cases."), 403
+        if not SqlService.get_challenge_by_id(challenge_id):
+            abort(404)
+
+        upload = request.files.get('file')
+        if upload:
+            data, filename, content_type = upload.read(), upload.filename or '', upload.mimetype
+        else:
+            data, filename, content_type = request.get_data(), '', request.mimetype
+        format = 'json' if filename.lower().endswith('.json') or content_type == 'application/json' else 'csv'
+
+        try:
+            tests = self.parse_test_cases(data.decode('utf-8-sig'), format)
+        except (ValueError, UnicodeDecodeError) as err:
+            return jsonify(message=f"Invalid test case file: {err}"), 400
+        if len(tests) > self.test_import_max_rows:
+            return jsonify(message=f"At most {self.test_import_max_rows} test cases can be imported at once."), 413
+
+        imported = SqlService.insert_challenge_tests(challenge_id, tests)
+        if imported is None:
+            return jsonify(message="Failed to import the test cases."), 500
+        self.invalidate_challenge_pages(challenge_id)
+        return jsonify(imported=imported)
+
     def delete_test_case(self, challenge_id, test_case_id): 
         """
         Deletes a test case from a challenge if the user has the necessary privileges.
@@ -657,6 +1364,7 @@ class App:
         try:
             if session['privileged_mode']:
                 SqlService.delete_challenge_test_by_id_and_challenge_id(test_case_id, challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
                 return jsonify({'message': 'ok'}), 200
 
         except RuntimeError as err:
@@ -685,6 +1393,7 @@ class App:
         try:
             if session['privileged_mode']:
                 SqlService.delete_challenge_comment_by_id_and_challenge_id(comment_id, challenge_id)
+                self.invalidate_challenge_pages(challenge_id)
             
         except RuntimeError as err:
             print(f'Error Deleting Comment! {err}')
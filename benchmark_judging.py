@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from classes.challenge.challenge import Challenge
+from classes.challenge.challengetest import ChallengeTest
+from classes.util.dockerservice import DockerService
+from classes.util.latencystats import LatencyStats
+
+BUILD_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql', 'build.sql')
+
+# Correct solutions of the seed challenges, used to judge and to compute generated test outputs
+REFERENCE_SOLUTIONS = {
+    'sum': "def sum(a, b):\n    return a + b\n",
+    'max_integer': "def max_integer(lst):\n    return max(lst)\n",
+    'fizz_buzz': (
+        "def fizz_buzz(n):\n"
+        "    result = []\n"
+        "    for i in range(1, n + 1):\n"
+        "        if i % 15 == 0:\n"
+        "            result.append('FizzBuzz')\n"
+        "        elif i % 3 == 0:\n"
+        "            result.append('Fizz')\n"
+        "        elif i % 5 == 0:\n"
+        "            result.append('Buzz')\n"
+        "        else:\n"
+        "            result.append(str(i))\n"
+        "    return result\n"
+    ),
+    'power': "def power(a, b):\n    return a ** b\n"
+}
+
+# Random test inputs for the generated large test sets
+INPUT_GENERATORS = {
+    'sum': lambda rng: f"{rng.randint(-10**6, 10**6)}, {rng.randint(-10**6, 10**6)}",
+    'max_integer': lambda rng: repr([rng.randint(-1000, 1000) for _ in range(rng.randint(1, 50))]),
+    'fizz_buzz': lambda rng: str(rng.randint(1, 100)),
+    'power': lambda rng: f"{rng.randint(-10, 10)}, {rng.randint(0, 10)}"
+}
+
+def parse_sql_values(text):
+    """
+    Parses the value tuples of a MySQL INSERT statement, e.g. "(1, 'a', 2.5), (2, 'b', NULL)".
+    """
+    rows, row, position = [], None, 0
+    while position < len(text):
+        char = text[position]
+        if char == '(' and row is None:
+            row = []
+        elif char == ')' and row is not None:
+            rows.append(row)
+            row = None
+        elif char == "'" and row is not None:
+            value = []
+            position += 1
+            while text[position] != "'":
+                if text[position] == '\\':
+                    position += 1
+                    value.append({'n': '\n', 'r': '\r', 't': '\t', '0': '\0'}.get(text[position], text[position]))
+                else:
+                    value.append(text[position])
+                position += 1
+            row.append(''.join(value))
+        elif row is not None and (char.isdigit() or char in '-.N'):
+            match = re.match(r"NULL|-?\d+(\.\d+)?", text[position:])
+            token = match.group(0)
+            row.append(None if token == 'NULL' else float(token) if '.' in token else int(token))
+            position += len(token) - 1
+        position += 1
+    return rows
+
+def load_seed_challenges(path=BUILD_SQL):
+    """
+    Loads the seed challenges that have a reference solution, with their seed test cases.
+
+    Returns:
+        list: (Challenge, list of ChallengeTest) pairs.
+    """
+    with open(path, encoding='utf-8') as sql_file:
+        sql = sql_file.read()
+
+    def inserts(table):
+        pattern = r"INSERT INTO `" + table + r"` \([^)]*\) VALUES (.*?);\r?\n"
+        return [row for values in re.findall(pattern, sql) for row in parse_sql_values(values)]
+
+    tests = {}
+    for test_id, challenge_id, is_deleted, test_input, test_output in inserts('challenge_test'):
+        if not is_deleted:
+            tests.setdefault(challenge_id, []).append(ChallengeTest(test_id, challenge_id, False, test_input, test_output))
+
+    challenges = []
+    for row in inserts('challenge'):
+        challenge = Challenge(*row)
+        if challenge.stub_name in REFERENCE_SOLUTIONS and not challenge.is_deleted:
+            challenges.append((challenge, tests.get(challenge.id, [])))
+    return challenges
+
+def generate_tests(challenge, count, seed=0):
+    """
+    Generates random test cases for a seed challenge, computing the expected outputs with its reference solution.
+    """
+    namespace = {}
+    exec(REFERENCE_SOLUTIONS[challenge.stub_name], namespace)
+    function = namespace[challenge.stub_name]
+    rng = random.Random(seed)
+
+    tests = []
+    for index in range(count):
+        test_input = INPUT_GENERATORS[challenge.stub_name](rng)
+        test_output = repr(eval(f"function({test_input})", {'function': function}))
+        tests.append(ChallengeTest(-(index + 1), challenge.id, False, test_input, test_output))
+    return tests
+
+def build_scenarios(large_tests):
+    """
+    Returns the benchmark scenarios: every seed challenge with its seed tests and with a generated large test set.
+    """
+    scenarios = []
+    for challenge, tests in load_seed_challenges():
+        if tests:
+            scenarios.append((f"{challenge.stub_name}/seed", challenge, tests))
+        if large_tests > 0:
+            scenarios.append((f"{challenge.stub_name}/large", challenge, generate_tests(challenge, large_tests, seed=challenge.id)))
+    return scenarios
+
+def run_scenario(challenge, tests, runs, warmup):
+    """
+    Judges the reference solution of a challenge repeatedly.
+
+    Returns:
+        dict: Latency summaries (seconds) of the whole judgement and of the test execution, the
+            per-test overhead and the share of the latency spent outside test execution
+            (container start-up and teardown).
+    """
+    code = REFERENCE_SOLUTIONS[challenge.stub_name]
+    latencies, exec_times, failures = [], [], 0
+    for run in range(warmup + runs):
+        start_time = time.perf_counter()
+        result = DockerService.execute_code(challenge, tests, code)
+        latency = time.perf_counter() - start_time
+        if run < warmup:
+            continue
+        if result['tests_passed'] != result['tests_total']:
+            failures += 1
+        latencies.append(latency)
+        exec_times.append(result['exec_time'])
+
+    startup_shares = [(latency - exec_time) / latency for latency, exec_time in zip(latencies, exec_times) if latency > 0]
+    return {
+        'tests': len(tests),
+        'runs': runs,
+        'failures': failures,
+        'latency': LatencyStats.summarize(latencies),
+        'exec_time': LatencyStats.summarize(exec_times),
+        'per_test_overhead': LatencyStats.summarize([exec_time / len(tests) for exec_time in exec_times]) if tests else None,
+        'startup_share': sum(startup_shares) / len(startup_shares) if startup_shares else None
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the judging pipeline (DockerService.execute_code) on the seed challenges.")
+    parser.add_argument('--runs', type=int, default=20, help="measured runs per scenario")
+    parser.add_argument('--warmup', type=int, default=2, help="unmeasured runs per scenario")
+    parser.add_argument('--large-tests', type=int, default=200, help="size of the generated test sets, 0 to skip them")
+    parser.add_argument('--backend', choices=['docker', 'local'], help="sandbox backend, defaults to SANDBOX_BACKEND")
+    parser.add_argument('--only', help="regular expression selecting the scenarios to run")
+    parser.add_argument('--output', default='benchmark_results.json', help="where the JSON results are written")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+    if args.backend:
+        DockerService.BACKEND = args.backend
+
+    results = {
+        'generated_at': datetime.now().isoformat(),
+        'host': platform.node(),
+        'config': {
+            'backend': DockerService.BACKEND,
+            'harness_mode': DockerService.HARNESS_MODE,
+            'pool_size': DockerService.POOL_SIZE,
+            'shards': DockerService.SHARDS,
+            'runs': args.runs,
+            'warmup': args.warmup,
+            'large_tests': args.large_tests
+        },
+        'scenarios': {}
+    }
+    for name, challenge, tests in build_scenarios(args.large_tests):
+        if args.only and not re.search(args.only, name):
+            continue
+        print(f"Running {name} ({len(tests)} tests)...")
+        scenario = run_scenario(challenge, tests, args.runs, args.warmup)
+        results['scenarios'][name] = scenario
+        latency = scenario['latency']
+        print(f"  p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s  start-up share {scenario['startup_share']:.0%}")
+
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = LatencyStats.compare(
+            {name: scenario['latency'] for name, scenario in results['scenarios'].items()},
+            {name: scenario['latency'] for name, scenario in baseline.get('scenarios', {}).items()},
+            tolerance=args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} {regression['key']}: {regression['baseline']:.3f}s -> {regression['current']:.3f}s ({regression['change']:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regression against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
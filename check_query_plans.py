@@ -0,0 +1,203 @@
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+import mysql.connector
+from classes.util.sqlservice import SqlService
+
+BUILD_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql', 'build.sql')
+
+# Procedures that read a whole table by design (they list it), with the tables they may scan
+# as EXPLAIN names them (by alias)
+FULL_SCAN_ALLOWED = {
+    'GetAllChallenges': {'challenge'},
+    'GetUnsolvedChallengesByAccountId': {'c'}
+}
+
+# Statements EXPLAIN can describe, INSERT ... VALUES statements never read a table
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+def parse_procedures(sql):
+    """
+    Extracts the stored procedures of a schema script.
+
+    Returns:
+        list: (name, parameters, statements) tuples, the parameters being (name, type) pairs
+            and the statements the SQL statements of the procedure body.
+    """
+    procedures = []
+    pattern = r"CREATE PROCEDURE `(\w+)`\((.*?)\)\s*BEGIN(.*?)\bEND\s*;;"
+    for name, parameters, body in re.findall(pattern, sql, re.DOTALL):
+        parameters = re.findall(r"\bIN\s+(\w+)\s+(\w+)", parameters, re.IGNORECASE)
+        statements = [" ".join(statement.split()) for statement in body.split(';')]
+        procedures.append((name, parameters, [statement for statement in statements if statement]))
+    return procedures
+
+def bind_parameters(statement, parameters, values):
+    """
+    Replaces the parameters of a procedure statement with pyformat placeholders.
+
+    Args:
+        statement (str): The statement.
+        parameters (list): The procedure's (name, type) parameters.
+        values (dict): The value of every parameter, by name.
+
+    Returns:
+        tuple: The statement with placeholders and the values it uses.
+    """
+    used = {}
+    for name, _ in parameters:
+        # A parameter shadows a column everywhere but as the target of an UPDATE assignment
+        pattern = r"(?<!SET )(?<!, )(?<![\w.])" + name + r"\b"
+        if re.search(pattern, statement):
+            statement = re.sub(pattern, f"%({name})s", statement)
+            used[name] = values[name]
+    return statement, used
+
+def sample_value(name, type, samples):
+    """
+    Picks a representative value for a procedure parameter from its name and type.
+
+    Args:
+        samples (dict): Existing ids ('account', 'challenge', 'challenge_test', 'comment',
+            'submission') and an existing 'username' and 'password'.
+    """
+    name = name.lower()
+    if type.lower() in ('varchar', 'text', 'char', 'enum'):
+        if 'username' in name:
+            return samples['username']
+        if 'password' in name:
+            return samples['password']
+        return 'x'
+    if type.lower() in ('double', 'float', 'decimal'):
+        return 1.0
+    if 'deleted' in name:
+        return 0
+    if 'limit' in name:
+        return 20
+    if 'after' in name:
+        return 0
+    if 'before' in name:
+        return 2 ** 31 - 1
+    for key in ('comment', 'submission', 'test', 'account', 'usergroup'):
+        if key in name:
+            return samples.get('challenge_test' if key == 'test' else key, 1)
+    return samples['challenge']
+
+def find_full_scans(plan_rows, procedure):
+    """
+    Returns the tables an EXPLAIN plan reads in full (access type ALL) that the procedure is not
+    allowed to scan.
+    """
+    allowed = FULL_SCAN_ALLOWED.get(procedure, set())
+    return [row['table'] for row in plan_rows if row.get('type') == 'ALL' and row.get('table') not in allowed]
+
+def seed(connection, accounts, challenges, tests_per_challenge, submissions):
+    """
+    Inserts a synthetic dataset large enough for the optimizer to prefer indexes over scans.
+    """
+    now = datetime.now()
+    cursor = connection.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM account")
+    first_account = cursor.fetchone()[0] + 1
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM challenge")
+    first_challenge = cursor.fetchone()[0] + 1
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM challenge_submission")
+    first_submission = cursor.fetchone()[0] + 1
+
+    def insert(statement, rows):
+        for start in range(0, len(rows), SqlService.BULK_BATCH_SIZE):
+            cursor.executemany(statement, rows[start:start + SqlService.BULK_BATCH_SIZE])
+
+    account_ids = range(first_account, first_account + accounts)
+    challenge_ids = range(first_challenge, first_challenge + challenges)
+    insert("INSERT INTO account (id, created_at, is_deleted, usergroup_id, username, password, email) VALUES (%s, %s, 0, 3, %s, %s, %s)",
+           [(i, now, f"plan_user_{i}", f"plan_password_{i}", f"plan_user_{i}@example.com") for i in account_ids])
+    insert("INSERT INTO challenge (id, created_at, account_id, is_deleted, name, difficulty, description, stub_name, stub_block, time_allowed_sec) "
+           "VALUES (%s, %s, %s, 0, %s, 'Easy', 'Synthetic challenge', 'solve', 'def solve(x):', 5)",
+           [(i, now, account_ids[i % accounts], f"Plan challenge {i}") for i in challenge_ids])
+    insert("INSERT INTO challenge_test (challenge_id, is_deleted, input, output) VALUES (%s, 0, '1', '1')",
+           [(i,) for i in challenge_ids for _ in range(tests_per_challenge)])
+    insert("INSERT INTO challenge_comment (created_at, account_id, is_deleted, challenge_id, title, `text`) VALUES (%s, %s, 0, %s, 'Title', 'Text')",
+           [(now, account_ids[i % accounts], i) for i in challenge_ids])
+    submission_ids = range(first_submission, first_submission + submissions)
+    insert("INSERT INTO challenge_submission (id, created_at, challenge_id, account_id, exec_time, exec_chars, exec_src) VALUES (%s, %s, %s, %s, 0.1, 10, 'pass')",
+           [(i, now, challenge_ids[i % challenges], account_ids[(i // challenges) % accounts]) for i in submission_ids])
+    insert("INSERT INTO challenge_submission_metric (challenge_submission_id, challenge_test_id, wall_time, cpu_user, cpu_sys, peak_rss_kb) VALUES (%s, 1, 0.1, 0.1, 0.0, 9000)",
+           [(i,) for i in submission_ids])
+    connection.commit()
+    for table in ('account', 'challenge', 'challenge_test', 'challenge_comment', 'challenge_submission', 'challenge_submission_metric'):
+        cursor.execute(f"ANALYZE TABLE `{table}`")
+        cursor.fetchall()
+    cursor.close()
+
+def load_samples(connection):
+    """
+    Picks existing rows to bind the procedure parameters to.
+    """
+    cursor = connection.cursor(dictionary=True)
+    samples = {}
+    for key, table in (('account', 'account'), ('challenge', 'challenge'), ('challenge_test', 'challenge_test'),
+                       ('comment', 'challenge_comment'), ('submission', 'challenge_submission')):
+        cursor.execute(f"SELECT MAX(id) AS id FROM `{table}`")
+        samples[key] = cursor.fetchone()['id'] or 1
+    cursor.execute("SELECT username, password FROM account WHERE id = %s", (samples['account'],))
+    account = cursor.fetchone() or {'username': 'x', 'password': 'x'}
+    samples.update(username=account['username'], password=account['password'])
+    cursor.close()
+    return samples
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN the statements of every stored procedure of sql/build.sql and fail on full table scans.")
+    parser.add_argument('--seed', action='store_true', help="insert a synthetic dataset first (use a scratch database)")
+    parser.add_argument('--accounts', type=int, default=2000, help="accounts inserted by --seed")
+    parser.add_argument('--challenges', type=int, default=2000, help="challenges inserted by --seed")
+    parser.add_argument('--tests-per-challenge', type=int, default=20, help="test cases per challenge inserted by --seed")
+    parser.add_argument('--submissions', type=int, default=50000, help="submissions inserted by --seed")
+    parser.add_argument('--schema', default=BUILD_SQL, help="the script defining the procedures")
+    args = parser.parse_args(argv)
+
+    with open(args.schema, encoding='utf-8') as schema_file:
+        procedures = parse_procedures(schema_file.read())
+
+    connection = SqlService.create_connection()
+    try:
+        if args.seed:
+            print(f"Seeding {SqlService.DATABASE}...")
+            seed(connection, args.accounts, args.challenges, args.tests_per_challenge, args.submissions)
+        samples = load_samples(connection)
+
+        failures = 0
+        cursor = connection.cursor(dictionary=True)
+        for name, parameters, statements in procedures:
+            values = {parameter: sample_value(parameter, type, samples) for parameter, type in parameters}
+            for statement in statements:
+                if not statement.upper().startswith(EXPLAINABLE):
+                    continue
+                query, params = bind_parameters(statement, parameters, values)
+                try:
+                    cursor.execute("EXPLAIN " + query, params)
+                    plan = cursor.fetchall()
+                except mysql.connector.Error as err:
+                    print(f"ERROR {name}: {err}")
+                    failures += 1
+                    continue
+                scans = find_full_scans(plan, name)
+                if scans:
+                    failures += 1
+                    print(f"FULL SCAN {name} on {', '.join(scans)}: {statement}")
+                else:
+                    print(f"ok {name}: " + ", ".join(f"{row['table']}={row['type']}/{row['key']}" for row in plan))
+        cursor.close()
+    finally:
+        connection.close()
+
+    if failures:
+        print(f"{failures} statement(s) do a full table scan or could not be explained")
+        return 1
+    print("No full table scan")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 class ChallengeSubmission:
-    def __init__(self, id, created_at, challenge_id, account_id, exec_time, exec_chars, exec_src):
+    def __init__(self, id, created_at, challenge_id, account_id, exec_time, exec_chars, exec_src, cpu_time=None, peak_rss_kb=None):
         self._id = id
         self._created_at = created_at
         self._challenge_id = challenge_id
@@ -7,6 +7,8 @@ class ChallengeSubmission:
         self._exec_time = exec_time
         self._exec_chars = exec_chars
         self._exec_src = exec_src
+        self._cpu_time = cpu_time
+        self._peak_rss_kb = peak_rss_kb
 
     @property
     def id(self):
@@ -63,3 +65,19 @@ class ChallengeSubmission:
     @exec_src.setter
     def exec_src(self, value):
         self._exec_src = value
+
+    @property
+    def cpu_time(self):
+        return self._cpu_time
+
+    @cpu_time.setter
+    def cpu_time(self, value):
+        self._cpu_time = value
+
+    @property
+    def peak_rss_kb(self):
+        return self._peak_rss_kb
+
+    @peak_rss_kb.setter
+    def peak_rss_kb(self, value):
+        self._peak_rss_kb = value
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    A thread-safe in-process cache bounded both in size (least recently used entries
+    are evicted first) and in time (entries expire after a fixed time-to-live).
+
+    The cache is meant as a read-through layer: readers call get_or_load with the function
+    loading the value, writers invalidate the keys they change.
+    """
+
+    def __init__(self, max_size=1024, ttl_sec=60):
+        """
+        Args:
+            max_size (int): The maximum number of entries kept.
+            ttl_sec (float): How long an entry is served before it is loaded again. A
+                time-to-live (or size) of 0 disables the cache.
+        """
+        self._max_size = max_size
+        self._ttl_sec = ttl_sec
+        self._entries = OrderedDict()   # key -> (value, expires_at), least recently used first
+        self._generation = 0            # bumped by every invalidation
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @property
+    def enabled(self):
+        return self._max_size > 0 and self._ttl_sec > 0
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for a key, loading and caching it on a miss.
+
+        None values are returned but never cached, so failed or empty loads are retried.
+
+        Args:
+            key (hashable): The cache key.
+            loader (callable): Loads the value when it is not cached.
+
+        Returns:
+            object: The cached or freshly loaded value.
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            generation = self._generation
+
+        value = loader()
+        if value is None:
+            return value
+
+        with self._lock:
+            # A write invalidated the cache while loading, the value may already be stale
+            if generation != self._generation:
+                return value
+            self._entries[key] = (value, time.monotonic() + self._ttl_sec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Removes the given keys from the cache.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache metrics.
+
+        Returns:
+            dict: The number of entries, the configured bounds and the lifetime counters
+                (hits, misses, evictions, expirations and invalidations).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_size'] = self._max_size
+            stats['ttl_sec'] = self._ttl_sec
+        return stats
@@ -0,0 +1,230 @@
+import bisect
+import threading
+import time
+
+class ChallengeCatalog:
+    """
+    The list of available challenges, kept in every supported ordering.
+
+    Each ordering is a sorted list of (sort key, challenge id) pairs maintained with
+    bisect, so inserting, editing or deleting a challenge only moves that challenge
+    and listing a page costs O(page size) instead of a full sort per request.
+    The catalog is loaded lazily and reloaded periodically to pick up changes made
+    by other processes.
+    """
+
+    DIFFICULTY_RANKS = {'Easy': 1, 'Medium': 2, 'Hard': 3}
+    ORDERINGS = ('name', 'difficulty', 'created_at', 'popularity')
+    DEFAULT_ORDERING = 'difficulty'
+
+    def __init__(self, loader, refresh_sec=300):
+        """
+        Args:
+            loader (callable): Returns the list of challenges and a dict mapping challenge
+                ids to their number of submissions.
+            refresh_sec (float): How long the catalog is used before it is reloaded.
+        """
+        self._loader = loader
+        self._refresh_sec = refresh_sec
+        self._lock = threading.RLock()
+        self._loaded = threading.Condition(self._lock)  # notified when a load finishes
+        self._loaded_at = None       # None until the first load
+        self._invalidated = False
+        self._refreshing = False     # a thread is running the loader
+        self._journal = None         # changes applied while the loader runs, replayed on its result
+        self._challenges = {}        # challenge id -> Challenge
+        self._submissions = {}       # challenge id -> number of submissions
+        self._keys = {}              # challenge id -> {ordering: sort key}
+        self._indexes = {ordering: [] for ordering in self.ORDERINGS}
+        self._versions = {ordering: 0 for ordering in self.ORDERINGS}
+
+    def _sort_key(self, ordering, challenge, submissions=None):
+        if ordering == 'name':
+            return (challenge.name, challenge.id)
+        if ordering == 'difficulty':
+            return (self.DIFFICULTY_RANKS.get(challenge.difficulty, 0), challenge.id)
+        if ordering == 'created_at':
+            return (challenge.created_at, challenge.id)
+        # Most submitted first
+        submissions = self._submissions if submissions is None else submissions
+        return (-submissions.get(challenge.id, 0), challenge.id)
+
+    def _insert(self, challenge):
+        keys = {ordering: self._sort_key(ordering, challenge) for ordering in self.ORDERINGS}
+        for ordering, key in keys.items():
+            bisect.insort(self._indexes[ordering], key)
+        self._keys[challenge.id] = keys
+        self._challenges[challenge.id] = challenge
+
+    def _remove(self, challenge_id):
+        keys = self._keys.pop(challenge_id, None)
+        if keys is None:
+            return
+        for ordering, key in keys.items():
+            index = self._indexes[ordering]
+            del index[bisect.bisect_left(index, key)]
+        del self._challenges[challenge_id]
+
+    def _bump(self, *orderings):
+        for ordering in orderings or self.ORDERINGS:
+            self._versions[ordering] += 1
+
+    def _build(self, challenges, submissions):
+        submissions = dict(submissions or {})
+        challenges_by_id, keys_by_id = {}, {}
+        keyed = {ordering: [] for ordering in self.ORDERINGS}
+        for challenge in challenges or []:
+            keys = {ordering: self._sort_key(ordering, challenge, submissions) for ordering in self.ORDERINGS}
+            for ordering, key in keys.items():
+                keyed[ordering].append(key)
+            keys_by_id[challenge.id] = keys
+            challenges_by_id[challenge.id] = challenge
+        indexes = {ordering: sorted(keys) for ordering, keys in keyed.items()}
+        return challenges_by_id, submissions, keys_by_id, indexes
+
+    def load(self):
+        """
+        (Re)builds every ordering from the loader.
+
+        The loader runs and the orderings are built without holding the lock, so readers keep
+        using the previous snapshot meanwhile. The changes applied to the catalog in the
+        meantime are replayed on the new snapshot before it is swapped in (a submission
+        already counted by the loader may then be counted twice until the next reload).
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            snapshot = self._build(*self._loader())
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._challenges, self._submissions, self._keys, self._indexes = snapshot
+            for change in journal:
+                change()
+            self._loaded_at = time.monotonic()
+            self._invalidated = False
+            self._bump()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            while True:
+                stale = self._loaded_at is None or self._invalidated or time.monotonic() - self._loaded_at > self._refresh_sec
+                if not stale:
+                    return
+                if not self._refreshing:
+                    break
+                # Another thread is reloading: serve the previous snapshot, or wait for the first one
+                if self._loaded_at is not None:
+                    return
+                self._loaded.wait()
+            self._refreshing = True
+        try:
+            self.load()
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._loaded.notify_all()
+
+    def invalidate(self):
+        """
+        Forces a full reload on the next access.
+        """
+        with self._lock:
+            self._invalidated = True
+
+    def _apply(self, change):
+        # Applies a change to the current snapshot and records it for a running reload
+        if self._journal is not None:
+            self._journal.append(change)
+        if self._loaded_at is not None:
+            change()
+
+    def upsert(self, challenge):
+        """
+        Adds a challenge or moves an edited challenge to its new position in every ordering.
+        Does nothing until the catalog has been loaded, since the load will include it.
+        """
+        def change():
+            self._remove(challenge.id)
+            self._insert(challenge)
+            self._bump()
+
+        with self._lock:
+            self._apply(change)
+
+    def remove(self, challenge_id):
+        """
+        Removes a deleted challenge from every ordering.
+        """
+        def change():
+            self._remove(challenge_id)
+            self._bump()
+
+        with self._lock:
+            self._apply(change)
+
+    def record_submission(self, challenge_id):
+        """
+        Counts a new submission for a challenge, moving it in the popularity ordering.
+        """
+        def change():
+            self._submissions[challenge_id] = self._submissions.get(challenge_id, 0) + 1
+            challenge = self._challenges.get(challenge_id)
+            if challenge is None:
+                return
+            index = self._indexes['popularity']
+            keys = self._keys[challenge_id]
+            del index[bisect.bisect_left(index, keys['popularity'])]
+            keys['popularity'] = self._sort_key('popularity', challenge)
+            bisect.insort(index, keys['popularity'])
+            self._bump('popularity')
+
+        with self._lock:
+            self._apply(change)
+
+    def get_submission_count(self, challenge_id):
+        with self._lock:
+            return self._submissions.get(challenge_id, 0)
+
+    def get_version(self, ordering):
+        """
+        Returns a number that changes whenever the challenges listed in an ordering, or their
+        order, may have changed; pages rendered from the catalog are cached on it. The catalog
+        is reloaded first if it is stale.
+        """
+        if ordering not in self.ORDERINGS:
+            ordering = self.DEFAULT_ORDERING
+        self._ensure_loaded()
+        with self._lock:
+            return self._versions[ordering]
+
+    def page(self, ordering, page=1, per_page=25):
+        """
+        Returns one page of challenges in the given ordering.
+
+        Args:
+            ordering (str): One of ORDERINGS, unknown orderings fall back to DEFAULT_ORDERING.
+            page (int): The 1-based page number, clamped to the available pages.
+            per_page (int): The number of challenges per page.
+
+        Returns:
+            tuple: The list of challenges on the page, the page number and the number of pages.
+        """
+        if ordering not in self.ORDERINGS:
+            ordering = self.DEFAULT_ORDERING
+        per_page = max(1, per_page)
+        self._ensure_loaded()
+        with self._lock:
+            index = self._indexes[ordering]
+            pages = max(1, -(-len(index) // per_page))
+            page = min(max(1, page), pages)
+            start = (page - 1) * per_page
+            challenges = [self._challenges[challenge_id] for _, challenge_id in index[start:start + per_page]]
+        return challenges, page, pages
+
+    def __len__(self):
+        with self._lock:
+            return len(self._challenges)
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import deque
+
+class ConnectionPool:
+    """
+    A thread-safe, size-bounded pool of database connections.
+
+    Connections are validated before they are handed out, reset when they are
+    returned and closed once they have been idle for too long (down to the
+    minimum size of the pool).
+    """
+
+    def __init__(self, factory, min_size=0, max_size=10, idle_timeout_sec=300, validate=None, reset=None):
+        """
+        Args:
+            factory (callable): Opens a new connection.
+            min_size (int): The number of connections kept open even when idle.
+            max_size (int): The maximum number of connections (idle and borrowed) owned by the pool.
+            idle_timeout_sec (float): How long an idle connection above the minimum size is kept open.
+            validate (callable, optional): Returns True if a connection is still usable.
+            reset (callable, optional): Cleans up a returned connection (e.g. ends its transaction).
+        """
+        self._factory = factory
+        self._min_size = min_size
+        self._max_size = max_size
+        self._idle_timeout_sec = idle_timeout_sec
+        self._validate = validate
+        self._reset = reset
+        self._condition = threading.Condition()
+        self._idle = deque()      # (connection, returned_at) pairs, most recently returned last
+        self._borrowed = 0
+        self._total = 0           # idle + borrowed + being opened
+        self._closed = False
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'borrows': 0,
+            'evicted': 0,
+            'invalid': 0,
+            'timeouts': 0,
+            'wait_sec_total': 0.0,
+            'wait_sec_max': 0.0
+        }
+
+    def _open(self):
+        try:
+            connection = self._factory()
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats['created'] += 1
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._stats['closed'] += 1
+
+    def _is_valid(self, connection):
+        if self._validate is None:
+            return True
+        try:
+            return bool(self._validate(connection))
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        """
+        Removes the connections that have been idle for longer than the idle timeout,
+        keeping at least the minimum size open. Must be called holding the condition.
+
+        Returns:
+            list: The evicted connections, to be closed outside of the lock.
+        """
+        evicted = []
+        expiry = time.time() - self._idle_timeout_sec
+        # The oldest connections are at the left of the deque
+        while self._idle and self._idle[0][1] < expiry and self._total > self._min_size:
+            evicted.append(self._idle.popleft()[0])
+            self._total -= 1
+            self._stats['evicted'] += 1
+        return evicted
+
+    def fill(self):
+        """
+        Opens connections until the pool holds its minimum size.
+        """
+        while True:
+            with self._condition:
+                if self._closed or self._total >= self._min_size:
+                    return
+                self._total += 1
+            connection = self._open()
+            with self._condition:
+                self._idle.append((connection, time.time()))
+                self._condition.notify()
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a valid connection from the pool.
+
+        The most recently returned idle connection is handed out first. If none is idle and
+        the pool has not reached its maximum size a new connection is opened, otherwise the
+        call blocks until a connection is returned.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait for a connection.
+
+        Returns:
+            object: A connection reserved for the caller, to be given back with release().
+
+        Raises:
+            RuntimeError: If the pool is closed or no connection became available in time.
+        """
+        start_time = time.time()
+        deadline = None if timeout is None else start_time + timeout
+        while True:
+            connection, create = None, False
+            with self._condition:
+                evicted = self._evict_idle()
+                while not self._idle and self._total >= self._max_size and not self._closed:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise RuntimeError("No database connection became available in time")
+                    self._condition.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("The connection pool is closed")
+                if self._idle:
+                    connection = self._idle.pop()[0]
+                else:
+                    self._total += 1
+                    create = True
+            for stale in evicted:
+                self._close(stale)
+
+            if create:
+                connection = self._open()
+            elif not self._is_valid(connection):
+                with self._condition:
+                    self._total -= 1
+                    self._stats['invalid'] += 1
+                    self._condition.notify()
+                self._close(connection)
+                continue
+
+            waited = time.time() - start_time
+            with self._condition:
+                self._borrowed += 1
+                self._stats['borrows'] += 1
+                self._stats['wait_sec_total'] += waited
+                self._stats['wait_sec_max'] = max(self._stats['wait_sec_max'], waited)
+            return connection
+
+    def release(self, connection, discard=False):
+        """
+        Returns a borrowed connection to the pool.
+
+        Args:
+            connection (object): The connection previously borrowed with acquire().
+            discard (bool, optional): Close the connection instead of keeping it, e.g. after
+                the caller saw it fail.
+        """
+        if not discard and self._reset is not None:
+            try:
+                self._reset(connection)
+            except Exception:
+                discard = True
+
+        with self._condition:
+            self._borrowed -= 1
+            if not discard and not self._closed:
+                self._idle.append((connection, time.time()))
+                evicted = self._evict_idle()
+                self._condition.notify()
+            else:
+                self._total -= 1
+                self._condition.notify()
+                evicted = [connection]
+        for stale in evicted:
+            self._close(stale)
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool metrics.
+
+        Returns:
+            dict: The pool bounds, number of idle and borrowed connections and the lifetime
+                counters (created, closed, borrows, evicted, invalid, timeouts and wait times).
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['min_size'] = self._min_size
+            stats['max_size'] = self._max_size
+            stats['idle'] = len(self._idle)
+            stats['borrowed'] = self._borrowed
+        return stats
+
+    def close(self):
+        """
+        Closes the pool and every idle connection. Borrowed connections are closed when
+        they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            self._close(connection)
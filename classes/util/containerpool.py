@@ -0,0 +1,328 @@
+import threading
+import time
+from collections import deque
+import docker
+
+class ContainerPool:
+    """
+    A size-bounded pool of pre-warmed sandbox containers.
+
+    Creating and tearing down a container costs far more than running a typical
+    submission, so the pool keeps a number of idle containers running and leases
+    them out to submissions. Containers are health-checked before every lease,
+    reset after every use and recycled once they reach their maximum number of uses.
+    A container may also keep a zygote (see Zygote) across its leases, which goes away
+    with it.
+    """
+
+    # The directories of a read-only sandbox that a submission can still write to
+    WRITABLE_PATHS = ["/dev/shm", "/tmp"]
+
+    # Kills every process left behind by the previous lease (except PID 1), then deletes every
+    # file it left in the writable directories; exits non-zero if any of them could not be deleted
+    RESET_COMMAND = ["sh", "-c", 'kill -9 -1 2>/dev/null; find "$@" -mindepth 1 -delete', "reset"] + WRITABLE_PATHS
+
+    # The same, sparing the ready zygote whose pid is passed first: it already killed every
+    # process of the previous lease itself, this only catches the ones started since
+    ZYGOTE_RESET_SCRIPT = (
+        'for dir in /proc/[0-9]*; do pid=${dir#/proc/};'
+        ' [ "$pid" = 1 ] || [ "$pid" = $$ ] || [ "$pid" = "$0" ] || kill -9 "$pid" 2>/dev/null; done;'
+        ' find "$@" -mindepth 1 -delete'
+    )
+
+    def __init__(self, size, max_uses=50, image="safe-python-env", run_options=None, client=None):
+        """
+        Args:
+            size (int): The maximum number of containers (idle and leased) owned by the pool.
+            max_uses (int): The number of leases after which a container is recycled.
+            image (str): The docker image the sandbox containers are created from.
+            run_options (dict, optional): Extra keyword arguments for `client.containers.run`.
+            client (docker.DockerClient, optional): The docker client, created from the environment if omitted.
+        """
+        self._size = size
+        self._max_uses = max_uses
+        self._image = image
+        self._run_options = run_options or {}
+        self._client = client
+        self._condition = threading.Condition()
+        self._idle = deque()      # (container, uses) pairs ready to be leased
+        self._uses = {}           # container id -> uses, for leased containers
+        self._zygotes = {}        # container id -> the zygote kept in the container
+        self._total = 0           # idle + leased + being created
+        self._closed = False
+        self._stats = {
+            'created': 0,
+            'destroyed': 0,
+            'recycled': 0,
+            'unhealthy': 0,
+            'leases': 0,
+            'lease_wait_sec_total': 0.0,
+            'lease_wait_sec_max': 0.0
+        }
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
+
+    def _create_container(self):
+        """
+        Starts a new long-lived sandbox container.
+
+        Returns:
+            docker.models.containers.Container: The running container.
+        """
+        container = self._get_client().containers.run(
+            self._image,
+            command=["sleep", "infinity"],
+            detach=True,
+            **self._run_options
+        )
+        with self._condition:
+            self._stats['created'] += 1
+        return container
+
+    def _destroy_container(self, container):
+        """
+        Force-removes a container, ignoring errors from containers that are already gone.
+        """
+        with self._condition:
+            zygote = self._zygotes.pop(container.id, None)
+        if zygote is not None:
+            zygote.close()
+        try:
+            container.remove(force=True)
+        except docker.errors.APIError:
+            pass
+        with self._condition:
+            self._stats['destroyed'] += 1
+
+    def is_healthy(self, container):
+        """
+        Checks that a container is still running and able to accept work.
+
+        Args:
+            container (docker.models.containers.Container): The container to check.
+
+        Returns:
+            bool: True if the container is running, False otherwise.
+        """
+        try:
+            container.reload()
+            return container.status == 'running'
+        except docker.errors.APIError:
+            return False
+
+    def get_zygote(self, container, start):
+        """
+        Returns the zygote kept in a leased container, starting one if it has none.
+
+        Args:
+            container (docker.models.containers.Container): The leased container.
+            start (callable): Starts a zygote in the container it is called with.
+
+        Returns:
+            Zygote: The zygote, kept until the container is reset while it is not ready or
+                destroyed.
+        """
+        with self._condition:
+            zygote = self._zygotes.get(container.id)
+        if zygote is None:
+            zygote = start(container)
+            with self._condition:
+                self._zygotes[container.id] = zygote
+        return zygote
+
+    def reset(self, container):
+        """
+        Resets a container between leases by killing any process left behind by the
+        previous submission and deleting the files it wrote (see WRITABLE_PATHS).
+
+        The container's zygote is spared if it is ready for the next job, which it only is
+        once it killed the processes of its last job itself; otherwise it is closed and killed
+        with the rest.
+
+        Args:
+            container (docker.models.containers.Container): The container to reset.
+
+        Returns:
+            bool: True if the reset succeeded, False if the container should be discarded
+                because the reset exited with an error.
+        """
+        with self._condition:
+            zygote = self._zygotes.pop(container.id, None)
+        command = self.RESET_COMMAND
+        if zygote is not None and zygote.ready:
+            command = ["sh", "-c", self.ZYGOTE_RESET_SCRIPT, str(zygote.pid)] + self.WRITABLE_PATHS
+        elif zygote is not None:
+            zygote.close()
+            zygote = None
+        try:
+            reset = container.exec_run(command)[0] == 0
+        except docker.errors.APIError:
+            reset = False
+        if zygote is not None:
+            if reset:
+                with self._condition:
+                    self._zygotes[container.id] = zygote
+            else:
+                zygote.close()
+        return reset
+
+    def warm(self):
+        """
+        Starts containers until the pool holds its configured size.
+        """
+        while True:
+            with self._condition:
+                if self._closed or self._total >= self._size:
+                    return
+                self._total += 1
+            self._add_idle_container()
+
+    def _add_idle_container(self):
+        try:
+            container = self._create_container()
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._idle.append((container, 0))
+            self._condition.notify()
+
+    def _replenish(self):
+        """
+        Replaces a destroyed container in the background so the pool stays warm.
+        """
+        def target():
+            try:
+                self.warm()
+            except Exception:
+                pass
+        threading.Thread(target=target, daemon=True).start()
+
+    def lease(self, timeout=None):
+        """
+        Leases a healthy container from the pool.
+
+        Idle containers are handed out first. If none is idle and the pool has not
+        reached its size a new container is started, otherwise the call blocks until
+        a container is released.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait for a container.
+
+        Returns:
+            docker.models.containers.Container: A running container reserved for the caller.
+
+        Raises:
+            RuntimeError: If the pool is closed or no container became available in time.
+        """
+        start_time = time.time()
+        deadline = None if timeout is None else start_time + timeout
+        while True:
+            container, uses, create = None, 0, False
+            with self._condition:
+                while not self._idle and self._total >= self._size and not self._closed:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise RuntimeError("No sandbox container became available in time")
+                    self._condition.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("The container pool is closed")
+                if self._idle:
+                    container, uses = self._idle.popleft()
+                else:
+                    self._total += 1
+                    create = True
+
+            if create:
+                try:
+                    container = self._create_container()
+                except Exception:
+                    with self._condition:
+                        self._total -= 1
+                        self._condition.notify()
+                    raise
+            elif not self.is_healthy(container):
+                self._discard(container, unhealthy=True)
+                continue
+
+            waited = time.time() - start_time
+            with self._condition:
+                self._uses[container.id] = uses
+                self._stats['leases'] += 1
+                self._stats['lease_wait_sec_total'] += waited
+                self._stats['lease_wait_sec_max'] = max(self._stats['lease_wait_sec_max'], waited)
+            return container
+
+    def release(self, container, healthy=True):
+        """
+        Returns a leased container to the pool.
+
+        The container is reset and put back as idle, unless it was reported unhealthy,
+        failed to reset or reached its maximum number of uses, in which case it is
+        destroyed and replaced in the background.
+
+        Args:
+            container (docker.models.containers.Container): The container previously leased.
+            healthy (bool, optional): False if the caller saw the container misbehave.
+        """
+        with self._condition:
+            uses = self._uses.pop(container.id, 0) + 1
+
+        if not healthy or not self.reset(container):
+            self._discard(container, unhealthy=True)
+        elif uses >= self._max_uses:
+            with self._condition:
+                self._stats['recycled'] += 1
+            self._discard(container)
+        else:
+            with self._condition:
+                if not self._closed:
+                    self._idle.append((container, uses))
+                    self._condition.notify()
+                    return
+            self._discard(container)
+
+    def _discard(self, container, unhealthy=False):
+        with self._condition:
+            self._total -= 1
+            if unhealthy:
+                self._stats['unhealthy'] += 1
+            self._condition.notify()
+        self._destroy_container(container)
+        if not self._closed:
+            self._replenish()
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool metrics.
+
+        Returns:
+            dict: The pool size, number of idle and leased containers and the lifetime
+                counters (created, destroyed, recycled, unhealthy, leases and lease wait times).
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['max_uses'] = self._max_uses
+            stats['idle'] = len(self._idle)
+            stats['leased'] = len(self._uses)
+        return stats
+
+    def close(self):
+        """
+        Closes the pool and destroys every idle container. Leased containers are
+        destroyed when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [container for container, _ in self._idle]
+            self._idle.clear()
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for container in idle:
+            self._destroy_container(container)
@@ -0,0 +1,159 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+class CpuAllocator:
+    """
+    Hands out the host CPUs sandboxes are pinned to.
+
+    Every grant goes to the least loaded CPUs, so concurrent submissions (and the
+    shards of a single submission) land on different cores as long as there are
+    idle ones. Grants never block: once every core is busy the least loaded ones
+    are shared, which only costs throughput, never correctness.
+
+    The load is counted per process. With a lock directory, the judging processes of a
+    host (e.g. several gunicorn workers) also coordinate: a process holds an exclusive
+    lock on a file per core while it has sandboxes pinned to that core, and CPUs locked
+    by another process count as busy.
+    """
+
+    def __init__(self, cpus, lock_dir=None):
+        """
+        Args:
+            cpus (list): The ids of the CPUs sandboxes may be pinned to.
+            lock_dir (str, optional): The directory of the per-core lock files shared by
+                the processes of the host, the load is only known to this process if omitted.
+        """
+        if not cpus:
+            raise ValueError("The CPU allocator needs at least one CPU")
+        self._cpus = list(cpus)
+        self._load = {cpu: 0 for cpu in self._cpus}   # cpu -> number of sandboxes pinned to it
+        self._lock = threading.Lock()
+        self._lock_dir = lock_dir if fcntl else None
+        self._lock_files = {}     # cpu -> the open lock file, locked while the cpu is loaded
+        self._lock_pid = None     # the process the lock files were opened by
+        self._held = set()        # cpus whose lock file this process holds
+        self._stats = {
+            'grants': 0,
+            'shared_grants': 0
+        }
+
+    @staticmethod
+    def parse_cpus(spec):
+        """
+        Parses a CPU list in the cpuset format, e.g. '0-3,6'.
+
+        Args:
+            spec (str): The CPU list.
+
+        Returns:
+            list: The CPU ids, in the given order and without duplicates.
+        """
+        cpus = []
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                first, last = part.split('-', 1)
+                ids = range(int(first), int(last) + 1)
+            else:
+                ids = [int(part)]
+            cpus.extend(cpu for cpu in ids if cpu not in cpus)
+        return cpus
+
+    @staticmethod
+    def available_cpus():
+        """
+        Returns the CPUs this process may run on, which is the host's CPUs unless it is itself pinned.
+        """
+        if hasattr(os, 'sched_getaffinity'):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    def _try_lock(self, cpu):
+        """
+        Takes the host-wide lock of a CPU if no other process holds it.
+
+        Returns:
+            bool: True if this process holds the lock, always True without a lock directory.
+        """
+        if self._lock_dir is None or cpu in self._held:
+            return True
+        if self._lock_pid != os.getpid():
+            # Forked since the files were opened: the locks belong to the parent
+            self._lock_files, self._held, self._lock_pid = {}, set(), os.getpid()
+        lock_file = self._lock_files.get(cpu)
+        try:
+            if lock_file is None:
+                os.makedirs(self._lock_dir, exist_ok=True)
+                lock_file = self._lock_files[cpu] = open(os.path.join(self._lock_dir, f"cpu{cpu}.lock"), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False  # Held by another process, or the directory is not writable
+        self._held.add(cpu)
+        return True
+
+    def acquire(self, count=1):
+        """
+        Reserves distinct CPUs, least loaded first.
+
+        CPUs that are idle host-wide come first, then the least loaded ones, a CPU locked
+        by another process counting as running one more sandbox.
+
+        Args:
+            count (int): The number of CPUs wanted, capped at the number of CPUs managed.
+
+        Returns:
+            list: The reserved CPU ids, to be given back with release.
+        """
+        count = max(1, min(count, len(self._cpus)))
+        with self._lock:
+            # Ties go to the first CPUs in the configured order
+            idle = []
+            for cpu in self._cpus:
+                if len(idle) < count and not self._load[cpu] and self._try_lock(cpu):
+                    idle.append(cpu)
+            others = [cpu for cpu in self._cpus if cpu not in idle]
+            others.sort(key=lambda cpu: self._load[cpu] + (self._lock_dir is not None and cpu not in self._held))
+            cpus = idle + others[:count - len(idle)]
+            for cpu in cpus:
+                if cpu not in idle:
+                    self._stats['shared_grants'] += 1
+                    self._try_lock(cpu)  # Taken over if the other process is done with it
+                self._load[cpu] += 1
+                self._stats['grants'] += 1
+        return cpus
+
+    def release(self, cpus):
+        """
+        Gives back CPUs reserved with acquire.
+        """
+        with self._lock:
+            for cpu in cpus:
+                if self._load.get(cpu):
+                    self._load[cpu] -= 1
+                if not self._load.get(cpu) and cpu in self._held:
+                    fcntl.flock(self._lock_files[cpu], fcntl.LOCK_UN)
+                    self._held.discard(cpu)
+
+    def stats(self):
+        """
+        Returns a snapshot of the allocator metrics.
+
+        Returns:
+            dict: The managed CPUs, the number of sandboxes this process pinned to each of
+                them, the number of CPUs it keeps busy and the lifetime counters (grants and
+                shared_grants, the grants of a CPU that was already busy, in this process or
+                in another one).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cpus'] = list(self._cpus)
+            stats['load'] = dict(self._load)
+            stats['busy'] = sum(1 for load in self._load.values() if load)
+        return stats
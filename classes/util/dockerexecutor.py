@@ -0,0 +1,108 @@
+import docker
+import requests
+from docker.utils.socket import STDOUT, frames_iter
+from classes.util.containerpool import ContainerPool
+from classes.util.executor import Executor
+from classes.util.zygote import Zygote
+
+class DockerExecStream:
+    """
+    The stdin and stdout of a command started in a container with an attached socket.
+    """
+
+    def __init__(self, container, command):
+        api = container.client.api
+        exec_id = api.exec_create(container.id, command, stdin=True)['Id']
+        self._socket = api.exec_start(exec_id, socket=True)
+        # Without a TTY the output is multiplexed in stdout and stderr frames
+        self._frames = frames_iter(self._socket, tty=False)
+        self._buffer = b""
+
+    def write(self, data):
+        getattr(self._socket, '_sock', self._socket).sendall(data)
+
+    def read(self, size):
+        while len(self._buffer) < size:
+            stream, data = next(self._frames, (None, None))
+            if data is None:
+                break
+            if stream == STDOUT:
+                self._buffer += data
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        try:
+            self._socket.close()
+        except OSError:
+            pass
+
+class DockerExecutor(Executor):
+    """
+    Runs submissions in docker containers, created for every submission or leased from a
+    warm container pool. A pooled container keeps its zygote across leases.
+    """
+
+    name = 'docker'
+
+    def __init__(self, image, run_options, pool=None, lease_timeout_sec=30):
+        """
+        Args:
+            image (str): The docker image the sandbox containers are created from.
+            run_options (dict): Extra keyword arguments for `client.containers.run`.
+            pool (ContainerPool, optional): The warm container pool, containers are created
+                and removed for every submission if omitted.
+            lease_timeout_sec (float): How long to wait for a pooled container.
+        """
+        self._image = image
+        self._run_options = run_options
+        self._pool = pool
+        self._lease_timeout_sec = lease_timeout_sec
+
+    def acquire(self, cpu, time_limit_sec=None):
+        try:
+            if self._pool:
+                container = self._pool.lease(timeout=self._lease_timeout_sec)
+                try:
+                    container.update(cpuset_cpus=str(cpu))
+                except docker.errors.APIError:
+                    pass  # Run on the CPUs the container already has rather than fail the submission
+                return container
+            return docker.from_env().containers.run(
+                self._image,
+                command=["sleep", "300"],
+                detach=True,
+                **dict(self._run_options, cpuset_cpus=str(cpu))
+            )
+        except (docker.errors.DockerException, requests.exceptions.RequestException) as err:
+            # Docker is down or refused the container
+            raise RuntimeError(f"Error: the sandbox could not be started: {err}") from err
+
+    def release(self, container, healthy=True):
+        if self._pool:
+            self._pool.release(container, healthy=healthy)
+        else:
+            container.stop()  # Stop the container
+            container.remove()  # Remove the container
+
+    def open_stream(self, container, command):
+        return DockerExecStream(container, command)
+
+    def open_zygote(self, container):
+        if self._pool:
+            return self._pool.get_zygote(container, self._start_zygote)
+        return super().open_zygote(container)
+
+    def _start_zygote(self, container):
+        # Alone in its container, the zygote kills whatever a job left behind itself
+        return Zygote(DockerExecStream(container, ["python", "-c", Zygote.get_source(reap=True)]))
+
+    def close_zygote(self, container, zygote):
+        if not self._pool:
+            zygote.close()  # Otherwise the pool keeps it until the container is reset or destroyed
+
+    def interrupt(self, container):
+        try:
+            container.exec_run(ContainerPool.RESET_COMMAND)
+        except docker.errors.APIError:
+            pass
@@ -1,10 +1,269 @@
 import ast
+import hashlib
+import json
+import os
 import threading
 import time
 import re
+import tempfile
 import docker
+from classes.util.cache import TTLCache
+from classes.util.containerpool import ContainerPool
+from classes.util.cpuallocator import CpuAllocator
+from classes.util.dockerexecutor import DockerExecutor
+from classes.util.localexecutor import LocalExecutor
+from classes.util import harnessruntime
+from classes.util.harness import Harness
 
 class DockerService:
+    IMAGE = "safe-python-env"
+
+    # Resource limits applied to every sandbox container
+    CONTAINER_OPTIONS = {
+        "network_mode": "none",
+        "mem_limit": '100m',
+        "cpuset_cpus": '0',
+        "read_only": True
+    }
+
+    # Warm container pool configuration, a size of 0 disables pooling
+    POOL_SIZE = int(os.getenv("DOCKER_POOL_SIZE", "0"))
+    POOL_MAX_USES = int(os.getenv("DOCKER_POOL_MAX_USES", "50"))
+    POOL_LEASE_TIMEOUT_SEC = float(os.getenv("DOCKER_POOL_LEASE_TIMEOUT_SEC", "30"))
+
+    # 'per_test' starts one interpreter per test case, 'batched' runs every test case
+    # in a single harness process, 'zygote' forks every test case from a pre-imported harness
+    HARNESS_MODE = os.getenv("DOCKER_HARNESS_MODE", "per_test")
+
+    # 'docker' runs submissions in containers, 'local' in rlimited subprocesses of the judge host
+    BACKEND = os.getenv("SANDBOX_BACKEND", "docker")
+    LOCAL_MEMORY_MB = int(os.getenv("LOCAL_SANDBOX_MEMORY_MB", "100"))
+    LOCAL_ISOLATE_NETWORK = os.getenv("LOCAL_SANDBOX_ISOLATE_NETWORK", "1") != "0"
+    LOCAL_READ_ONLY = os.getenv("LOCAL_SANDBOX_READ_ONLY", "1") != "0"
+
+    # CPUs the sandboxes are pinned to (cpuset format, e.g. '0-3'), all available CPUs if empty
+    CPUS = os.getenv("DOCKER_CPUS", "")
+    # Per-core lock files through which the judging processes of the host share the CPUs, none if empty
+    CPU_LOCK_DIR = os.getenv("DOCKER_CPU_LOCK_DIR", os.path.join(tempfile.gettempdir(), "sandbox-cpus"))
+
+    # Number of sandboxes a submission's test cases are spread over, each pinned to its own CPU
+    SHARDS = int(os.getenv("DOCKER_SHARDS", "1"))
+
+    # Verdict cache for resubmitted code, a time-to-live (or size) of 0 disables it
+    RESULT_CACHE_TTL_SEC = float(os.getenv("DOCKER_RESULT_CACHE_TTL_SEC", "3600"))
+    RESULT_CACHE_MAX_SIZE = int(os.getenv("DOCKER_RESULT_CACHE_MAX_SIZE", "4096"))
+
+    # Time limit of a single test case, the challenge's time limit if 0
+    TEST_TIME_LIMIT_SEC = float(os.getenv("DOCKER_TEST_TIME_LIMIT_SEC", "0"))
+    # How long a timed out submission gets to stop once its sandboxes were killed
+    RECLAIM_TIMEOUT_SEC = float(os.getenv("DOCKER_RECLAIM_TIMEOUT_SEC", "10"))
+
+    _pool = None
+    _pool_lock = threading.Lock()   # held while the pool is created and warmed
+    _lock = threading.Lock()        # guards the CPU allocator and the timeout metrics
+    _cpu_allocator = None
+    _timeout_stats = {'timeouts': 0, 'reclaimed': 0, 'unreclaimed': 0, 'test_timeouts': 0}
+    _result_cache = TTLCache(max_size=RESULT_CACHE_MAX_SIZE, ttl_sec=RESULT_CACHE_TTL_SEC)
+
+    @staticmethod
+    def get_container_pool():
+        """
+        Returns the shared warm container pool, creating and warming it on first use.
+
+        Returns:
+            ContainerPool or None: The pool, or None if pooling is disabled (DOCKER_POOL_SIZE=0).
+        """
+        if DockerService.POOL_SIZE <= 0:
+            return None
+        with DockerService._pool_lock:
+            if DockerService._pool is None:
+                DockerService._pool = ContainerPool(
+                    DockerService.POOL_SIZE,
+                    max_uses=DockerService.POOL_MAX_USES,
+                    image=DockerService.IMAGE,
+                    run_options=DockerService.CONTAINER_OPTIONS
+                )
+                DockerService._pool.warm()
+        return DockerService._pool
+
+    @staticmethod
+    def get_pool_stats():
+        """
+        Returns the warm container pool metrics.
+
+        Never creates the pool, so that scraping the metrics starts no container.
+
+        Returns:
+            dict or None: The pool statistics, or None if pooling is disabled or no
+                submission has been judged with it yet.
+        """
+        pool = DockerService._pool
+        return pool.stats() if pool else None
+
+    @staticmethod
+    def get_executor():
+        """
+        Returns the sandbox backend selected by SANDBOX_BACKEND.
+
+        Returns:
+            Executor: A DockerExecutor (using the warm container pool if enabled) or a LocalExecutor.
+
+        Raises:
+            ValueError: If SANDBOX_BACKEND names an unknown backend.
+        """
+        if DockerService.BACKEND == 'local':
+            return LocalExecutor(memory_mb=DockerService.LOCAL_MEMORY_MB, isolate_network=DockerService.LOCAL_ISOLATE_NETWORK,
+                                 read_only=DockerService.LOCAL_READ_ONLY)
+        if DockerService.BACKEND == 'docker':
+            return DockerExecutor(
+                DockerService.IMAGE,
+                DockerService.CONTAINER_OPTIONS,
+                pool=DockerService.get_container_pool(),
+                lease_timeout_sec=DockerService.POOL_LEASE_TIMEOUT_SEC
+            )
+        raise ValueError(f"Unknown sandbox backend: {DockerService.BACKEND}")
+
+    @staticmethod
+    def get_cpu_allocator():
+        """
+        Returns the CPU allocator shared by every submission judged by this process.
+
+        Returns:
+            CpuAllocator: The allocator of the DOCKER_CPUS (or all available) CPUs, which
+                coordinates with the other processes of the host through DOCKER_CPU_LOCK_DIR.
+        """
+        with DockerService._lock:
+            if DockerService._cpu_allocator is None:
+                cpus = CpuAllocator.parse_cpus(DockerService.CPUS) or CpuAllocator.available_cpus()
+                DockerService._cpu_allocator = CpuAllocator(cpus, lock_dir=DockerService.CPU_LOCK_DIR or None)
+        return DockerService._cpu_allocator
+
+    @staticmethod
+    def get_cpu_stats():
+        """
+        Returns the CPU allocator metrics.
+
+        Returns:
+            dict: The allocator statistics.
+        """
+        return DockerService.get_cpu_allocator().stats()
+
+    @staticmethod
+    def get_timeout_stats():
+        """
+        Returns the timeout metrics.
+
+        Returns:
+            dict: The number of submissions that exceeded their time limit ('timeouts'), of
+                those whose sandboxes were killed and released ('reclaimed') or still running
+                after DOCKER_RECLAIM_TIMEOUT_SEC ('unreclaimed'), and of test cases interrupted
+                by their own time limit ('test_timeouts').
+        """
+        with DockerService._lock:
+            return dict(DockerService._timeout_stats)
+
+    @staticmethod
+    def count_timeout(key):
+        with DockerService._lock:
+            DockerService._timeout_stats[key] += 1
+
+    @staticmethod
+    def get_result_cache_stats():
+        """
+        Returns the verdict cache metrics (hits, misses, evictions, ...).
+        """
+        return DockerService._result_cache.stats()
+
+    @staticmethod
+    def clear_result_cache():
+        """
+        Empties the verdict cache.
+        """
+        DockerService._result_cache.clear()
+
+    @staticmethod
+    def hash_code(code):
+        """
+        Hashes the normalized form of a code snippet.
+
+        The code is hashed through its abstract syntax tree, so resubmissions that only differ
+        in formatting or comments share the same hash.
+
+        Args:
+            code (str): The user's code.
+
+        Returns:
+            str or None: The hash, or None if the code does not parse.
+        """
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return None
+        return hashlib.sha256(ast.dump(tree).encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint_tests(challenge, tests):
+        """
+        Fingerprints everything besides the user's code that decides a verdict: the function
+        called, the time allowed and the current test cases.
+
+        Args:
+            challenge (Challenge): The challenge.
+            tests (list): The challenge's ChallengeTest objects.
+
+        Returns:
+            str: The fingerprint, which changes whenever a test case is added, deleted or edited.
+        """
+        cases = sorted([test.id, test.test_input, test.test_output] for test in tests)
+        return hashlib.sha256(json.dumps([challenge.stub_name, challenge.time_allowed_sec, cases], default=str).encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable(result_dict):
+        """
+        Tells whether a verdict only depends on the code and the tests: a pass or a wrong
+        answer. Timeouts and sandbox errors depend on the load of the host and are retried.
+        """
+        if result_dict.get('timeout'):
+            return False
+        return result_dict.get('tests_passed') == result_dict.get('tests_total') or bool(result_dict.get('error'))
+
+    @staticmethod
+    def execute_code_cached(challenge, tests, user_code, on_output=None):
+        """
+        Executes a user's code like execute_code, serving the verdict of an identical earlier
+        submission from the verdict cache when there is one.
+
+        Submissions are identical when their normalized code (see hash_code) and the challenge's
+        test fingerprint (see fingerprint_tests) match, so adding or deleting a test case
+        invalidates every cached verdict of the challenge.
+
+        Args:
+            challenge (Challenge): The challenge the code is submitted for.
+            tests (list): The challenge's ChallengeTest objects.
+            user_code (str): The user's code.
+            on_output (callable, optional): See execute_code, not called for cached verdicts.
+
+        Returns:
+            dict: The result dictionary of execute_code, with 'cached' set to True when it was
+                served from the cache. 'exec_chars' always describes the submitted code.
+        """
+        code_hash = DockerService.hash_code(user_code)
+        if code_hash is None or not DockerService._result_cache.enabled:
+            return DockerService.execute_code(challenge, tests, user_code, on_output)
+
+        executed = []
+
+        def loader():
+            result_dict = DockerService.execute_code(challenge, tests, user_code, on_output)
+            executed.append(result_dict)
+            return result_dict if DockerService.is_cacheable(result_dict) else None
+
+        key = ('result', challenge.id, code_hash, DockerService.fingerprint_tests(challenge, tests))
+        result_dict = DockerService._result_cache.get_or_load(key, loader)
+        if executed:
+            return executed[0]
+        return dict(result_dict, cached=True, exec_chars=len(user_code))
+
     @staticmethod
     def validate_user_method(code, method_name):
         """
@@ -35,26 +294,190 @@ class DockerService:
             return False, str(e)
 
     @staticmethod
-    def execute_code(challenge, tests, user_code):
+    def parse_exception(text):
+        """
+        Finds the first 'SomethingError: detail' message in the given output.
+
+        Args:
+            text (str): The output of a sandboxed process.
+
+        Returns:
+            str or None: The error message, or None if the output contains no error.
+        """
+        match = re.search(r"(\w+Error): ([^\n]+)", text)
+        if match:
+            error_type, error_detail = match.groups()
+            return f"{error_type}: {error_detail}"
+        return None
+
+    @staticmethod
+    def apply_harness_payload(payload, tests, result_dict):
+        """
+        Evaluates the per-test results returned by the batched harness and records them
+        in the result dictionary.
+
+        The sandbox reports the value each test returned; the comparison against the
+        expected output is repeated here so the verdict never depends on the sandbox.
+        Evaluation stops at the first failing test, matching the per-test mode.
+
+        Args:
+            payload (dict): The payload decoded by Harness.read_payload or returned by the zygote.
+            tests (list): The ChallengeTest objects the harness was built with.
+            result_dict (dict): The result dictionary of execute_code, updated in place.
+        """
+        result_dict['print_outputs'].extend(payload['prints'])
+        if payload['exception']:
+            result_dict['exception'] = payload['exception']
+            result_dict['success'] = False
+
+        entries = payload['tests']
+        for index, test_case in enumerate(tests):
+            entry = entries[index] if index < len(entries) else None
+            if entry:
+                result_dict['print_outputs'].extend(entry['prints'])
+                if entry['exception']:
+                    result_dict['exception'] = entry['exception']
+                    result_dict['success'] = False
+
+            timed_out = bool(entry and entry.get('timeout'))
+            function_result, passed = DockerService.judge_entry(entry, test_case)
+            result_dict['test_results'].append({
+                'id': test_case.id,
+                'input': test_case.test_input,
+                'expected': test_case.test_output,
+                'result': entry['result'] if entry else None,
+                'passed': passed,
+                'prints': entry['prints'] if entry else [],
+                'exception': entry['exception'] if entry else None,
+                'wall_time': entry['wall_time'] if entry else 0.0,
+                'timeout': timed_out,
+                'cpu_user': entry.get('cpu_user', 0.0) if entry else 0.0,
+                'cpu_sys': entry.get('cpu_sys', 0.0) if entry else 0.0,
+                'peak_rss_kb': entry.get('peak_rss_kb', 0) if entry else 0
+            })
+
+            if timed_out:
+                # Reported like a submission timeout rather than as a wrong answer
+                DockerService.count_timeout('test_timeouts')
+                result_dict['timeout'] = True
+                result_dict['success'] = False
+                return
+            if not passed:
+                result_dict['error'] = f"Failed! For input ({test_case.test_input}) expected result {test_case.test_output}, but returned {function_result}."
+                result_dict['success'] = False
+                return  # Terminate upon first unexpected result
+            result_dict['tests_passed'] += 1
+
+    @staticmethod
+    def judge_entry(entry, test_case):
+        """
+        Compares what a test case returned in the sandbox with its expected output.
+
+        Args:
+            entry (dict or None): The test's entry in the harness payload, None if it did not run.
+            test_case (ChallengeTest): The test case.
+
+        Returns:
+            tuple: The returned value (evaluated if it is a literal, None if the test did not
+                return) and whether the test passed.
+        """
+        function_result = None
+        if entry and entry['result'] is not None:
+            try:
+                function_result = ast.literal_eval(entry['result'])
+            except (ValueError, SyntaxError):
+                function_result = entry['result']
+        timed_out = bool(entry and entry.get('timeout'))
+        return function_result, not timed_out and function_result == ast.literal_eval(test_case.test_output)
+
+    @staticmethod
+    def new_shard_result(tests):
+        """
+        Returns an empty result dictionary for a shard of a submission's test cases.
+        """
+        return {
+            'tests_total': len(tests),
+            'tests_passed': 0,
+            'print_outputs': [],
+            'error': "",
+            'exception': "",
+            'success': True,
+            'test_results': []
+        }
+
+    @staticmethod
+    def merge_shard_results(shard_results, result_dict):
+        """
+        Combines the results of the shards of a submission as if its tests had run one after another.
+
+        Shards hold contiguous slices of the tests, so the shards are merged in order up to and
+        including the first one that did not pass all its tests: that shard holds the first
+        failure, and the tests after it would not have run.
+
+        Args:
+            shard_results (list): The result dictionaries of the shards, in test order.
+            result_dict (dict): The result dictionary of execute_code, updated in place.
+        """
+        for shard_result in shard_results:
+            result_dict['tests_passed'] += shard_result['tests_passed']
+            result_dict['print_outputs'].extend(shard_result['print_outputs'])
+            result_dict['test_results'].extend(shard_result['test_results'])
+            if shard_result['exception']:
+                result_dict['exception'] = shard_result['exception']
+            if shard_result.get('timeout'):
+                result_dict['timeout'] = True
+            if shard_result['tests_passed'] < shard_result['tests_total']:
+                result_dict['error'] = shard_result['error']
+                return
+
+    @staticmethod
+    def execute_code(challenge, tests, user_code, on_output=None):
         """
         Executes a user's code against a set of test cases inside a secure Docker environment.
 
-        The method appends the user's code with a custom print function to capture the outputs.
-        It then runs each test case input through the user-defined function within the code
-        and compares the output against the expected result. The execution happens inside a
-        Docker container to ensure security and isolation from the host environment.
+        The user's code is run by the harness (see Harness), which captures its prints and
+        streams the result of every test case back as length-prefixed JSON frames; each
+        result is then compared against the expected output. The execution happens inside a
+        Docker container to ensure security and isolation from the host environment (or, with
+        SANDBOX_BACKEND=local, in resource-limited subprocesses of the host). When the
+        warm container pool is enabled (DOCKER_POOL_SIZE > 0) the container is leased from the
+        pool instead of being created and removed for every submission. In the 'batched'
+        harness mode (DOCKER_HARNESS_MODE=batched) the user's code is loaded once and every
+        test case runs in a single interpreter, with per-test results in 'test_results'. The
+        'zygote' mode also loads the code once, in a child forked from an interpreter that
+        has already imported the harness, then forks every test case from it so each test
+        starts from the same pristine state; pooled containers keep that interpreter across
+        submissions.
+
+        Every sandbox is pinned to a CPU handed out by the shared CPU allocator. With
+        DOCKER_SHARDS > 1 the test cases are split in contiguous shards run in parallel, each
+        in its own sandbox on its own CPU; when a shard fails, the shards holding later test
+        cases are cancelled, so the result is the same as running the tests in order.
+
+        Every test case is interrupted inside the sandbox after DOCKER_TEST_TIME_LIMIT_SEC (the
+        challenge's time limit by default). When the whole submission exceeds the challenge's
+        time limit, its sandboxes are killed and released (pooled containers are replaced
+        rather than reused) and its CPUs given back before the result is returned.
 
         Args:
             challenge (Challenge): An object representing the challenge including metadata like the stub name and timeout.
             tests (list): A list of test cases, each with 'test_input' and 'test_output' attributes.
             user_code (str): The user's code that defines the function to test.
+            on_output (callable, optional): Called from the judging threads with a dict holding
+                the 'test_id' (None for the module body), the 'prints' and whether the output
+                was 'truncated', as soon as the sandbox reports them. At most PRINT_MAX_LINES
+                lines and PRINT_MAX_BYTES bytes are streamed per submission.
 
         Returns:
             dict: A dictionary containing the results of the code execution, including:
                 - The total number of tests and how many passed.
-                - Captured print outputs.
+                - Captured print outputs, keeping the last PRINT_MAX_LINES lines and
+                  PRINT_MAX_BYTES bytes after a truncation marker.
                 - Any error or exception messages.
                 - Execution time and a flag indicating if the execution timed out.
+                - The CPU time of the tests ('cpu_time', in seconds) and their peak resident
+                  memory ('peak_rss_kb'), as measured inside the sandbox.
+                - Per-test results.
         """
         result_dict = {
             'tests_total': len(tests),
@@ -65,94 +488,214 @@ class DockerService:
             'success': True,
             'timeout': False,
             'exec_time': 0.0,
-            'exec_chars': 0
+            'exec_chars': 0,
+            'test_results': []
         }
-        client = docker.from_env()
-        appended_code_base = f"""
-def captured_print(*args, **kwargs):
-    global print_outputs
-    original_print(*args, **kwargs)
-    print_outputs.append(' '.join(map(str, args)))
+        executor = DockerService.get_executor()
+        allocator = DockerService.get_cpu_allocator()
 
-import builtins
-original_print = builtins.print
-builtins.print = captured_print
-print_outputs = []
+        # Split the tests in contiguous shards, each run in its own sandbox pinned to its own CPU
+        cpus = allocator.acquire(min(DockerService.SHARDS, len(tests)))
+        shard_size = max(1, -(-len(tests) // len(cpus)))
+        shards = [tests[index:index + shard_size] for index in range(0, len(tests), shard_size)] or [tests]
+        # Even a single shard gets its own result: a shard still running after the deadline
+        # must not write into the result returned to the caller
+        shard_results = [DockerService.new_shard_result(shard) for shard in shards]
+        cancels = [threading.Event() for _ in shards]
+        exec_times = [0.0 for _ in shards]   # time spent running each shard, container start-up excluded
+        running = {}                    # shard index -> sandbox, for the shards being executed
+        running_lock = threading.Lock()
+        streamed = {'lines': 0, 'bytes': 0, 'truncated': False}
+        expired = threading.Event()     # set once the submission exceeded its time limit
+        merged = threading.Event()      # set once the shard results are in result_dict
+        test_time_limit_sec = DockerService.TEST_TIME_LIMIT_SEC or challenge.time_allowed_sec
 
-""" + user_code
+        def cancel_after(index):
+            # A shard failed: the shards holding later tests cannot change the verdict anymore.
+            # Index -1 stops every shard, once the submission exceeded its time limit.
+            for later in range(index + 1, len(shards)):
+                cancels[later].set()
+            with running_lock:
+                sandboxes = [sandbox for later, sandbox in running.items() if later > index]
+            for sandbox in sandboxes:
+                executor.interrupt(sandbox)
 
-        def target(result_dict):
-            container = client.containers.run(
-                "safe-python-env",
-                command=["sleep", "300"],
-                detach=True,
-                network_mode="none",
-                mem_limit='100m',
-                cpuset_cpus='0',
-                read_only=True
-            )
+        def run_shard(index, cpu):
+            shard_tests, shard_result, cancel = shards[index], shard_results[index], cancels[index]
+            if cancel.is_set():
+                return
+            try:
+                sandbox = executor.acquire(cpu, challenge.time_allowed_sec)
+            except RuntimeError as err:
+                shard_result['exception'] = str(err)
+                cancel_after(index)
+                return
 
+            with running_lock:
+                if cancel.is_set():
+                    # Cancelled (or timed out) while waiting for the sandbox
+                    executor.release(sandbox)
+                    return
+                running[index] = sandbox
             start_time = time.time()
+            try:
+                if DockerService.HARNESS_MODE == 'batched':
+                    run_harness(sandbox, shard_tests, shard_result)
+                elif DockerService.HARNESS_MODE == 'zygote':
+                    run_zygote(sandbox, shard_tests, shard_result)
+                else:
+                    run_tests(sandbox, shard_tests, shard_result, cancel)
+            finally:
+                exec_times[index] = time.time() - start_time
+                with running_lock:
+                    running.pop(index, None)
+                # A sandbox killed at the deadline is not trusted to be reused
+                executor.release(sandbox, healthy=not expired.is_set())
+
+            if shard_result['tests_passed'] < len(shard_tests) and not cancel.is_set():
+                cancel_after(index)
+
+        def target(result_dict):
+            try:
+                if len(shards) == 1:
+                    run_shard(0, cpus[0])
+                else:
+                    threads = [threading.Thread(target=run_shard, args=(index, cpus[index])) for index in range(len(shards))]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                with running_lock:
+                    # Shards finishing after the deadline are dropped, the submission timed out
+                    if not expired.is_set():
+                        DockerService.merge_shard_results(shard_results, result_dict)
+                        # Shards run in parallel, the slowest one sets the execution time
+                        result_dict['exec_time'] = max(exec_times)
+                        merged.set()
+            finally:
+                allocator.release(cpus)
+
+        def stream_prints(test_id, prints):
+            # Forwards prints to on_output until the submission's output budget is spent
+            if on_output is None or not prints:
+                return
+            with running_lock:
+                if streamed['truncated']:
+                    return
+                kept = []
+                for line in prints:
+                    size = len(line.encode(errors='replace'))
+                    if streamed['lines'] >= Harness.PRINT_MAX_LINES or streamed['bytes'] + size > Harness.PRINT_MAX_BYTES:
+                        streamed['truncated'] = True
+                        break
+                    streamed['lines'] += 1
+                    streamed['bytes'] += size
+                    kept.append(line)
+                truncated = streamed['truncated']
+            on_output({'test_id': test_id, 'prints': kept, 'truncated': truncated})
 
+        def on_event(kind, event):
+            stream_prints(event.get('id') if kind == 'test' else None, event.get('prints'))
+
+        def stop_at_failure(tests):
+            # The sandbox runs every test case, it is stopped once one of them failed
+            expected = {test_case.id: test_case for test_case in tests}
+            failed = []
+
+            def until(entry):
+                test_case = expected.get(entry['id'])
+                if test_case is None or not DockerService.judge_entry(entry, test_case)[1]:
+                    failed.append(entry['id'])
+                return bool(failed)
+            return until, failed
+
+        def run_harness(sandbox, tests, result_dict):
+            source = Harness.build_source(Harness.build_job(challenge, tests, user_code, test_time_limit_sec=test_time_limit_sec))
+            failure = "Error: the sandbox did not return any result"
+            until, failed = stop_at_failure(tests)
+            try:
+                chunks = sandbox.exec_run(["python", "-c", source], stream=True, demux=True)[1]
+                payload, stderr = Harness.read_payload(chunks, on_event, until)
+            except ValueError as err:
+                payload, stderr, failure = None, "", str(err)
+            except docker.errors.ContainerError as ce:
+                payload, stderr = None, ce.stderr.decode(errors='replace')
+            if failed:
+                executor.interrupt(sandbox)
+
+            if payload is None:
+                if expired.is_set():
+                    return  # Killed at the submission deadline, reported as a timeout
+                # The harness died before reporting (e.g. killed for exceeding the memory limit)
+                result_dict['exception'] = DockerService.parse_exception(stderr) or failure
+                result_dict['success'] = False
+            else:
+                DockerService.apply_harness_payload(payload, tests, result_dict)
+
+        def run_zygote(sandbox, tests, result_dict):
+            # Pooled containers keep their zygote across submissions (see Zygote)
+            zygote = executor.open_zygote(sandbox)
+            failure = "Error: the sandbox did not return any result"
+            until, failed = stop_at_failure(tests)
+            try:
+                job = Harness.build_job(challenge, tests, user_code, test_time_limit_sec=test_time_limit_sec)
+                payload = zygote.run(job, time_limit_sec=challenge.time_allowed_sec, on_event=on_event, until=until)
+            except ValueError as err:
+                payload, failure = None, str(err)
+            finally:
+                executor.close_zygote(sandbox, zygote)
+            if failed:
+                executor.interrupt(sandbox)
+
+            if payload is None and expired.is_set():
+                return  # Killed at the submission deadline, reported as a timeout
+            if payload is None:
+                result_dict['exception'] = failure
+                result_dict['success'] = False
+                return
+
+            if payload['timeout']:
+                # Keep the tests finished before the time limit, the test that exceeded it has no result
+                DockerService.apply_harness_payload(payload, tests[:len(payload['tests'])], result_dict)
+                result_dict['timeout'] = True
+                result_dict['success'] = False
+            else:
+                DockerService.apply_harness_payload(payload, tests, result_dict)
+
+        def run_tests(sandbox, tests, result_dict, cancel):
+            # A fresh interpreter for every test case
             for test_case in tests:
-                appended_code = appended_code_base + f"\nresult = {challenge.stub_name}({test_case.test_input})\nprint('RESULT:', result)\n"
-
-                try:
-                    output = container.exec_run(
-                        ["python", "-c", appended_code]
-                    )[1]  # Using exec_run to execute the command on the already running container
-                    lines = output.decode().strip().splitlines()
-                    function_result = None
-
-                    for line in lines:
-                        if line.startswith("RESULT:"):
-                            function_result_str = line.split(":", 1)[1].strip()
-                            # Safely evaluate the string to get the actual list
-                            function_result = ast.literal_eval(function_result_str)
-                        else:
-                            # Using regex to find the specific error message
-                            match = re.search(r"(\w+Error): ([^\n]+)", line)
-                            if match:
-                                error_type, error_detail = match.groups()
-                                result_dict['exception'] = f"{error_type}: {error_detail}"
-                                result_dict['success'] = False
-                            else:
-                                result_dict['print_outputs'].append(line)
-
-                    # Compare the evaluated list with the expected result
-                    if function_result != ast.literal_eval(test_case.test_output):
-                        result_dict['error'] = f"Failed! For input ({test_case.test_input}) expected result {test_case.test_output}, but returned {function_result}."
-                        result_dict['success'] = False
-                        return  # Terminate upon first unexpected result
-                    else:
-                        result_dict['tests_passed'] += 1
-                except docker.errors.ContainerError as ce:
-                    error_message = ce.stderr.decode()
-                    #print("error_message", error_message)
-
-                    # Using regex to find the specific error message
-                    match = re.search(r"(\w+Error): ([^\n]+)", error_message)
-                    if match:
-                        error_type, error_detail = match.groups()
-                        result_dict['exception'] = f"{error_type}: {error_detail}"
-                        result_dict['success'] = False
-
-            result_dict['exec_time'] = time.time() - start_time
-
-
-
-            container.stop()  # Stop the container
-            container.remove()  # Remove the container
-
-        
+                if cancel.is_set():
+                    return  # An earlier shard already failed
+                tests_passed = result_dict['tests_passed']
+                run_harness(sandbox, [test_case], result_dict)
+                if result_dict['tests_passed'] == tests_passed:
+                    return  # Terminate upon first unexpected result
+
         thread = threading.Thread(target=target, args=(result_dict,))
         thread.start()
         thread.join(timeout=challenge.time_allowed_sec)
+        with running_lock:
+            timed_out = not merged.is_set()
+            if timed_out:
+                expired.set()
+        if timed_out:
+            # Kill the submission's sandboxes so that its containers and CPUs are given back
+            # now rather than whenever the user's code would have stopped on its own
+            DockerService.count_timeout('timeouts')
+            cancel_after(-1)
+            thread.join(timeout=DockerService.RECLAIM_TIMEOUT_SEC)
+            DockerService.count_timeout('unreclaimed' if thread.is_alive() else 'reclaimed')
         result_dict['exec_chars'] = len(user_code)
+        prints = harnessruntime.PrintBuffer(Harness.PRINT_MAX_LINES, Harness.PRINT_MAX_BYTES)
+        prints.extend(result_dict['print_outputs'])
+        result_dict['print_outputs'] = prints.lines()
         result_dict['success'] = result_dict['tests_total'] == result_dict['tests_passed']
+        # Measured inside the sandbox, so unlike exec_time they exclude the sandbox overhead
+        result_dict['cpu_time'] = sum(test['cpu_user'] + test['cpu_sys'] for test in result_dict['test_results'])
+        result_dict['peak_rss_kb'] = max((test['peak_rss_kb'] for test in result_dict['test_results']), default=0)
 
-        if thread.is_alive() and result_dict['exec_time'] == 0.0:
+        if timed_out:
             result_dict['timeout'] = True
-            #result_dict['success'] = False
 
         return result_dict
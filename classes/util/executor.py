@@ -0,0 +1,79 @@
+from classes.util.zygote import Zygote
+
+class Executor:
+    """
+    A sandbox backend judging submissions.
+
+    Judging acquires one sandbox per shard of test cases, runs commands in it with
+    `sandbox.exec_run(command, stream=True, demux=True)`, which returns the output as a
+    stream of (stdout, stderr) chunks like docker's `Container.exec_run`, and releases it
+    afterwards.
+    """
+
+    name = None
+
+    def acquire(self, cpu, time_limit_sec=None):
+        """
+        Reserves a sandbox pinned to a CPU.
+
+        Args:
+            cpu (int): The CPU the sandbox runs on.
+            time_limit_sec (float, optional): The time allowed for the submission, used by
+                backends that enforce their own limits.
+
+        Returns:
+            object: The sandbox.
+
+        Raises:
+            RuntimeError: If no sandbox can be provided.
+        """
+        raise NotImplementedError
+
+    def release(self, sandbox, healthy=True):
+        """
+        Gives back a sandbox reserved with acquire.
+
+        Args:
+            sandbox (object): The sandbox.
+            healthy (bool, optional): False if the sandbox must not be reused, e.g. because
+                the submission it ran was killed at its deadline.
+        """
+        raise NotImplementedError
+
+    def open_stream(self, sandbox, command):
+        """
+        Starts a long-running command in a sandbox, e.g. a zygote, and connects to it.
+
+        Args:
+            sandbox (object): A sandbox reserved with acquire.
+            command (list): The command.
+
+        Returns:
+            object: The command's stdin and stdout, with write(bytes), read(size), which
+                returns less than size bytes only at the end of the output, and close().
+        """
+        raise NotImplementedError
+
+    def open_zygote(self, sandbox):
+        """
+        Returns a zygote (see Zygote) running in a sandbox, started for this lease by default.
+
+        Args:
+            sandbox (object): A sandbox reserved with acquire.
+
+        Returns:
+            Zygote: The zygote, to be given back with close_zygote.
+        """
+        return Zygote(self.open_stream(sandbox, ["python", "-c", Zygote.get_source()]))
+
+    def close_zygote(self, sandbox, zygote):
+        """
+        Gives back a zygote returned by open_zygote, before its sandbox is released.
+        """
+        zygote.close()
+
+    def interrupt(self, sandbox):
+        """
+        Kills whatever is running in a sandbox, e.g. when its results are not needed anymore.
+        """
+        raise NotImplementedError
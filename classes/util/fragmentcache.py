@@ -0,0 +1,72 @@
+import threading
+from classes.util.cache import TTLCache
+
+class FragmentCache:
+    """
+    A cache of rendered HTML, whole pages or fragments of them.
+
+    Every entry is keyed on what it shows (e.g. the test cases of challenge 3 for a privileged
+    user) and on the version of its content when it was rendered. Changing the content bumps
+    its version, so the entries rendered before are never served again and age out of the
+    underlying TTLCache, however many variants of the content were cached.
+
+    The versions live in each application process, so other processes keep serving their
+    rendered entries until they expire (ttl_sec).
+    """
+
+    def __init__(self, max_size=1024, ttl_sec=60):
+        """
+        Args:
+            max_size (int): The maximum number of rendered entries kept.
+            ttl_sec (float): How long a rendered entry is served. A time-to-live (or size) of 0
+                disables the cache.
+        """
+        self._cache = TTLCache(max_size=max_size, ttl_sec=ttl_sec)
+        self._versions = {}     # scope -> content version
+        self._lock = threading.Lock()
+
+    def version(self, scope):
+        """
+        Returns the current content version of a scope, e.g. ('challenge', 3).
+
+        The version must be read before loading the content to render, so that content
+        changed meanwhile is cached under the old version and never served.
+        """
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def bump(self, *scopes):
+        """
+        Marks the content of the given scopes as changed, once the change is committed.
+        """
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def get_or_render(self, key, version, render):
+        """
+        Returns the cached HTML for a key and content version, rendering and caching it on a miss.
+
+        Args:
+            key (tuple): What the entry shows, including everything the template reads from
+                the session (e.g. the privilege flag).
+            version (int): The content version, read before loading the content.
+            render (callable): Renders the HTML; None (e.g. for a missing challenge) is returned
+                but not cached.
+
+        Returns:
+            str or None: The rendered HTML.
+        """
+        return self._cache.get_or_load(key + (version,), render)
+
+    def clear(self):
+        """
+        Removes every rendered entry.
+        """
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache metrics (see TTLCache.stats).
+        """
+        return self._cache.stats()
@@ -0,0 +1,187 @@
+import inspect
+import json
+import os
+from classes.util import harnessruntime
+
+class Harness:
+    """
+    Builds the batched test harness that runs inside the sandbox and decodes its output.
+
+    The harness loads the user's code once and runs every test case in the same
+    interpreter. Its stdout carries nothing but length-prefixed JSON frames, one event
+    per loaded module and per test, while anything the user's code writes ends up on
+    stderr, so results never have to be scraped out of arbitrary text. The user's code
+    runs in a worker process that holds neither the harness' stdout nor the expected
+    outputs, which never leave the judge, so it cannot forge a passing result.
+    """
+    _runtime_source = None
+
+    # Frames larger than this are treated as a broken harness rather than buffered
+    MAX_FRAME_BYTES = int(os.getenv('HARNESS_MAX_FRAME_BYTES', harnessruntime.MAX_FRAME_BYTES))
+    # How much of the harness' stderr is kept to report how it died
+    STDERR_TAIL_BYTES = 64 * 1024
+    # Bounds of the prints kept for the module body and for every test, older lines are dropped
+    PRINT_MAX_LINES = int(os.getenv('PRINT_MAX_LINES', 1000))
+    PRINT_MAX_BYTES = int(os.getenv('PRINT_MAX_BYTES', 64 * 1024))
+
+    @staticmethod
+    def get_runtime_source():
+        """
+        Returns the source of the sandbox-side runtime (classes/util/harnessruntime.py).
+        """
+        if Harness._runtime_source is None:
+            Harness._runtime_source = inspect.getsource(harnessruntime)
+        return Harness._runtime_source
+
+    @staticmethod
+    def build_job(challenge, tests, user_code, test_time_limit_sec=None):
+        """
+        Describes a judging job in the form understood by the sandbox runtime.
+
+        The job leaves out the expected outputs: the sandbox reports what every test
+        returned, the judge compares it and stops the sandbox at the first failing test.
+
+        Args:
+            challenge (Challenge): The challenge, providing the stub name to call.
+            tests (list): The ChallengeTest objects to run.
+            user_code (str): The user's code.
+            test_time_limit_sec (float, optional): The time after which a test is interrupted.
+
+        Returns:
+            dict: The job.
+        """
+        return {
+            'user_code': user_code,
+            'stub_name': challenge.stub_name,
+            'tests': [{'id': test.id, 'input': test.test_input} for test in tests],
+            'print_limits': {'max_lines': Harness.PRINT_MAX_LINES, 'max_bytes': Harness.PRINT_MAX_BYTES},
+            'max_frame_bytes': Harness.MAX_FRAME_BYTES,
+            'test_time_limit_sec': test_time_limit_sec
+        }
+
+    @staticmethod
+    def build_source(job):
+        """
+        Builds the program executed with `python -c` inside the sandbox.
+
+        Args:
+            job (dict): The job returned by build_job.
+
+        Returns:
+            str: The runtime source followed by the call running the encoded job.
+        """
+        blob = harnessruntime.encode_job(job)
+        return Harness.get_runtime_source() + f"\nmain({blob!r})\n"
+
+    @staticmethod
+    def collect_events(events, on_event=None, until=None):
+        """
+        Gathers the events of a job into its payload.
+
+        Args:
+            events (iterable): The decoded events: a 'load' event, a 'test' event per test
+                case run and an 'end' event.
+            on_event (callable, optional): Called with the name and data of every 'load'
+                and 'test' event as soon as it is decoded, e.g. to forward the prints.
+            until (callable, optional): Called with every test entry; once it returns True
+                the remaining events are not read and the payload is returned as it is.
+
+        Returns:
+            dict or None: The payload in the form of harnessruntime.run_job, with the
+                'timeout' and 'exception' reported by the 'end' event, or None if the events
+                stopped before it (e.g. because the harness died).
+        """
+        payload = {'prints': [], 'exception': None, 'tests': [], 'timeout': False}
+        for event in events:
+            kind = event.pop('event', None)
+            if on_event and kind in ('load', 'test'):
+                on_event(kind, event)
+            if kind == 'load':
+                payload.update(event)
+            elif kind == 'test':
+                payload['tests'].append(event)
+                if until and until(event):
+                    return payload
+            elif kind == 'end':
+                payload['timeout'] = bool(event.get('timeout'))
+                payload['exception'] = event.get('exception') or payload['exception']
+                return payload
+        return None
+
+    @staticmethod
+    def read_payload(chunks, on_event=None, until=None):
+        """
+        Decodes the events the harness streams while it runs.
+
+        Args:
+            chunks (iterable): The harness output as (stdout, stderr) tuples of bytes or
+                None, like the demultiplexed stream of docker's `exec_run`.
+            on_event (callable, optional): See collect_events.
+            until (callable, optional): See collect_events.
+
+        Returns:
+            tuple: The payload (see collect_events) and the end of the harness' stderr,
+                decoded as text.
+
+        Raises:
+            ValueError: If the harness sent a malformed frame.
+        """
+        decoder = FrameDecoder()
+        stderr = bytearray()
+
+        def events():
+            for out, err in chunks:
+                if err:
+                    stderr.extend(err)
+                    del stderr[:-Harness.STDERR_TAIL_BYTES]
+                if out:
+                    yield from decoder.feed(out)
+
+        payload = Harness.collect_events(events(), on_event, until)
+        return payload, stderr.decode(errors='replace')
+
+class FrameDecoder:
+    """
+    Incrementally splits a byte stream into the JSON frames written by harnessruntime.write_frame.
+    """
+
+    def __init__(self, max_frame_bytes=None):
+        """
+        Args:
+            max_frame_bytes (int, optional): The largest frame accepted, Harness.MAX_FRAME_BYTES by default.
+        """
+        self._buffer = b""
+        self._max_frame_bytes = max_frame_bytes or Harness.MAX_FRAME_BYTES
+
+    def feed(self, data):
+        """
+        Adds bytes to the stream.
+
+        Returns:
+            list: The values of the frames completed by these bytes.
+
+        Raises:
+            ValueError: If a frame is larger than the limit or is not valid JSON.
+        """
+        self._buffer += data
+        values = []
+        header_size = harnessruntime.FRAME_HEADER.size
+        while len(self._buffer) >= header_size:
+            length = harnessruntime.FRAME_HEADER.unpack(self._buffer[:header_size])[0]
+            if length > self._max_frame_bytes:
+                raise ValueError(f"Error: harness frame of {length} bytes exceeds {self._max_frame_bytes}")
+            if len(self._buffer) < header_size + length:
+                break
+            data, self._buffer = self._buffer[header_size:header_size + length], self._buffer[header_size + length:]
+            try:
+                values.append(json.loads(data))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Error: malformed harness frame: {e}") from e
+        return values
+
+    @property
+    def pending(self):
+        """
+        The number of bytes of an incomplete frame.
+        """
+        return len(self._buffer)
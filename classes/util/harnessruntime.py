@@ -0,0 +1,407 @@
+# This module is executed inside the sandbox: its source is sent to the container
+# together with the job, so it must only depend on the standard library.
+import ast
+import base64
+import builtins
+import collections
+import json
+import os
+import select
+import signal
+import struct
+import time
+import zlib
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Results travel as frames: a 4-byte big-endian length followed by that many bytes of JSON
+FRAME_HEADER = struct.Struct('>I')
+# The largest frame a worker may report, unless the job sets its own 'max_frame_bytes'
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# The fields of the events a worker may report (see relay_events) and their types
+OPTIONAL_STR = (str, type(None))
+EVENT_FIELDS = {
+    'load': {'prints': list, 'exception': OPTIONAL_STR},
+    'test': {'result': OPTIONAL_STR, 'passed': (bool, type(None)), 'prints': list, 'exception': OPTIONAL_STR,
+             'wall_time': (int, float), 'timeout': bool, 'cpu_user': (int, float), 'cpu_sys': (int, float),
+             'peak_rss_kb': int},
+    'end': {'timeout': (bool, type(None))}
+}
+
+class TestTimeout(BaseException):
+    """
+    Raised in the user's code when a test case exceeds its time limit. It derives from
+    BaseException so that a bare `except Exception` in the user's code does not swallow it.
+    """
+
+def format_exception(e):
+    """
+    Formats an exception the way the judge reports it, e.g. 'ZeroDivisionError: division by zero'.
+    """
+    if isinstance(e, SyntaxError):
+        return f"{type(e).__name__}: {e.msg}"
+    return f"{type(e).__name__}: {e}"
+
+class PrintBuffer:
+    """
+    A ring buffer of printed lines bounded in lines and bytes, keeping the most recent ones.
+
+    Printing in a tight loop cannot exhaust the sandbox memory: the oldest lines are
+    dropped and replaced by a truncation marker, and an overlong line is cut short.
+    """
+
+    def __init__(self, max_lines=1000, max_bytes=65536):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._lines = collections.deque()
+        self._bytes = 0
+
+    def append(self, line):
+        data = line.encode(errors='replace')
+        if len(data) > self.max_bytes:
+            suffix = " [line truncated]"
+            line = data[:max(0, self.max_bytes - len(suffix))].decode(errors='ignore') + suffix
+            data = line.encode()
+        self._lines.append(line)
+        self._bytes += len(data)
+        while self._lines and (len(self._lines) > self.max_lines or self._bytes > self.max_bytes):
+            self._bytes -= len(self._lines.popleft().encode(errors='replace'))
+            self.dropped += 1
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def lines(self):
+        """
+        Returns the kept lines, preceded by a truncation marker if older lines were dropped.
+        """
+        marker = [f"[... {self.dropped} earlier lines truncated ...]"] if self.dropped else []
+        return marker + list(self._lines)
+
+def new_print_buffer(job):
+    """
+    Returns an empty PrintBuffer with the job's 'print_limits', if any.
+    """
+    return PrintBuffer(**(job.get('print_limits') or {}))
+
+def capture_prints(prints):
+    """
+    Makes print append its output to the given list or PrintBuffer instead of writing to stdout.
+    """
+    def captured_print(*args, **kwargs):
+        prints.append(' '.join(map(str, args)))
+
+    builtins.print = captured_print
+
+def load_code(user_code):
+    """
+    Executes the user's code as the '__main__' module.
+
+    Returns:
+        dict: The module namespace, holding the function under test.
+    """
+    namespace = {'__name__': '__main__', '__builtins__': builtins}
+    exec(compile(user_code, '<user_code>', 'exec'), namespace)
+    return namespace
+
+def set_deadline(time_limit_sec):
+    """
+    Raises TestTimeout in the running code after time_limit_sec seconds; 0 or None cancels it.
+    """
+    if not hasattr(signal, 'setitimer'):
+        return
+    if time_limit_sec:
+        def expire(signum, frame):
+            raise TestTimeout()
+        signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, time_limit_sec or 0)
+
+def measure_usage(before):
+    """
+    Returns the CPU time used since the given getrusage snapshot and the peak resident memory.
+    """
+    if before is None:
+        return {'cpu_user': 0.0, 'cpu_sys': 0.0, 'peak_rss_kb': 0}
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'cpu_user': after.ru_utime - before.ru_utime,
+        'cpu_sys': after.ru_stime - before.ru_stime,
+        'peak_rss_kb': after.ru_maxrss  # KiB on Linux
+    }
+
+def run_test(namespace, stub_name, test, print_limits=None, time_limit_sec=None):
+    """
+    Runs a test case against the loaded code, capturing its prints.
+
+    Args:
+        print_limits (dict, optional): The 'max_lines' and 'max_bytes' of the captured prints.
+        time_limit_sec (float, optional): The time after which the test is interrupted.
+
+    Returns:
+        dict: The test entry with its 'id', 'result' (repr of the returned value), 'passed'
+            (None if the test has no expected 'output'), 'prints', 'exception', 'wall_time' in seconds, 'timeout', set if the test was
+            interrupted for exceeding its time limit, the user and system CPU time spent by
+            the test in seconds ('cpu_user', 'cpu_sys') and the peak resident memory of the
+            process running it in KiB ('peak_rss_kb').
+    """
+    judged = 'output' in test
+    entry = {'id': test['id'], 'result': None, 'passed': False if judged else None, 'prints': [], 'exception': None, 'timeout': False}
+    prints = PrintBuffer(**(print_limits or {}))
+    capture_prints(prints)
+    expected = None
+    if judged:
+        try:
+            expected = ast.literal_eval(test['output'])
+        except (ValueError, SyntaxError):
+            expected = test['output']
+
+    usage = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    start_time = time.perf_counter()
+    try:
+        set_deadline(time_limit_sec)
+        try:
+            result = eval(f"{stub_name}({test['input']})", namespace)
+            entry['result'] = repr(result)
+            if judged:
+                entry['passed'] = result == expected
+        finally:
+            set_deadline(None)
+    except TestTimeout:
+        entry['timeout'] = True
+        entry['exception'] = f"TimeoutError: the test exceeded its time limit of {time_limit_sec} s"
+    except BaseException as e:
+        entry['exception'] = format_exception(e)
+    entry['wall_time'] = time.perf_counter() - start_time
+    entry.update(measure_usage(usage))
+    entry['prints'] = prints.lines()
+    return entry
+
+def run_job(job, on_event=None):
+    """
+    Loads the user's code once and runs every test case of the job against it.
+
+    Args:
+        job (dict): The job with the keys 'user_code', 'stub_name', 'tests' (a list of
+            dicts with 'id', 'input' and optionally 'output') and optionally
+            'stop_on_failure' (stop after the first test not returning its 'output'),
+            'print_limits' (the PrintBuffer bounds of the module body and of every test) and
+            'test_time_limit_sec' (the time after which a test is interrupted).
+        on_event (callable, optional): Called with a 'load' event holding the 'prints' and
+            'exception' of the module body once the code is loaded, then with a 'test'
+            event holding the entry of every test as soon as it has run.
+
+    Returns:
+        dict: The payload with the prints of the module body ('prints'), the exception
+            raised while loading the code ('exception') and one entry per executed test
+            in 'tests' (see run_test).
+    """
+    payload = {'prints': [], 'exception': None, 'tests': []}
+    original_print = builtins.print
+
+    prints = new_print_buffer(job)
+    capture_prints(prints)
+    try:
+        try:
+            namespace = load_code(job['user_code'])
+        except BaseException as e:
+            payload['exception'] = format_exception(e)
+            namespace = None
+        payload['prints'] = prints.lines()
+        if on_event:
+            on_event({'event': 'load', 'prints': payload['prints'], 'exception': payload['exception']})
+        if namespace is None:
+            return payload
+
+        for test in job['tests']:
+            entry = run_test(namespace, job['stub_name'], test, job.get('print_limits'), job.get('test_time_limit_sec'))
+            payload['tests'].append(entry)
+            if on_event:
+                on_event(dict(entry, event='test'))
+
+            if job.get('stop_on_failure') and entry['passed'] is False:
+                break
+    finally:
+        builtins.print = original_print
+    return payload
+
+def encode_job(job):
+    """
+    Encodes a job as compact ASCII so it can be embedded in the harness source.
+    """
+    return base64.b64encode(zlib.compress(json.dumps(job).encode())).decode()
+
+def decode_job(blob):
+    return json.loads(zlib.decompress(base64.b64decode(blob)))
+
+def encode_frame(value):
+    data = json.dumps(value).encode()
+    return FRAME_HEADER.pack(len(data)) + data
+
+def write_frame(fd, value):
+    """
+    Writes a JSON value as a frame to a file descriptor.
+    """
+    data = encode_frame(value)
+    while data:
+        data = data[os.write(fd, data):]
+
+def read_exact(stream, size):
+    """
+    Reads exactly size bytes, or returns None if the stream ends first.
+    """
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def read_frame(stream, max_bytes=None):
+    """
+    Reads a frame from a binary stream.
+
+    Args:
+        stream (file): The binary stream.
+        max_bytes (int, optional): The largest frame accepted, any size by default.
+
+    Returns:
+        The decoded JSON value, or None at the end of the stream.
+
+    Raises:
+        ValueError: If the frame is larger than max_bytes or is not valid JSON.
+    """
+    header = read_exact(stream, FRAME_HEADER.size)
+    if header is None:
+        return None
+    length = FRAME_HEADER.unpack(header)[0]
+    if max_bytes is not None and length > max_bytes:
+        raise ValueError(f"Error: frame of {length} bytes exceeds {max_bytes}")
+    data = read_exact(stream, length)
+    return None if data is None else json.loads(data)
+
+def parse_event(data):
+    """
+    Decodes an event reported by a worker.
+
+    Returns:
+        dict or None: The event with only the fields of its kind (see EVENT_FIELDS), or None
+            if it is not valid JSON, of an unknown kind or has a field of the wrong type.
+    """
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return None
+    fields = EVENT_FIELDS.get(event.get('event')) if isinstance(event, dict) else None
+    if fields is None:
+        return None
+    checked = {'event': event['event']}
+    for name, types in fields.items():
+        if not isinstance(event.get(name), types):
+            return None
+        checked[name] = event.get(name)
+    if not all(isinstance(line, str) for line in checked.get('prints', [])):
+        return None
+    return checked
+
+def relay_events(job, work, fd, deadline=None, close_fds=()):
+    """
+    Runs the user's code in a forked worker and relays the events it reports as frames on fd.
+
+    The worker closes fd (and close_fds) as soon as it is forked and reports its events
+    over a private pipe, so the user's code can neither write frames on fd nor read the
+    next job. Only a 'load' event, then at most one 'test' event per test of the job,
+    stamped with the id of that test, then an 'end' event are relayed, and only their
+    known fields (see parse_event); anything else, or a frame larger than the job's
+    'max_frame_bytes' (MAX_FRAME_BYTES by default), stops the relay as if the worker died.
+
+    Args:
+        job (dict): The job the worker runs.
+        work (callable): Runs the job in the worker, called with the function reporting an event.
+        fd (int): The file descriptor the events are relayed to.
+        deadline (float, optional): The time.monotonic() at which the worker is killed.
+        close_fds (iterable, optional): Other file descriptors the worker must not hold.
+
+    Returns:
+        str: 'ok' once the 'end' event was relayed, 'died' or 'timeout' otherwise.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        for private_fd in (fd,) + tuple(close_fds):
+            os.close(private_fd)
+        try:
+            work(lambda event: write_frame(write_fd, event))
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    ids = [test['id'] for test in job['tests']]
+    max_frame_bytes = job.get('max_frame_bytes') or MAX_FRAME_BYTES
+    buffer, loaded, status = b"", False, None
+    try:
+        while status is None:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            if not select.select([read_fd], [], [], timeout)[0]:
+                status = 'timeout'
+                break
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                status = 'died'
+                break
+            buffer += chunk
+            while status is None and len(buffer) >= FRAME_HEADER.size:
+                length = FRAME_HEADER.unpack(buffer[:FRAME_HEADER.size])[0]
+                if length > max_frame_bytes:
+                    status = 'died'
+                    break
+                size = FRAME_HEADER.size + length
+                if len(buffer) < size:
+                    break
+                event, buffer = parse_event(buffer[FRAME_HEADER.size:size]), buffer[size:]
+                kind = event and event['event']
+                if kind == 'load' and not loaded:
+                    loaded = True
+                elif kind == 'test' and loaded and ids:
+                    event['id'] = ids.pop(0)
+                elif kind == 'end' and loaded:
+                    status = 'ok'
+                else:
+                    status = 'died'
+                    break
+                write_frame(fd, event)
+    finally:
+        os.close(read_fd)
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        os.waitpid(pid, 0)
+    return status
+
+def main(blob):
+    """
+    Runs an encoded job, streaming its events as frames on stdout followed by an 'end' event.
+
+    Stdout is reserved for the frames: the file descriptor is redirected to stderr, and
+    the user's code runs in a worker that does not hold it (see relay_events), so nothing
+    it writes, however it writes it, can be mistaken for a result. Without the 'end'
+    event (e.g. the worker was killed for exceeding the memory limit) the harness is
+    reported as dead.
+    """
+    fd = os.dup(1)
+    os.dup2(2, 1)
+    job = decode_job(blob)
+
+    def work(emit):
+        run_job(job, emit)
+        emit({'event': 'end'})
+
+    relay_events(job, work, fd)
@@ -0,0 +1,85 @@
+import bisect
+import threading
+
+class LatencyHistogram:
+    """
+    Thread-safe latency histograms, one per key (e.g. a stored procedure name).
+
+    Every series keeps a count per fixed bucket, the total and the maximum, so recording is a
+    constant-time update however many samples are taken, and percentiles are estimated from
+    the bucket bounds.
+    """
+
+    # Upper bounds in seconds, the last bucket holds everything slower
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Args:
+            buckets (tuple): The increasing bucket upper bounds, in seconds.
+        """
+        self._buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, duration, error=False):
+        """
+        Adds a sample.
+
+        Args:
+            key (hashable): The series.
+            duration (float): The latency, in seconds.
+            error (bool): Whether the measured operation failed.
+        """
+        index = bisect.bisect_left(self._buckets, duration)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self._buckets) + 1), 'count': 0, 'errors': 0, 'sum': 0.0, 'max': 0.0}
+            series['counts'][index] += 1
+            series['count'] += 1
+            series['sum'] += duration
+            series['max'] = max(series['max'], duration)
+            if error:
+                series['errors'] += 1
+
+    def snapshot(self):
+        """
+        Returns the histograms.
+
+        Returns:
+            dict: By key, the sample 'count', the 'errors', the 'total_sec', 'mean_sec' and
+                'max_sec', the estimated 'p50', 'p95' and 'p99' (the upper bound of the bucket
+                holding that rank, or the maximum for the last bucket) and the cumulative
+                'buckets' as [upper bound, count] pairs, None standing for infinity.
+        """
+        with self._lock:
+            series = {key: dict(value, counts=list(value['counts'])) for key, value in self._series.items()}
+        snapshot = {}
+        for key, value in series.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(self._buckets + (None,), value['counts']):
+                cumulative += count
+                buckets.append([bound, cumulative])
+            summary = {
+                'count': value['count'],
+                'errors': value['errors'],
+                'total_sec': value['sum'],
+                'mean_sec': value['sum'] / value['count'],
+                'max_sec': value['max'],
+                'buckets': buckets
+            }
+            for q in self.PERCENTILES:
+                rank = value['count'] * q / 100
+                bound = next(bound for bound, count in buckets if count >= rank)
+                summary[f'p{q}'] = value['max'] if bound is None else min(bound, value['max'])
+            snapshot[key] = summary
+        return snapshot
+
+    def reset(self):
+        """
+        Forgets every sample.
+        """
+        with self._lock:
+            self._series.clear()
@@ -0,0 +1,258 @@
+import queue
+import threading
+import time
+import uuid
+
+class JudgeJob:
+    """
+    A submission waiting for, or going through, judging.
+
+    Jobs keep an append-only list of events ('status', 'result', ...) so that
+    pollers and server-sent-event streams can follow their progress.
+    """
+    def __init__(self, func, account_id=None):
+        self.id = uuid.uuid4().hex
+        self.account_id = account_id
+        self.status = 'queued'
+        self.result = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._func = func
+        self._events = []
+        self._condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status == 'done'
+
+    @property
+    def wait_time(self):
+        """Seconds the job spent in the queue (so far, if it has not started yet)."""
+        return (self.started_at or time.time()) - self.created_at
+
+    @property
+    def run_time(self):
+        """Seconds the job spent being judged, or None if it has not started."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def publish(self, event, data):
+        """
+        Appends an event to the job and wakes up everyone following it.
+
+        Args:
+            event (str): The event name.
+            data (dict): The JSON-serializable event data.
+        """
+        with self._condition:
+            self._events.append((event, data))
+            self._condition.notify_all()
+
+    def next_events(self, cursor, timeout=None):
+        """
+        Returns the events published after the given position, waiting for new ones if needed.
+
+        Args:
+            cursor (int): The number of events the caller has already seen.
+            timeout (float, optional): The maximum number of seconds to wait for a new event.
+
+        Returns:
+            list: The new (event, data) pairs, empty if none arrived before the timeout.
+        """
+        with self._condition:
+            if len(self._events) <= cursor and not self.done:
+                self._condition.wait(timeout)
+            return self._events[cursor:]
+
+    def wait(self, timeout=None):
+        """
+        Waits until the job is done.
+
+        Returns:
+            bool: True if the job is done.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.done, timeout)
+            return self.done
+
+    def run(self):
+        with self._condition:
+            self.status = 'running'
+            self.started_at = time.time()
+        self.publish('status', self.to_dict())
+        try:
+            result, status_code = self._func(self)
+        except Exception as e:
+            result = {
+                'message': str(e),
+                'flash': {"message": f"An unexpected error occurred: {e}", "category": "error"}
+            }
+            status_code = 500
+        with self._condition:
+            self.result = result
+            self.status_code = status_code
+            self.finished_at = time.time()
+            self.status = 'done'
+        self.publish('result', dict(result, status_code=status_code))
+
+    def to_dict(self):
+        """
+        Returns the job status (without its result) as a JSON-serializable dictionary.
+        """
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'wait_time': self.wait_time,
+            'run_time': self.run_time
+        }
+
+class JudgeQueue:
+    """
+    A bounded queue of judging jobs served by a fixed pool of worker threads.
+
+    Web requests enqueue submissions and return immediately, so slow submissions
+    only occupy judge workers and never the threads serving pages.
+    """
+    def __init__(self, workers=2, max_depth=100, result_ttl_sec=600):
+        """
+        Args:
+            workers (int): The number of submissions judged concurrently.
+            max_depth (int): The number of jobs allowed to wait in the queue.
+            result_ttl_sec (float): How long finished jobs are kept for polling.
+        """
+        self._workers = workers
+        self._result_ttl_sec = result_ttl_sec
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._jobs = {}
+        self._threads = []
+        self._closed = False            # set by shutdown, no submission is accepted anymore
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'wait_sec_total': 0.0,
+            'wait_sec_max': 0.0,
+            'run_sec_total': 0.0,
+            'run_sec_max': 0.0
+        }
+
+    def _start_workers(self):
+        # Workers are started lazily so an idle application does not hold threads
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _wake_next_worker(self):
+        # Once the queue is closed it only shrinks, so a stop sentinel fits as soon as it is
+        # drained; every worker stopping passes the sentinel on to the next one
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._wake_next_worker()
+                return
+            job.run()
+            with self._lock:
+                self._stats['completed'] += 1
+                self._stats['wait_sec_total'] += job.wait_time
+                self._stats['wait_sec_max'] = max(self._stats['wait_sec_max'], job.wait_time)
+                self._stats['run_sec_total'] += job.run_time
+                self._stats['run_sec_max'] = max(self._stats['run_sec_max'], job.run_time)
+                stopping = self._closed
+            if stopping and self._queue.empty():
+                self._wake_next_worker()
+                return
+
+    def _purge_expired(self):
+        expiry = time.time() - self._result_ttl_sec
+        for job_id in [job.id for job in self._jobs.values() if job.done and job.finished_at < expiry]:
+            del self._jobs[job_id]
+
+    def submit(self, func, account_id=None):
+        """
+        Enqueues a judging job.
+
+        Args:
+            func (callable): Called with the JudgeJob by a worker; returns the result
+                payload (dict) and the HTTP status code describing it.
+            account_id (int, optional): The account the job belongs to.
+
+        Returns:
+            JudgeJob: The queued job.
+
+        Raises:
+            RuntimeError: If the queue is full or shut down.
+        """
+        job = JudgeJob(func, account_id)
+        with self._lock:
+            if self._closed:
+                self._stats['rejected'] += 1
+                raise RuntimeError("The judging queue is shut down")
+            self._purge_expired()
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._stats['rejected'] += 1
+                raise RuntimeError("The judging queue is full")
+            self._jobs[job.id] = job
+            self._stats['submitted'] += 1
+        return job
+
+    def get(self, job_id):
+        """
+        Returns the job with the given id, or None if it is unknown or expired.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """
+        Returns a snapshot of the queue metrics.
+
+        Returns:
+            dict: The queue depth, running jobs, worker count and the lifetime counters
+                with total, maximum and average wait and run times in seconds.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['depth'] = self._queue.qsize()
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == 'running')
+            stats['workers'] = self._workers
+        completed = stats['completed']
+        stats['wait_sec_avg'] = stats['wait_sec_total'] / completed if completed else 0.0
+        stats['run_sec_avg'] = stats['run_sec_total'] / completed if completed else 0.0
+        return stats
+
+    def shutdown(self, timeout=None):
+        """
+        Stops accepting submissions and stops the workers once the jobs already queued have
+        been judged. Never blocks on a full queue: the workers stop as they find it drained.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait for the workers,
+                e.g. when one of them may be stuck on a submission. Waits for them all by default.
+
+        Returns:
+            bool: True if every worker has stopped.
+        """
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        self._wake_next_worker()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+        return not any(thread.is_alive() for thread in threads)
@@ -0,0 +1,77 @@
+import math
+
+class LatencyStats:
+    """
+    Helpers summarizing latency samples and comparing summaries against a baseline.
+    """
+
+    PERCENTILES = (50, 95, 99)
+
+    @staticmethod
+    def percentile(values, q):
+        """
+        Returns the q-th percentile of the values, interpolating linearly between samples.
+
+        Args:
+            values (list): The samples.
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float or None: The percentile, or None if there are no samples.
+        """
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = (len(ordered) - 1) * q / 100
+        low, high = math.floor(rank), math.ceil(rank)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    @staticmethod
+    def summarize(values):
+        """
+        Summarizes latency samples.
+
+        Args:
+            values (list): The samples, in seconds.
+
+        Returns:
+            dict: The number of samples, their minimum, mean, maximum and p50, p95 and p99.
+        """
+        summary = {
+            'count': len(values),
+            'min': min(values) if values else None,
+            'mean': sum(values) / len(values) if values else None,
+            'max': max(values) if values else None
+        }
+        for q in LatencyStats.PERCENTILES:
+            summary[f'p{q}'] = LatencyStats.percentile(values, q)
+        return summary
+
+    @staticmethod
+    def compare(current, baseline, tolerance=0.2, keys=('p50', 'p95', 'p99')):
+        """
+        Finds the latencies that regressed compared to a baseline.
+
+        Args:
+            current (dict): Summaries returned by summarize, by name.
+            baseline (dict): The baseline summaries, by name. Names missing on either side are ignored.
+            tolerance (float): The allowed relative slowdown, e.g. 0.2 for 20%.
+            keys (tuple): The summary fields compared.
+
+        Returns:
+            list: One dict per regression, with the 'name', the 'key', the 'baseline' and
+                'current' values and the relative 'change'.
+        """
+        regressions = []
+        for name, summary in current.items():
+            reference = baseline.get(name)
+            if not reference:
+                continue
+            for key in keys:
+                before, after = reference.get(key), summary.get(key)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if change > tolerance:
+                    regressions.append({'name': name, 'key': key, 'baseline': before, 'current': after, 'change': change})
+        return regressions
@@ -0,0 +1,307 @@
+import math
+import os
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from classes.util.executor import Executor
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Run by `sh` in the sandbox's mount namespace before the command: remounts every mount point
+# read-only, keeping the flags a user namespace is not allowed to clear, and refuses to start
+# the command if any of them stays writable
+READ_ONLY_SCRIPT = """
+mounts=$(cat /proc/self/mounts)
+echo "$mounts" | while read -r _ target _ options _; do
+    flags=ro
+    for option in $(echo "$options" | tr , ' '); do
+        case $option in nosuid|nodev|noexec|noatime|nodiratime|relatime|strictatime) flags=$flags,$option;; esac
+    done
+    mount -o "remount,bind,$flags" "$(printf '%b' "$target")" 2>/dev/null || exit 1
+done || exit 126
+exec "$@"
+"""
+
+class LocalStream:
+    """
+    The stdin and stdout of a long-running sandbox process.
+    """
+
+    def __init__(self, sandbox, process):
+        self._sandbox = sandbox
+        self._process = process
+
+    def write(self, data):
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def read(self, size):
+        return self._process.stdout.read(size)
+
+    def close(self):
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._sandbox._kill(self._process)
+        self._process.wait()
+        self._process.stdout.close()
+        with self._sandbox._lock:
+            self._sandbox._processes.discard(self._process)
+
+class LocalSandbox:
+    """
+    A working directory in which commands run as resource-limited subprocesses.
+
+    With read_only, the commands run in their own mount namespace where every file system
+    is remounted read-only, so they cannot create, change or remove any file, whatever
+    their uid. Otherwise only the working directory's mode and the zero file size limit
+    stand in their way, which neither stops root nor the creation, renaming or removal of
+    (empty) files elsewhere.
+    """
+
+    def __init__(self, python, cpu=None, memory_mb=100, time_limit_sec=None, isolate_network=True, read_only=True):
+        """
+        Args:
+            python (str): The interpreter that runs 'python' commands.
+            cpu (int, optional): The CPU the processes are pinned to.
+            memory_mb (int): The address space limit of the processes.
+            time_limit_sec (float, optional): The CPU time limit of the processes, also used
+                as the wall clock limit of every command.
+            isolate_network (bool): Run the processes in an empty network namespace.
+            read_only (bool): Run the processes with every file system mounted read-only.
+        """
+        self._python = python
+        self._cpu = cpu
+        self._memory_bytes = memory_mb * 1024 * 1024
+        self._time_limit_sec = time_limit_sec
+        self._isolate_network = isolate_network
+        self._read_only = read_only
+        self._processes = set()
+        self._lock = threading.Lock()
+        self.workdir = tempfile.mkdtemp(prefix='sandbox-')
+        os.chmod(self.workdir, 0o555)
+
+    def _limit(self):
+        # Runs in the child between fork and exec
+        if resource:
+            resource.setrlimit(resource.RLIMIT_AS, (self._memory_bytes, self._memory_bytes))
+            resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+            if self._time_limit_sec:
+                cpu_sec = math.ceil(self._time_limit_sec) + 1
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_sec, cpu_sec))
+        if self._cpu is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {self._cpu})
+
+    def build_command(self, command):
+        """
+        Maps a sandbox command to the host command line.
+        """
+        if command[0] == 'python':
+            # Isolated mode: no user site-packages, no PYTHON* environment variables
+            command = [self._python, '-I'] + list(command[1:])
+        if self._read_only:
+            command = ['sh', '-c', READ_ONLY_SCRIPT, 'sandbox'] + list(command)
+        namespaces = (['--net'] if self._isolate_network else []) + (['--mount'] if self._read_only else [])
+        if namespaces:
+            command = ['unshare'] + namespaces + ['--map-root-user'] + list(command)
+        return command
+
+    def _popen(self, command, **kwargs):
+        process = subprocess.Popen(
+            self.build_command(command),
+            cwd=self.workdir,
+            env={'PATH': os.environ.get('PATH', os.defpath), 'PYTHONDONTWRITEBYTECODE': '1'},
+            preexec_fn=self._limit,
+            start_new_session=True,
+            **kwargs
+        )
+        with self._lock:
+            self._processes.add(process)
+        return process
+
+    def open_stream(self, command):
+        """
+        Starts a long-running command and connects to its stdin and stdout (stderr is discarded).
+
+        Returns:
+            LocalStream: The stream, to be closed once the command is not needed anymore.
+        """
+        process = self._popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return LocalStream(self, process)
+
+    def exec_run(self, command, stream=False, demux=False):
+        """
+        Runs a command to completion, like docker's `Container.exec_run`.
+
+        Args:
+            command (list): The command, 'python' designating the configured interpreter.
+            stream (bool): Return the output as it is produced instead of once the command exited.
+            demux (bool): Keep stdout and stderr apart, as (stdout, stderr) tuples of bytes or None.
+
+        Returns:
+            tuple: The exit code (negative for a signal, None when streaming) and the output:
+                the combined stdout and stderr bytes, a (stdout, stderr) tuple with demux, or
+                a generator of chunks when streaming.
+        """
+        if not stream and not demux:
+            process = self._popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            try:
+                try:
+                    output = process.communicate(timeout=self._wall_timeout())[0]
+                except subprocess.TimeoutExpired:
+                    self._kill(process)
+                    output = process.communicate()[0]
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+            return process.returncode, output
+
+        process = self._popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        chunks = self._read_chunks(process)
+        if not demux:
+            chunks = (out or err for out, err in chunks)
+        if stream:
+            return None, chunks
+        chunks = list(chunks)
+        return process.returncode, (b"".join(out for out, _ in chunks if out) or None,
+                                    b"".join(err for _, err in chunks if err) or None)
+
+    def _wall_timeout(self):
+        return self._time_limit_sec + 1 if self._time_limit_sec else None
+
+    def _read_chunks(self, process):
+        # Yields (stdout, stderr) chunks until both pipes are closed, killing the process at the wall deadline
+        timeout = self._wall_timeout()
+        deadline = time.monotonic() + timeout if timeout else None
+        selector = selectors.DefaultSelector()
+        selector.register(process.stdout, selectors.EVENT_READ, 0)
+        selector.register(process.stderr, selectors.EVENT_READ, 1)
+        try:
+            while selector.get_map():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._kill(process)
+                    deadline = None
+                    continue
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fileobj.fileno(), 65536)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        continue
+                    yield (data, None) if key.data == 0 else (None, data)
+            process.wait()
+        finally:
+            selector.close()
+            if process.returncode is None:
+                self._kill(process)
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+            with self._lock:
+                self._processes.discard(process)
+
+    def _kill(self, process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def interrupt(self):
+        """
+        Kills every running command and the processes they started.
+        """
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            self._kill(process)
+
+    def close(self):
+        """
+        Kills the running commands and removes the working directory.
+        """
+        self.interrupt()
+        os.chmod(self.workdir, 0o700)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+class LocalExecutor(Executor):
+    """
+    Runs submissions as subprocesses of the judge host, limited with rlimits (CPU time,
+    address space, file size), pinned to their CPU, with every file system remounted
+    read-only in their own mount namespace (`unshare --mount`) and without network access
+    (`unshare --net`).
+
+    It avoids the docker overhead and daemon but isolates far less than a container (the
+    host file system stays readable, the processes share the host's pid namespace), so it
+    is meant for trusted or batch workloads.
+    """
+
+    name = 'local'
+
+    _network_isolation = None
+    _read_only_mounts = None
+
+    def __init__(self, python=sys.executable, memory_mb=100, isolate_network=True, read_only=True):
+        """
+        Args:
+            python (str): The interpreter running the submissions.
+            memory_mb (int): The address space limit of a submission.
+            isolate_network (bool): Refuse to judge when network isolation is unavailable.
+            read_only (bool): Refuse to judge when the file systems cannot be remounted read-only.
+        """
+        self._python = python
+        self._memory_mb = memory_mb
+        self._isolate_network = isolate_network
+        self._read_only = read_only
+
+    @staticmethod
+    def network_isolation_available():
+        """
+        Checks once whether processes can be started in their own network namespace.
+        """
+        if LocalExecutor._network_isolation is None:
+            try:
+                completed = subprocess.run(['unshare', '--net', '--map-root-user', 'true'], capture_output=True, timeout=10)
+                LocalExecutor._network_isolation = completed.returncode == 0
+            except (OSError, subprocess.SubprocessError):
+                LocalExecutor._network_isolation = False
+        return LocalExecutor._network_isolation
+
+    @staticmethod
+    def read_only_available():
+        """
+        Checks once whether processes can be started with every file system remounted read-only.
+        """
+        if LocalExecutor._read_only_mounts is None:
+            try:
+                completed = subprocess.run(['unshare', '--mount', '--map-root-user', 'sh', '-c', READ_ONLY_SCRIPT, 'sandbox', 'true'],
+                                           capture_output=True, timeout=10)
+                LocalExecutor._read_only_mounts = completed.returncode == 0
+            except (OSError, subprocess.SubprocessError):
+                LocalExecutor._read_only_mounts = False
+        return LocalExecutor._read_only_mounts
+
+    def acquire(self, cpu, time_limit_sec=None):
+        if self._isolate_network and not self.network_isolation_available():
+            raise RuntimeError("Error: network isolation (unshare --net) is not available on this host")
+        if self._read_only and not self.read_only_available():
+            raise RuntimeError("Error: read-only file systems (unshare --mount) are not available on this host")
+        return LocalSandbox(self._python, cpu, self._memory_mb, time_limit_sec, self._isolate_network, self._read_only)
+
+    def release(self, sandbox, healthy=True):
+        sandbox.close()  # Sandboxes are never reused
+
+    def open_stream(self, sandbox, command):
+        return sandbox.open_stream(command)
+
+    def interrupt(self, sandbox):
+        sandbox.interrupt()
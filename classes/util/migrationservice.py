@@ -0,0 +1,293 @@
+import hashlib
+import os
+import re
+from datetime import datetime
+
+class MigrationService:
+    """
+    Applies the numbered schema migrations of sql/migrations to a live database.
+
+    sql/build.sql creates the baseline schema and sample data from scratch (dropping
+    everything first). Later schema changes ship as files named `<version>_<name>.sql`,
+    applied in version order and recorded in the `schema_migration` table so that each runs
+    once per database; a pending migration numbered below an applied one is refused rather
+    than run out of order. Every migration must also be safe to run again (`CREATE ... IF NOT
+    EXISTS`, `DROP ... IF EXISTS`, ...) so that it can be applied on top of a build.sql that
+    already contains it and retried after a partial failure: MySQL commits DDL statements
+    immediately, so a failing migration cannot be rolled back.
+
+    MySQL has no `CREATE INDEX IF NOT EXISTS` (only MariaDB has), so the service runs such a
+    statement without the clause, and only if information_schema has no index of that name.
+    """
+    ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'sql'))
+    MIGRATIONS_DIR = os.getenv("SQL_MIGRATIONS_DIR", os.path.join(ROOT_DIR, 'migrations'))
+    BUILD_SQL = os.path.join(ROOT_DIR, 'build.sql')
+
+    # Held while migrating so that concurrent runners (e.g. several instances starting at
+    # once) apply every migration only once
+    LOCK_NAME = 'schema_migration'
+    LOCK_TIMEOUT_SEC = int(os.getenv("SQL_MIGRATION_LOCK_TIMEOUT_SEC", "60"))
+
+    FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+    # CREATE INDEX IF NOT EXISTS: the statement without the clause, then the index and table names
+    INDEX_IF_NOT_EXISTS_PATTERN = re.compile(
+        r"(CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX)\s+IF\s+NOT\s+EXISTS(\s+`?(\w+)`?\s+ON\s+`?(\w+)`?)",
+        re.IGNORECASE
+    )
+
+    @staticmethod
+    def list_migrations(directory=None):
+        """
+        Lists the migration files.
+
+        Args:
+            directory (str, optional): The migrations directory, MIGRATIONS_DIR by default.
+
+        Returns:
+            list: (version, name, path) tuples sorted by version.
+
+        Raises:
+            RuntimeError: If two files have the same version.
+        """
+        directory = directory or MigrationService.MIGRATIONS_DIR
+        migrations = {}
+        for filename in sorted(os.listdir(directory)):
+            match = MigrationService.FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            version = int(match.group(1))
+            if version in migrations:
+                raise RuntimeError(f"Duplicate migration version {version}: {migrations[version][2]} and {filename}")
+            migrations[version] = (version, match.group(2), os.path.join(directory, filename))
+        return [migrations[version] for version in sorted(migrations)]
+
+    @staticmethod
+    def checksum(path):
+        """
+        Returns the SHA-256 of a migration file, recorded to detect files edited after they were applied.
+        """
+        with open(path, 'rb') as migration_file:
+            return hashlib.sha256(migration_file.read()).hexdigest()
+
+    @staticmethod
+    def split_statements(sql):
+        """
+        Splits a SQL script into statements the way the mysql client does.
+
+        Comments are dropped, quoted strings are kept intact and `delimiter` lines change the
+        statement terminator, so scripts defining stored procedures (like build.sql) work.
+
+        Args:
+            sql (str): The script.
+
+        Returns:
+            list: The statements, without their terminators.
+        """
+        statements, current = [], []
+        delimiter, position, length = ';', 0, len(sql)
+        at_line_start = True
+        while position < length:
+            if at_line_start:
+                match = re.match(r"[ \t]*delimiter[ \t]+(\S+)[ \t]*(\r?\n|$)", sql[position:], re.IGNORECASE)
+                if match and not "".join(current).strip():
+                    delimiter = match.group(1)
+                    position += match.end()
+                    continue
+            char = sql[position]
+            at_line_start = char == '\n'
+            if char in "'\"`":
+                end = position + 1
+                while end < length and sql[end] != char:
+                    end += 2 if sql[end] == '\\' and char != '`' else 1
+                current.append(sql[position:end + 1])
+                position = end + 1
+            elif sql.startswith('--', position) and (position + 2 == length or sql[position + 2].isspace()) or char == '#':
+                end = sql.find('\n', position)
+                position = length if end == -1 else end
+            elif sql.startswith('/*', position):
+                end = sql.find('*/', position + 2)
+                position = length if end == -1 else end + 2
+                current.append(' ')
+            elif sql.startswith(delimiter, position):
+                statement = "".join(current).strip()
+                if statement:
+                    statements.append(statement)
+                current = []
+                position += len(delimiter)
+            else:
+                current.append(char)
+                position += 1
+        statement = "".join(current).strip()
+        if statement:
+            statements.append(statement)
+        return statements
+
+    @staticmethod
+    def guard_statement(cursor, statement):
+        """
+        Rewrites a `CREATE INDEX IF NOT EXISTS` statement for MySQL.
+
+        Args:
+            cursor (mysql.connector.cursor.MySQLCursor): A cursor on the migrated database.
+            statement (str): The statement.
+
+        Returns:
+            str or None: The statement to run, without the clause, or None if the index exists.
+                Other statements are returned unchanged.
+        """
+        match = MigrationService.INDEX_IF_NOT_EXISTS_PATTERN.match(statement)
+        if not match:
+            return statement
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics"
+            " WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+            (match.group(4), match.group(3))
+        )
+        if cursor.fetchall():
+            return None
+        return match.group(1) + match.group(2) + statement[match.end():]
+
+    @staticmethod
+    def execute_script(connection, sql):
+        """
+        Runs every statement of a SQL script and commits.
+
+        Args:
+            connection (mysql.connector.connection.MySQLConnection): The connection.
+            sql (str): The script.
+        """
+        cursor = connection.cursor()
+        try:
+            for statement in MigrationService.split_statements(sql):
+                statement = MigrationService.guard_statement(cursor, statement)
+                if statement is None:
+                    continue
+                cursor.execute(statement)
+                if cursor.with_rows:
+                    cursor.fetchall()
+            connection.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def ensure_version_table(connection):
+        """
+        Creates the table recording the applied migrations if it does not exist.
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS `schema_migration` ("
+                " `version` int(11) NOT NULL,"
+                " `name` varchar(255) NOT NULL,"
+                " `checksum` char(64) NOT NULL,"
+                " `applied_at` datetime NOT NULL,"
+                " PRIMARY KEY (`version`)"
+                ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci"
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get_applied(connection):
+        """
+        Returns the applied migrations.
+
+        Returns:
+            dict: The checksum of every applied migration, by version.
+        """
+        MigrationService.ensure_version_table(connection)
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT version, checksum FROM schema_migration")
+            return {version: checksum for version, checksum in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get_status(connection, directory=None):
+        """
+        Compares the migration files with the migrations applied to a database.
+
+        Returns:
+            list: A dict per migration file with its 'version', 'name' and 'state': 'applied',
+                'pending', 'out_of_order' (pending, but numbered below an applied migration)
+                or 'modified' (applied, but the file changed since).
+        """
+        applied = MigrationService.get_applied(connection)
+        status = []
+        for version, name, path in MigrationService.list_migrations(directory):
+            if version not in applied:
+                state = 'out_of_order' if version < max(applied, default=version) else 'pending'
+            elif applied[version] != MigrationService.checksum(path):
+                state = 'modified'
+            else:
+                state = 'applied'
+            status.append({'version': version, 'name': name, 'state': state})
+        return status
+
+    @staticmethod
+    def migrate(connection, target=None, directory=None):
+        """
+        Applies the pending migrations in version order.
+
+        Args:
+            connection (mysql.connector.connection.MySQLConnection): The connection.
+            target (int, optional): The last version to apply, all of them by default.
+            directory (str, optional): The migrations directory, MIGRATIONS_DIR by default.
+
+        Returns:
+            list: The (version, name) of the applied migrations.
+
+        Raises:
+            RuntimeError: If another runner holds the migration lock, an applied migration
+                was modified since (a new migration must be written instead) or a pending
+                migration is numbered below an applied one.
+            mysql.connector.Error: If a migration fails; the earlier ones stay applied.
+        """
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MigrationService.LOCK_NAME, MigrationService.LOCK_TIMEOUT_SEC))
+        if cursor.fetchone()[0] != 1:
+            cursor.close()
+            raise RuntimeError("Another migration is in progress")
+        try:
+            applied = MigrationService.get_applied(connection)
+            done = []
+            for version, name, path in MigrationService.list_migrations(directory):
+                if target is not None and version > target:
+                    break
+                checksum = MigrationService.checksum(path)
+                if version in applied:
+                    if applied[version] != checksum:
+                        raise RuntimeError(f"Migration {version}_{name} was modified after it was applied")
+                    continue
+                if version < max(applied, default=version):
+                    raise RuntimeError(f"Migration {version}_{name} is numbered below the applied migration {max(applied)}")
+                with open(path, encoding='utf-8') as migration_file:
+                    MigrationService.execute_script(connection, migration_file.read())
+                cursor.execute(
+                    "INSERT INTO schema_migration (version, name, checksum, applied_at) VALUES (%s, %s, %s, %s)",
+                    (version, name, checksum, datetime.now())
+                )
+                connection.commit()
+                done.append((version, name))
+            return done
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MigrationService.LOCK_NAME,))
+            cursor.fetchall()
+            cursor.close()
+
+    @staticmethod
+    def build(connection, directory=None):
+        """
+        Builds the current schema from scratch: runs build.sql, which drops and recreates every
+        table (data included), then applies every migration. Meant for tests and new installs.
+
+        Returns:
+            list: The (version, name) of the applied migrations.
+        """
+        with open(MigrationService.BUILD_SQL, encoding='utf-8') as build_file:
+            MigrationService.execute_script(connection, build_file.read())
+        return MigrationService.migrate(connection, directory=directory)
@@ -0,0 +1,81 @@
+import math
+
+class PrometheusFormatter:
+    """
+    Builds metrics in the Prometheus text exposition format (version 0.0.4).
+
+    Metrics are added family by family, then rendered into the body of a scrape response.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._lines = []
+
+    @staticmethod
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def format_labels(labels):
+        """
+        Formats a label set, e.g. {"endpoint": "index"} as '{endpoint="index"}'.
+        """
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{name}="{PrometheusFormatter.escape(value)}"' for name, value in labels.items()) + '}'
+
+    @staticmethod
+    def format_value(value):
+        if value is None:
+            return 'NaN'
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, int):
+            return str(value)
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(float(value))
+
+    def add(self, name, type, help, samples):
+        """
+        Adds a counter or gauge family.
+
+        Args:
+            name (str): The metric name.
+            type (str): 'counter' or 'gauge'.
+            help (str): The description.
+            samples (list): (labels, value) pairs, labels being a dict (or None).
+        """
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {type}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{self.format_labels(labels)} {self.format_value(value)}")
+
+    def add_histogram(self, name, help, snapshot, label_names):
+        """
+        Adds a histogram family from a LatencyHistogram snapshot.
+
+        Args:
+            name (str): The metric name, e.g. 'http_request_duration_seconds'.
+            help (str): The description.
+            snapshot (dict): LatencyHistogram.snapshot(), its keys being the label values.
+            label_names (tuple): The label names, matching the keys (a tuple, or a single value
+                if there is only one label).
+        """
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for key, stats in snapshot.items():
+            values = key if isinstance(key, tuple) else (key,)
+            labels = dict(zip(label_names, values))
+            for bound, count in stats['buckets']:
+                le = '+Inf' if bound is None else self.format_value(bound)
+                self._lines.append(f"{name}_bucket{self.format_labels(dict(labels, le=le))} {count}")
+            self._lines.append(f"{name}_sum{self.format_labels(labels)} {self.format_value(stats['total_sec'])}")
+            self._lines.append(f"{name}_count{self.format_labels(labels)} {stats['count']}")
+
+    def render(self):
+        """
+        Returns the exposition text.
+        """
+        return '\n'.join(self._lines) + '\n'
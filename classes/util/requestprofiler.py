@@ -0,0 +1,174 @@
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+class RequestProfiler:
+    """
+    A sampling profiler for individual requests.
+
+    While a request is profiled, a background thread samples the stack of the thread
+    handling it every few milliseconds (through sys._current_frames, so the profiled code is
+    not instrumented and runs at full speed). The samples are kept per request for the most
+    recent requests and summed per endpoint, and served as collapsed stacks
+    ("outer;inner;innermost count" lines), the input of flamegraph.pl, speedscope or inferno.
+
+    Requests that are not profiled cost a random draw, so profiling can stay available in production.
+    """
+
+    def __init__(self, sample_rate=0.0, interval_sec=0.005, max_requests=100, max_stacks=5000):
+        """
+        Args:
+            sample_rate (float): The share of requests profiled, between 0 and 1.
+            interval_sec (float): The time between two samples of a profiled request.
+            max_requests (int): The number of recent profiled requests kept.
+            max_stacks (int): The number of distinct stacks kept per endpoint; samples of
+                further stacks are counted under '[other]' to bound the memory used.
+        """
+        self.sample_rate = sample_rate
+        self._interval_sec = interval_sec
+        self._max_stacks = max_stacks
+        self._active = {}                               # thread id -> profiled request
+        self._requests = deque(maxlen=max_requests)     # finished requests, oldest first
+        self._endpoints = {}                            # endpoint -> {'requests', 'duration_sec', 'stacks'}
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def should_profile(self, forced=False):
+        """
+        Decides whether to profile a request.
+
+        Args:
+            forced (bool): Whether the request asked to be profiled.
+        """
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self, endpoint, path):
+        """
+        Starts profiling the request handled by the calling thread.
+
+        Args:
+            endpoint (str): The endpoint the samples are summed under.
+            path (str): The request path, kept with the request's samples.
+
+        Returns:
+            int: The id of the profiled request.
+        """
+        request = {
+            'id': next(self._ids),
+            'endpoint': endpoint,
+            'path': path,
+            'started_at': time.perf_counter(),
+            'samples': 0,
+            'stacks': Counter()
+        }
+        with self._lock:
+            self._active[threading.get_ident()] = request
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, daemon=True)
+                self._thread.start()
+        return request['id']
+
+    def stop(self):
+        """
+        Stops profiling the request handled by the calling thread, if it is profiled.
+        """
+        with self._lock:
+            request = self._active.pop(threading.get_ident(), None)
+            if request is None:
+                return
+            request['duration_sec'] = time.perf_counter() - request.pop('started_at')
+            self._requests.append(request)
+            endpoint = self._endpoints.setdefault(request['endpoint'], {'requests': 0, 'duration_sec': 0.0, 'stacks': Counter()})
+            endpoint['requests'] += 1
+            endpoint['duration_sec'] += request['duration_sec']
+            for stack, count in request['stacks'].items():
+                if stack not in endpoint['stacks'] and len(endpoint['stacks']) >= self._max_stacks:
+                    stack = '[other]'
+                endpoint['stacks'][stack] += count
+
+    @staticmethod
+    def format_stack(frame):
+        """
+        Returns the collapsed representation of a stack, outermost frame first.
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            # The parent directory tells apart modules with the same name (flask/app.py and app.py)
+            filename = os.path.join(os.path.basename(os.path.dirname(code.co_filename)), os.path.basename(code.co_filename))
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _sample(self):
+        while True:
+            time.sleep(self._interval_sec)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, request in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        request['stacks'][self.format_stack(frame)] += 1
+                        request['samples'] += 1
+                del frames
+
+    @staticmethod
+    def collapse(stacks):
+        """
+        Formats stacks as collapsed stack lines, the most sampled first.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def summary(self):
+        """
+        Returns the profiled endpoints and recent requests.
+
+        Returns:
+            dict: 'endpoints': by endpoint, the number of profiled 'requests', their total
+                'duration_sec' and 'samples'; 'requests': the recent profiled requests (most
+                recent first) with their 'id', 'endpoint', 'path', 'duration_sec' and 'samples'.
+        """
+        with self._lock:
+            endpoints = {
+                name: {'requests': endpoint['requests'], 'duration_sec': endpoint['duration_sec'], 'samples': sum(endpoint['stacks'].values())}
+                for name, endpoint in self._endpoints.items()
+            }
+            requests = [
+                {key: request[key] for key in ('id', 'endpoint', 'path', 'duration_sec', 'samples')}
+                for request in reversed(self._requests)
+            ]
+        return {'endpoints': endpoints, 'requests': requests}
+
+    def endpoint_stacks(self, endpoint):
+        """
+        Returns the collapsed stacks summed over the profiled requests of an endpoint, or None if none was profiled.
+        """
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            stacks = Counter(stats['stacks']) if stats else None
+        return self.collapse(stacks) if stacks is not None else None
+
+    def request_stacks(self, request_id):
+        """
+        Returns the collapsed stacks of a recent profiled request, or None if it is not kept anymore.
+        """
+        with self._lock:
+            request = next((request for request in self._requests if request['id'] == request_id), None)
+            stacks = Counter(request['stacks']) if request else None
+        return self.collapse(stacks) if stacks is not None else None
+
+    def reset(self):
+        """
+        Forgets the finished profiled requests.
+        """
+        with self._lock:
+            self._requests.clear()
+            self._endpoints.clear()
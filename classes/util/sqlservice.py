@@ -1,6 +1,12 @@
 from dotenv import load_dotenv
+import logging
 import os
+import threading
+import time
 import mysql.connector
+from classes.util.connectionpool import ConnectionPool
+from classes.util.cache import TTLCache
+from classes.util.histogram import LatencyHistogram
 from classes.account.user import User
 from classes.account.moderator import Moderator
 from classes.challenge.challenge import Challenge
@@ -11,6 +17,8 @@ from classes.challenge.challengesubmission import ChallengeSubmission
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class SqlService:
     _instance = None
 
@@ -20,6 +28,32 @@ class SqlService:
     PASSWORD = os.getenv("MYSQL_PASSWORD", "")
     DATABASE = os.getenv("MYSQL_DB", "CodeChamp-mockup")
 
+    # Connection pool configuration, a maximum size of 0 opens a connection per query
+    POOL_MIN_SIZE = int(os.getenv("MYSQL_POOL_MIN_SIZE", "0"))
+    POOL_MAX_SIZE = int(os.getenv("MYSQL_POOL_MAX_SIZE", "0"))
+    POOL_IDLE_TIMEOUT_SEC = float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT_SEC", "300"))
+    POOL_TIMEOUT_SEC = float(os.getenv("MYSQL_POOL_TIMEOUT_SEC", "10"))
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    # Read-through cache for challenges and test cases, a time-to-live of 0 disables it
+    CACHE_TTL_SEC = float(os.getenv("SQL_CACHE_TTL_SEC", "60"))
+    CACHE_MAX_SIZE = int(os.getenv("SQL_CACHE_MAX_SIZE", "1024"))
+
+    _cache = TTLCache(max_size=CACHE_MAX_SIZE, ttl_sec=CACHE_TTL_SEC)
+
+    # Rows sent per multi-row INSERT by execute_many, keeping statements below max_allowed_packet
+    BULK_BATCH_SIZE = int(os.getenv("SQL_BULK_BATCH_SIZE", "1000"))
+
+    # Queries slower than this are logged with their parameters, 0 disables the log
+    SLOW_QUERY_SEC = float(os.getenv("SQL_SLOW_QUERY_SEC", "0.5"))
+
+    # Procedures whose parameters are credentials, never written to the slow query log
+    REDACTED_PROCEDURES = {'GetAccountByUsernameAndPassword', 'InsertAccount', 'UpdateAccount'}
+
+    _query_stats = LatencyHistogram()
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SqlService, cls).__new__(cls)
@@ -45,14 +79,148 @@ class SqlService:
         }
         return mysql.connector.connect(**config)
 
+    @staticmethod
+    def get_connection_pool():
+        """
+        Returns the shared connection pool, creating it on first use.
+
+        Borrowed connections are validated with a ping and returned connections are rolled
+        back, so no transaction (or read snapshot) leaks from one query to the next.
+
+        Returns:
+            ConnectionPool or None: The pool, or None if pooling is disabled (MYSQL_POOL_MAX_SIZE=0).
+        """
+        if SqlService.POOL_MAX_SIZE <= 0:
+            return None
+        with SqlService._pool_lock:
+            if SqlService._pool is None:
+                SqlService._pool = ConnectionPool(
+                    lambda: SqlService.create_connection(),
+                    min_size=SqlService.POOL_MIN_SIZE,
+                    max_size=SqlService.POOL_MAX_SIZE,
+                    idle_timeout_sec=SqlService.POOL_IDLE_TIMEOUT_SEC,
+                    validate=lambda connection: connection.is_connected(),
+                    reset=lambda connection: connection.rollback()
+                )
+        return SqlService._pool
+
+    @staticmethod
+    def get_pool_stats():
+        """
+        Returns the connection pool metrics.
+
+        Returns:
+            dict or None: The pool statistics, or None if pooling is disabled.
+        """
+        pool = SqlService.get_connection_pool()
+        return pool.stats() if pool else None
+
+    @staticmethod
+    def get_connection():
+        """
+        Returns a connection for a single database round-trip, borrowed from the pool if
+        pooling is enabled. It must be handed back with release_connection.
+
+        Returns:
+            mysql.connector.connection.MySQLConnection: The connection.
+        """
+        pool = SqlService.get_connection_pool()
+        if pool:
+            return pool.acquire(timeout=SqlService.POOL_TIMEOUT_SEC)
+        return SqlService.create_connection()
+
+    @staticmethod
+    def release_connection(connection):
+        """
+        Gives back a connection obtained from get_connection, returning it to the pool or
+        closing it if pooling is disabled.
+
+        Args:
+            connection (mysql.connector.connection.MySQLConnection): The connection.
+        """
+        pool = SqlService.get_connection_pool()
+        if pool:
+            pool.release(connection)
+        else:
+            connection.close()
+
+    @staticmethod
+    def get_cache_stats():
+        """
+        Returns the read cache metrics (hits, misses, evictions, ...).
+        """
+        return SqlService._cache.stats()
+
+    @staticmethod
+    def clear_caches():
+        """
+        Empties the read cache, e.g. after the database was changed outside of SqlService.
+        """
+        SqlService._cache.clear()
+
+    @staticmethod
+    def get_query_stats():
+        """
+        Returns the latency histogram of every stored procedure and query (see LatencyHistogram.snapshot).
+        """
+        return SqlService._query_stats.snapshot()
+
+    @staticmethod
+    def reset_query_stats():
+        SqlService._query_stats.reset()
+
+    @staticmethod
+    def record_query(name, params, started_at, error=False):
+        """
+        Records the latency of a query started at started_at (a time.perf_counter() value)
+        and logs it if it is slower than SLOW_QUERY_SEC.
+
+        Args:
+            name (str): The stored procedure name, or the query text.
+            params (tuple): The query parameters, logged with slow queries.
+            started_at (float): When the query was sent.
+            error (bool): Whether the query failed.
+        """
+        duration = time.perf_counter() - started_at
+        SqlService._query_stats.record(name, duration, error)
+        if SqlService.SLOW_QUERY_SEC > 0 and duration >= SqlService.SLOW_QUERY_SEC:
+            logger.warning("Slow query %s took %.3fs, parameters: %s", name, duration,
+                           "<redacted>" if name in SqlService.REDACTED_PROCEDURES else repr(params)[:500])
+
+    @staticmethod
+    def query_name(query):
+        """
+        Returns the name a query is recorded under: its text on a single line.
+        """
+        return " ".join(query.split())[:200]
+
+    @staticmethod
+    def invalidate_challenge(challenge_id):
+        """
+        Removes a challenge, its test cases and the challenge list from the read cache.
+
+        The cache lives in each application process, so other processes may keep serving
+        the old data until their entries expire (SQL_CACHE_TTL_SEC).
+
+        Args:
+            challenge_id (int): The ID of the challenge that was changed.
+        """
+        SqlService._cache.invalidate(
+            ('challenges', ),
+            ('challenge', challenge_id),
+            ('tests', challenge_id),
+            ('challenge_with_tests', challenge_id)
+        )
+
     @staticmethod
     def execute_query(query, params=None):
         """
         Executes a given SQL query and returns the fetched results.
 
-        This method creates a database connection, executes the provided SQL query, and fetches
+        This method borrows a database connection, executes the provided SQL query, and fetches
         all the resulting rows. It supports parameterized queries to prevent SQL injection. In case
-        of an error, it prints the error message and returns None.
+        of an error, it prints the error message and returns None. The query is timed and recorded
+        under its text (see get_query_stats).
 
         Args:
             query (str): The SQL query to be executed.
@@ -62,18 +230,21 @@ class SqlService:
             list of dict or None: A list of dictionaries representing the fetched rows if the query
                                 is successful, or None if there is an error.
         """
-        connection = SqlService.create_connection()
+        connection = SqlService.get_connection()
         cursor = connection.cursor(dictionary=True)
+        started_at, error = time.perf_counter(), False
         try:
             cursor.execute(query, params)
             result = cursor.fetchall()
             return result
         except mysql.connector.Error as err:
+            error = True
             print(f"Error: {err}")
             return None
         finally:
+            SqlService.record_query(SqlService.query_name(query), params, started_at, error)
             cursor.close()
-            connection.close()
+            SqlService.release_connection(connection)
 
     @staticmethod
     def execute_query_and_get_last_id(query, params):
@@ -91,29 +262,34 @@ class SqlService:
         Returns:
             int or None: The ID of the last row inserted by the query if successful, or None if there is an error.
         """
-        connection = SqlService.create_connection()
+        connection = SqlService.get_connection()
         cursor = connection.cursor()
+        started_at, error = time.perf_counter(), False
         try:
             cursor.execute(query, params)
             connection.commit()
             return cursor.lastrowid
         except mysql.connector.Error as err:
+            error = True
             print(f"Error: {err}")
             connection.rollback()
             return None
         finally:
+            SqlService.record_query(SqlService.query_name(query), params, started_at, error)
             cursor.close()
-            connection.close()
+            SqlService.release_connection(connection)
 
     @staticmethod
-    def call_stored_procedure(proc_name, params=(), fetchone=False, update=False, delete=False):
+    def call_stored_procedure(proc_name, params=(), fetchone=False, update=False, delete=False, result_sets=False):
         """
         Calls a stored procedure in the SQL database with the provided parameters.
 
         This method can be used to execute a stored procedure for fetching results, updating, or deleting
         records. It allows for fetching either a single result or all results based on the 'fetchone'
         parameter. The 'update' and 'delete' flags indicate if the stored procedure is expected to update
-        or delete records, respectively.
+        or delete records, respectively. The 'result_sets' flag keeps the result sets of a procedure
+        running several SELECT statements apart, so related data can be loaded in a single round-trip.
+        Every call is timed and recorded under the procedure name (see get_query_stats).
 
         Args:
             proc_name (str): The name of the stored procedure to call.
@@ -121,16 +297,19 @@ class SqlService:
             fetchone (bool, optional): If True, fetches a single result from the called procedure.
             update (bool, optional): If True, indicates that the procedure is expected to perform an update.
             delete (bool, optional): If True, indicates that the procedure is expected to perform a delete operation.
+            result_sets (bool, optional): If True, returns the rows of each result set separately.
 
         Returns:
             list, dict, bool, or None: Depending on the flags set and the procedure called, it may return:
                                     - A list of dictionaries representing the fetched rows.
+                                    - A list of such lists, one per result set, if 'result_sets' is True.
                                     - A single dictionary if 'fetchone' is True.
                                     - True if an 'update' or 'delete' was performed.
                                     - None if there is an error.
         """
-        connection = SqlService.create_connection()
+        connection = SqlService.get_connection()
         cursor = connection.cursor(dictionary=True)
+        started_at, error = time.perf_counter(), False
         try:
             cursor.callproc(proc_name, params)
             connection.commit()
@@ -139,6 +318,8 @@ class SqlService:
                     return result.fetchone()
             elif update or delete:
                 return True
+            elif result_sets:
+                return [result.fetchall() for result in cursor.stored_results()]
             else:
                 results = []
                 for result in cursor.stored_results():
@@ -146,12 +327,53 @@ class SqlService:
                 return results
 
         except mysql.connector.Error as err:
-            #print(f"Error: {err}")
+            error = True
+            logger.error("Stored procedure %s failed: %s", proc_name, err)
             connection.rollback()
             return None
         finally:
+            SqlService.record_query(proc_name, params, started_at, error)
             cursor.close()
-            connection.close()
+            SqlService.release_connection(connection)
+
+    @staticmethod
+    def execute_many(statement, rows):
+        """
+        Executes a parameterized INSERT statement for many rows in a single transaction.
+
+        MySQL Connector/Python rewrites an INSERT run with executemany into a multi-row INSERT,
+        so the rows are sent in one round-trip per BULK_BATCH_SIZE rows instead of one per row.
+        Either every row is inserted or, if any batch fails, none is.
+
+        Args:
+            statement (str): The INSERT statement with %s placeholders.
+            rows (list): The parameter tuples, one per row.
+
+        Returns:
+            int or None: The number of inserted rows, or None if there is an error.
+        """
+        if not rows:
+            return 0
+        connection = SqlService.get_connection()
+        cursor = connection.cursor()
+        started_at, error = time.perf_counter(), False
+        try:
+            inserted = 0
+            for start in range(0, len(rows), SqlService.BULK_BATCH_SIZE):
+                cursor.executemany(statement, rows[start:start + SqlService.BULK_BATCH_SIZE])
+                inserted += cursor.rowcount
+            connection.commit()
+            return inserted
+
+        except mysql.connector.Error as err:
+            error = True
+            logger.error("Bulk insert failed: %s", err)
+            connection.rollback()
+            return None
+        finally:
+            SqlService.record_query(SqlService.query_name(statement), (f"{len(rows)} rows",), started_at, error)
+            cursor.close()
+            SqlService.release_connection(connection)
 
     @staticmethod
     def raw_account_to_account(raw_account):
@@ -344,6 +566,39 @@ class SqlService:
         submission = ChallengeSubmission(submission_id, created_at, challenge_id, account_id, exec_time, exec_chars, exec_src)
         return submission
 
+    @staticmethod
+    def raw_challenge_summary_to_challenge(raw_challenge):
+        """
+        Converts a raw challenge summary (a challenge row without its text columns) to a Challenge object.
+
+        Parameters:
+        - raw_challenge (dict): A dictionary with the 'id', 'created_at', 'account_id', 'name',
+          'difficulty', 'stub_name' and 'time_allowed_sec' of a challenge that is not deleted.
+
+        Returns:
+        - Challenge: A Challenge object whose description and stub_block are None.
+        """
+        return Challenge(raw_challenge['id'], raw_challenge['created_at'], raw_challenge['account_id'], False,
+                         raw_challenge['name'], raw_challenge['difficulty'], None, raw_challenge['stub_name'],
+                         None, raw_challenge['time_allowed_sec'])
+
+    @staticmethod
+    def raw_submission_summary_to_submission(raw_submission):
+        """
+        Converts a raw submission summary (a submission row without its source code) to a ChallengeSubmission object.
+
+        Parameters:
+        - raw_submission (dict): A dictionary with the 'id', 'created_at', 'challenge_id', 'account_id',
+          'exec_time' and 'exec_chars' of a submission, and optionally its 'cpu_time' and 'peak_rss_kb'
+          aggregated from its metrics (None for submissions recorded without metrics).
+
+        Returns:
+        - ChallengeSubmission: A ChallengeSubmission object whose exec_src is None.
+        """
+        return ChallengeSubmission(raw_submission['id'], raw_submission['created_at'], raw_submission['challenge_id'],
+                                   raw_submission['account_id'], raw_submission['exec_time'], raw_submission['exec_chars'], None,
+                                   raw_submission.get('cpu_time'), raw_submission.get('peak_rss_kb'))
+
     @staticmethod
     def insert_account(usergroup, username, password, email):
         """
@@ -385,7 +640,9 @@ class SqlService:
             The result of the stored procedure execution, the ID of the
             inserted challenge if successful.
         """
-        return SqlService.call_stored_procedure("InsertChallenge", params=(account_id, name, difficulty, description, stub_name, stub_block, time_allowed_sec))
+        result = SqlService.call_stored_procedure("InsertChallenge", params=(account_id, name, difficulty, description, stub_name, stub_block, time_allowed_sec))
+        SqlService._cache.invalidate(('challenges', ))
+        return result
 
     @staticmethod
     def insert_challenge_test(challenge_id, input_data, output_data):
@@ -404,7 +661,31 @@ class SqlService:
             The result of the stored procedure execution, the ID of the
             inserted challenge test if successful.
         """
-        return SqlService.call_stored_procedure("InsertChallengeTest", params=(challenge_id, input_data, output_data))
+        result = SqlService.call_stored_procedure("InsertChallengeTest", params=(challenge_id, input_data, output_data))
+        SqlService.invalidate_challenge(challenge_id)
+        return result
+
+    @staticmethod
+    def insert_challenge_tests(challenge_id, tests):
+        """
+        Inserts many test cases for a coding challenge at once.
+
+        The test cases are inserted with execute_many, in a single transaction and with
+        multi-row inserts, so loading thousands of generated tests takes a few round-trips
+        instead of one connection and commit per test.
+
+        Args:
+            challenge_id (int): The ID of the challenge for which the tests are added.
+            tests (list): The (input, output) pairs of the test cases.
+
+        Returns:
+            int or None: The number of inserted test cases, or None if the insert failed.
+        """
+        rows = [(challenge_id, input_data, output_data) for input_data, output_data in tests]
+        inserted = SqlService.execute_many(
+            "INSERT INTO challenge_test (challenge_id, is_deleted, input, output) VALUES (%s, 0, %s, %s)", rows)
+        SqlService.invalidate_challenge(challenge_id)
+        return inserted
 
     @staticmethod
     def insert_challenge_comment(account_id, challenge_id, title, text):
@@ -448,6 +729,43 @@ class SqlService:
         """
         return SqlService.call_stored_procedure("InsertChallengeSubmission", params=(challenge_id, account_id, exec_time, exec_chars, exec_src))
 
+    @staticmethod
+    def get_inserted_id(result):
+        """
+        Extracts the ID returned by an insert procedure ending with 'SELECT LAST_INSERT_ID()'.
+
+        Args:
+            result: The result of call_stored_procedure.
+
+        Returns:
+            int or None: The ID, or None if the insert failed.
+        """
+        if isinstance(result, list) and result and isinstance(result[0], dict):
+            return result[0].get('LAST_INSERT_ID()')
+        return None
+
+    @staticmethod
+    def insert_challenge_submission_metrics(submission_id, test_results):
+        """
+        Records the resource usage of every test of a submission, as measured inside the sandbox.
+
+        The metrics of all the tests are inserted at once with execute_many.
+
+        Args:
+            submission_id (int): The ID of the submission.
+            test_results (list): The 'test_results' of DockerService.execute_code, with the 'id' of
+                the test, its 'wall_time', 'cpu_user' and 'cpu_sys' in seconds and 'peak_rss_kb'.
+
+        Returns:
+            bool: True if every metric was recorded.
+        """
+        rows = [(submission_id, test['id'], test['wall_time'], test.get('cpu_user', 0.0), test.get('cpu_sys', 0.0), test.get('peak_rss_kb', 0))
+                for test in test_results]
+        inserted = SqlService.execute_many(
+            "INSERT INTO challenge_submission_metric (challenge_submission_id, challenge_test_id, wall_time, cpu_user, cpu_sys, peak_rss_kb)"
+            " VALUES (%s, %s, %s, %s, %s, %s)", rows)
+        return inserted == len(rows)
+
     @staticmethod
     def get_account_by_username_password(username, password):
         """
@@ -479,14 +797,18 @@ class SqlService:
         into a structured challenge object.
 
         Returns:
-            A list of challenge objects representing all challenges in the database.
+            A list of challenge objects representing all challenges in the database. The list
+            is served from the read cache and can be reordered by the caller.
         """
-        raw_challenges = SqlService.call_stored_procedure("GetAllChallenges")
-        challenges = []
-        for raw_challenge in raw_challenges:
-            challenge = SqlService.raw_challenge_to_challenge(raw_challenge)
-            challenges.append(challenge)
-        return challenges
+        def load():
+            raw_challenges = SqlService.call_stored_procedure("GetAllChallenges")
+            challenges = []
+            for raw_challenge in raw_challenges:
+                challenge = SqlService.raw_challenge_to_challenge(raw_challenge)
+                challenges.append(challenge)
+            return challenges
+
+        return list(SqlService._cache.get_or_load(('challenges', ), load))
 
 
     @staticmethod
@@ -496,7 +818,7 @@ class SqlService:
 
         This method calls the 'GetChallengeById' stored procedure, passing the specific
         challenge ID to retrieve the corresponding challenge. The raw challenge data
-        is converted into a structured challenge object.
+        is converted into a structured challenge object, which is kept in the read cache.
 
         Args:
             id (int): The unique identifier for the challenge to retrieve.
@@ -504,9 +826,11 @@ class SqlService:
         Returns:
             A challenge object corresponding to the specified ID or None if not found.
         """
-        raw_challenge = SqlService.call_stored_procedure("GetChallengeById", params=(id, ), fetchone=True)
-        challenge = SqlService.raw_challenge_to_challenge(raw_challenge)
-        return challenge
+        def load():
+            raw_challenge = SqlService.call_stored_procedure("GetChallengeById", params=(id, ), fetchone=True)
+            return SqlService.raw_challenge_to_challenge(raw_challenge)
+
+        return SqlService._cache.get_or_load(('challenge', id), load)
     
     @staticmethod
     # get a specific challenge test
@@ -536,7 +860,7 @@ class SqlService:
 
         Calls the 'GetChallengeTestsById' stored procedure with the challenge ID to fetch
         all associated test cases. Each raw test case data is transformed into a structured
-        test object.
+        test object. The test cases are kept in the read cache.
 
         Args:
             id (int): The unique identifier for the challenge whose test cases are to be retrieved.
@@ -544,15 +868,19 @@ class SqlService:
         Returns:
             A list of test objects for the specified challenge.
         """
-        raw_tests = SqlService.call_stored_procedure("GetChallengeTestsById", params=(id, ))
-        if not raw_tests:
-            return None
-        
-        tests = []
-        for raw_test in raw_tests:
-            test = SqlService.raw_test_to_test(raw_test)
-            tests.append(test)
-        return tests
+        def load():
+            raw_tests = SqlService.call_stored_procedure("GetChallengeTestsById", params=(id, ))
+            if not raw_tests:
+                return None
+
+            tests = []
+            for raw_test in raw_tests:
+                test = SqlService.raw_test_to_test(raw_test)
+                tests.append(test)
+            return tests
+
+        tests = SqlService._cache.get_or_load(('tests', id), load)
+        return list(tests) if tests else None
 
     @staticmethod
     def get_challenge_tests_by_id_and_limit(id):
@@ -665,6 +993,126 @@ class SqlService:
             submissions.append(submission)
         return submissions
 
+    @staticmethod
+    def get_challenge_summaries(after_id=0, limit=20):
+        """
+        Retrieves a page of challenge summaries using keyset pagination.
+
+        This method calls the 'GetChallengeSummariesAfterId' stored procedure, which returns the
+        challenges with an ID greater than 'after_id' in ID order, without their description and
+        stub block. Paging on the ID keeps every page an index range scan, however deep it is.
+
+        Args:
+            after_id (int, optional): The ID of the last challenge of the previous page, 0 for the first page.
+            limit (int, optional): The maximum number of challenges to return.
+
+        Returns:
+            A list of challenge objects whose description and stub_block are None.
+        """
+        raw_challenges = SqlService.call_stored_procedure("GetChallengeSummariesAfterId", params=(after_id, limit))
+        return [SqlService.raw_challenge_summary_to_challenge(raw_challenge) for raw_challenge in raw_challenges or []]
+
+    @staticmethod
+    def get_challenge_submission_summaries(challenge_id, account_id, before_id=None, limit=20):
+        """
+        Retrieves a page of an account's submissions for a challenge using keyset pagination.
+
+        This method calls the 'GetChallengeSubmissionSummariesByIdAndAccountId' stored procedure, which
+        returns the newest submissions with an ID lower than 'before_id', without their source code.
+
+        Args:
+            challenge_id (int): The ID of the challenge for which submissions are sought.
+            account_id (int): The ID of the account whose submissions are sought.
+            before_id (int, optional): The ID of the last submission of the previous page, None for the first page.
+            limit (int, optional): The maximum number of submissions to return.
+
+        Returns:
+            A list of submission objects whose exec_src is None, newest first.
+        """
+        raw_submissions = SqlService.call_stored_procedure("GetChallengeSubmissionSummariesByIdAndAccountId", params=(challenge_id, account_id, before_id, limit))
+        return [SqlService.raw_submission_summary_to_submission(raw_submission) for raw_submission in raw_submissions or []]
+
+    @staticmethod
+    def get_challenge_submission_counts():
+        """
+        Retrieves the number of submissions made to each challenge.
+
+        This method calls the 'GetChallengeSubmissionCounts' stored procedure, which is used to
+        order challenges by popularity.
+
+        Returns:
+            dict: The number of submissions keyed by challenge ID. Challenges without
+                submissions are left out.
+        """
+        raw_counts = SqlService.call_stored_procedure("GetChallengeSubmissionCounts")
+        if not raw_counts:
+            return {}
+        return {raw_count['challenge_id']: raw_count['submission_count'] for raw_count in raw_counts}
+
+    @staticmethod
+    def get_challenge_with_tests_by_id(challenge_id):
+        """
+        Retrieves a challenge and its test cases in a single database round-trip.
+
+        This method calls the 'GetChallengeWithTestsById' stored procedure, which returns the
+        challenge and its test cases as two result sets, and converts them like
+        get_challenge_by_id and get_challenge_tests_by_id do. Found challenges are kept in the
+        read cache, which keeps the judging path off the database for hot challenges.
+
+        Args:
+            challenge_id (int): The unique identifier for the challenge to retrieve.
+
+        Returns:
+            tuple: The challenge object (or None if not found) and the list of test objects
+                (or None if the challenge has no test cases).
+        """
+        def load():
+            result_sets = SqlService.call_stored_procedure("GetChallengeWithTestsById", params=(challenge_id, ), result_sets=True)
+            if not result_sets or not result_sets[0]:
+                return None
+
+            raw_challenges, raw_tests = result_sets
+            challenge = SqlService.raw_challenge_to_challenge(raw_challenges[0])
+            tests = [SqlService.raw_test_to_test(raw_test) for raw_test in raw_tests] or None
+            return challenge, tests
+
+        loaded = SqlService._cache.get_or_load(('challenge_with_tests', challenge_id), load)
+        if loaded is None:
+            return None, None
+        challenge, tests = loaded
+        return challenge, list(tests) if tests else None
+
+    @staticmethod
+    def get_challenge_page_by_id(challenge_id, account_id=None):
+        """
+        Retrieves everything displayed on a challenge page in a single database round-trip.
+
+        This method calls the 'GetChallengePageById' stored procedure, which returns the challenge,
+        its test cases, its comments and the submissions of the given account (without their source
+        code) as four result sets.
+        Each result set is converted into the same objects (and None for an empty list) as the
+        individual getters return.
+
+        Args:
+            challenge_id (int): The unique identifier for the challenge to retrieve.
+            account_id (int, optional): The ID of the account whose submissions are sought. No
+                submissions are returned if it is omitted.
+
+        Returns:
+            tuple: The challenge object (or None if not found), the list of test objects, the list
+                of comment objects and the list of submission objects.
+        """
+        result_sets = SqlService.call_stored_procedure("GetChallengePageById", params=(challenge_id, account_id), result_sets=True)
+        if not result_sets:
+            return None, None, None, None
+
+        raw_challenges, raw_tests, raw_comments, raw_submissions = result_sets
+        challenge = SqlService.raw_challenge_to_challenge(raw_challenges[0] if raw_challenges else None)
+        tests = [SqlService.raw_test_to_test(raw_test) for raw_test in raw_tests] or None
+        comments = [SqlService.raw_comment_to_comment(raw_comment) for raw_comment in raw_comments] or None
+        submissions = [SqlService.raw_submission_summary_to_submission(raw_submission) for raw_submission in raw_submissions] or None
+        return challenge, tests, comments, submissions
+
     @staticmethod
     def update_challenge_name_by_id(id, name):
         """
@@ -679,7 +1127,9 @@ class SqlService:
         Returns:
         - The result of the stored procedure execution which may contain information about the success or failure of the update operation.
         """
-        return SqlService.call_stored_procedure("UpdateChallengeNameById", params=(id, name), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeNameById", params=(id, name), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def update_challenge_difficulty_by_id(id, difficulty):
@@ -695,7 +1145,9 @@ class SqlService:
         Returns:
         - The outcome of the stored procedure, indicating the update status.
         """
-        return SqlService.call_stored_procedure("UpdateChallengeDifficultyById", params=(id, difficulty), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeDifficultyById", params=(id, difficulty), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def update_challenge_description_by_id(id, description):
@@ -712,7 +1164,9 @@ class SqlService:
         Returns:
         - The result of the stored procedure execution, typically a confirmation of the update.
         """
-        return SqlService.call_stored_procedure("UpdateChallengeDescriptionById", params=(id, description), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeDescriptionById", params=(id, description), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def update_challenge_stub_name_by_id(id, name):
@@ -726,7 +1180,9 @@ class SqlService:
         Returns:
         - The result of the stored procedure execution, which is an indicator of success or failure.
         """
-        return SqlService.call_stored_procedure("UpdateChallengeStubNameById", params=(id, name), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeStubNameById", params=(id, name), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def update_challenge_stub_block_by_id(id, stub_block):
@@ -740,7 +1196,9 @@ class SqlService:
         Returns:
         - A confirmation of the update from the stored procedure's result.
         """
-        return SqlService.call_stored_procedure("UpdateChallengeStubBlockById", params=(id, stub_block), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeStubBlockById", params=(id, stub_block), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def update_challenge_is_deleted_by_id(id, is_deleted):
@@ -757,7 +1215,9 @@ class SqlService:
         Returns:
         - True
         """
-        return SqlService.call_stored_procedure("UpdateChallengeIsDeletedById", params=(id, is_deleted), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeIsDeletedById", params=(id, is_deleted), update=True)
+        SqlService.invalidate_challenge(id)
+        return result
     
     @staticmethod
     def update_challenge_test_is_deleted_by_id(id, is_deleted):
@@ -774,7 +1234,9 @@ class SqlService:
         Returns:
         - True
         """
-        return SqlService.call_stored_procedure("UpdateChallengeTestIsDeletedById", params=(id, is_deleted), update=True)
+        result = SqlService.call_stored_procedure("UpdateChallengeTestIsDeletedById", params=(id, is_deleted), update=True)
+        SqlService.clear_caches()
+        return result
     
     @staticmethod
     def update_challenge_comment_is_deleted_by_id(id, is_deleted):
@@ -806,7 +1268,9 @@ class SqlService:
         Returns:
         - An indicator from the database operation about the success or failure of the deletion.
         """
-        return SqlService.call_stored_procedure("DeleteChallengeById", params=(id, ), delete=True)
+        result = SqlService.call_stored_procedure("DeleteChallengeById", params=(id, ), delete=True)
+        SqlService.invalidate_challenge(id)
+        return result
 
     @staticmethod
     def delete_challenge_test_by_id_and_challenge_id(challenge_test_id, challenge_id):
@@ -820,7 +1284,9 @@ class SqlService:
         Returns:
         - An outcome from the database procedure that may confirm deletion or report an error.
         """
-        return SqlService.call_stored_procedure("DeleteChallengeTestByIdAndChallengeId", params=(challenge_test_id, challenge_id), delete=True)
+        result = SqlService.call_stored_procedure("DeleteChallengeTestByIdAndChallengeId", params=(challenge_test_id, challenge_id), delete=True)
+        SqlService.invalidate_challenge(challenge_id)
+        return result
 
     @staticmethod
     def delete_challenge_comment_by_id_and_challenge_id(comment_id, challenge_id):
@@ -844,7 +1310,9 @@ class SqlService:
         Parameters:
         - username (str): The username of the account to be wiped.
         """
-        return SqlService.call_stored_procedure("PurgeAccountByUsername", params=(username,), delete=True)
+        result = SqlService.call_stored_procedure("PurgeAccountByUsername", params=(username,), delete=True)
+        SqlService.clear_caches()
+        return result
     
     @staticmethod
     def purge_challenge_by_id(challenge_id):
@@ -854,7 +1322,9 @@ class SqlService:
         Parameters:
         - challenge_id (id): The id of the challenge to be wiped.
         """
-        return SqlService.call_stored_procedure("PurgeChallengeById", params=(challenge_id,), delete=True)
+        result = SqlService.call_stored_procedure("PurgeChallengeById", params=(challenge_id,), delete=True)
+        SqlService.invalidate_challenge(challenge_id)
+        return result
     
     @staticmethod
     def purge_challenge_test_by_id(challenge_test_id):
@@ -864,7 +1334,9 @@ class SqlService:
         Parameters:
         - challenge_test_id (id): The id of the challenge test to be wiped.
         """
-        return SqlService.call_stored_procedure("PurgeChallengeTestById", params=(challenge_test_id,), delete=True)
+        result = SqlService.call_stored_procedure("PurgeChallengeTestById", params=(challenge_test_id,), delete=True)
+        SqlService.clear_caches()
+        return result
     
     @staticmethod
     def purge_challenge_comment_by_id(challenge_comment_id):
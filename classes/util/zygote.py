@@ -0,0 +1,111 @@
+import inspect
+from classes.util import harnessruntime, zygoteruntime
+from classes.util.harness import Harness
+
+class Zygote:
+    """
+    Talks to a zygote running inside a sandbox.
+
+    The zygote is a long-lived interpreter that has already imported the harness runtime.
+    It forks a worker for every job, which loads the user's code and forks again for every
+    test case, so the tests are isolated from each other without paying an interpreter
+    start-up per test. Jobs are sent as length-prefixed JSON frames over the zygote's
+    stdin, and it answers with the same event frames as the harness (see Harness) on its
+    stdout, which the worker does not hold. The zygote reports a 'ready' event, with its
+    pid, whenever it waits for a job.
+
+    A pooled container keeps its zygote across leases (see ContainerPool.get_zygote), so
+    that only the first submission judged in it pays for the interpreter start-up and the
+    runtime import. Such a zygote kills whatever a job left behind before it reports ready
+    (see zygoteruntime.serve); one whose job did not run to its end, e.g. because a test
+    failed and its sandbox was interrupted, is not ready and is replaced.
+    """
+    _sources = {}
+
+    def __init__(self, stream):
+        """
+        Args:
+            stream: The zygote's stdin and stdout, with write(bytes), read(size) and close().
+        """
+        self._stream = stream
+        self.pid = None         # The zygote's pid in its sandbox, once it reported ready
+        self.ready = False      # True while the zygote waits for a job
+
+    @staticmethod
+    def get_source(reap=False):
+        """
+        Returns the program started with `python -c` inside the sandbox.
+
+        Args:
+            reap (bool, optional): See zygoteruntime.serve, only for a zygote alone in its container.
+        """
+        if reap not in Zygote._sources:
+            Zygote._sources[reap] = (
+                Harness.get_runtime_source()
+                + "\n" + inspect.getsource(zygoteruntime)
+                + f"\nserve(sys.modules[__name__], reap={reap})\n"
+            )
+        return Zygote._sources[reap]
+
+    def _read_frame(self):
+        return harnessruntime.read_frame(self._stream, Harness.MAX_FRAME_BYTES)
+
+    def wait_ready(self):
+        """
+        Waits for the zygote to report that it is ready for a job.
+
+        Returns:
+            bool: True once it is ready, False if the zygote died.
+
+        Raises:
+            ValueError: If the zygote sent something else.
+        """
+        event = self._read_frame()
+        if event is None:
+            return False
+        if not isinstance(event, dict) or event.get('event') != 'ready' or type(event.get('pid')) is not int:
+            raise ValueError("Error: the zygote sent an unexpected frame")
+        self.pid, self.ready = event['pid'], True
+        return True
+
+    def run(self, job, time_limit_sec=None, on_event=None, until=None):
+        """
+        Runs a job (see Harness.build_job) in the zygote.
+
+        Args:
+            job (dict): The job.
+            time_limit_sec (float, optional): The time after which the zygote kills the job.
+            on_event (callable, optional): See Harness.collect_events.
+            until (callable, optional): See Harness.collect_events; the zygote keeps running
+                the job until its sandbox is interrupted.
+
+        Returns:
+            dict or None: The payload (see Harness.collect_events), with 'timeout' set if the
+                job was killed, or None if the zygote died.
+
+        Raises:
+            ValueError: If the zygote sent a malformed frame.
+        """
+        if not self.ready and not self.wait_ready():
+            return None
+        self.ready = False
+        self._stream.write(harnessruntime.encode_frame(dict(job, time_limit_sec=time_limit_sec)))
+        ended = []
+
+        def events():
+            for event in iter(self._read_frame, None):
+                ended.append(isinstance(event, dict) and event.get('event') == 'end')
+                yield event
+
+        payload = Harness.collect_events(events(), on_event, until)
+        if payload is not None and ended[-1]:
+            # Ready again once the job's leftovers are killed, otherwise it is replaced
+            try:
+                self.wait_ready()
+            except ValueError:
+                pass
+        return payload
+
+    def close(self):
+        self.ready = False
+        self._stream.close()
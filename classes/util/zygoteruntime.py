@@ -0,0 +1,169 @@
+# This module is executed inside the sandbox after classes/util/harnessruntime.py, so it
+# must only depend on the standard library and on the harness runtime.
+import json
+import os
+import select
+import signal
+import sys
+import time
+
+try:
+    from classes.util.harnessruntime import FRAME_HEADER, read_frame, relay_events, write_frame
+except ImportError:
+    pass  # Inside the sandbox they are defined by the harness runtime source preceding this one
+
+def run_forked(function, deadline=None):
+    """
+    Calls function in a forked child and returns its JSON result.
+
+    The child starts from a copy of the caller's state and whatever it changes is
+    thrown away with it, so every call gets the same pristine state.
+
+    Args:
+        function (callable): Returns the JSON value to send back.
+        deadline (float, optional): The time.monotonic() at which the child is killed.
+
+    Returns:
+        tuple: The result (None if the child died or was killed) and the status: 'ok',
+            'died' or 'timeout'.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = function()
+        except BaseException as e:
+            result = {'crash': f"{type(e).__name__}: {e}"}
+        try:
+            write_frame(write_fd, result)
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    chunks, status = [], 'ok'
+    while True:
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        ready = select.select([read_fd], [], [], timeout)[0]
+        if not ready:
+            os.kill(pid, signal.SIGKILL)
+            status = 'timeout'
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    data = b"".join(chunks)
+    if status == 'timeout':
+        return None, status
+    if len(data) < FRAME_HEADER.size or len(data) != FRAME_HEADER.size + FRAME_HEADER.unpack(data[:FRAME_HEADER.size])[0]:
+        return None, 'died'
+    result = json.loads(data[FRAME_HEADER.size:])
+    if isinstance(result, dict) and 'crash' in result:
+        return None, 'died'
+    return result, 'ok'
+
+def run_submission(runtime, job, emit):
+    """
+    Loads the user's code, then runs every test case in its own forked child.
+
+    Reports a 'load' event, a 'test' event per test case and an 'end' event, whose
+    'timeout' is set if the tests exceeded the job's 'time_limit_sec'.
+
+    Args:
+        runtime (module): Provides load_code, run_test, new_print_buffer, capture_prints and format_exception.
+        job (dict): The job, see runtime.run_job.
+        emit (callable): Reports an event.
+    """
+    deadline = time.monotonic() + job['time_limit_sec'] if job.get('time_limit_sec') else None
+
+    prints = runtime.new_print_buffer(job)
+    runtime.capture_prints(prints)
+    try:
+        namespace, exception = runtime.load_code(job['user_code']), None
+    except BaseException as e:
+        namespace, exception = None, runtime.format_exception(e)
+    emit({'event': 'load', 'prints': prints.lines(), 'exception': exception})
+
+    timeout = False
+    for test in job['tests'] if namespace is not None else []:
+        entry, status = run_forked(lambda: runtime.run_test(namespace, job['stub_name'], test, job.get('print_limits'), job.get('test_time_limit_sec')), deadline)
+        if status == 'timeout':
+            timeout = True
+            break
+        if entry is None:
+            entry = {'id': test['id'], 'result': None, 'passed': False if 'output' in test else None, 'prints': [],
+                     'exception': "Error: the test process died", 'wall_time': 0.0, 'timeout': False,
+                     'cpu_user': 0.0, 'cpu_sys': 0.0, 'peak_rss_kb': 0}
+        emit(dict(entry, event='test'))
+        if job.get('stop_on_failure') and entry['passed'] is False:
+            break
+    emit({'event': 'end', 'timeout': timeout})
+
+def reap_processes():
+    """
+    Kills every process but PID 1 and the caller, i.e. whatever a job left behind.
+
+    Only meant for a zygote alone in its container: outside of a PID namespace of its own it
+    would kill every process of the user running it.
+    """
+    try:
+        os.kill(-1, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # Nothing was left behind
+
+def make_undumpable():
+    """
+    Forbids processes of the same user, such as the workers, to ptrace the caller or read its memory.
+    """
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+    except (ImportError, OSError, AttributeError):
+        pass
+
+def serve(runtime, source=None, fd=None, reap=False):
+    """
+    Runs the zygote: reads job frames and answers each with its event frames (see run_submission).
+
+    Every job runs in a worker forked from the zygote, which has already imported the
+    runtime, so it starts in a few milliseconds from a pristine state. The worker holds
+    neither the frames' file descriptor nor the zygote's input (see relay_events); if it
+    dies or exceeds the job's time limit, the zygote ends the job itself with an 'end'
+    event holding the 'exception' or 'timeout'. Before reading every job the zygote reports
+    a 'ready' event with its pid.
+
+    Args:
+        runtime (module): Provides load_code, run_test, new_print_buffer, capture_prints and format_exception.
+        source (file, optional): The binary stream the jobs are read from, stdin by default.
+        fd (int, optional): The file descriptor the events are written to. By default a
+            private copy of stdout, stdout itself being redirected to stderr so that user
+            code writing to it cannot corrupt the frames.
+        reap (bool, optional): True for a zygote kept in a container across submissions: it
+            is made undumpable, and kills every process a job left behind before it reports
+            'ready' (see reap_processes).
+    """
+    if source is None:
+        source = sys.stdin.buffer
+    if fd is None:
+        fd = os.dup(1)
+        os.dup2(2, 1)
+    if reap:
+        make_undumpable()
+    while True:
+        if reap:
+            reap_processes()
+        write_frame(fd, {'event': 'ready', 'pid': os.getpid()})
+        job = read_frame(source)
+        if job is None:
+            return
+        # The tests enforce the time limit themselves, this also catches code looping while loading
+        deadline = time.monotonic() + job['time_limit_sec'] + 1 if job.get('time_limit_sec') else None
+        status = relay_events(job, lambda emit: run_submission(runtime, job, emit), fd, deadline, close_fds=(source.fileno(),))
+        if status == 'timeout':
+            write_frame(fd, {'event': 'end', 'timeout': True})
+        elif status == 'died':
+            write_frame(fd, {'event': 'end', 'timeout': False, 'exception': "Error: the sandbox process died"})
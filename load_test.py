@@ -0,0 +1,333 @@
+import argparse
+import http.cookiejar
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from classes.util.cryptoservice import CryptoService
+from classes.util.latencystats import LatencyStats
+from classes.util.sqlservice import SqlService
+
+# Stub and reference solution of the synthetic challenges; their tests are "a, b" -> a + b
+STUB_NAME = 'solve'
+STUB_BLOCK = 'def solve(a, b):'
+SOLUTION = "def solve(a, b):\n    return a + b\n"
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+# Share of each action in the traffic of a virtual user
+DEFAULT_MIX = 'browse=50,open=35,submit=10,comment=5'
+ACTIONS = ('browse', 'open', 'submit', 'comment')
+
+def parse_mix(text):
+    """
+    Parses a traffic mix, e.g. "browse=50,open=35,submit=10,comment=5".
+
+    Returns:
+        dict: The weight of every action, by action.
+
+    Raises:
+        ValueError: If an action is unknown, a weight is negative or they are all zero.
+    """
+    mix = {}
+    for item in text.split(','):
+        action, _, weight = item.partition('=')
+        action = action.strip()
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action '{action}', expected one of {', '.join(ACTIONS)}")
+        mix[action] = float(weight)
+        if mix[action] < 0:
+            raise ValueError(f"Negative weight for '{action}'")
+    if not any(mix.values()):
+        raise ValueError("The mix has no action")
+    return mix
+
+def choose_action(mix, rng):
+    """
+    Draws an action of the mix with a probability proportional to its weight.
+    """
+    actions = list(mix)
+    return rng.choices(actions, weights=[mix[action] for action in actions])[0]
+
+def seed(prefix, accounts, challenges, tests_per_challenge, submissions, comments_per_challenge, rng):
+    """
+    Inserts a synthetic dataset through SqlService, the way the application writes it.
+
+    Accounts that already exist (from an earlier run with the same prefix) are reused, the
+    challenges and their tests, submissions and comments are always added.
+
+    Returns:
+        tuple: The seeded users (dicts with their 'id', 'username' and plaintext 'password')
+            and the ids of the seeded challenges.
+    """
+    users = []
+    for index in range(accounts):
+        username = f"{prefix}_user_{index}"
+        password = f"{prefix}_password_{index}"
+        hashed_password = CryptoService.hash_password(password)
+        SqlService.insert_account(3, username, hashed_password, f"{username}@example.com")
+        account = SqlService.get_account_by_username_password(username, hashed_password)
+        if account is None:
+            raise RuntimeError(f"Could not create the account {username} (its email may be in use)")
+        users.append({'id': account.id, 'username': username, 'password': password})
+
+    challenge_ids = []
+    for index in range(challenges):
+        result = SqlService.insert_challenge(
+            users[index % accounts]['id'], f"{prefix} challenge {index}", rng.choice(DIFFICULTIES),
+            "Write a function named solve that takes two integers a and b and returns their sum.",
+            STUB_NAME, STUB_BLOCK, 5
+        )
+        challenge_id = SqlService.get_inserted_id(result)
+        if challenge_id is None:
+            raise RuntimeError(f"Could not create the challenge {prefix} challenge {index}")
+        tests = []
+        for _ in range(tests_per_challenge):
+            a, b = rng.randint(-1000, 1000), rng.randint(-1000, 1000)
+            tests.append((f"{a}, {b}", str(a + b)))
+        if tests:
+            SqlService.insert_challenge_tests(challenge_id, tests)
+        for comment in range(comments_per_challenge):
+            SqlService.insert_challenge_comment(rng.choice(users)['id'], challenge_id, f"Comment {comment}", "Synthetic comment")
+        challenge_ids.append(challenge_id)
+
+    for _ in range(submissions):
+        SqlService.insert_challenge_submission(rng.choice(challenge_ids), rng.choice(users)['id'], round(rng.uniform(0.01, 0.5), 4), len(SOLUTION), SOLUTION)
+    return users, challenge_ids
+
+class FlaskClient:
+    """
+    Sends requests to an in-process App through the Flask test client, with its own session.
+    """
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self._client.open(path, method=method, data=data)
+        return response.status_code, response.get_data()
+
+class HttpClient:
+    """
+    Sends requests to a running server, keeping the session cookie and not following redirects.
+    """
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url, timeout=60):
+        self._base_url = base_url.rstrip('/')
+        self._timeout = timeout
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        http_request = urllib.request.Request(self._base_url + path, data=body, method=method)
+        try:
+            with self._opener.open(http_request, timeout=self._timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as err:
+            # Error statuses and the (unfollowed) redirects
+            return err.code, err.read()
+
+class Recorder:
+    """
+    Collects the latency and outcome of every request, by route.
+    """
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, latency, error):
+        with self._lock:
+            self._samples.setdefault(route, []).append((latency, error))
+
+    def timed(self, client, route, method, path, data=None):
+        """
+        Sends a request and records it. A connection failure or a 4xx/5xx status is an error.
+
+        Returns:
+            tuple: The status code (None if the request failed) and the body.
+        """
+        started_at = time.perf_counter()
+        try:
+            status, body = client.request(method, path, data)
+        except Exception as err:
+            status, body = None, str(err).encode()
+        self.record(route, time.perf_counter() - started_at, status is None or status >= 400)
+        return status, body
+
+    def report(self, elapsed_sec):
+        """
+        Summarizes the recorded requests.
+
+        Args:
+            elapsed_sec (float): The wall time of the run, for the throughputs.
+
+        Returns:
+            dict: By route, the number of 'requests' and 'errors', the 'error_rate', the
+                'throughput' (requests per second) and the 'latency' summary (seconds).
+        """
+        with self._lock:
+            samples = {route: list(values) for route, values in self._samples.items()}
+        report = {}
+        for route in sorted(samples):
+            latencies = [latency for latency, _ in samples[route]]
+            errors = sum(1 for _, error in samples[route] if error)
+            report[route] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'error_rate': errors / len(latencies),
+                'throughput': len(latencies) / elapsed_sec if elapsed_sec > 0 else None,
+                'latency': LatencyStats.summarize(latencies)
+            }
+        return report
+
+class RequestBudget:
+    """
+    A thread-safe countdown of the requests left to send, unlimited if None.
+    """
+
+    def __init__(self, total=None):
+        self._left = total
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self._left is None:
+            return True
+        with self._lock:
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
+
+def run_user(client, user, challenge_ids, mix, recorder, deadline, budget, rng, think_sec=0.0, poll_wait_sec=10, unique_submissions=True):
+    """
+    Logs a virtual user in, then sends the actions of the mix until the deadline or the budget is reached.
+
+    A submission is followed by long polls of its job until it is judged; the time from the
+    submission to the verdict is recorded as the 'verdict' route.
+    """
+    status, _ = recorder.timed(client, 'login', 'POST', '/submit_login', {'username': user['username'], 'password': user['password']})
+    if status != 302:
+        # The login page is rendered again (200) when the credentials are refused
+        print(f"Login failed for {user['username']} (status {status})", file=sys.stderr)
+        return
+
+    while time.perf_counter() < deadline and budget.take():
+        action = choose_action(mix, rng)
+        challenge_id = rng.choice(challenge_ids)
+        if action == 'browse':
+            recorder.timed(client, 'challenges', 'GET', '/challenges')
+        elif action == 'open':
+            recorder.timed(client, 'challenge', 'GET', f'/challenges/{challenge_id}')
+        elif action == 'comment':
+            recorder.timed(client, 'comment', 'POST', f'/submit_comment/{challenge_id}', {'comment-title': 'Load test', 'comment-content': 'Synthetic comment'})
+        elif action == 'submit':
+            # The verdict cache compares syntax trees, a unique constant makes the submission run in the sandbox
+            code = SOLUTION + (f"NONCE = {rng.getrandbits(64)}\n" if unique_submissions else '')
+            submitted_at = time.perf_counter()
+            status, body = recorder.timed(client, 'submission', 'POST', f'/submission/{challenge_id}', {'stub-block': code})
+            if status == 202:
+                status_url = json.loads(body)['status_url']
+                while status == 202 and time.perf_counter() < deadline + poll_wait_sec:
+                    status, _ = recorder.timed(client, 'submission_status', 'GET', f'{status_url}?wait={poll_wait_sec}')
+                recorder.record('verdict', time.perf_counter() - submitted_at, status is None or status >= 400 or status == 202)
+        if think_sec > 0:
+            time.sleep(rng.expovariate(1 / think_sec))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the application with a seeded synthetic dataset and a mix of browsing, submissions and comments.")
+    parser.add_argument('--url', help="base URL of a running server, the application is run in-process by default")
+    parser.add_argument('--accounts', type=int, default=20, help="accounts seeded, one virtual user each (at most)")
+    parser.add_argument('--challenges', type=int, default=50, help="challenges seeded")
+    parser.add_argument('--tests-per-challenge', type=int, default=10, help="test cases seeded per challenge")
+    parser.add_argument('--submissions', type=int, default=500, help="past submissions seeded")
+    parser.add_argument('--comments-per-challenge', type=int, default=2, help="comments seeded per challenge")
+    parser.add_argument('--prefix', default='load', help="prefix of the seeded usernames and challenge names")
+    parser.add_argument('--concurrency', type=int, default=10, help="virtual users sending requests at once")
+    parser.add_argument('--duration', type=float, default=60, help="length of the run, in seconds")
+    parser.add_argument('--requests', type=int, help="stop after this many actions in total")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"weights of the actions (default {DEFAULT_MIX})")
+    parser.add_argument('--think-ms', type=float, default=0, help="mean pause of a virtual user between two actions")
+    parser.add_argument('--repeat-submissions', action='store_true', help="submit the same code every time, so that verdicts are served from the cache")
+    parser.add_argument('--random-seed', type=int, default=0, help="seed of the dataset and of the traffic")
+    parser.add_argument('--output', default='load_test_results.json', help="where the JSON results are written")
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as err:
+        parser.error(str(err))
+    if args.accounts < 1 or args.challenges < 1:
+        parser.error("--accounts and --challenges must be at least 1")
+
+    rng = random.Random(args.random_seed)
+    print(f"Seeding {SqlService.DATABASE}: {args.accounts} accounts, {args.challenges} challenges, {args.tests_per_challenge} tests per challenge, {args.submissions} submissions...")
+    users, challenge_ids = seed(args.prefix, args.accounts, args.challenges, args.tests_per_challenge, args.submissions, args.comments_per_challenge, rng)
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        from app import App
+        app = App().app
+        make_client = lambda: FlaskClient(app)
+
+    recorder = Recorder()
+    budget = RequestBudget(args.requests)
+    print(f"Running {args.concurrency} virtual users for {args.duration}s against {args.url or 'the in-process application'}...")
+    started_at = time.perf_counter()
+    deadline = started_at + args.duration
+    threads = [
+        threading.Thread(target=run_user, args=(
+            make_client(), users[index % len(users)], challenge_ids, mix, recorder, deadline, budget,
+            random.Random(rng.getrandbits(64)), args.think_ms / 1000, 10, not args.repeat_submissions
+        ))
+        for index in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed_sec = time.perf_counter() - started_at
+
+    routes = recorder.report(elapsed_sec)
+    print(f"{'route':<20}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in routes.items():
+        latency = stats['latency']
+        print(f"{route:<20}{stats['requests']:>10}{stats['error_rate']:>8.1%}{stats['throughput']:>9.1f}{latency['p50']:>8.3f}s{latency['p95']:>8.3f}s{latency['p99']:>8.3f}s")
+
+    results = {
+        'generated_at': datetime.now().isoformat(),
+        'config': {
+            'target': args.url or 'in-process',
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'requests': args.requests,
+            'mix': mix,
+            'think_ms': args.think_ms,
+            'repeat_submissions': args.repeat_submissions,
+            'dataset': {
+                'accounts': args.accounts,
+                'challenges': args.challenges,
+                'tests_per_challenge': args.tests_per_challenge,
+                'submissions': args.submissions,
+                'comments_per_challenge': args.comments_per_challenge
+            }
+        },
+        'elapsed_sec': elapsed_sec,
+        'routes': routes
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import argparse
+import sys
+import mysql.connector
+from classes.util.migrationservice import MigrationService
+from classes.util.sqlservice import SqlService
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the schema migrations of sql/migrations to the database configured with the MYSQL_* variables.")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('status', help="list the migrations and whether they are applied")
+    up = subparsers.add_parser('up', help="apply the pending migrations (the default)")
+    up.add_argument('--target', type=int, help="the last version to apply")
+    build = subparsers.add_parser('build', help="rebuild the schema from sql/build.sql, DELETING ALL DATA, then apply every migration")
+    build.add_argument('--yes', action='store_true', help="confirm that the database may be wiped")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build' and not args.yes:
+        print(f"This drops every table of {SqlService.DATABASE}, pass --yes to confirm")
+        return 2
+
+    connection = SqlService.create_connection()
+    try:
+        if args.command == 'status':
+            for migration in MigrationService.get_status(connection):
+                print(f"{migration['version']:>4} {migration['name']:<40} {migration['state']}")
+            return 0
+        if args.command == 'build':
+            applied = MigrationService.build(connection)
+        else:
+            applied = MigrationService.migrate(connection, target=getattr(args, 'target', None))
+    except (RuntimeError, mysql.connector.Error) as err:
+        print(f"Error: {err}")
+        return 1
+    finally:
+        connection.close()
+
+    for version, name in applied:
+        print(f"Applied {version}_{name}")
+    print("The schema is up to date" if not applied else f"{len(applied)} migration(s) applied")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -93,6 +93,7 @@ CREATE TABLE `challenge_comment` (
   PRIMARY KEY (`id`),
   KEY `fk_account_id2` (`account_id`),
   KEY `fk_challenge_id` (`challenge_id`),
+  KEY `idx_challenge_comment_challenge_id_is_deleted` (`challenge_id`, `is_deleted`),
   CONSTRAINT `fk_account_id2` FOREIGN KEY (`account_id`) REFERENCES `account` (`id`),
   CONSTRAINT `fk_challenge_id` FOREIGN KEY (`challenge_id`) REFERENCES `challenge` (`id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=83 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -119,6 +120,7 @@ CREATE TABLE `challenge_submission` (
   PRIMARY KEY (`id`),
   KEY `fk_account_id3` (`account_id`),
   KEY `fk_challenge_id2` (`challenge_id`),
+  KEY `idx_challenge_submission_challenge_id_account_id` (`challenge_id`, `account_id`),
   CONSTRAINT `fk_account_id3` FOREIGN KEY (`account_id`) REFERENCES `account` (`id`),
   CONSTRAINT `fk_challenge_id2` FOREIGN KEY (`challenge_id`) REFERENCES `challenge` (`id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=100 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -130,6 +132,24 @@ BEGIN;
 INSERT INTO `challenge_submission` (`id`, `created_at`, `challenge_id`, `account_id`, `exec_time`, `exec_chars`, `exec_src`) VALUES (66, '2023-11-13 19:34:13', 1, 1, 0.23, 27, 'def sum(a, b): return a + b');
 COMMIT;
 
+-- ----------------------------
+-- Table structure for challenge_submission_metric
+-- ----------------------------
+DROP TABLE IF EXISTS `challenge_submission_metric`;
+CREATE TABLE `challenge_submission_metric` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `challenge_submission_id` int(11) NOT NULL,
+  `challenge_test_id` int(11) NOT NULL,
+  `wall_time` double NOT NULL,
+  `cpu_user` double NOT NULL,
+  `cpu_sys` double NOT NULL,
+  `peak_rss_kb` int(11) NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `fk_challenge_submission_id` (`challenge_submission_id`),
+  KEY `idx_challenge_submission_metric_usage` (`challenge_submission_id`, `cpu_user`, `cpu_sys`, `peak_rss_kb`),
+  CONSTRAINT `fk_challenge_submission_id` FOREIGN KEY (`challenge_submission_id`) REFERENCES `challenge_submission` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- ----------------------------
 -- Table structure for challenge_test
 -- ----------------------------
@@ -140,7 +160,8 @@ CREATE TABLE `challenge_test` (
   `is_deleted` tinyint(1) NOT NULL,
   `input` text NOT NULL,
   `output` text NOT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `idx_challenge_test_challenge_id_is_deleted` (`challenge_id`, `is_deleted`)
 ) ENGINE=InnoDB AUTO_INCREMENT=137 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- ----------------------------
@@ -165,6 +186,19 @@ INSERT INTO `challenge_test` (`id`, `challenge_id`, `is_deleted`, `input`, `outp
 INSERT INTO `challenge_test` (`id`, `challenge_id`, `is_deleted`, `input`, `output`) VALUES (39, 16, 0, '-1, -1', '0');
 COMMIT;
 
+-- ----------------------------
+-- Table structure for schema_migration
+-- Rebuilding the schema forgets the applied migrations, they are applied again by migrate.py
+-- ----------------------------
+DROP TABLE IF EXISTS `schema_migration`;
+CREATE TABLE `schema_migration` (
+  `version` int(11) NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `checksum` char(64) NOT NULL,
+  `applied_at` datetime NOT NULL,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- ----------------------------
 -- Table structure for usergroup
 -- ----------------------------
@@ -316,6 +350,35 @@ END
 ;;
 delimiter ;
 
+-- ----------------------------
+-- Procedure structure for GetChallengePageById
+-- ----------------------------
+DROP PROCEDURE IF EXISTS `GetChallengePageById`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengePageById`(IN in_challenge_id INT,
+ IN in_account_id INT)
+BEGIN
+  SELECT * FROM challenge WHERE id=in_challenge_id;
+
+  SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_challenge_id;
+
+  SELECT cc.*, a.username FROM challenge_comment cc
+	JOIN account a ON a.id=cc.account_id
+	WHERE cc.is_deleted=0 and cc.challenge_id=in_challenge_id;
+
+		SELECT cs.id, cs.created_at, cs.challenge_id, cs.account_id, cs.exec_time, cs.exec_chars,
+      (SELECT SUM(m.cpu_user + m.cpu_sys) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS cpu_time,
+      (SELECT MAX(m.peak_rss_kb) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS peak_rss_kb
+    FROM `challenge_submission` cs
+    INNER JOIN `challenge` c ON c.`id` = cs.`challenge_id`
+    WHERE 
+	  c.`id` = in_challenge_id AND
+		cs.`account_id` = in_account_id AND 
+		c.is_deleted=0;
+END
+;;
+delimiter ;
+
 -- ----------------------------
 -- Procedure structure for GetChallengeSubmissionById
 -- ----------------------------
@@ -332,6 +395,46 @@ END
 ;;
 delimiter ;
 
+-- ----------------------------
+-- Procedure structure for GetChallengeSubmissionCounts
+-- ----------------------------
+DROP PROCEDURE IF EXISTS `GetChallengeSubmissionCounts`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSubmissionCounts`()
+BEGIN
+  SELECT challenge_id, COUNT(*) AS submission_count
+    FROM `challenge_submission`
+    GROUP BY challenge_id;
+END
+;;
+delimiter ;
+
+-- ----------------------------
+-- Procedure structure for GetChallengeSubmissionSummariesByIdAndAccountId
+-- ----------------------------
+DROP PROCEDURE IF EXISTS `GetChallengeSubmissionSummariesByIdAndAccountId`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSubmissionSummariesByIdAndAccountId`(IN in_challenge_id INT,
+ IN in_account_id INT,
+ IN in_before_id INT,
+ IN in_limit INT)
+BEGIN
+		SELECT cs.id, cs.created_at, cs.challenge_id, cs.account_id, cs.exec_time, cs.exec_chars,
+      (SELECT SUM(m.cpu_user + m.cpu_sys) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS cpu_time,
+      (SELECT MAX(m.peak_rss_kb) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS peak_rss_kb
+    FROM `challenge_submission` cs
+    INNER JOIN `challenge` c ON c.`id` = cs.`challenge_id`
+    WHERE 
+	  c.`id` = in_challenge_id AND
+		cs.`account_id` = in_account_id AND 
+		c.is_deleted=0 AND
+		(in_before_id IS NULL OR cs.`id` < in_before_id)
+    ORDER BY cs.`id` DESC
+    LIMIT in_limit;
+END
+;;
+delimiter ;
+
 -- ----------------------------
 -- Procedure structure for GetChallengeSubmissionsByIdAndAccountId
 -- ----------------------------
@@ -351,6 +454,23 @@ END
 ;;
 delimiter ;
 
+-- ----------------------------
+-- Procedure structure for GetChallengeSummariesAfterId
+-- ----------------------------
+DROP PROCEDURE IF EXISTS `GetChallengeSummariesAfterId`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSummariesAfterId`(IN in_after_id INT,
+ IN in_limit INT)
+BEGIN
+  SELECT id, created_at, account_id, name, difficulty, stub_name, time_allowed_sec
+    FROM challenge
+    WHERE is_deleted=0 AND id > in_after_id
+    ORDER BY id
+    LIMIT in_limit;
+END
+;;
+delimiter ;
+
 -- ----------------------------
 -- Procedure structure for GetChallengeTestById
 -- ----------------------------
@@ -387,6 +507,20 @@ END
 ;;
 delimiter ;
 
+-- ----------------------------
+-- Procedure structure for GetChallengeWithTestsById
+-- ----------------------------
+DROP PROCEDURE IF EXISTS `GetChallengeWithTestsById`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeWithTestsById`(IN in_challenge_id INT)
+BEGIN
+  SELECT * FROM challenge WHERE id=in_challenge_id;
+
+  SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_challenge_id;
+END
+;;
+delimiter ;
+
 -- ----------------------------
 -- Procedure structure for GetSolvedChallengesByAccountId
 -- ----------------------------
@@ -0,0 +1,107 @@
+-- Schema objects added to sql/build.sql after the baseline, for databases built before them:
+-- the per-test metrics table (which 001 indexes) and the stored procedures using the new
+-- queries. Safe to run on a live database and to run again: the table is only created if
+-- missing and every procedure is dropped and recreated.
+
+CREATE TABLE IF NOT EXISTS `challenge_submission_metric` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `challenge_submission_id` int(11) NOT NULL,
+  `challenge_test_id` int(11) NOT NULL,
+  `wall_time` double NOT NULL,
+  `cpu_user` double NOT NULL,
+  `cpu_sys` double NOT NULL,
+  `peak_rss_kb` int(11) NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `fk_challenge_submission_id` (`challenge_submission_id`),
+  CONSTRAINT `fk_challenge_submission_id` FOREIGN KEY (`challenge_submission_id`) REFERENCES `challenge_submission` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- GetChallengePageById
+DROP PROCEDURE IF EXISTS `GetChallengePageById`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengePageById`(IN in_challenge_id INT,
+ IN in_account_id INT)
+BEGIN
+  SELECT * FROM challenge WHERE id=in_challenge_id;
+
+  SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_challenge_id;
+
+  SELECT cc.*, a.username FROM challenge_comment cc
+	JOIN account a ON a.id=cc.account_id
+	WHERE cc.is_deleted=0 and cc.challenge_id=in_challenge_id;
+
+		SELECT cs.id, cs.created_at, cs.challenge_id, cs.account_id, cs.exec_time, cs.exec_chars,
+      (SELECT SUM(m.cpu_user + m.cpu_sys) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS cpu_time,
+      (SELECT MAX(m.peak_rss_kb) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS peak_rss_kb
+    FROM `challenge_submission` cs
+    INNER JOIN `challenge` c ON c.`id` = cs.`challenge_id`
+    WHERE 
+	  c.`id` = in_challenge_id AND
+		cs.`account_id` = in_account_id AND 
+		c.is_deleted=0;
+END
+;;
+delimiter ;
+
+-- GetChallengeSubmissionCounts
+DROP PROCEDURE IF EXISTS `GetChallengeSubmissionCounts`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSubmissionCounts`()
+BEGIN
+  SELECT challenge_id, COUNT(*) AS submission_count
+    FROM `challenge_submission`
+    GROUP BY challenge_id;
+END
+;;
+delimiter ;
+
+-- GetChallengeSubmissionSummariesByIdAndAccountId
+DROP PROCEDURE IF EXISTS `GetChallengeSubmissionSummariesByIdAndAccountId`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSubmissionSummariesByIdAndAccountId`(IN in_challenge_id INT,
+ IN in_account_id INT,
+ IN in_before_id INT,
+ IN in_limit INT)
+BEGIN
+		SELECT cs.id, cs.created_at, cs.challenge_id, cs.account_id, cs.exec_time, cs.exec_chars,
+      (SELECT SUM(m.cpu_user + m.cpu_sys) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS cpu_time,
+      (SELECT MAX(m.peak_rss_kb) FROM `challenge_submission_metric` m WHERE m.challenge_submission_id = cs.id) AS peak_rss_kb
+    FROM `challenge_submission` cs
+    INNER JOIN `challenge` c ON c.`id` = cs.`challenge_id`
+    WHERE 
+	  c.`id` = in_challenge_id AND
+		cs.`account_id` = in_account_id AND 
+		c.is_deleted=0 AND
+		(in_before_id IS NULL OR cs.`id` < in_before_id)
+    ORDER BY cs.`id` DESC
+    LIMIT in_limit;
+END
+;;
+delimiter ;
+
+-- GetChallengeSummariesAfterId
+DROP PROCEDURE IF EXISTS `GetChallengeSummariesAfterId`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeSummariesAfterId`(IN in_after_id INT,
+ IN in_limit INT)
+BEGIN
+  SELECT id, created_at, account_id, name, difficulty, stub_name, time_allowed_sec
+    FROM challenge
+    WHERE is_deleted=0 AND id > in_after_id
+    ORDER BY id
+    LIMIT in_limit;
+END
+;;
+delimiter ;
+
+-- GetChallengeWithTestsById
+DROP PROCEDURE IF EXISTS `GetChallengeWithTestsById`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeWithTestsById`(IN in_challenge_id INT)
+BEGIN
+  SELECT * FROM challenge WHERE id=in_challenge_id;
+
+  SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_challenge_id;
+END
+;;
+delimiter ;
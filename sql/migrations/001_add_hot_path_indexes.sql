@@ -0,0 +1,20 @@
+-- Composite and covering indexes for the stored procedures on the request path.
+-- Safe to run on a live database and to run again: existing indexes are skipped.
+
+-- GetChallengeTestsById, GetChallengeTestsByIdAndLimit, GetChallengeWithTestsById, GetChallengePageById
+CREATE INDEX IF NOT EXISTS `idx_challenge_test_challenge_id_is_deleted`
+  ON `challenge_test` (`challenge_id`, `is_deleted`);
+
+-- GetChallengeCommentsById, GetChallengePageById
+CREATE INDEX IF NOT EXISTS `idx_challenge_comment_challenge_id_is_deleted`
+  ON `challenge_comment` (`challenge_id`, `is_deleted`);
+
+-- GetChallengeSubmissionsByIdAndAccountId, GetChallengeSubmissionSummariesByIdAndAccountId,
+-- GetChallengePageById and GetUnsolvedChallengesByAccountId. InnoDB appends the primary key,
+-- so the summaries are also read in `id` order without a sort.
+CREATE INDEX IF NOT EXISTS `idx_challenge_submission_challenge_id_account_id`
+  ON `challenge_submission` (`challenge_id`, `account_id`);
+
+-- Covers the cpu_time and peak_rss_kb subqueries of the submission summaries
+CREATE INDEX IF NOT EXISTS `idx_challenge_submission_metric_usage`
+  ON `challenge_submission_metric` (`challenge_submission_id`, `cpu_user`, `cpu_sys`, `peak_rss_kb`);
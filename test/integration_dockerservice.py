@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from datetime import datetime
 
 import sys
@@ -251,5 +252,39 @@ def sum(x, y):
         self.assertEqual(result['success'], False)
         self.assertEqual(result['timeout'], True)
 
+    def test_execute_code_batched_success(self):
+        challenge = Challenge(
+            id=1,
+            created_at=datetime.now(),
+            account_id=1,
+            is_deleted=False,
+            name="Test Sum",
+            difficulty="Easy",
+            description="Some Challenge Description",
+            stub_name="sum",
+            stub_block="# TODO",
+            time_allowed_sec=20
+        )
+
+        tests = [
+            ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18"),
+            ChallengeTest(id=2, challenge_id=1, is_deleted=False, test_input="4, 7", test_output="11")
+        ]
+
+        user_code = """
+def sum(x, y):
+    print(x, y)
+    return x + y
+"""
+
+        # Run every test case in a single harness process
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'):
+            result = DockerService.execute_code(challenge, tests, user_code)
+
+        self.assertEqual(result['tests_passed'], len(tests))
+        self.assertEqual(result['success'], True)
+        self.assertEqual(result['print_outputs'], ['6 12', '4 7'])
+        self.assertEqual(len(result['test_results']), len(tests))
+
 if __name__ == '__main__':
     unittest.main()
@@ -550,6 +550,27 @@ class TestSqlService(unittest.TestCase):
 
         self.assertIsNone(submissions)
 
+    def test_get_challenge_page_by_id_success(self):
+        # Define test data
+        challenge_id = 1
+        account_id = 1
+
+        # Call the method
+        challenge, tests, comments, submissions = SqlService.get_challenge_page_by_id(challenge_id, account_id)
+
+        # Assert that the page data matches the individual getters
+        self.assertEqual(challenge.id, SqlService.get_challenge_by_id(challenge_id).id)
+        self.assertEqual(len(tests), len(SqlService.get_challenge_tests_by_id(challenge_id)))
+        self.assertEqual(comments is None, SqlService.get_challenge_comments_by_id(challenge_id) is None)
+        self.assertEqual(submissions is None, SqlService.get_challenge_submissions_by_id_and_account_id(challenge_id, account_id) is None)
+
+    def test_get_challenge_with_tests_by_id_fail_missing_challenge_id(self):
+        # Call the method with a missing challenge
+        challenge, tests = SqlService.get_challenge_with_tests_by_id(None)
+
+        self.assertIsNone(challenge)
+        self.assertIsNone(tests)
+
     def test_update_challenge_name_by_id_success(self):
         # Define test data
         challenge_id = 1
@@ -1,9 +1,11 @@
 import sys
 import os
+import threading
 import unittest
 from unittest.mock import patch
 from datetime import datetime
 import re
+import io
 from bs4 import BeautifulSoup
 
 # Add the parent directory to the PYTHONPATH so the App class can be imported
@@ -12,15 +14,23 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from app import App
+from classes.util.sqlservice import SqlService
+from classes.util.dockerservice import DockerService
 from classes.account.user import User
 from classes.challenge.challenge import Challenge
 from classes.challenge.challengetest import ChallengeTest
+from classes.challenge.challengesubmission import ChallengeSubmission
+from classes.challenge.challengecomment import ChallengeComment
+from flask import render_template
 
 class FlaskAppTestCase(unittest.TestCase):
 
     def setUp(self):
         #Set up a test client before each test
-        app = App().app
+        SqlService.clear_caches()
+        DockerService.clear_result_cache()
+        self.app_instance = App()
+        app = self.app_instance.app
         app.testing = True
         self.client = app.test_client()
 
@@ -46,6 +56,14 @@ class FlaskAppTestCase(unittest.TestCase):
             test_output="18"
         )
 
+    def tearDown(self):
+        self.app_instance.judge_queue.shutdown()
+
+    def wait_for_job(self, response):
+        # Submissions are judged in the background, wait for the job result
+        self.assertEqual(response.status_code, 202)
+        return self.client.get(response.json['status_url'] + '?wait=10')
+
     def test_index_page(self):
         response = self.client.get('/')
         self.assertEqual(response.status_code, 200)
@@ -171,21 +189,20 @@ class FlaskAppTestCase(unittest.TestCase):
         self.assertIn('text/html', response.content_type)
 
     
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.dockerservice.DockerService.validate_user_method')
     @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
-    def test_submission_route_post_method_with_valid_data(self, mock_insert_submission, mock_validate_user_method, mock_get_challenge_tests_by_id, mock_get_challenge_by_id):
+    def test_submission_route_post_method_with_valid_data(self, mock_insert_submission, mock_validate_user_method, mock_get_challenge_with_tests):
         mock_insert_submission.return_value = True  # Mock successful submission insertion
         mock_validate_user_method.return_value = (True, "valid")
-        mock_get_challenge_by_id.return_value = self.challenge
-        mock_get_challenge_tests_by_id.return_value = [self.challenge_test]
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
 
         with self.client.session_transaction() as session:
             session['user_id'] = 'some_user_id'  # Set user ID in session
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 200)
 
@@ -193,17 +210,15 @@ class FlaskAppTestCase(unittest.TestCase):
         response = self.client.get('/submission/1')
         self.assertEqual(response.status_code, 405)
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    def test_submission_no_challenge_found(self, mock_get_challenge_by_id):
-        mock_get_challenge_by_id.return_value = None
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    def test_submission_no_challenge_found(self, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (None, None)
         response = self.client.post('/submission/1', data={'stub-block': 'code'})
         self.assertEqual(response.status_code, 404)
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
-    def test_submission_no_tests_implemented(self, mock_get_tests, mock_get_challenge):
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = None
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    def test_submission_no_tests_implemented(self, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, None)
         response = self.client.post('/submission/1', data={'stub-block': 'code'})
         self.assertEqual(response.status_code, 501)
         self.assertEqual(response.json, {
@@ -211,13 +226,11 @@ class FlaskAppTestCase(unittest.TestCase):
             "flash": {"message": "Test cases are not implemented yet.", "category": "error"}
         })
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.dockerservice.DockerService.validate_user_method')
-    def test_submission_invalid_stub(self, mock_validate, mock_get_tests, mock_get_challenge):
+    def test_submission_invalid_stub(self, mock_validate, mock_get_challenge_with_tests):
         mock_validate.return_value = (False, "Invalid stub")
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
         response = self.client.post('/submission/1', data={'stub-block': 'invalid code'})
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json, {
@@ -225,22 +238,18 @@ class FlaskAppTestCase(unittest.TestCase):
             "flash": {"message": "Invalid stub", "category": "error"}
         })
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
-    def test_submission_database_insertion_failure(self, mock_insert, mock_get_tests, mock_get_challenge):
+    def test_submission_database_insertion_failure(self, mock_insert, mock_get_challenge_with_tests):
         mock_insert.return_value = False
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
         response = self.client.post('/submission/1', data={'stub-block': 'valid code'})
         self.assertEqual(response.status_code, 400)
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
-    def test_submission_exception_handling(self, mock_insert_submission, mock_get_challenge_tests_by_id, mock_get_challenge_by_id):
-        mock_get_challenge_by_id.return_value = self.challenge
-        mock_get_challenge_tests_by_id.return_value = [self.challenge_test]
+    def test_submission_exception_handling(self, mock_insert_submission, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
         
         # Mock insert_challenge_submission to raise an exception
         mock_insert_submission.side_effect = Exception("Test Exception")
@@ -250,17 +259,16 @@ class FlaskAppTestCase(unittest.TestCase):
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 500)
         self.assertIn("An unexpected error occurred: Test Exception", response.json.get("flash", {}).get("message", ""))
         self.assertIn("Test Exception", response.json.get("message", ""))
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
-    def test_submission_failed_to_add_submission(self, mock_insert_submission, mock_get_challenge_tests_by_id, mock_get_challenge_by_id):
-        mock_get_challenge_by_id.return_value = self.challenge
-        mock_get_challenge_tests_by_id.return_value = [self.challenge_test]
+    def test_submission_failed_to_add_submission(self, mock_insert_submission, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
 
         # Mock insert_challenge_submission to return False, simulating a failure to add submission
         mock_insert_submission.return_value = False
@@ -270,33 +278,53 @@ class FlaskAppTestCase(unittest.TestCase):
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json.get("message", ""), "Failed to add your submission.")
         self.assertEqual(response.json.get("flash", {}).get("message", ""), "Failed to add submission.")
         self.assertEqual(response.json.get("flash", {}).get("category", ""), "error")
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.dockerservice.DockerService.execute_code')
-    def test_submission_execution_error(self, mock_execute_code, mock_get_tests, mock_get_challenge):
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+    def test_submission_execution_error(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
         mock_execute_code.return_value = {'error': 'Execution Error', 'print_outputs': ['']}
 
         response = self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'})
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 400)
         self.assertIn('Execution Error', response.json.get('message'))
         self.assertIn('Execution Error', response.json.get('flash', {}).get('message'))
         self.assertEqual('error', response.json.get('flash', {}).get('category'))
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_submission_metrics')
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
     @patch('classes.util.dockerservice.DockerService.execute_code')
-    def test_submission_execution_error(self, mock_execute_code, mock_get_tests, mock_get_challenge):
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+    def test_submission_records_metrics(self, mock_execute_code, mock_insert_submission, mock_insert_metrics, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+        test_results = [{'id': 1, 'wall_time': 0.01, 'cpu_user': 0.01, 'cpu_sys': 0.0, 'peak_rss_kb': 9000}]
+        mock_execute_code.return_value = {
+            'error': '', 'print_outputs': [], 'tests_passed': 1, 'tests_total': 1, 'exec_time': 0.5,
+            'exec_chars': 28, 'timeout': False, 'test_results': test_results, 'cpu_time': 0.01, 'peak_rss_kb': 9000
+        }
+        mock_insert_submission.return_value = [{'LAST_INSERT_ID()': 101}]
+
+        with self.client.session_transaction() as session:
+            session['user_id'] = 'test_user_id'
+
+        response = self.wait_for_job(self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['peak_rss_kb'], 9000)
+        mock_insert_metrics.assert_called_once_with(101, test_results)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_submission_execution_error(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
 
         # Simulate an execution error scenario
         mock_execute_code.return_value = {
@@ -313,15 +341,14 @@ class FlaskAppTestCase(unittest.TestCase):
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 400)
 
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.dockerservice.DockerService.execute_code')
-    def test_submission_timeout(self, mock_execute_code, mock_get_tests, mock_get_challenge):
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+    def test_submission_timeout(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
 
         # Adjusted mock for a timeout scenario
         mock_execute_code.return_value = {
@@ -339,18 +366,44 @@ class FlaskAppTestCase(unittest.TestCase):
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 408)
         self.assertIn("Timeout Occurred!", response.json.get('message'))
         self.assertIn("A timeout occurred during the execution of your submission.", response.json.get('flash', {}).get('message'))
         self.assertEqual('warning', response.json.get('flash', {}).get('category'))
     
-    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
-    @patch('classes.util.sqlservice.SqlService.get_challenge_tests_by_id')
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_submission')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
     @patch('classes.util.dockerservice.DockerService.execute_code')
-    def test_submission_exception(self, mock_execute_code, mock_get_tests, mock_get_challenge):
-        mock_get_challenge.return_value = self.challenge
-        mock_get_tests.return_value = [self.challenge_test]
+    def test_submission_timeout_after_passing_tests(self, mock_execute_code, mock_get_challenge_with_tests, mock_insert):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+
+        # Every test passed, but the submission exceeded its time limit
+        mock_execute_code.return_value = {
+            'timeout': True,
+            'print_outputs': [''],
+            'tests_passed': 1,
+            'tests_total': 1,
+            'error': "",
+            'exec_time': 0,
+            'exec_chars': 0
+        }
+
+        with self.client.session_transaction() as session:
+            session['user_id'] = 'test_user_id'
+
+        valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
+        response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
+
+        self.assertEqual(response.status_code, 408)
+        mock_insert.assert_not_called()
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_submission_exception(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
 
         # Simulate an exception scenario
         mock_execute_code.return_value = {
@@ -369,12 +422,172 @@ class FlaskAppTestCase(unittest.TestCase):
 
         valid_test_data = {'stub-block': 'def foo(x, y): return x + y'}
         response = self.client.post('/submission/1', data=valid_test_data)
+        response = self.wait_for_job(response)
 
         self.assertEqual(response.status_code, 500)
         self.assertIn('Exception occurred', response.json.get('message'))
         self.assertIn('Exception occurred', response.json.get('flash', {}).get('message'))
         self.assertEqual('error', response.json.get('flash', {}).get('category'))
 
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_submission_events_stream(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+        mock_execute_code.return_value = {
+            'timeout': True,
+            'print_outputs': [''],
+            'tests_passed': 0,
+            'tests_total': 1,
+            'error': None,
+            'exec_time': 0,
+            'exec_chars': 0
+        }
+
+        response = self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'})
+        self.assertEqual(response.status_code, 202)
+
+        events = self.client.get(response.json['events_url'])
+        body = events.get_data(as_text=True)
+
+        self.assertEqual(events.mimetype, 'text/event-stream')
+        self.assertIn('event: status', body)
+        self.assertIn('event: result', body)
+        self.assertIn('"status_code": 408', body)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_submission_events_stream_output(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+
+        def execute_code(challenge, tests, user_code, on_output=None):
+            on_output({'test_id': 1, 'prints': ['hello'], 'truncated': False})
+            return {'timeout': True, 'print_outputs': ['hello'], 'tests_passed': 0, 'tests_total': 1,
+                    'error': None, 'exec_time': 0, 'exec_chars': 0}
+        mock_execute_code.side_effect = execute_code
+
+        response = self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'})
+        body = self.client.get(response.json['events_url']).get_data(as_text=True)
+
+        self.assertIn('event: output\ndata: {"test_id": 1, "prints": ["hello"], "truncated": false}', body)
+        self.assertLess(body.index('event: output'), body.index('event: result'))
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_submission_status_long_poll_output(self, mock_execute_code, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def execute_code(challenge, tests, user_code, on_output=None):
+            on_output({'test_id': 1, 'prints': ['hello'], 'truncated': False})
+            release.wait(5)
+            return {'timeout': True, 'print_outputs': ['hello'], 'tests_passed': 0, 'tests_total': 1,
+                    'error': None, 'exec_time': 0, 'exec_chars': 0}
+        mock_execute_code.side_effect = execute_code
+
+        response = self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'})
+        status_url = response.json['status_url']
+
+        # The poll returns with the prints published so far, before the job is done
+        cursor, output = 0, []
+        while not output:
+            poll = self.client.get(f'{status_url}?wait=5&cursor={cursor}')
+            self.assertEqual(poll.status_code, 202)
+            output += poll.json['output']
+            cursor = poll.json['cursor']
+        self.assertEqual(output, [{'test_id': 1, 'prints': ['hello'], 'truncated': False}])
+
+        release.set()
+        result = self.client.get(f'{status_url}?wait=5&cursor={cursor}')
+        while result.status_code == 202:
+            result = self.client.get(f"{status_url}?wait=5&cursor={result.json['cursor']}")
+        self.assertEqual(result.status_code, 408)
+
+    def test_submission_status_unknown_job(self):
+        response = self.client.get('/submission/job/unknown')
+        self.assertEqual(response.status_code, 404)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_with_tests_by_id')
+    @patch('classes.util.judgequeue.JudgeQueue.submit')
+    def test_submission_queue_full(self, mock_submit, mock_get_challenge_with_tests):
+        mock_get_challenge_with_tests.return_value = (self.challenge, [self.challenge_test])
+        mock_submit.side_effect = RuntimeError("The judging queue is full")
+
+        response = self.client.post('/submission/1', data={'stub-block': 'def foo(x, y): return x + y'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual('warning', response.json.get('flash', {}).get('category'))
+
+    def test_submission_stats(self):
+        response = self.client.get('/submission/stats')
+
+        self.assertEqual(response.status_code, 200)
+        for key in ('depth', 'running', 'workers', 'wait_sec_avg', 'run_sec_avg'):
+            self.assertIn(key, response.json)
+        self.assertIn('reclaimed', response.json['timeouts'])
+
+    def test_profile_requires_privilege(self):
+        self.assertEqual(self.client.get('/profile').status_code, 403)
+        self.assertEqual(self.client.get('/profile/endpoints/submission_stats').status_code, 403)
+        self.assertEqual(self.client.get('/profile', headers={'X-Profile': ''}).status_code, 403)
+
+    def test_profile_requested_with_token(self):
+        self.app_instance.profile_token = 'secret'
+
+        response = self.client.get('/submission/stats', headers={'X-Profile': 'secret'})
+        unprofiled = self.client.get('/submission/stats', headers={'X-Profile': 'wrong'})
+
+        profile_id = int(response.headers['X-Profile-Id'])
+        self.assertNotIn('X-Profile-Id', unprofiled.headers)
+        summary = self.client.get('/profile', headers={'X-Profile': 'secret'}).json
+        self.assertEqual(summary['requests'][0]['id'], profile_id)
+        self.assertEqual(summary['endpoints']['submission_stats']['requests'], 1)
+        self.assertEqual(self.client.get(f'/profile/requests/{profile_id}', headers={'X-Profile': 'secret'}).status_code, 200)
+        self.assertEqual(self.client.get('/profile/requests/999', headers={'X-Profile': 'secret'}).status_code, 404)
+
+    def test_profile_sampled_for_moderators(self):
+        self.app_instance.profiler.sample_rate = 1
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = True
+
+            client.get('/submission/stats')
+            response = client.get('/profile/endpoints/submission_stats')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/plain')
+            self.assertNotIn('profile', client.get('/profile').json['endpoints'])
+
+    @patch('classes.util.sqlservice.SqlService.get_query_stats')
+    def test_metrics(self, mock_get_query_stats):
+        mock_get_query_stats.return_value = {}
+        self.client.get('/submission/stats')
+        self.client.get('/no_such_page')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.data.decode()
+        self.assertIn('http_requests_total{endpoint="submission_stats",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{endpoint="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{endpoint="submission_stats",method="GET",status="200"} 1', body)
+        for name in ('judge_queue_depth', 'judge_timeouts_total', 'cache_hit_ratio{cache="sql"}', 'cache_requests_total{cache="verdict",result="miss"}', 'cache_entries{cache="page"}'):
+            self.assertIn(name, body)
+
+    @patch('classes.util.sqlservice.SqlService.get_query_stats')
+    def test_sql_stats(self, mock_get_query_stats):
+        mock_get_query_stats.return_value = {
+            'GetChallengeById': {'count': 10, 'total_sec': 0.1},
+            'GetChallengePageById': {'count': 2, 'total_sec': 0.5}
+        }
+
+        response = self.client.get('/sql/stats')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([query['name'] for query in response.json['queries']], ['GetChallengePageById', 'GetChallengeById'])
+        self.assertIn('hits', response.json['cache'])
+
     def test_generic_challenge_success(self):
         response = self.client.get('/challenges/1')
 
@@ -399,6 +612,100 @@ class FlaskAppTestCase(unittest.TestCase):
         # Check if the returned template title is correct
         self.assertNotIn('Sum', response.data.decode('utf-8'))  # Check for challenge title
 
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_test')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_page_by_id')
+    def test_challenge_page_cached_for_anonymous_visitors(self, mock_get_page, mock_insert_test):
+        mock_get_page.return_value = (self.challenge, [self.challenge_test], [], None)
+
+        first = self.client.get('/challenges/1')
+        second = self.client.get('/challenges/1')
+
+        self.assertEqual(second.data, first.data)
+        mock_get_page.assert_called_once()
+
+        # Adding a test case bumps the version of the challenge's pages
+        moderator = self.app_instance.app.test_client()
+        with moderator.session_transaction() as sess:
+            sess['privileged_mode'] = True
+            sess['user_id'] = 1
+        moderator.post('/add_test_case/1', data={'inputParameters[]': '1, 2', 'expectedOutput[]': '3'})
+        mock_get_page.return_value = (self.challenge, [self.challenge_test, ChallengeTest(2, 1, False, "1, 2", "3")], [], None)
+
+        response = self.client.get('/challenges/1')
+
+        self.assertEqual(mock_get_page.call_count, 2)
+        self.assertIn('1, 2', response.data.decode())
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_page_by_id')
+    def test_challenge_fragments_depend_on_privilege(self, mock_get_page):
+        mock_get_page.return_value = (self.challenge, [self.challenge_test], [], None)
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 2
+        moderator = self.app_instance.app.test_client()
+        with moderator.session_transaction() as sess:
+            sess['privileged_mode'] = True
+            sess['user_id'] = 1
+
+        user_page = self.client.get('/challenges/1').data.decode()
+        moderator_page = moderator.get('/challenges/1').data.decode()
+
+        # Logged-in users get their own submissions, the page itself is not cached
+        self.assertEqual(mock_get_page.call_count, 2)
+        self.assertNotIn('delete-test-case', user_page)
+        self.assertIn('delete-test-case', moderator_page)
+        self.assertIn('6, 12', user_page)
+
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_comment')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_page_by_id')
+    def test_submit_comment_invalidates_challenge_page(self, mock_get_page, mock_insert_comment):
+        mock_get_page.return_value = (self.challenge, [self.challenge_test], [], None)
+        self.assertIn('No comments yet', self.client.get('/challenges/1').data.decode())
+
+        commenter = self.app_instance.app.test_client()
+        with commenter.session_transaction() as sess:
+            sess['user_id'] = 2
+        commenter.post('/submit_comment/1', data={'comment-title': 'Nice', 'comment-content': 'Thanks'})
+        comment = ChallengeComment(1, datetime.now(), 2, False, 1, 'Nice', 'Thanks', 'someone')
+        mock_get_page.return_value = (self.challenge, [self.challenge_test], [comment], None)
+
+        page = self.client.get('/challenges/1').data.decode()
+
+        self.assertNotIn('No comments yet', page)
+        self.assertIn('Thanks', page)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_submission_counts')
+    @patch('classes.util.sqlservice.SqlService.get_all_challenges')
+    def test_challenges_list_cached_on_catalog_version(self, mock_get_all_challenges, mock_get_counts):
+        mock_get_all_challenges.return_value = [Challenge(i, datetime.now(), 1, False, f"Challenge {i}", "Easy", "Description", "foo", "# TODO", 5) for i in (1, 2)]
+        mock_get_counts.return_value = {}
+
+        with patch('app.render_template', wraps=render_template) as mock_render:
+            self.client.get('/challenges')
+            self.client.get('/challenges')
+            self.assertEqual(mock_render.call_count, 2)   # the page and its list, once
+
+            self.app_instance.catalog.remove(2)
+            page = self.client.get('/challenges').data.decode()
+
+        self.assertEqual(mock_render.call_count, 4)
+        self.assertNotIn('Challenge 2', page)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_submission_counts')
+    @patch('classes.util.sqlservice.SqlService.get_all_challenges')
+    def test_challenges_cache_key_uses_clamped_page(self, mock_get_all_challenges, mock_get_counts):
+        mock_get_all_challenges.return_value = [Challenge(i, datetime.now(), 1, False, f"Challenge {i}", "Easy", "Description", "foo", "# TODO", 5) for i in (1, 2)]
+        mock_get_counts.return_value = {}
+
+        # Every request renders the only page, a single page and list entry are cached
+        for page in ('1', '2', '999', '-5', 'junk'):
+            self.client.get(f'/challenges?page={page}')
+        self.assertEqual(self.app_instance.page_cache.stats()['size'], 2)
+
+        # Page sizes are clamped too
+        self.client.get('/challenges?per_page=100')
+        self.client.get('/challenges?per_page=1000000')
+        self.assertEqual(self.app_instance.page_cache.stats()['size'], 4)
+
     def test_challenges_success(self):
         with self.client as client:
             with client.session_transaction() as sess:
@@ -418,6 +725,98 @@ class FlaskAppTestCase(unittest.TestCase):
             self.assertIn('Challenges', response.data.decode('utf-8'), "The title 'Challenges' was not found in the response")
 
 
+    @patch('classes.util.sqlservice.SqlService.get_challenge_submission_counts')
+    @patch('classes.util.sqlservice.SqlService.get_all_challenges')
+    def test_challenges_pagination(self, mock_get_all_challenges, mock_get_counts):
+        mock_get_all_challenges.return_value = [
+            Challenge(i, datetime.now(), 1, False, f"Challenge {i:02d}", "Easy", "Description", "foo", "# TODO", 5)
+            for i in range(1, 31)
+        ]
+        mock_get_counts.return_value = {30: 3}
+
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['sorting_criteria'] = 'popularity'
+
+            response = client.get('/challenges?page=1&per_page=10')
+
+            self.assertEqual(response.status_code, 200)
+            soup = BeautifulSoup(response.data.decode(), 'html.parser')
+            links = [a.get_text() for a in soup.select('.list-group-item a')]
+            self.assertEqual(len(links), 10)
+            self.assertEqual(links[0], 'Challenge 30')
+            self.assertIn('Page 1 of 3', response.data.decode())
+
+            # The catalog is loaded once and served from memory afterwards
+            client.get('/challenges?page=3&per_page=10')
+            mock_get_all_challenges.assert_called_once()
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_summaries')
+    def test_api_challenges_keyset_pagination(self, mock_get_summaries):
+        mock_get_summaries.return_value = [
+            Challenge(i, datetime.now(), 1, False, f"Challenge {i}", "Easy", None, "foo", None, 5) for i in (4, 5, 6)
+        ]
+
+        response = self.client.get('/api/challenges?limit=2')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([challenge['id'] for challenge in data['challenges']], [4, 5])
+        self.assertNotIn('description', data['challenges'][0])
+        mock_get_summaries.assert_called_with(0, 3)
+
+        # The cursor resumes after the last challenge of the page
+        mock_get_summaries.return_value = mock_get_summaries.return_value[2:]
+        data = self.client.get(f"/api/challenges?limit=2&cursor={data['next_cursor']}").get_json()
+        mock_get_summaries.assert_called_with(5, 3)
+        self.assertEqual([challenge['id'] for challenge in data['challenges']], [6])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_api_challenges_bad_cursor(self):
+        response = self.client.get('/api/challenges?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
+    def test_api_challenge(self, mock_get_challenge):
+        mock_get_challenge.return_value = self.challenge
+
+        data = self.client.get('/api/challenges/1').get_json()
+        self.assertEqual(data['description'], "Some Challenge Description")
+        self.assertEqual(data['stub_block'], "# TODO")
+
+        mock_get_challenge.return_value = None
+        self.assertEqual(self.client.get('/api/challenges/2').status_code, 404)
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_submission_summaries')
+    def test_api_challenge_submissions(self, mock_get_summaries):
+        mock_get_summaries.return_value = [ChallengeSubmission(9, datetime.now(), 1, 1, 0.5, 30, None)]
+
+        self.assertEqual(self.client.get('/api/challenges/1/submissions').status_code, 401)
+
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+
+            data = client.get('/api/challenges/1/submissions?limit=500').get_json()
+
+        mock_get_summaries.assert_called_with(1, 1, None, 101)
+        self.assertEqual(data['submissions'][0]['exec_chars'], 30)
+        self.assertNotIn('exec_src', data['submissions'][0])
+        self.assertIsNone(data['next_cursor'])
+
+    @patch('classes.util.sqlservice.SqlService.get_challenge_submission_by_id')
+    def test_api_submission_only_for_owner(self, mock_get_submission):
+        mock_get_submission.return_value = ChallengeSubmission(9, datetime.now(), 1, 1, 0.5, 30, "def foo(): pass")
+
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+            self.assertEqual(client.get('/api/submissions/9').get_json()['exec_src'], "def foo(): pass")
+
+            with client.session_transaction() as sess:
+                sess['user_id'] = 2
+            self.assertEqual(client.get('/api/submissions/9').status_code, 404)
+
     def test_submit_challenge_success(self):
          with self.client as client:
             with client.session_transaction() as sess:
@@ -841,6 +1240,88 @@ class FlaskAppTestCase(unittest.TestCase):
             self.assertFalse(b'[0, -1, 1, -100, 100]' in response.data)   
           
 
+    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id', return_value=None)
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_tests')
+    @patch('classes.util.sqlservice.SqlService.insert_challenge')
+    def test_submit_challenge_inserts_tests_in_bulk(self, mock_insert_challenge, mock_insert_tests, mock_get_challenge):
+        mock_insert_challenge.return_value = [{'LAST_INSERT_ID()': 12}]
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = True
+                sess['user_id'] = 1
+            form_data = {
+            'challengeName': 'Subtract',
+            'challengeDifficulty': 'Easy',
+            'challengeDescription': 'Given two numbers x and y, return x - y',
+            'stubName': 'sub',
+            'stubBlock': 'def sub(x,y)\n#Add your codes here',
+            'timeAllowed': '20',
+            'inputParameters[]': ['1,3','1,4'],
+            'expectedOutput[]': ['-2','-3'],
+            }
+
+            client.post('/submit_challenge', data=form_data)
+
+            mock_insert_tests.assert_called_once_with(12, [('1,3', '-2'), ('1,4', '-3')])
+
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_tests', return_value=2)
+    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
+    def test_import_test_cases_json(self, mock_get_challenge, mock_insert_tests):
+        mock_get_challenge.return_value = self.challenge
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = True
+                sess['user_id'] = 1
+
+            response = client.post('/import_test_cases/1', json=[{'input': '1, 2', 'output': '3'}, ['[4]', 4]])
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {'imported': 2})
+            mock_insert_tests.assert_called_once_with(1, [('1, 2', '3'), ('[4]', '4')])
+
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_tests', return_value=2)
+    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
+    def test_import_test_cases_csv_file(self, mock_get_challenge, mock_insert_tests):
+        mock_get_challenge.return_value = self.challenge
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = True
+                sess['user_id'] = 1
+            data = {'file': (io.BytesIO(b'input,output\n"1, 2",3\n"[4]",4\n'), 'tests.csv')}
+
+            response = client.post('/import_test_cases/1', data=data, content_type='multipart/form-data')
+
+            self.assertEqual(response.status_code, 200)
+            mock_insert_tests.assert_called_once_with(1, [('1, 2', '3'), ('[4]', '4')])
+
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_tests')
+    def test_import_test_cases_requires_moderator(self, mock_insert_tests):
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = False
+                sess['user_id'] = 1
+
+            response = client.post('/import_test_cases/1', json=[['1', '1']])
+
+            self.assertEqual(response.status_code, 403)
+            mock_insert_tests.assert_not_called()
+
+    @patch('classes.util.sqlservice.SqlService.insert_challenge_tests')
+    @patch('classes.util.sqlservice.SqlService.get_challenge_by_id')
+    def test_import_test_cases_invalid_file(self, mock_get_challenge, mock_insert_tests):
+        mock_get_challenge.return_value = self.challenge
+        with self.client as client:
+            with client.session_transaction() as sess:
+                sess['privileged_mode'] = True
+                sess['user_id'] = 1
+
+            self.assertEqual(client.post('/import_test_cases/1', json={'input': '1'}).status_code, 400)
+            self.assertEqual(client.post('/import_test_cases/1', data=b'1,2,3\n', content_type='text/csv').status_code, 400)
+
+            self.app_instance.test_import_max_rows = 1
+            self.assertEqual(client.post('/import_test_cases/1', json=[['1', '1'], ['2', '2']]).status_code, 413)
+            mock_insert_tests.assert_not_called()
+
     #Here we want to make sure that we have a comment for challenge id = 2 with comment id = 88 in the database
     def test_delete_comment_success(self):
         #, challenge_id, comment_id /delete_comment/
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from classes.util.cache import TTLCache
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_get_or_load_hit(self):
+        cache = TTLCache(max_size=2, ttl_sec=60)
+        loader = MagicMock(return_value='value')
+
+        self.assertEqual(cache.get_or_load('key', loader), 'value')
+        self.assertEqual(cache.get_or_load('key', loader), 'value')
+
+        loader.assert_called_once()
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_none_is_not_cached(self):
+        cache = TTLCache(max_size=2, ttl_sec=60)
+        loader = MagicMock(return_value=None)
+
+        cache.get_or_load('key', loader)
+        cache.get_or_load('key', loader)
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(max_size=2, ttl_sec=60)
+        cache.get_or_load('a', lambda: 1)
+        cache.get_or_load('b', lambda: 2)
+        cache.get_or_load('a', lambda: 1)   # 'b' is now the least recently used
+        cache.get_or_load('c', lambda: 3)
+
+        loader = MagicMock(return_value=2)
+        cache.get_or_load('b', loader)
+
+        loader.assert_called_once()
+        self.assertEqual(cache.get_or_load('c', MagicMock()), 3)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    @patch('classes.util.cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        cache = TTLCache(max_size=2, ttl_sec=10)
+        mock_monotonic.return_value = 100
+        cache.get_or_load('key', lambda: 'old')
+
+        mock_monotonic.return_value = 111
+        self.assertEqual(cache.get_or_load('key', lambda: 'new'), 'new')
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_invalidate_and_clear(self):
+        cache = TTLCache(max_size=4, ttl_sec=60)
+        cache.get_or_load('a', lambda: 1)
+        cache.get_or_load('b', lambda: 2)
+
+        cache.invalidate('a', 'missing')
+        self.assertEqual(cache.get_or_load('a', lambda: 10), 10)
+
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+        self.assertEqual(cache.stats()['invalidations'], 3)
+
+    def test_invalidation_during_load_is_not_overwritten(self):
+        cache = TTLCache(max_size=2, ttl_sec=60)
+
+        def loader():
+            # A writer invalidates the key while the old value is being loaded
+            cache.invalidate('key')
+            return 'stale'
+
+        self.assertEqual(cache.get_or_load('key', loader), 'stale')
+        self.assertEqual(cache.get_or_load('key', lambda: 'fresh'), 'fresh')
+
+    def test_disabled(self):
+        cache = TTLCache(max_size=2, ttl_sec=0)
+        loader = MagicMock(return_value='value')
+
+        cache.get_or_load('key', loader)
+        cache.get_or_load('key', loader)
+
+        self.assertFalse(cache.enabled)
+        self.assertEqual(loader.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime
+from classes.util.challengecatalog import ChallengeCatalog
+from classes.challenge.challenge import Challenge
+
+def make_challenge(challenge_id, name, difficulty, day):
+    return Challenge(challenge_id, datetime(2024, 1, day), 1, False, name, difficulty, "Description", "foo", "# TODO", 5)
+
+class TestChallengeCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.challenges = [
+            make_challenge(1, "Sum", "Medium", 3),
+            make_challenge(2, "Add", "Hard", 1),
+            make_challenge(3, "Max", "Easy", 2)
+        ]
+        self.loader = MagicMock(return_value=(self.challenges, {3: 5, 1: 2}))
+        self.catalog = ChallengeCatalog(self.loader)
+
+    def ids(self, ordering, page=1, per_page=10):
+        challenges, _, _ = self.catalog.page(ordering, page, per_page)
+        return [challenge.id for challenge in challenges]
+
+    def test_orderings(self):
+        self.assertEqual(self.ids('name'), [2, 3, 1])
+        self.assertEqual(self.ids('difficulty'), [3, 1, 2])
+        self.assertEqual(self.ids('created_at'), [2, 3, 1])
+        self.assertEqual(self.ids('popularity'), [3, 1, 2])
+        self.loader.assert_called_once()
+
+    def test_unknown_ordering_falls_back_to_difficulty(self):
+        self.assertEqual(self.ids('unknown'), [3, 1, 2])
+
+    def test_pagination(self):
+        challenges, page, pages = self.catalog.page('name', 2, 2)
+
+        self.assertEqual([challenge.id for challenge in challenges], [1])
+        self.assertEqual((page, pages), (2, 2))
+
+        # Out of range pages are clamped
+        _, page, _ = self.catalog.page('name', 10, 2)
+        self.assertEqual(page, 2)
+        _, page, _ = self.catalog.page('name', 0, 2)
+        self.assertEqual(page, 1)
+
+    def test_upsert_moves_edited_challenge(self):
+        self.catalog.page('name')
+        edited = make_challenge(1, "Aardvark", "Easy", 3)
+
+        self.catalog.upsert(edited)
+
+        self.assertEqual(self.ids('name'), [1, 2, 3])
+        self.assertEqual(self.ids('difficulty'), [1, 3, 2])
+        self.assertEqual(len(self.catalog), 3)
+
+    def test_upsert_adds_new_challenge(self):
+        self.catalog.page('name')
+        self.catalog.upsert(make_challenge(4, "Zip", "Easy", 4))
+
+        self.assertEqual(self.ids('name'), [2, 3, 1, 4])
+        self.assertEqual(self.ids('created_at'), [2, 3, 1, 4])
+
+    def test_upsert_before_load_is_ignored(self):
+        self.catalog.upsert(make_challenge(4, "Zip", "Easy", 4))
+        self.assertEqual(len(self.catalog), 0)
+
+    def test_remove(self):
+        self.catalog.page('name')
+        self.catalog.remove(3)
+        self.catalog.remove(42)
+
+        for ordering in ChallengeCatalog.ORDERINGS:
+            self.assertNotIn(3, self.ids(ordering))
+
+    def test_record_submission_updates_popularity(self):
+        self.catalog.page('popularity')
+        for _ in range(4):
+            self.catalog.record_submission(1)
+        self.catalog.record_submission(42)
+
+        self.assertEqual(self.ids('popularity'), [1, 3, 2])
+        self.assertEqual(self.catalog.get_submission_count(1), 6)
+
+    def test_stale_catalog_is_reloaded(self):
+        catalog = ChallengeCatalog(self.loader, refresh_sec=-1)
+        catalog.page('name')
+        catalog.page('name')
+
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_invalidate(self):
+        self.catalog.page('name')
+        self.catalog.invalidate()
+        self.catalog.page('name')
+
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_reload_does_not_block_readers(self):
+        self.catalog.page('name')
+        loading, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_loader():
+            loading.set()
+            release.wait(5)
+            return [make_challenge(1, "Sum", "Medium", 3), make_challenge(2, "Add", "Hard", 1)], {}
+
+        self.catalog._loader = slow_loader
+        self.catalog.invalidate()
+        reloader = threading.Thread(target=self.catalog.page, args=('name',))
+        reloader.start()
+        self.assertTrue(loading.wait(5))
+
+        # Readers get the previous snapshot while the loader runs
+        self.assertEqual(self.ids('name'), [2, 3, 1])
+        # Changes made meanwhile are replayed on the reloaded snapshot
+        self.catalog.upsert(make_challenge(5, "Zip", "Easy", 5))
+
+        release.set()
+        reloader.join(5)
+        self.assertEqual(self.ids('name'), [2, 1, 5])
+
+    def test_version_changes_with_the_catalog(self):
+        name_version = self.catalog.get_version('name')
+        self.loader.assert_called_once()
+
+        self.catalog.upsert(make_challenge(1, "Aardvark", "Easy", 3))
+        self.assertNotEqual(self.catalog.get_version('name'), name_version)
+
+        name_version = self.catalog.get_version('name')
+        self.catalog.remove(2)
+        self.assertNotEqual(self.catalog.get_version('name'), name_version)
+
+    def test_submission_only_changes_the_popularity_version(self):
+        name_version = self.catalog.get_version('name')
+        popularity_version = self.catalog.get_version('popularity')
+
+        self.catalog.record_submission(2)
+
+        self.assertEqual(self.catalog.get_version('name'), name_version)
+        self.assertNotEqual(self.catalog.get_version('popularity'), popularity_version)
+
+if __name__ == '__main__':
+    unittest.main()
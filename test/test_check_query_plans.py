@@ -0,0 +1,80 @@
+import unittest
+import check_query_plans
+from check_query_plans import bind_parameters, find_full_scans, parse_procedures, sample_value
+
+SCHEMA = """
+DROP PROCEDURE IF EXISTS `GetChallengeTestsByIdAndLimit`;
+delimiter ;;
+CREATE PROCEDURE `GetChallengeTestsByIdAndLimit`(IN in_id INT, IN in_limit INT)
+BEGIN
+  SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_id LIMIT in_limit;
+END
+;;
+delimiter ;
+
+DROP PROCEDURE IF EXISTS `UpdateChallengeIsDeletedById`;
+delimiter ;;
+CREATE PROCEDURE `UpdateChallengeIsDeletedById`(IN in_challenge_id INT,
+    IN is_deleted TINYINT)
+BEGIN
+		UPDATE challenge SET is_deleted=is_deleted
+		WHERE challenge.id=in_challenge_id;
+END
+;;
+delimiter ;
+"""
+
+SAMPLES = {'account': 5, 'challenge': 6, 'challenge_test': 7, 'comment': 8, 'submission': 9, 'username': 'user', 'password': 'hash'}
+
+class TestCheckQueryPlans(unittest.TestCase):
+
+    def test_parse_procedures(self):
+        procedures = parse_procedures(SCHEMA)
+
+        self.assertEqual(procedures[0], (
+            'GetChallengeTestsByIdAndLimit',
+            [('in_id', 'INT'), ('in_limit', 'INT')],
+            ["SELECT * FROM challenge_test WHERE is_deleted=0 and challenge_id=in_id LIMIT in_limit"]
+        ))
+        self.assertEqual(procedures[1][1], [('in_challenge_id', 'INT'), ('is_deleted', 'TINYINT')])
+
+    def test_parse_build_sql(self):
+        with open(check_query_plans.BUILD_SQL, encoding='utf-8') as schema_file:
+            names = [name for name, _, _ in parse_procedures(schema_file.read())]
+
+        self.assertIn('GetChallengeTestsById', names)
+        self.assertIn('GetAccountByUsernameAndPassword', names)
+
+    def test_bind_parameters(self):
+        parameters = [('in_id', 'INT'), ('in_limit', 'INT')]
+
+        statement, values = bind_parameters("SELECT * FROM challenge_test WHERE challenge_id=in_id LIMIT in_limit", parameters, {'in_id': 6, 'in_limit': 20, 'unused': 1})
+
+        self.assertEqual(statement, "SELECT * FROM challenge_test WHERE challenge_id=%(in_id)s LIMIT %(in_limit)s")
+        self.assertEqual(values, {'in_id': 6, 'in_limit': 20})
+
+    def test_bind_parameters_keeps_update_targets(self):
+        parameters = [('in_challenge_id', 'INT'), ('is_deleted', 'TINYINT')]
+
+        statement, _ = bind_parameters("UPDATE challenge SET is_deleted=is_deleted WHERE challenge.id=in_challenge_id", parameters, {'in_challenge_id': 6, 'is_deleted': 0})
+
+        self.assertEqual(statement, "UPDATE challenge SET is_deleted=%(is_deleted)s WHERE challenge.id=%(in_challenge_id)s")
+
+    def test_sample_value(self):
+        self.assertEqual(sample_value('in_username', 'varchar', SAMPLES), 'user')
+        self.assertEqual(sample_value('in_password', 'varchar', SAMPLES), 'hash')
+        self.assertEqual(sample_value('in_challenge_test_id', 'INT', SAMPLES), 7)
+        self.assertEqual(sample_value('inChallengeSubmissionId', 'INT', SAMPLES), 9)
+        self.assertEqual(sample_value('in_account_id', 'INT', SAMPLES), 5)
+        self.assertEqual(sample_value('in_id', 'INT', SAMPLES), 6)
+        self.assertEqual(sample_value('in_limit', 'INT', SAMPLES), 20)
+        self.assertEqual(sample_value('in_time_allowed_sec', 'DOUBLE', SAMPLES), 1.0)
+
+    def test_find_full_scans(self):
+        plan = [{'table': 'c', 'type': 'ALL', 'key': None}, {'table': 'cs', 'type': 'ref', 'key': 'idx'}]
+
+        self.assertEqual(find_full_scans(plan, 'GetSolvedChallengesByAccountId'), ['c'])
+        self.assertEqual(find_full_scans([{'table': 'challenge', 'type': 'ALL'}], 'GetAllChallenges'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from classes.util.connectionpool import ConnectionPool
+from classes.util.sqlservice import SqlService
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        # Every call to the factory opens a new mock connection
+        self.created = []
+
+        def factory():
+            connection = MagicMock()
+            connection.is_connected.return_value = True
+            self.created.append(connection)
+            return connection
+
+        self.factory = factory
+
+    def test_fill_opens_min_size(self):
+        pool = ConnectionPool(self.factory, min_size=2, max_size=4)
+        pool.fill()
+
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_acquire_reuses_released_connection(self):
+        pool = ConnectionPool(self.factory, max_size=2, reset=lambda connection: connection.rollback())
+
+        connection = pool.acquire()
+        pool.release(connection)
+        second = pool.acquire()
+
+        self.assertIs(connection, second)
+        self.assertEqual(len(self.created), 1)
+        connection.rollback.assert_called_once()
+
+        stats = pool.stats()
+        self.assertEqual(stats['borrows'], 2)
+        self.assertEqual(stats['borrowed'], 1)
+        self.assertEqual(stats['created'], 1)
+
+    def test_acquire_discards_invalid_connection(self):
+        pool = ConnectionPool(self.factory, max_size=1, validate=lambda connection: connection.is_connected())
+        pool.release(pool.acquire())
+        self.created[0].is_connected.return_value = False
+
+        connection = pool.acquire()
+
+        self.assertIs(connection, self.created[1])
+        self.created[0].close.assert_called_once()
+        self.assertEqual(pool.stats()['invalid'], 1)
+
+    def test_validate_exception_counts_as_invalid(self):
+        pool = ConnectionPool(self.factory, max_size=1, validate=MagicMock(side_effect=Exception("gone")))
+        pool.release(pool.acquire())
+
+        pool.acquire()
+
+        self.assertEqual(pool.stats()['invalid'], 1)
+        self.assertEqual(len(self.created), 2)
+
+    def test_acquire_timeout_when_exhausted(self):
+        pool = ConnectionPool(self.factory, max_size=1)
+        pool.acquire()
+
+        with self.assertRaises(RuntimeError):
+            pool.acquire(timeout=0.01)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_factory_error_frees_slot(self):
+        pool = ConnectionPool(MagicMock(side_effect=Exception("refused")), max_size=1)
+
+        with self.assertRaises(Exception):
+            pool.acquire()
+        self.assertEqual(pool._total, 0)
+
+    def test_idle_connections_are_evicted_above_min_size(self):
+        pool = ConnectionPool(self.factory, min_size=1, max_size=3, idle_timeout_sec=-1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        stats = pool.stats()
+        self.assertEqual(stats['evicted'], 1)
+        self.assertEqual(stats['idle'], 1)
+        first.close.assert_called_once()
+
+    def test_release_failed_reset_closes_connection(self):
+        pool = ConnectionPool(self.factory, max_size=1, reset=MagicMock(side_effect=Exception("lost")))
+
+        connection = pool.acquire()
+        pool.release(connection)
+
+        connection.close.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_close_closes_idle_connections(self):
+        pool = ConnectionPool(self.factory, min_size=2, max_size=2)
+        pool.fill()
+        pool.close()
+
+        for connection in self.created:
+            connection.close.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+class TestSqlServicePool(unittest.TestCase):
+
+    def tearDown(self):
+        SqlService._pool = None
+
+    def test_pool_disabled(self):
+        with patch.object(SqlService, 'POOL_MAX_SIZE', 0):
+            self.assertIsNone(SqlService.get_connection_pool())
+            self.assertIsNone(SqlService.get_pool_stats())
+
+    @patch('mysql.connector.connect')
+    def test_execute_query_reuses_pooled_connection(self, mock_connect):
+        mock_connection = mock_connect.return_value
+        mock_connection.cursor.return_value.fetchall.return_value = [{'id': 1}]
+
+        with patch.object(SqlService, 'POOL_MAX_SIZE', 2):
+            SqlService.execute_query("SELECT 1")
+            SqlService.execute_query("SELECT 1")
+            stats = SqlService.get_pool_stats()
+
+        mock_connect.assert_called_once()
+        mock_connection.close.assert_not_called()
+        mock_connection.rollback.assert_called()
+        self.assertEqual(stats['borrows'], 2)
+        self.assertEqual(stats['idle'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
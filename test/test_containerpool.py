@@ -0,0 +1,240 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from classes.util import harnessruntime
+from classes.util.containerpool import ContainerPool
+from classes.util.dockerservice import DockerService
+from classes.challenge.challenge import Challenge
+from classes.challenge.challengetest import ChallengeTest
+from datetime import datetime
+import docker
+
+class TestContainerPool(unittest.TestCase):
+
+    def setUp(self):
+        # Every call to containers.run returns a new running mock container
+        self.mock_client = MagicMock()
+        self.created = []
+
+        def run(*args, **kwargs):
+            container = MagicMock()
+            container.id = f"container-{len(self.created)}"
+            container.status = 'running'
+            container.exec_run.return_value = (0, b'')
+            self.created.append(container)
+            return container
+
+        self.mock_client.containers.run.side_effect = run
+
+    def test_warm_starts_containers_up_to_size(self):
+        pool = ContainerPool(3, client=self.mock_client, run_options={'read_only': True})
+        pool.warm()
+
+        self.assertEqual(len(self.created), 3)
+        self.assertEqual(pool.stats()['idle'], 3)
+        self.mock_client.containers.run.assert_called_with("safe-python-env", command=["sleep", "infinity"], detach=True, read_only=True)
+
+    def test_lease_reuses_released_container(self):
+        pool = ContainerPool(1, client=self.mock_client)
+
+        container = pool.lease()
+        pool.release(container)
+        second = pool.lease()
+
+        self.assertIs(container, second)
+        self.assertEqual(len(self.created), 1)
+        container.exec_run.assert_called_with(ContainerPool.RESET_COMMAND)
+
+        stats = pool.stats()
+        self.assertEqual(stats['leases'], 2)
+        self.assertEqual(stats['leased'], 1)
+        self.assertEqual(stats['created'], 1)
+
+    def test_lease_discards_unhealthy_container(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        pool.warm()
+        self.created[0].status = 'exited'
+
+        with patch.object(pool, '_replenish'):
+            container = pool.lease()
+
+        self.assertIs(container, self.created[1])
+        self.created[0].remove.assert_called_with(force=True)
+        self.assertEqual(pool.stats()['unhealthy'], 1)
+
+    def test_release_recycles_after_max_uses(self):
+        pool = ContainerPool(1, max_uses=2, client=self.mock_client)
+
+        with patch.object(pool, '_replenish') as mock_replenish:
+            container = pool.lease()
+            pool.release(container)
+            pool.release(pool.lease())
+
+        container.remove.assert_called_with(force=True)
+        mock_replenish.assert_called_once()
+        stats = pool.stats()
+        self.assertEqual(stats['recycled'], 1)
+        self.assertEqual(stats['idle'], 0)
+
+    def test_release_unhealthy_destroys_container(self):
+        pool = ContainerPool(1, client=self.mock_client)
+
+        with patch.object(pool, '_replenish'):
+            container = pool.lease()
+            pool.release(container, healthy=False)
+
+        container.remove.assert_called_with(force=True)
+        self.assertEqual(pool.stats()['unhealthy'], 1)
+
+    def test_release_failed_reset_destroys_container(self):
+        pool = ContainerPool(1, client=self.mock_client)
+
+        with patch.object(pool, '_replenish'):
+            container = pool.lease()
+            container.exec_run.return_value = (1, b'')
+            pool.release(container)
+
+        container.remove.assert_called_with(force=True)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_reset_wipes_writable_paths(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        container = MagicMock()
+        container.exec_run.return_value = (0, b'')
+
+        self.assertTrue(pool.reset(container))
+        command = container.exec_run.call_args[0][0]
+        self.assertIn("kill -9 -1", command[2])
+        self.assertEqual(command[-2:], ["/dev/shm", "/tmp"])
+
+        # A file the previous submission left behind could not be deleted
+        container.exec_run.return_value = (1, b"find: '/tmp/locked': Permission denied")
+        self.assertFalse(pool.reset(container))
+
+    def test_zygote_is_kept_across_leases(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        zygote = MagicMock(ready=True, pid=42)
+        start = MagicMock(return_value=zygote)
+
+        container = pool.lease()
+        self.assertIs(pool.get_zygote(container, start), zygote)
+        pool.release(container)
+        container = pool.lease()
+
+        self.assertIs(pool.get_zygote(container, start), zygote)
+        start.assert_called_once_with(container)
+        command = container.exec_run.call_args[0][0]
+        self.assertEqual(command[2:4], [ContainerPool.ZYGOTE_RESET_SCRIPT, "42"])
+        zygote.close.assert_not_called()
+
+    def test_reset_kills_zygote_that_is_not_ready(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        zygote = MagicMock(ready=False)
+
+        container = pool.lease()
+        pool.get_zygote(container, lambda container: zygote)
+        pool.release(container)
+
+        zygote.close.assert_called_once()
+        container.exec_run.assert_called_with(ContainerPool.RESET_COMMAND)
+        self.assertIsNot(pool.get_zygote(pool.lease(), MagicMock()), zygote)
+
+    def test_destroyed_container_closes_its_zygote(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        zygote = MagicMock(ready=True, pid=42)
+
+        with patch.object(pool, '_replenish'):
+            container = pool.lease()
+            pool.get_zygote(container, lambda container: zygote)
+            pool.release(container, healthy=False)
+
+        zygote.close.assert_called_once()
+        container.remove.assert_called_with(force=True)
+
+    def test_lease_timeout_when_exhausted(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        pool.lease()
+
+        with self.assertRaises(RuntimeError):
+            pool.lease(timeout=0.01)
+
+    def test_is_healthy_api_error(self):
+        pool = ContainerPool(1, client=self.mock_client)
+        container = MagicMock()
+        container.reload.side_effect = docker.errors.APIError("gone")
+
+        self.assertFalse(pool.is_healthy(container))
+
+    def test_close_destroys_idle_containers(self):
+        pool = ContainerPool(2, client=self.mock_client)
+        pool.warm()
+        pool.close()
+
+        for container in self.created:
+            container.remove.assert_called_with(force=True)
+        with self.assertRaises(RuntimeError):
+            pool.lease()
+
+class TestDockerServicePool(unittest.TestCase):
+
+    def tearDown(self):
+        DockerService._pool = None
+
+    def test_get_container_pool_disabled(self):
+        with patch.object(DockerService, 'POOL_SIZE', 0):
+            self.assertIsNone(DockerService.get_container_pool())
+            self.assertIsNone(DockerService.get_pool_stats())
+
+    @patch('classes.util.dockerservice.ContainerPool')
+    def test_get_container_pool_enabled(self, mock_pool_class):
+        with patch.object(DockerService, 'POOL_SIZE', 2):
+            pool = DockerService.get_container_pool()
+
+            self.assertIs(pool, DockerService.get_container_pool())
+            mock_pool_class.assert_called_once()
+            pool.warm.assert_called_once()
+
+    @patch('classes.util.dockerservice.ContainerPool')
+    def test_get_pool_stats_does_not_create_the_pool(self, mock_pool_class):
+        with patch.object(DockerService, 'POOL_SIZE', 2):
+            self.assertIsNone(DockerService.get_pool_stats())
+            mock_pool_class.assert_not_called()
+
+            DockerService.get_container_pool()
+            self.assertIs(DockerService.get_pool_stats(), mock_pool_class.return_value.stats.return_value)
+
+    @patch('docker.from_env')
+    @patch('classes.util.dockerservice.DockerService.get_container_pool')
+    def test_execute_code_leases_from_pool(self, mock_get_pool, mock_docker):
+        mock_pool = MagicMock()
+        mock_container = MagicMock()
+        entry = {'id': 1, 'result': '18', 'passed': True, 'prints': [], 'exception': None, 'wall_time': 0.001}
+        frames = b"".join(harnessruntime.encode_frame(event) for event in (
+            {'event': 'load', 'prints': [], 'exception': None}, dict(entry, event='test'), {'event': 'end'}))
+        mock_container.exec_run.return_value = (None, [(frames, None)])
+        mock_pool.lease.return_value = mock_container
+        mock_get_pool.return_value = mock_pool
+
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(1, 1, False, "6, 12", "18")]
+
+        result = DockerService.execute_code(challenge, tests, "def sum(x, y):\n  return x + y")
+
+        self.assertEqual(result['tests_passed'], 1)
+        mock_pool.release.assert_called_with(mock_container, healthy=True)
+        mock_docker.assert_not_called()
+        mock_container.remove.assert_not_called()
+
+    @patch('classes.util.dockerservice.DockerService.get_container_pool')
+    def test_execute_code_pool_exhausted(self, mock_get_pool):
+        mock_get_pool.return_value.lease.side_effect = RuntimeError("No sandbox container became available in time")
+
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(1, 1, False, "6, 12", "18")]
+
+        result = DockerService.execute_code(challenge, tests, "def sum(x, y):\n  return x + y")
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['exception'], "No sandbox container became available in time")
+
+if __name__ == '__main__':
+    unittest.main()
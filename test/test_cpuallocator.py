@@ -0,0 +1,70 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from classes.util.cpuallocator import CpuAllocator
+
+class TestCpuAllocator(unittest.TestCase):
+
+    def test_parse_cpus(self):
+        self.assertEqual(CpuAllocator.parse_cpus("0-3,6"), [0, 1, 2, 3, 6])
+        self.assertEqual(CpuAllocator.parse_cpus("2, 2,1"), [2, 1])
+        self.assertEqual(CpuAllocator.parse_cpus(""), [])
+
+    def test_no_cpus(self):
+        with self.assertRaises(ValueError):
+            CpuAllocator([])
+
+    def test_concurrent_grants_use_distinct_cpus(self):
+        allocator = CpuAllocator([0, 1, 2])
+
+        first = allocator.acquire()
+        second = allocator.acquire(2)
+
+        self.assertEqual(first, [0])
+        self.assertEqual(second, [1, 2])
+        self.assertEqual(allocator.stats()['shared_grants'], 0)
+
+    def test_count_is_capped(self):
+        allocator = CpuAllocator([0, 1])
+        self.assertEqual(allocator.acquire(5), [0, 1])
+        self.assertEqual(allocator.acquire(0), [0])
+
+    def test_busy_cpus_are_shared_least_loaded_first(self):
+        allocator = CpuAllocator([0, 1])
+        allocator.acquire(2)
+        allocator.acquire()            # cpu 0 now runs two sandboxes
+
+        self.assertEqual(allocator.acquire(), [1])
+        stats = allocator.stats()
+        self.assertEqual(stats['shared_grants'], 2)
+        self.assertEqual(stats['load'], {0: 2, 1: 2})
+
+    def test_release(self):
+        allocator = CpuAllocator([0, 1])
+        cpus = allocator.acquire(2)
+        allocator.release(cpus)
+        allocator.release([7])
+
+        stats = allocator.stats()
+        self.assertEqual(stats['busy'], 0)
+        self.assertEqual(stats['grants'], 2)
+
+    @unittest.skipIf(sys.platform.startswith('win'), "the lock files rely on flock")
+    def test_processes_sharing_a_lock_dir_use_distinct_cpus(self):
+        # Every allocator opens its own lock files, like the judging processes of a host
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        first, second = CpuAllocator([0, 1], lock_dir=lock_dir), CpuAllocator([0, 1], lock_dir=lock_dir)
+
+        self.assertEqual(first.acquire(), [0])
+        self.assertEqual(second.acquire(), [1])     # Locked by the first allocator
+        self.assertEqual(second.stats()['shared_grants'], 0)
+
+        first.release([0])
+        self.assertEqual(second.acquire(), [0])
+        self.assertEqual(first.acquire(2), [0, 1])  # Both locked by the second allocator
+        self.assertEqual(first.stats()['shared_grants'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,45 @@
 import unittest
 from classes.util.dockerservice import DockerService
+from classes.util.containerpool import ContainerPool
+from classes.util.cpuallocator import CpuAllocator
+from classes.util.dockerexecutor import DockerExecutor
+from classes.util.localexecutor import LocalExecutor
+from classes.util.zygote import Zygote
+from classes.util import harnessruntime
 from datetime import datetime
 from unittest.mock import patch, MagicMock
 from classes.challenge.challenge import Challenge
 from classes.challenge.challengetest import ChallengeTest
-from io import StringIO
+from io import StringIO, BytesIO
 import docker
+import re
+import sys
+import threading
 
 # The purpose of these mock tests is to do line coverage
 # These testers simply test line execution
 # We have a separate integration test file for actual (real data) processing
 
+def harness_entry(test_id, result, prints=None, exception=None):
+    return {'id': test_id, 'result': result, 'passed': True, 'prints': prints or [], 'exception': exception, 'wall_time': 0.001}
+
+def harness_frames(tests=(), prints=(), exception=None, timeout=False):
+    # The frames of a harness or zygote reporting these events
+    frames = harnessruntime.encode_frame({'event': 'load', 'prints': list(prints), 'exception': exception})
+    frames += b"".join(harnessruntime.encode_frame(dict(entry, event='test')) for entry in tests)
+    return frames + harnessruntime.encode_frame({'event': 'end', 'timeout': timeout})
+
+def zygote_stream(tests=(), prints=(), exception=None, timeout=False):
+    # A zygote reporting these events for its job
+    stream = MagicMock()
+    ready = harnessruntime.encode_frame({'event': 'ready', 'pid': 7})
+    stream.read.side_effect = BytesIO(ready + harness_frames(tests, prints, exception, timeout) + ready).read
+    return stream
+
+def harness_output(tests=(), prints=(), exception=None, stderr=None):
+    # What exec_run(stream=True, demux=True) returns for a harness streaming these events
+    return (None, [(harness_frames(tests, prints, exception), stderr)])
+
 class TestDockerService(unittest.TestCase):
     
     def test_validate_user_method_valid(self):
@@ -40,8 +69,7 @@ class TestDockerService(unittest.TestCase):
 
         # Set up a mock return value for container's exec_run method to simulate code execution with invalid results
         # The user code returns x + x, so for input "6, 12" it should return "12" (incorrect result)
-        mock_output = b"RESULT: 12\nRESULT: 8"  # Incorrect results according to user code
-        mock_container.exec_run.return_value = (0, mock_output)  # Simulate exec_run returning a tuple with exit status and output
+        mock_container.exec_run.return_value = harness_output([harness_entry(1, '12')])  # Incorrect result according to user code
 
         # Define the Challenge and ChallengeTest instances
         challenge = Challenge(
@@ -97,8 +125,7 @@ def sum(x, y):
         mock_client.containers.run.return_value = mock_container
 
         # Set up a mock return value for container's exec_run method to simulate a syntax error
-        mock_output = b"SyntaxError: invalid syntax"
-        mock_container.exec_run.return_value = (1, mock_output)  # Simulate exec_run returning a tuple with exit status and error output
+        mock_container.exec_run.return_value = harness_output(exception="SyntaxError: invalid syntax")
 
         # Define the Challenge and ChallengeTest instances
         challenge = Challenge(
@@ -256,7 +283,7 @@ def sum(x, y):
     def test_execute_code_capture_prints(self, mock_docker_env):
         # Setup mock Docker container and its exec_run return value
         mock_container = MagicMock()
-        mock_container.exec_run.return_value = (0, b'Hello World\nRESULT: True')
+        mock_container.exec_run.return_value = harness_output([harness_entry(1, 'True')], prints=['Hello World'])
         mock_docker_env.return_value.containers.run.return_value = mock_container
 
         # Dummy challenge and tests
@@ -291,7 +318,7 @@ def sum(x, y):
     def test_execute_code_passed_tests(self, mock_docker_env):
         # Setup mock Docker container and its exec_run return value
         mock_container = MagicMock()
-        mock_container.exec_run.return_value = (0, b'RESULT: 18')
+        mock_container.exec_run.return_value = harness_output([harness_entry(1, '18')])
         mock_docker_env.return_value.containers.run.return_value = mock_container
 
         # Dummy challenge and tests
@@ -320,4 +347,488 @@ def sum(x, y):
         result = DockerService.execute_code(challenge, tests, user_code)
 
         # Assertions
-        self.assertEqual(result['tests_passed'], 1)
\ No newline at end of file
+        self.assertEqual(result['tests_passed'], 1)
+
+class TestDockerServiceBatched(unittest.TestCase):
+
+    def setUp(self):
+        self.challenge = Challenge(
+            id=1,
+            created_at=datetime.now(),
+            account_id=1,
+            is_deleted=False,
+            name="Test Sum",
+            difficulty="Easy",
+            description="Some Challenge Description",
+            stub_name="sum",
+            stub_block="# TODO",
+            time_allowed_sec=20
+        )
+        self.tests = [
+            ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18"),
+            ChallengeTest(id=2, challenge_id=1, is_deleted=False, test_input="4, 7", test_output="11")
+        ]
+
+    def run_batched(self, mock_docker, payload):
+        # Make exec_run stream the events of the given payload
+        mock_container = MagicMock()
+        mock_docker.return_value.containers.run.return_value = mock_container
+        mock_container.exec_run.return_value = harness_output(payload['tests'], payload['prints'], payload['exception'])
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'):
+            result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+        return result, mock_container
+
+    def entry(self, test_id, result, prints=None, exception=None):
+        return harness_entry(test_id, result, prints, exception)
+
+    @patch('docker.from_env')
+    def test_execute_code_batched_single_exec(self, mock_docker):
+        payload = {'prints': [], 'exception': None, 'tests': [self.entry(1, '18', ['6 12']), self.entry(2, '11', ['4 7'])]}
+
+        result, mock_container = self.run_batched(mock_docker, payload)
+
+        self.assertEqual(mock_container.exec_run.call_count, 1)
+        self.assertEqual(mock_container.exec_run.call_args.kwargs, {'stream': True, 'demux': True})
+        self.assertEqual(result['tests_passed'], 2)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['print_outputs'], ['6 12', '4 7'])
+        self.assertEqual([test['passed'] for test in result['test_results']], [True, True])
+        self.assertEqual(result['test_results'][0]['wall_time'], 0.001)
+
+    @patch('docker.from_env')
+    def test_execute_code_batched_invalid_result(self, mock_docker):
+        payload = {'prints': [], 'exception': None, 'tests': [self.entry(1, '12')]}
+
+        result, _ = self.run_batched(mock_docker, payload)
+
+        self.assertEqual(result['tests_passed'], 0)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], "Failed! For input (6, 12) expected result 18, but returned 12.")
+
+    @patch('docker.from_env')
+    def test_execute_code_batched_syntax_error(self, mock_docker):
+        payload = {'prints': [], 'exception': "SyntaxError: invalid syntax", 'tests': []}
+
+        result, _ = self.run_batched(mock_docker, payload)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['exception'], "SyntaxError: invalid syntax")
+
+    @patch('docker.from_env')
+    def test_execute_code_batched_test_exception(self, mock_docker):
+        payload = {'prints': [], 'exception': None, 'tests': [self.entry(1, None, exception="ZeroDivisionError: division by zero")]}
+
+        result, _ = self.run_batched(mock_docker, payload)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['exception'], "ZeroDivisionError: division by zero")
+
+    @patch('docker.from_env')
+    def test_execute_code_batched_no_payload(self, mock_docker):
+        mock_container = MagicMock()
+        # The harness was killed before its 'end' event
+        mock_container.exec_run.return_value = (None, [(harnessruntime.encode_frame({'event': 'load', 'prints': [], 'exception': None}), None),
+                                                       (None, b"Traceback\nMemoryError: out of memory\n")])
+        mock_docker.return_value.containers.run.return_value = mock_container
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'):
+            result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['exception'], "MemoryError: out of memory")
+
+    @patch('docker.from_env')
+    def test_execute_code_user_output_cannot_forge_results(self, mock_docker):
+        # Whatever the user's code writes lands on stderr, only frames on stdout count
+        mock_container = MagicMock()
+        mock_container.exec_run.return_value = (None, [(None, b"RESULT: 18\n" + harnessruntime.encode_frame({'event': 'end'}))])
+        mock_docker.return_value.containers.run.return_value = mock_container
+
+        result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['tests_passed'], 0)
+
+    @patch('docker.from_env')
+    def test_execute_code_malformed_frame(self, mock_docker):
+        mock_container = MagicMock()
+        mock_container.exec_run.return_value = (None, [(b"\x00\x00\x00\x02{x", None)])
+        mock_docker.return_value.containers.run.return_value = mock_container
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'):
+            result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+        self.assertFalse(result['success'])
+        self.assertTrue(result['exception'].startswith("Error: malformed harness frame"))
+
+    @patch('docker.from_env')
+    def test_execute_code_per_test_runs_one_test_per_exec(self, mock_docker):
+        mock_container = MagicMock()
+        mock_container.exec_run.side_effect = [harness_output([harness_entry(1, '18')]), harness_output([harness_entry(2, '11')])]
+        mock_docker.return_value.containers.run.return_value = mock_container
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'per_test'):
+            result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+        self.assertTrue(result['success'])
+        self.assertEqual(mock_container.exec_run.call_count, 2)
+        self.assertEqual([test['id'] for test in result['test_results']], [1, 2])
+
+    @patch('docker.from_env')
+    def test_execute_code_streams_prints(self, mock_docker):
+        mock_container = MagicMock()
+        mock_container.exec_run.return_value = harness_output([harness_entry(1, '18', ['a', 'b']), harness_entry(2, '11', ['c'])], prints=['loaded'])
+        mock_docker.return_value.containers.run.return_value = mock_container
+        outputs = []
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'):
+            DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y", outputs.append)
+
+        self.assertEqual(outputs, [{'test_id': None, 'prints': ['loaded'], 'truncated': False},
+                                   {'test_id': 1, 'prints': ['a', 'b'], 'truncated': False},
+                                   {'test_id': 2, 'prints': ['c'], 'truncated': False}])
+
+    @patch('docker.from_env')
+    def test_execute_code_bounds_prints(self, mock_docker):
+        mock_container = MagicMock()
+        mock_container.exec_run.return_value = harness_output([harness_entry(1, '18', ['a', 'b']), harness_entry(2, '11', ['c'])])
+        mock_docker.return_value.containers.run.return_value = mock_container
+        outputs = []
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'batched'), patch('classes.util.harness.Harness.PRINT_MAX_LINES', 2):
+            result = DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y", outputs.append)
+
+        self.assertEqual(result['print_outputs'], ["[... 1 earlier lines truncated ...]", 'b', 'c'])
+        self.assertEqual(outputs[-1], {'test_id': 2, 'prints': [], 'truncated': True})
+
+    @patch('docker.from_env')
+    def test_execute_code_reports_resource_usage(self, mock_docker):
+        entries = [dict(harness_entry(1, '18'), cpu_user=0.3, cpu_sys=0.1, peak_rss_kb=9000),
+                   dict(harness_entry(2, '11'), cpu_user=0.2, cpu_sys=0.0, peak_rss_kb=12000)]
+        result, _ = self.run_batched(mock_docker, {'prints': [], 'exception': None, 'tests': entries})
+
+        self.assertAlmostEqual(result['cpu_time'], 0.6)
+        self.assertEqual(result['peak_rss_kb'], 12000)
+        self.assertEqual(result['test_results'][1]['cpu_user'], 0.2)
+
+    def test_parse_exception(self):
+        self.assertEqual(DockerService.parse_exception("Traceback\nNameError: name 'x' is not defined"), "NameError: name 'x' is not defined")
+        self.assertIsNone(DockerService.parse_exception("hello"))
+
+class TestDockerServiceSharded(unittest.TestCase):
+
+    def setUp(self):
+        self.challenge = Challenge(
+            id=1,
+            created_at=datetime.now(),
+            account_id=1,
+            is_deleted=False,
+            name="Test Sum",
+            difficulty="Easy",
+            description="Some Challenge Description",
+            stub_name="sum",
+            stub_block="# TODO",
+            time_allowed_sec=20
+        )
+        self.tests = [
+            ChallengeTest(id=i, challenge_id=1, is_deleted=False, test_input=f"{i}, {i}", test_output=str(2 * i))
+            for i in range(1, 5)
+        ]
+        self.allocator = CpuAllocator([0, 1])
+        patcher = patch.object(DockerService, '_cpu_allocator', self.allocator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_sharded(self, mock_docker, results):
+        # Each sandbox answers with the result the user code returns for the test input
+        def exec_run(command, **kwargs):
+            if command == ContainerPool.RESET_COMMAND:
+                return 0, b""   # The sandbox is interrupted after its first failing test
+            blob = re.search(r"main\('([^']*)'\)", command[-1]).group(1)
+            test = harnessruntime.decode_job(blob)['tests'][0]
+            return harness_output([harness_entry(test['id'], str(results[test['input']]))])
+
+        mock_docker.return_value.containers.run.side_effect = lambda *args, **kwargs: MagicMock(exec_run=MagicMock(side_effect=exec_run))
+        with patch.object(DockerService, 'SHARDS', 2):
+            return DockerService.execute_code(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+    @patch('docker.from_env')
+    def test_shards_pinned_to_distinct_cpus(self, mock_docker):
+        result = self.run_sharded(mock_docker, {"1, 1": 2, "2, 2": 4, "3, 3": 6, "4, 4": 8})
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['tests_passed'], 4)
+        cpus = sorted(call.kwargs['cpuset_cpus'] for call in mock_docker.return_value.containers.run.call_args_list)
+        self.assertEqual(cpus, ['0', '1'])
+        self.assertEqual(self.allocator.stats()['busy'], 0)
+
+    @patch('docker.from_env')
+    def test_first_failure_wins(self, mock_docker):
+        # Tests 2 and 4 fail, only the first failure is reported like in sequential execution
+        result = self.run_sharded(mock_docker, {"1, 1": 2, "2, 2": 0, "3, 3": 6, "4, 4": 0})
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['tests_passed'], 1)
+        self.assertEqual(result['error'], "Failed! For input (2, 2) expected result 4, but returned 0.")
+
+    def test_merge_shard_results_stops_at_failed_shard(self):
+        first = DockerService.new_shard_result(self.tests[:2])
+        first.update(tests_passed=2, print_outputs=['a'])
+        second = DockerService.new_shard_result(self.tests[2:])
+        second.update(tests_passed=0, error="Failed!", exception="ZeroDivisionError: division by zero")
+        third = DockerService.new_shard_result(self.tests[:1])
+        third.update(tests_passed=1, print_outputs=['c'])
+        result_dict = DockerService.new_shard_result(self.tests)
+
+        DockerService.merge_shard_results([first, second, third], result_dict)
+
+        self.assertEqual(result_dict['tests_passed'], 2)
+        self.assertEqual(result_dict['print_outputs'], ['a'])
+        self.assertEqual(result_dict['error'], "Failed!")
+        self.assertEqual(result_dict['exception'], "ZeroDivisionError: division by zero")
+
+class TestDockerServiceResultCache(unittest.TestCase):
+
+    def setUp(self):
+        DockerService.clear_result_cache()
+        self.challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        self.tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+        self.passed = {'tests_total': 1, 'tests_passed': 1, 'error': "", 'timeout': False, 'exec_time': 0.5, 'exec_chars': 28}
+
+    def test_hash_code_ignores_formatting_and_comments(self):
+        first = DockerService.hash_code("def sum(x, y): return x + y")
+        second = DockerService.hash_code("# My solution\ndef sum(x,  y):\n    return x + y\n")
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, DockerService.hash_code("def sum(x, y): return y + x"))
+        self.assertIsNone(DockerService.hash_code("def sum(x, y) return"))
+
+    def test_fingerprint_changes_with_tests(self):
+        fingerprint = DockerService.fingerprint_tests(self.challenge, self.tests)
+        added = self.tests + [ChallengeTest(id=2, challenge_id=1, is_deleted=False, test_input="1, 2", test_output="3")]
+
+        self.assertEqual(fingerprint, DockerService.fingerprint_tests(self.challenge, list(reversed(self.tests))))
+        self.assertNotEqual(fingerprint, DockerService.fingerprint_tests(self.challenge, added))
+        self.assertNotEqual(fingerprint, DockerService.fingerprint_tests(self.challenge, []))
+
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_resubmission_is_served_from_cache(self, mock_execute_code):
+        mock_execute_code.return_value = self.passed
+
+        first = DockerService.execute_code_cached(self.challenge, self.tests, "def sum(x, y): return x + y")
+        second = DockerService.execute_code_cached(self.challenge, self.tests, "def sum(x, y):\n    return x + y  # again")
+
+        mock_execute_code.assert_called_once()
+        self.assertNotIn('cached', first)
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['tests_passed'], 1)
+        self.assertEqual(second['exec_chars'], len("def sum(x, y):\n    return x + y  # again"))
+
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_new_test_case_invalidates_cached_verdict(self, mock_execute_code):
+        mock_execute_code.return_value = self.passed
+        DockerService.execute_code_cached(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+        tests = self.tests + [ChallengeTest(id=2, challenge_id=1, is_deleted=False, test_input="1, 2", test_output="3")]
+        DockerService.execute_code_cached(self.challenge, tests, "def sum(x, y): return x + y")
+
+        self.assertEqual(mock_execute_code.call_count, 2)
+
+    @patch('classes.util.dockerservice.DockerService.execute_code')
+    def test_timeouts_and_sandbox_errors_are_not_cached(self, mock_execute_code):
+        for result_dict in ({'tests_total': 1, 'tests_passed': 0, 'error': "", 'timeout': True},
+                            {'tests_total': 1, 'tests_passed': 0, 'error': "", 'timeout': False, 'exception': "No sandbox container became available in time"}):
+            mock_execute_code.reset_mock()
+            mock_execute_code.return_value = result_dict
+
+            DockerService.execute_code_cached(self.challenge, self.tests, "def sum(x, y): return x + y")
+            result = DockerService.execute_code_cached(self.challenge, self.tests, "def sum(x, y): return x + y")
+
+            self.assertEqual(mock_execute_code.call_count, 2)
+            self.assertIs(result, result_dict)
+
+class TestDockerServiceBackends(unittest.TestCase):
+
+    def test_get_executor(self):
+        with patch.object(DockerService, 'BACKEND', 'docker'), patch.object(DockerService, 'POOL_SIZE', 0):
+            self.assertIsInstance(DockerService.get_executor(), DockerExecutor)
+        with patch.object(DockerService, 'BACKEND', 'local'):
+            self.assertIsInstance(DockerService.get_executor(), LocalExecutor)
+        with patch.object(DockerService, 'BACKEND', 'vm'):
+            with self.assertRaises(ValueError):
+                DockerService.get_executor()
+
+    @patch('classes.util.dockerservice.DockerService.get_executor')
+    def test_execute_code_uses_selected_backend(self, mock_get_executor):
+        sandbox = MagicMock()
+        sandbox.exec_run.return_value = harness_output([harness_entry(1, '18')])
+        mock_get_executor.return_value.acquire.return_value = sandbox
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+
+        result = DockerService.execute_code(challenge, tests, "def sum(x, y): return x + y")
+
+        self.assertTrue(result['success'])
+        mock_get_executor.return_value.acquire.assert_called_once()
+        mock_get_executor.return_value.release.assert_called_once_with(sandbox, healthy=True)
+
+    @patch('classes.util.dockerservice.DockerService.get_executor')
+    def test_timed_out_submission_is_reclaimed(self, mock_get_executor):
+        # The sandbox runs until it is interrupted
+        killed = threading.Event()
+
+        def exec_run(command, **kwargs):
+            def chunks():
+                killed.wait(10)
+                yield (None, b"Killed")
+            return (None, chunks())
+
+        sandbox = MagicMock()
+        sandbox.exec_run.side_effect = exec_run
+        executor = mock_get_executor.return_value
+        executor.acquire.return_value = sandbox
+        executor.interrupt.side_effect = lambda _: killed.set()
+        allocator = CpuAllocator([0])
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 0.2)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+        reclaimed = DockerService.get_timeout_stats()['reclaimed']
+
+        with patch.object(DockerService, '_cpu_allocator', allocator):
+            result = DockerService.execute_code(challenge, tests, "def sum(x, y):\n    while True: pass")
+
+        self.assertTrue(result['timeout'])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['exception'], "")
+        executor.interrupt.assert_called_once_with(sandbox)
+        executor.release.assert_called_once_with(sandbox, healthy=False)
+        self.assertEqual(allocator.stats()['busy'], 0)
+        self.assertEqual(DockerService.get_timeout_stats()['reclaimed'], reclaimed + 1)
+
+    @patch('docker.from_env')
+    def test_docker_errors_are_reported_as_sandbox_errors(self, mock_docker):
+        mock_docker.side_effect = docker.errors.DockerException("Error while fetching server API version")
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+
+        with self.assertRaises(RuntimeError):
+            DockerExecutor("safe-python-env", {}).acquire(0)
+        with patch.object(DockerService, 'BACKEND', 'docker'), patch.object(DockerService, 'POOL_SIZE', 0):
+            result = DockerService.execute_code(challenge, tests, "def sum(x, y): return x + y")
+
+        self.assertFalse(result['success'])
+        self.assertIn("the sandbox could not be started", result['exception'])
+
+    @patch('classes.util.dockerservice.DockerService.get_executor')
+    def test_results_reported_after_the_deadline_are_dropped(self, mock_get_executor):
+        # The sandbox reports a passing test only once it is interrupted at the deadline
+        killed = threading.Event()
+
+        def exec_run(command, **kwargs):
+            def chunks():
+                killed.wait(10)
+                yield from harness_output([harness_entry(1, '18')])[1]
+            return (None, chunks())
+
+        sandbox = MagicMock()
+        sandbox.exec_run.side_effect = exec_run
+        executor = mock_get_executor.return_value
+        executor.acquire.return_value = sandbox
+        executor.interrupt.side_effect = lambda _: killed.set()
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 0.2)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+
+        with patch.object(DockerService, '_cpu_allocator', CpuAllocator([0])):
+            result = DockerService.execute_code(challenge, tests, "def sum(x, y): return x + y")
+        executor.release.assert_called_once()
+
+        self.assertTrue(result['timeout'])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['tests_passed'], 0)
+        self.assertEqual(result['test_results'], [])
+
+    def test_test_timeout_is_reported_as_timeout(self):
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+        result_dict = DockerService.new_shard_result(tests)
+        entry = dict(harness_entry(1, None, exception="TimeoutError: the test exceeded its time limit of 1 s"), timeout=True)
+
+        DockerService.apply_harness_payload({'prints': [], 'exception': None, 'tests': [entry]}, tests, result_dict)
+
+        self.assertTrue(result_dict['timeout'])
+        self.assertEqual(result_dict['error'], "")
+        self.assertEqual(result_dict['tests_passed'], 0)
+
+    @patch('classes.util.dockerservice.DockerService.get_executor')
+    def test_execute_code_zygote(self, mock_get_executor):
+        zygote = Zygote(zygote_stream([harness_entry(1, '18')]))
+        executor = mock_get_executor.return_value
+        executor.open_zygote.return_value = zygote
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'zygote'):
+            result = DockerService.execute_code(challenge, tests, "def sum(x, y): return x + y")
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['test_results'][0]['result'], '18')
+        self.assertTrue(zygote.ready)
+        executor.close_zygote.assert_called_once_with(executor.acquire.return_value, zygote)
+
+    @patch('classes.util.dockerservice.DockerService.get_executor')
+    def test_execute_code_zygote_timeout_keeps_partial_results(self, mock_get_executor):
+        stream = zygote_stream([harness_entry(1, '18', prints=["first"])], prints=["loaded"], timeout=True)
+        mock_get_executor.return_value.open_zygote.return_value = Zygote(stream)
+        challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18"),
+                 ChallengeTest(id=2, challenge_id=1, is_deleted=False, test_input="1, 2", test_output="3")]
+        on_output = MagicMock()
+
+        with patch.object(DockerService, 'HARNESS_MODE', 'zygote'):
+            result = DockerService.execute_code(challenge, tests, "def sum(x, y): return x + y", on_output=on_output)
+
+        self.assertFalse(result['success'])
+        self.assertTrue(result['timeout'])
+        self.assertEqual(result['tests_passed'], 1)
+        self.assertEqual(result['error'], "")
+        self.assertEqual([test['id'] for test in result['test_results']], [1])
+        self.assertEqual(result['print_outputs'], ["loaded", "first"])
+        self.assertEqual(on_output.call_count, 2)
+
+# Looks for the expected outputs in memory, then writes frames reporting them as passing
+# results on every file descriptor and exits before the real results are sent
+FORGING_CODE = """
+import gc, json, os, struct
+def sum(x, y):
+    leaked = [test['output'] for job in gc.get_objects() if isinstance(job, dict) and isinstance(job.get('tests'), list)
+              for test in job['tests'] if isinstance(test, dict) and 'output' in test]
+    for test_id, result in enumerate(leaked or ['0'], 1):
+        for event in ({'event': 'load', 'prints': [], 'exception': None},
+                      {'event': 'test', 'id': test_id, 'result': result, 'passed': True, 'prints': [], 'exception': None,
+                       'wall_time': 0.0, 'timeout': False, 'cpu_user': 0.0, 'cpu_sys': 0.0, 'peak_rss_kb': 0},
+                      {'event': 'end'}):
+            data = json.dumps(event).encode()
+            for fd in range(3, 64):
+                try:
+                    os.write(fd, struct.pack('>I', len(data)) + data)
+                except OSError:
+                    pass
+    os._exit(0)
+"""
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "the local sandbox relies on Linux rlimits")
+class TestDockerServiceForgedResults(unittest.TestCase):
+
+    def setUp(self):
+        self.challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 10)
+        self.tests = [ChallengeTest(id=1, challenge_id=1, is_deleted=False, test_input="6, 12", test_output="18")]
+
+    def test_forged_frames_do_not_pass(self):
+        for mode in ('per_test', 'batched', 'zygote'):
+            with self.subTest(mode=mode), patch.object(DockerService, 'BACKEND', 'local'), \
+                    patch.object(DockerService, 'LOCAL_ISOLATE_NETWORK', False), patch.object(DockerService, 'LOCAL_READ_ONLY', False), \
+                    patch.object(DockerService, 'SHARDS', 1), patch.object(DockerService, 'HARNESS_MODE', mode):
+                result = DockerService.execute_code(self.challenge, self.tests, FORGING_CODE)
+
+                self.assertFalse(result['success'])
+                self.assertEqual(result['tests_passed'], 0)
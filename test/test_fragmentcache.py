@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock
+from classes.util.fragmentcache import FragmentCache
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_get_or_render_hit(self):
+        cache = FragmentCache(max_size=10, ttl_sec=60)
+        render = MagicMock(return_value='<li>Sum</li>')
+
+        self.assertEqual(cache.get_or_render(('challenge_testcases', 1, False), 0, render), '<li>Sum</li>')
+        self.assertEqual(cache.get_or_render(('challenge_testcases', 1, False), 0, render), '<li>Sum</li>')
+
+        render.assert_called_once()
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_variants_are_cached_separately(self):
+        cache = FragmentCache(max_size=10, ttl_sec=60)
+
+        cache.get_or_render(('challenge_testcases', 1, False), 0, lambda: 'visitor')
+        html = cache.get_or_render(('challenge_testcases', 1, True), 0, lambda: 'moderator')
+
+        self.assertEqual(html, 'moderator')
+
+    def test_bump_changes_the_version(self):
+        cache = FragmentCache(max_size=10, ttl_sec=60)
+        self.assertEqual(cache.version(('challenge', 1)), 0)
+
+        cache.bump(('challenge', 1))
+
+        self.assertEqual(cache.version(('challenge', 1)), 1)
+        self.assertEqual(cache.version(('challenge', 2)), 0)
+
+    def test_bumped_entries_are_rendered_again(self):
+        cache = FragmentCache(max_size=10, ttl_sec=60)
+        render = MagicMock(side_effect=['old', 'new'])
+        cache.get_or_render(('challenge_page', 1, False), cache.version(('challenge', 1)), render)
+
+        cache.bump(('challenge', 1))
+        html = cache.get_or_render(('challenge_page', 1, False), cache.version(('challenge', 1)), render)
+
+        self.assertEqual(html, 'new')
+        self.assertEqual(render.call_count, 2)
+
+    def test_none_is_not_cached(self):
+        cache = FragmentCache(max_size=10, ttl_sec=60)
+        render = MagicMock(return_value=None)
+
+        cache.get_or_render(('challenge_page', 100, False), 0, render)
+        cache.get_or_render(('challenge_page', 100, False), 0, render)
+
+        self.assertEqual(render.call_count, 2)
+
+    def test_disabled(self):
+        cache = FragmentCache(max_size=10, ttl_sec=0)
+        render = MagicMock(return_value='html')
+
+        cache.get_or_render(('challenges_list',), 0, render)
+        cache.get_or_render(('challenges_list',), 0, render)
+
+        self.assertEqual(render.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import subprocess
+import sys
+from datetime import datetime
+from classes.util import harnessruntime
+from classes.util.harness import Harness, FrameDecoder
+from classes.challenge.challenge import Challenge
+from classes.challenge.challengetest import ChallengeTest
+
+class TestHarness(unittest.TestCase):
+
+    def setUp(self):
+        self.challenge = Challenge(1, datetime.now(), 1, False, "Test Sum", "Easy", "Description", "sum", "# TODO", 20)
+        self.tests = [
+            ChallengeTest(1, 1, False, "6, 12", "18"),
+            ChallengeTest(2, 1, False, "4, 7", "11")
+        ]
+
+    def test_build_job(self):
+        job = Harness.build_job(self.challenge, self.tests, "code")
+
+        self.assertEqual(job['stub_name'], "sum")
+        self.assertEqual(job['user_code'], "code")
+        # The expected outputs never reach the sandbox
+        self.assertEqual(job['tests'][1], {'id': 2, 'input': "4, 7"})
+        self.assertEqual(job['print_limits'], {'max_lines': Harness.PRINT_MAX_LINES, 'max_bytes': Harness.PRINT_MAX_BYTES})
+
+    def test_build_source_runs_all_tests_in_one_process(self):
+        source = Harness.build_source(Harness.build_job(self.challenge, self.tests, "def sum(x, y):\n    print(x)\n    return x + y"))
+
+        completed = subprocess.run([sys.executable, "-c", source], capture_output=True)
+        payload, stderr = Harness.read_payload([(completed.stdout, completed.stderr)])
+
+        self.assertEqual([entry['result'] for entry in payload['tests']], ['18', '11'])
+        self.assertEqual(payload['tests'][0]['prints'], ['6'])
+        self.assertEqual(stderr, "")
+
+    def test_user_output_goes_to_stderr(self):
+        user_code = "import os, sys\nos.write(1, b'RESULT: 18')\nsys.stdout.write('hi')\ndef sum(x, y):\n    return x + y"
+        source = Harness.build_source(Harness.build_job(self.challenge, self.tests, user_code))
+
+        completed = subprocess.run([sys.executable, "-c", source], capture_output=True)
+        payload, stderr = Harness.read_payload([(completed.stdout, completed.stderr)])
+
+        self.assertEqual(len(payload['tests']), 2)
+        self.assertIn("RESULT: 18", stderr)
+
+    def test_read_payload_split_frames(self):
+        data = b"".join(harnessruntime.encode_frame(event) for event in (
+            {'event': 'load', 'prints': ['hello'], 'exception': None},
+            {'event': 'test', 'id': 1, 'result': '18'},
+            {'event': 'end'}))
+
+        payload, _ = Harness.read_payload([(data[i:i + 3], None) for i in range(0, len(data), 3)])
+
+        self.assertEqual(payload, {'prints': ['hello'], 'exception': None, 'tests': [{'id': 1, 'result': '18'}], 'timeout': False})
+
+    def test_read_payload_without_end_event(self):
+        data = harnessruntime.encode_frame({'event': 'load', 'prints': [], 'exception': None})
+
+        payload, stderr = Harness.read_payload([(data, None), (None, b"MemoryError")])
+
+        self.assertIsNone(payload)
+        self.assertEqual(stderr, "MemoryError")
+
+    def test_frame_decoder_rejects_oversized_frame(self):
+        decoder = FrameDecoder(max_frame_bytes=10)
+
+        with self.assertRaises(ValueError):
+            decoder.feed(harnessruntime.encode_frame({'event': 'x' * 20}))
+
+    def test_frame_decoder_rejects_malformed_frame(self):
+        with self.assertRaises(ValueError):
+            FrameDecoder().feed(b"\x00\x00\x00\x02{x")
+
+    def test_frame_decoder_keeps_partial_frame(self):
+        decoder = FrameDecoder()
+        data = harnessruntime.encode_frame({'event': 'end'})
+
+        self.assertEqual(decoder.feed(data[:-1]), [])
+        self.assertEqual(decoder.pending, len(data) - 1)
+        self.assertEqual(decoder.feed(data[-1:]), [{'event': 'end'}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import io
+import os
+import sys
+import time
+import unittest
+from classes.util import harnessruntime
+
+class TestHarnessRuntime(unittest.TestCase):
+
+    def build_job(self, user_code, tests, stop_on_failure=True):
+        return {
+            'user_code': user_code,
+            'stub_name': 'sum',
+            'tests': [{'id': i, 'input': test_input, 'output': test_output} for i, (test_input, test_output) in enumerate(tests)],
+            'stop_on_failure': stop_on_failure
+        }
+
+    def test_run_job_all_passed(self):
+        job = self.build_job("def sum(x, y):\n    print(x, y)\n    return x + y", [("6, 12", "18"), ("4, 7", "11")])
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertIsNone(payload['exception'])
+        self.assertEqual([entry['result'] for entry in payload['tests']], ['18', '11'])
+        self.assertTrue(all(entry['passed'] for entry in payload['tests']))
+        self.assertEqual(payload['tests'][1]['prints'], ['4 7'])
+        self.assertGreaterEqual(payload['tests'][0]['wall_time'], 0)
+
+    def test_run_job_stops_on_failure(self):
+        job = self.build_job("def sum(x, y):\n    return x + x", [("6, 12", "18"), ("4, 7", "11")])
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(len(payload['tests']), 1)
+        self.assertFalse(payload['tests'][0]['passed'])
+
+    def test_run_job_continues_without_stop_on_failure(self):
+        job = self.build_job("def sum(x, y):\n    return x + x", [("6, 12", "18"), ("4, 7", "11")], stop_on_failure=False)
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(len(payload['tests']), 2)
+
+    def test_run_job_syntax_error(self):
+        job = self.build_job("def sum(x, y):\n    ret x + y", [("6, 12", "18")])
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(payload['exception'], "SyntaxError: invalid syntax")
+        self.assertEqual(payload['tests'], [])
+
+    def test_run_job_test_exception(self):
+        job = self.build_job("def sum(x, y):\n    return x / 0", [("6, 12", "18")])
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(payload['tests'][0]['exception'], "ZeroDivisionError: division by zero")
+        self.assertIsNone(payload['tests'][0]['result'])
+
+    def test_run_job_module_prints_and_restores_print(self):
+        original_print = print
+        job = self.build_job("print('loading')\ndef sum(x, y):\n    return x + y", [("1, 2", "3")])
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(payload['prints'], ['loading'])
+        import builtins
+        self.assertIs(builtins.print, original_print)
+
+    def test_run_job_reports_events(self):
+        events = []
+        job = self.build_job("print('loading')\ndef sum(x, y):\n    return x + y", [("1, 2", "3"), ("2, 2", "4")])
+
+        harnessruntime.run_job(job, events.append)
+
+        self.assertEqual([event['event'] for event in events], ['load', 'test', 'test'])
+        self.assertEqual(events[0]['prints'], ['loading'])
+        self.assertEqual(events[2]['result'], '4')
+
+    def test_run_job_bounds_prints(self):
+        job = self.build_job("def sum(x, y):\n    for i in range(100000):\n        print(i)\n    return x + y", [("1, 2", "3")])
+        job['print_limits'] = {'max_lines': 3, 'max_bytes': 1000}
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(payload['tests'][0]['prints'], ["[... 99997 earlier lines truncated ...]", '99997', '99998', '99999'])
+
+    def test_print_buffer_bounds_bytes(self):
+        buffer = harnessruntime.PrintBuffer(max_lines=100, max_bytes=30)
+        buffer.extend(['a' * 12, 'b' * 12, 'c' * 12])
+
+        self.assertEqual(buffer.lines(), ["[... 1 earlier lines truncated ...]", 'b' * 12, 'c' * 12])
+
+        buffer.append('x' * 50)
+        self.assertEqual(buffer.lines(), ["[... 3 earlier lines truncated ...]", 'x' * 13 + " [line truncated]"])
+
+    def test_run_job_interrupts_test_at_time_limit(self):
+        user_code = "def sum(x, y):\n    while True:\n        try:\n            pass\n        except Exception:\n            pass"
+        job = self.build_job(user_code, [("1, 2", "3"), ("2, 2", "4")])
+        job['test_time_limit_sec'] = 0.2
+
+        payload = harnessruntime.run_job(job)
+
+        self.assertEqual(len(payload['tests']), 1)
+        self.assertTrue(payload['tests'][0]['timeout'])
+        self.assertTrue(payload['tests'][0]['exception'].startswith("TimeoutError"))
+
+    def test_run_test_measures_resource_usage(self):
+        namespace = harnessruntime.load_code("def sum(x, y):\n    for i in range(300000):\n        x += 1\n    return x + y")
+
+        entry = harnessruntime.run_test(namespace, 'sum', {'id': 1, 'input': "0, 0", 'output': "300000"})
+
+        self.assertTrue(entry['passed'])
+        self.assertGreater(entry['cpu_user'] + entry['cpu_sys'], 0)
+        self.assertGreater(entry['peak_rss_kb'], 0)
+
+    def test_frames_round_trip(self):
+        stream = io.BytesIO(harnessruntime.encode_frame({'a': 1}) + harnessruntime.encode_frame([2]))
+
+        self.assertEqual(harnessruntime.read_frame(stream), {'a': 1})
+        self.assertEqual(harnessruntime.read_frame(stream), [2])
+        self.assertIsNone(harnessruntime.read_frame(stream))
+
+    def test_read_frame_rejects_oversized_frame(self):
+        stream = io.BytesIO(harnessruntime.encode_frame("x" * 100))
+
+        with self.assertRaises(ValueError):
+            harnessruntime.read_frame(stream, max_bytes=50)
+
+    def test_encode_decode_job(self):
+        job = self.build_job("def sum(x, y):\n    return x + y", [("1, 2", "3")])
+        self.assertEqual(harnessruntime.decode_job(harnessruntime.encode_job(job)), job)
+
+    def test_run_test_without_expected_output(self):
+        namespace = harnessruntime.load_code("def sum(x, y):\n    return x + y")
+
+        entry = harnessruntime.run_test(namespace, 'sum', {'id': 1, 'input': "1, 2"})
+
+        self.assertEqual(entry['result'], '3')
+        self.assertIsNone(entry['passed'])
+
+    def test_parse_event(self):
+        load = {'event': 'load', 'prints': ['hi'], 'exception': None}
+
+        self.assertEqual(harnessruntime.parse_event(harnessruntime.encode_frame(dict(load, extra=1))[4:]), load)
+        self.assertIsNone(harnessruntime.parse_event(b"not json"))
+        self.assertIsNone(harnessruntime.parse_event(b'{"event": "load", "prints": [1], "exception": null}'))
+        self.assertIsNone(harnessruntime.parse_event(b'{"event": "forged"}'))
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "the worker is forked")
+class TestRelayEvents(unittest.TestCase):
+
+    def relay(self, job, work):
+        read_fd, write_fd = os.pipe()
+        status = harnessruntime.relay_events(job, work, write_fd)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as stream:
+            return status, list(iter(lambda: harnessruntime.read_frame(stream), None))
+
+    def test_worker_does_not_hold_the_frames_fd(self):
+        job = {'tests': []}
+        read_fd, write_fd = os.pipe()
+
+        def work(emit):
+            try:
+                os.fstat(write_fd)
+                held = True
+            except OSError:
+                held = False
+            emit({'event': 'load', 'prints': [str(held)], 'exception': None})
+            emit({'event': 'end'})
+
+        status = harnessruntime.relay_events(job, work, write_fd)
+        os.close(write_fd)
+
+        self.assertEqual(status, 'ok')
+        with os.fdopen(read_fd, 'rb') as stream:
+            self.assertEqual(harnessruntime.read_frame(stream)['prints'], ['False'])
+
+    def test_test_events_are_stamped_with_the_job_ids(self):
+        entry = {'result': '3', 'passed': None, 'prints': [], 'exception': None, 'wall_time': 0.0,
+                 'timeout': False, 'cpu_user': 0.0, 'cpu_sys': 0.0, 'peak_rss_kb': 0}
+
+        def work(emit):
+            emit({'event': 'load', 'prints': [], 'exception': None})
+            emit(dict(entry, event='test', id=42))
+            emit(dict(entry, event='test', id=42))   # More tests than the job has
+            emit({'event': 'end'})
+
+        status, events = self.relay({'tests': [{'id': 7, 'input': "1, 2"}]}, work)
+
+        self.assertEqual(status, 'died')
+        self.assertEqual([event['event'] for event in events], ['load', 'test'])
+        self.assertEqual(events[1]['id'], 7)
+
+    def test_malformed_events_stop_the_relay(self):
+        def work(emit):
+            emit({'event': 'load', 'prints': [], 'exception': None})
+            emit({'event': 'test', 'result': '3'})
+            emit({'event': 'end'})
+
+        status, events = self.relay({'tests': [{'id': 1, 'input': "1, 2"}]}, work)
+
+        self.assertEqual(status, 'died')
+        self.assertEqual([event['event'] for event in events], ['load'])
+
+    def test_oversized_frame_stops_the_relay(self):
+        def work(emit):
+            emit({'event': 'load', 'prints': ["x" * 1000], 'exception': None})
+            emit({'event': 'end'})
+
+        status, events = self.relay({'tests': [], 'max_frame_bytes': 500}, work)
+
+        self.assertEqual(status, 'died')
+        self.assertEqual(events, [])
+
+    def test_worker_killed_at_deadline(self):
+        def work(emit):
+            while True:
+                pass
+
+        with open(os.devnull, 'wb') as devnull:
+            status = harnessruntime.relay_events({'tests': []}, work, devnull.fileno(), deadline=time.monotonic() + 0.2)
+
+        self.assertEqual(status, 'timeout')
+
+if __name__ == '__main__':
+    unittest.main()
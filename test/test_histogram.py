@@ -0,0 +1,52 @@
+import unittest
+from classes.util.histogram import LatencyHistogram
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_record(self):
+        histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+        for duration in (0.005, 0.05, 0.05, 0.5):
+            histogram.record('GetChallengeById', duration)
+        histogram.record('GetChallengeById', 3.0, error=True)
+
+        stats = histogram.snapshot()['GetChallengeById']
+
+        self.assertEqual(stats['count'], 5)
+        self.assertEqual(stats['errors'], 1)
+        self.assertAlmostEqual(stats['total_sec'], 3.605)
+        self.assertAlmostEqual(stats['mean_sec'], 0.721)
+        self.assertEqual(stats['max_sec'], 3.0)
+        self.assertEqual(stats['buckets'], [[0.01, 1], [0.1, 3], [1.0, 4], [None, 5]])
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.record('q', 0.005)
+        for _ in range(9):
+            histogram.record('q', 0.05)
+        histogram.record('q', 2.0)
+
+        stats = histogram.snapshot()['q']
+
+        self.assertEqual(stats['p50'], 0.01)
+        self.assertEqual(stats['p95'], 0.1)
+        self.assertEqual(stats['p99'], 0.1)
+        histogram.record('q', 2.0)
+        self.assertEqual(histogram.snapshot()['q']['p99'], 2.0)
+
+    def test_percentile_capped_at_max(self):
+        histogram = LatencyHistogram(buckets=(0.01, 0.1))
+        histogram.record('q', 0.02)
+
+        self.assertEqual(histogram.snapshot()['q']['p50'], 0.02)
+
+    def test_reset(self):
+        histogram = LatencyHistogram()
+        histogram.record('q', 0.1)
+
+        histogram.reset()
+
+        self.assertEqual(histogram.snapshot(), {})
+
+if __name__ == '__main__':
+    unittest.main()
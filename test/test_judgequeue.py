@@ -0,0 +1,123 @@
+import threading
+import unittest
+from classes.util.judgequeue import JudgeQueue, JudgeJob
+
+class TestJudgeQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = JudgeQueue(workers=1, max_depth=1)
+        self.addCleanup(self.queue.shutdown)
+
+    def test_submit_runs_job(self):
+        job = self.queue.submit(lambda job: ({'message': 'ok'}, 200), account_id=7)
+
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.result, {'message': 'ok'})
+        self.assertEqual(job.status_code, 200)
+        self.assertEqual(job.account_id, 7)
+        self.assertIs(self.queue.get(job.id), job)
+
+        stats = self.queue.stats()
+        self.assertEqual(stats['submitted'], 1)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['depth'], 0)
+
+    def test_job_exception_becomes_error_result(self):
+        def fail(job):
+            raise ValueError("boom")
+
+        job = self.queue.submit(fail)
+
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.status_code, 500)
+        self.assertEqual(job.result['message'], "boom")
+
+    def test_submit_rejects_when_full(self):
+        release = threading.Event()
+        started = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocking(job):
+            started.set()
+            release.wait(5)
+            return {}, 200
+
+        self.queue.submit(blocking)
+        started.wait(5)
+        self.queue.submit(blocking)  # fills the queue while the worker is busy
+
+        with self.assertRaises(RuntimeError):
+            self.queue.submit(blocking)
+        self.assertEqual(self.queue.stats()['rejected'], 1)
+        self.assertEqual(self.queue.stats()['depth'], 1)
+        self.assertEqual(self.queue.stats()['running'], 1)
+
+    def test_shutdown_full_queue(self):
+        queue = JudgeQueue(workers=1, max_depth=2)
+        release = threading.Event()
+        started = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocking(job):
+            started.set()
+            release.wait(5)
+            return {}, 200
+
+        first = queue.submit(blocking)
+        started.wait(5)
+        queued = [queue.submit(lambda job: ({}, 200)) for _ in range(2)]
+
+        # The worker is stuck: shutdown gives up after the timeout instead of blocking
+        self.assertFalse(queue.shutdown(timeout=0.2))
+        with self.assertRaises(RuntimeError):
+            queue.submit(lambda job: ({}, 200))
+
+        # Once it is released the jobs already queued are judged before the workers stop
+        release.set()
+        self.assertTrue(queue.shutdown(timeout=5))
+        self.assertTrue(all(job.done for job in [first] + queued))
+
+    def test_shutdown_idle_workers(self):
+        queue = JudgeQueue(workers=3, max_depth=1)
+        queue.submit(lambda job: ({}, 200)).wait(5)
+
+        self.assertTrue(queue.shutdown(timeout=5))
+
+    def test_expired_jobs_are_purged(self):
+        queue = JudgeQueue(workers=1, result_ttl_sec=0)
+        job = queue.submit(lambda job: ({}, 200))
+        job.wait(5)
+        queue.submit(lambda job: ({}, 200))
+
+        self.assertIsNone(queue.get(job.id))
+        queue.shutdown()
+
+    def test_get_unknown_job(self):
+        self.assertIsNone(self.queue.get('unknown'))
+
+class TestJudgeJob(unittest.TestCase):
+
+    def test_events(self):
+        job = JudgeJob(lambda job: ({'message': 'ok'}, 200))
+        self.assertEqual(job.next_events(0, timeout=0), [])
+
+        job.run()
+        events = job.next_events(0, timeout=0)
+
+        self.assertEqual([event for event, _ in events], ['status', 'result'])
+        self.assertEqual(events[1][1], {'message': 'ok', 'status_code': 200})
+        self.assertEqual(job.next_events(2, timeout=0), [])
+        self.assertGreaterEqual(job.run_time, 0)
+
+    def test_job_can_publish_progress(self):
+        def func(job):
+            job.publish('output', {'line': 'hello'})
+            return {}, 200
+
+        job = JudgeJob(func)
+        job.run()
+
+        self.assertIn(('output', {'line': 'hello'}), job.next_events(0))
+
+if __name__ == '__main__':
+    unittest.main()
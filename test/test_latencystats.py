@@ -0,0 +1,40 @@
+import unittest
+from classes.util.latencystats import LatencyStats
+
+class TestLatencyStats(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [4, 1, 3, 2, 5]
+        self.assertEqual(LatencyStats.percentile(values, 50), 3)
+        self.assertEqual(LatencyStats.percentile(values, 100), 5)
+        self.assertEqual(LatencyStats.percentile(values, 0), 1)
+        self.assertAlmostEqual(LatencyStats.percentile(values, 95), 4.8)
+        self.assertIsNone(LatencyStats.percentile([], 50))
+
+    def test_summarize(self):
+        summary = LatencyStats.summarize([0.1, 0.2, 0.3, 0.4])
+
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['min'], 0.1)
+        self.assertEqual(summary['max'], 0.4)
+        self.assertAlmostEqual(summary['mean'], 0.25)
+        self.assertAlmostEqual(summary['p50'], 0.25)
+        self.assertIn('p99', summary)
+
+    def test_summarize_empty(self):
+        summary = LatencyStats.summarize([])
+        self.assertEqual(summary['count'], 0)
+        self.assertIsNone(summary['p95'])
+
+    def test_compare(self):
+        baseline = {'sum/seed': {'p50': 1.0, 'p95': 2.0, 'p99': 3.0}, 'gone': {'p50': 1.0}}
+        current = {'sum/seed': {'p50': 1.1, 'p95': 2.6, 'p99': 3.0}, 'new': {'p50': 9.0}}
+
+        regressions = LatencyStats.compare(current, baseline, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]['key'], 'p95')
+        self.assertAlmostEqual(regressions[0]['change'], 0.3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import random
+import time
+import unittest
+from load_test import Recorder, RequestBudget, choose_action, parse_mix, run_user
+
+class FakeClient:
+    """
+    Answers like the application: a redirect to log in and comment, pages otherwise, and a
+    submission job done after one poll.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, path, data=None):
+        self.requests.append((method, path))
+        if path in ('/submit_login',) or path.startswith('/submit_comment/'):
+            return 302, b''
+        if path.startswith('/submission/job/'):
+            return 200, b'{"status": "done"}'
+        if path.startswith('/submission/'):
+            return 202, b'{"job_id": "abc", "status_url": "/submission/job/abc"}'
+        if path == '/challenges/404':
+            return 404, b''
+        return 200, b'<html></html>'
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("browse=3, open=1,submit=0"), {'browse': 3.0, 'open': 1.0, 'submit': 0.0})
+        with self.assertRaises(ValueError):
+            parse_mix("browse=1,delete=1")
+        with self.assertRaises(ValueError):
+            parse_mix("browse=0")
+        with self.assertRaises(ValueError):
+            parse_mix("browse=-1,open=2")
+
+    def test_choose_action(self):
+        rng = random.Random(0)
+
+        actions = [choose_action({'browse': 1, 'submit': 0}, rng) for _ in range(100)]
+
+        self.assertEqual(set(actions), {'browse'})
+
+    def test_request_budget(self):
+        budget = RequestBudget(2)
+
+        self.assertEqual([budget.take() for _ in range(3)], [True, True, False])
+        self.assertTrue(RequestBudget().take())
+
+    def test_report(self):
+        recorder = Recorder()
+        recorder.record('challenges', 0.1, False)
+        recorder.record('challenges', 0.3, True)
+        recorder.record('challenge', 0.2, False)
+
+        report = recorder.report(2.0)
+
+        self.assertEqual(list(report), ['challenge', 'challenges'])
+        self.assertEqual(report['challenges']['requests'], 2)
+        self.assertEqual(report['challenges']['errors'], 1)
+        self.assertEqual(report['challenges']['error_rate'], 0.5)
+        self.assertEqual(report['challenges']['throughput'], 1.0)
+        self.assertAlmostEqual(report['challenges']['latency']['p50'], 0.2)
+
+    def test_run_user(self):
+        client, recorder = FakeClient(), Recorder()
+        user = {'id': 1, 'username': 'load_user_0', 'password': 'load_password_0'}
+        mix = {'browse': 1, 'open': 1, 'submit': 1, 'comment': 1}
+
+        run_user(client, user, [404], mix, recorder, time.perf_counter() + 60, RequestBudget(40), random.Random(0))
+        report = recorder.report(1.0)
+
+        self.assertEqual(client.requests[0], ('POST', '/submit_login'))
+        self.assertEqual(report['login']['requests'], 1)
+        self.assertEqual(sum(report[route]['requests'] for route in ('challenges', 'challenge', 'submission', 'comment')), 40)
+        self.assertEqual(report['challenge']['error_rate'], 1.0)
+        self.assertEqual(report['submission_status']['requests'], report['submission']['requests'])
+        self.assertEqual(report['verdict']['errors'], 0)
+        self.assertIn(('GET', '/submission/job/abc?wait=10'), client.requests)
+
+    def test_run_user_stops_if_login_fails(self):
+        client, recorder = FakeClient(), Recorder()
+        client.request = lambda method, path, data=None: (200, b'Invalid username or password')
+
+        run_user(client, {'id': 1, 'username': 'x', 'password': 'y'}, [1], {'browse': 1}, recorder, time.perf_counter() + 60, RequestBudget(5), random.Random(0))
+
+        self.assertEqual(list(recorder.report(1.0)), ['login'])
+
+if __name__ == '__main__':
+    unittest.main()
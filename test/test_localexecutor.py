@@ -0,0 +1,133 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from classes.util.localexecutor import READ_ONLY_SCRIPT, LocalExecutor, LocalSandbox
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "the local sandbox relies on Linux rlimits")
+class TestLocalExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = LocalExecutor(isolate_network=False, read_only=False)
+        self.sandbox = self.executor.acquire(cpu=None, time_limit_sec=5)
+        self.addCleanup(self.executor.release, self.sandbox)
+
+    def test_exec_run(self):
+        exit_code, output = self.sandbox.exec_run(["python", "-c", "print(6 + 12)"])
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(output, b"18\n")
+
+    def test_stderr_is_captured(self):
+        exit_code, output = self.sandbox.exec_run(["python", "-c", "1 / 0"])
+
+        self.assertNotEqual(exit_code, 0)
+        self.assertIn(b"ZeroDivisionError: division by zero", output)
+
+    def test_exec_run_streams_demultiplexed_output(self):
+        exit_code, chunks = self.sandbox.exec_run(["python", "-c", "import sys; print(18); sys.stderr.write('err')"], stream=True, demux=True)
+        chunks = list(chunks)
+
+        self.assertIsNone(exit_code)
+        self.assertEqual(b"".join(out for out, _ in chunks if out), b"18\n")
+        self.assertEqual(b"".join(err for _, err in chunks if err), b"err")
+
+    def test_exec_run_stream_is_killed_at_wall_deadline(self):
+        sandbox = self.executor.acquire(cpu=None, time_limit_sec=0.5)
+        self.addCleanup(self.executor.release, sandbox)
+        start_time = time.monotonic()
+
+        chunks = list(sandbox.exec_run(["python", "-c", "import time; time.sleep(30)"], stream=True, demux=True)[1])
+
+        self.assertEqual(chunks, [])
+        self.assertLess(time.monotonic() - start_time, 10)
+
+    def test_working_directory_is_read_only(self):
+        exit_code, output = self.sandbox.exec_run(["python", "-c", "import os; print(os.getcwd())"])
+
+        self.assertEqual(output.decode().strip(), os.path.realpath(self.sandbox.workdir))
+        self.assertEqual(os.stat(self.sandbox.workdir).st_mode & 0o777, 0o555)
+
+    def test_memory_is_limited(self):
+        exit_code, output = self.sandbox.exec_run(["python", "-c", "x = bytearray(512 * 1024 * 1024)"])
+
+        self.assertNotEqual(exit_code, 0)
+        self.assertIn(b"MemoryError", output)
+
+    def test_interrupt_kills_running_command(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.sandbox.exec_run(["python", "-c", "while True: pass"])))
+        thread.start()
+        time.sleep(0.3)
+
+        self.sandbox.interrupt()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertLess(results[0][0], 0)
+
+    def test_release_removes_working_directory(self):
+        sandbox = self.executor.acquire(cpu=None)
+        self.executor.release(sandbox)
+        self.assertFalse(os.path.exists(sandbox.workdir))
+
+    def test_build_command(self):
+        sandbox = LocalSandbox("/usr/bin/python3", isolate_network=True, read_only=False)
+        self.addCleanup(sandbox.close)
+
+        self.assertEqual(sandbox.build_command(["python", "-c", "pass"]),
+                         ['unshare', '--net', '--map-root-user', '/usr/bin/python3', '-I', '-c', 'pass'])
+
+    def test_build_command_read_only(self):
+        sandbox = LocalSandbox("/usr/bin/python3", isolate_network=True, read_only=True)
+        self.addCleanup(sandbox.close)
+
+        self.assertEqual(sandbox.build_command(["python", "-c", "pass"]),
+                         ['unshare', '--net', '--mount', '--map-root-user', 'sh', '-c', READ_ONLY_SCRIPT, 'sandbox',
+                          '/usr/bin/python3', '-I', '-c', 'pass'])
+
+    @patch.object(LocalExecutor, 'network_isolation_available', return_value=False)
+    def test_missing_network_isolation_is_refused(self, _):
+        with self.assertRaises(RuntimeError):
+            LocalExecutor(isolate_network=True, read_only=False).acquire(cpu=None)
+
+    @patch.object(LocalExecutor, 'read_only_available', return_value=False)
+    def test_missing_read_only_mounts_are_refused(self, _):
+        with self.assertRaises(RuntimeError):
+            LocalExecutor(isolate_network=False, read_only=True).acquire(cpu=None)
+
+@unittest.skipUnless(sys.platform.startswith('linux') and LocalExecutor.read_only_available(),
+                     "remounting the file systems read-only needs unprivileged user and mount namespaces")
+class TestReadOnlyLocalSandbox(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = LocalExecutor(isolate_network=False, read_only=True)
+        self.sandbox = self.executor.acquire(cpu=None, time_limit_sec=5)
+        self.addCleanup(self.executor.release, self.sandbox)
+
+    def test_files_cannot_be_created_renamed_or_removed(self):
+        victim = tempfile.NamedTemporaryFile(prefix='sandbox-victim-', delete=False)
+        victim.close()
+        self.addCleanup(lambda: os.path.exists(victim.name) and os.remove(victim.name))
+        code = f"""
+import os
+errors = 0
+for attempt in [lambda: open('created', 'w'), lambda: open({tempfile.gettempdir()!r} + '/sandbox-created', 'w'),
+                lambda: os.rename({victim.name!r}, {victim.name!r} + '-renamed'), lambda: os.remove({victim.name!r})]:
+    try:
+        attempt()
+    except OSError:
+        errors += 1
+print(errors)
+"""
+        exit_code, output = self.sandbox.exec_run(["python", "-c", code])
+
+        self.assertEqual((exit_code, output), (0, b"4\n"))
+        self.assertTrue(os.path.exists(victim.name))
+        self.assertFalse(os.path.exists(os.path.join(tempfile.gettempdir(), 'sandbox-created')))
+
+if __name__ == '__main__':
+    unittest.main()
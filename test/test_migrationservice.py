@@ -0,0 +1,242 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from classes.util.migrationservice import MigrationService
+
+# The commit of the first build.sql, before any migration existed
+BASELINE_COMMIT = '39c14fc'
+
+def read_baseline_build_sql():
+    # From the git history, None if it is not available (e.g. in a shallow clone)
+    try:
+        return subprocess.run(
+            ["git", "show", f"{BASELINE_COMMIT}:sql/build.sql"], cwd=MigrationService.ROOT_DIR,
+            capture_output=True, check=True, encoding='utf-8'
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class SchemaModel:
+    """
+    The tables, indexes and procedures left by SQL scripts, replayed statement by statement and
+    failing where MySQL would (e.g. an index on a missing table).
+    """
+
+    def __init__(self):
+        self.tables = {}        # table -> names of its indexes
+        self.procedures = set()
+        self.foreign_key_checks = True
+
+    def execute_script(self, sql):
+        for statement in MigrationService.split_statements(sql):
+            self.execute(statement)
+
+    def execute(self, statement):
+        match = re.match(r"SET FOREIGN_KEY_CHECKS = (\d)", statement)
+        if match:
+            self.foreign_key_checks = match.group(1) == '1'
+            return
+        match = re.match(r"DROP TABLE IF EXISTS `(\w+)`", statement)
+        if match:
+            self.tables.pop(match.group(1), None)
+            return
+        match = re.match(r"CREATE TABLE (IF NOT EXISTS )?`(\w+)`", statement)
+        if match:
+            if_not_exists, table = match.groups()
+            if table in self.tables:
+                if not if_not_exists:
+                    raise AssertionError(f"Table {table} already exists")
+                return
+            for referenced in re.findall(r"REFERENCES `(\w+)`", statement):
+                if self.foreign_key_checks and referenced not in self.tables:
+                    raise AssertionError(f"Table {table} references the missing table {referenced}")
+            self.tables[table] = set(re.findall(r"KEY `(\w+)`", statement))
+            return
+        match = re.match(r"CREATE INDEX (?:IF NOT EXISTS )?`(\w+)`\s+ON `(\w+)`", statement)
+        if match:
+            index, table = match.groups()
+            if table not in self.tables:
+                raise AssertionError(f"Index {index} is created on the missing table {table}")
+            self.tables[table].add(index)
+            return
+        match = re.match(r"DROP PROCEDURE IF EXISTS `(\w+)`", statement)
+        if match:
+            self.procedures.discard(match.group(1))
+            return
+        match = re.match(r"CREATE PROCEDURE `(\w+)`", statement)
+        if match:
+            self.procedures.add(match.group(1))
+
+    def migrate(self):
+        for _, _, path in MigrationService.list_migrations():
+            with open(path, encoding='utf-8') as migration_file:
+                self.execute_script(migration_file.read())
+
+class TestMigrationService(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.write('002_add_column.sql', "ALTER TABLE t ADD COLUMN c INT;")
+        self.write('001_add_index.sql', "CREATE INDEX IF NOT EXISTS i ON t (a);\nCREATE INDEX IF NOT EXISTS j ON t (b);")
+        self.write('README.md', "Not a migration")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.directory, filename), 'w', encoding='utf-8') as migration_file:
+            migration_file.write(content)
+
+    def mock_connection(self, applied=None, lock=1):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchone.return_value = (lock,)
+        cursor.fetchall.return_value = list((applied or {}).items())
+        cursor.with_rows = False
+        return connection, cursor
+
+    def executed(self, cursor):
+        return [call.args[0] for call in cursor.execute.call_args_list]
+
+    def test_list_migrations(self):
+        migrations = MigrationService.list_migrations(self.directory)
+
+        self.assertEqual([(version, name) for version, name, _ in migrations], [(1, 'add_index'), (2, 'add_column')])
+
+    def test_list_migrations_duplicate_version(self):
+        self.write('1_other.sql', "SELECT 1;")
+
+        with self.assertRaises(RuntimeError):
+            MigrationService.list_migrations(self.directory)
+
+    def test_split_statements(self):
+        sql = (
+            "/* header */\n"
+            "SET NAMES utf8mb4;\n"
+            "-- a comment; with a semicolon\n"
+            "INSERT INTO t VALUES ('a;b', 'it\\'s');\n"
+            "delimiter ;;\n"
+            "CREATE PROCEDURE `P`()\n"
+            "BEGIN\n"
+            "  SELECT 1;\n"
+            "END\n"
+            ";;\n"
+            "delimiter ;\n"
+            "SELECT 2"
+        )
+
+        self.assertEqual(MigrationService.split_statements(sql), [
+            "SET NAMES utf8mb4",
+            "INSERT INTO t VALUES ('a;b', 'it\\'s')",
+            "CREATE PROCEDURE `P`()\nBEGIN\n  SELECT 1;\nEND",
+            "SELECT 2"
+        ])
+
+    def test_split_build_sql(self):
+        with open(MigrationService.BUILD_SQL, encoding='utf-8') as build_file:
+            statements = MigrationService.split_statements(build_file.read())
+
+        self.assertIn("SET FOREIGN_KEY_CHECKS = 1", statements)
+        self.assertTrue(any(statement.startswith("CREATE PROCEDURE `GetChallengeTestsById`") for statement in statements))
+
+    def test_migrate_applies_pending_in_order(self):
+        connection, cursor = self.mock_connection()
+
+        applied = MigrationService.migrate(connection, directory=self.directory)
+
+        self.assertEqual(applied, [(1, 'add_index'), (2, 'add_column')])
+        executed = self.executed(cursor)
+        self.assertEqual(executed[0], "SELECT GET_LOCK(%s, %s)")
+        self.assertLess(executed.index("CREATE INDEX j ON t (b)"), executed.index("ALTER TABLE t ADD COLUMN c INT"))
+        self.assertEqual(executed.count("INSERT INTO schema_migration (version, name, checksum, applied_at) VALUES (%s, %s, %s, %s)"), 2)
+        self.assertEqual(executed[-1], "SELECT RELEASE_LOCK(%s)")
+
+    def test_migrate_skips_applied_and_stops_at_target(self):
+        checksum = MigrationService.checksum(os.path.join(self.directory, '001_add_index.sql'))
+        connection, cursor = self.mock_connection(applied={1: checksum})
+
+        self.assertEqual(MigrationService.migrate(connection, target=1, directory=self.directory), [])
+        self.assertNotIn("CREATE INDEX i ON t (a)", self.executed(cursor))
+
+    def test_migrate_refuses_modified_migration(self):
+        connection, cursor = self.mock_connection(applied={1: 'outdated'})
+
+        with self.assertRaises(RuntimeError):
+            MigrationService.migrate(connection, directory=self.directory)
+        self.assertEqual(self.executed(cursor)[-1], "SELECT RELEASE_LOCK(%s)")
+
+    def test_guard_statement_creates_missing_index(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+
+        statement = MigrationService.guard_statement(cursor, "CREATE UNIQUE INDEX IF NOT EXISTS `i`\n  ON `t` (`a`, `b`)")
+
+        self.assertEqual(statement, "CREATE UNIQUE INDEX `i`\n  ON `t` (`a`, `b`)")
+        self.assertEqual(cursor.execute.call_args.args[1], ('t', 'i'))
+
+    def test_guard_statement_skips_existing_index(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1,)]
+
+        self.assertIsNone(MigrationService.guard_statement(cursor, "CREATE INDEX IF NOT EXISTS i ON t (a)"))
+        self.assertEqual(MigrationService.guard_statement(cursor, "DROP PROCEDURE IF EXISTS `P`"), "DROP PROCEDURE IF EXISTS `P`")
+        cursor.execute.assert_called_once()
+
+    def test_migrate_refuses_out_of_order_migration(self):
+        checksum = MigrationService.checksum(os.path.join(self.directory, '002_add_column.sql'))
+        connection, cursor = self.mock_connection(applied={2: checksum})
+
+        with self.assertRaises(RuntimeError):
+            MigrationService.migrate(connection, directory=self.directory)
+        self.assertNotIn("CREATE INDEX i ON t (a)", self.executed(cursor))
+        self.assertEqual([migration['state'] for migration in MigrationService.get_status(connection, self.directory)], ['out_of_order', 'applied'])
+
+    def test_migrate_lock_timeout(self):
+        connection, cursor = self.mock_connection(lock=0)
+
+        with self.assertRaises(RuntimeError):
+            MigrationService.migrate(connection, directory=self.directory)
+        self.assertEqual(self.executed(cursor), ["SELECT GET_LOCK(%s, %s)"])
+
+    def test_get_status(self):
+        checksum = MigrationService.checksum(os.path.join(self.directory, '001_add_index.sql'))
+        connection, _ = self.mock_connection(applied={1: checksum})
+
+        status = MigrationService.get_status(connection, self.directory)
+
+        self.assertEqual([migration['state'] for migration in status], ['applied', 'pending'])
+
+    @patch('classes.util.migrationservice.MigrationService.migrate', return_value=[])
+    @patch('classes.util.migrationservice.MigrationService.execute_script')
+    def test_build(self, mock_execute_script, mock_migrate):
+        connection = MagicMock()
+
+        MigrationService.build(connection, directory=self.directory)
+
+        self.assertIn("CREATE TABLE `schema_migration`", mock_execute_script.call_args[0][1])
+        mock_migrate.assert_called_once_with(connection, directory=self.directory)
+
+    def test_migrations_upgrade_the_baseline_schema(self):
+        # A database built from the first build.sql, before any migration existed
+        baseline = read_baseline_build_sql()
+        if baseline is None:
+            self.skipTest(f"the baseline build.sql of {BASELINE_COMMIT} is not in the git history")
+        upgraded = SchemaModel()
+        upgraded.execute_script(baseline)
+        upgraded.migrate()
+
+        built = SchemaModel()
+        with open(MigrationService.BUILD_SQL, encoding='utf-8') as build_file:
+            built.execute_script(build_file.read())
+        built.migrate()
+        built.tables.pop('schema_migration')    # Created by migrate.py on older databases
+
+        self.assertEqual(upgraded.tables, built.tables)
+        self.assertEqual(upgraded.procedures, built.procedures)
+
+if __name__ == '__main__':
+    unittest.main()
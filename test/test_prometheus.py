@@ -0,0 +1,49 @@
+import unittest
+from classes.util.histogram import LatencyHistogram
+from classes.util.prometheus import PrometheusFormatter
+
+class TestPrometheusFormatter(unittest.TestCase):
+
+    def test_add(self):
+        metrics = PrometheusFormatter()
+        metrics.add('judge_queue_depth', 'gauge', "Submissions waiting.", [(None, 3)])
+        metrics.add('cache_hit_ratio', 'gauge', "Hit ratio.", [({'cache': 'sql'}, 0.75)])
+
+        self.assertEqual(metrics.render(), (
+            "# HELP judge_queue_depth Submissions waiting.\n"
+            "# TYPE judge_queue_depth gauge\n"
+            "judge_queue_depth 3\n"
+            "# HELP cache_hit_ratio Hit ratio.\n"
+            "# TYPE cache_hit_ratio gauge\n"
+            'cache_hit_ratio{cache="sql"} 0.75\n'
+        ))
+
+    def test_escape_labels(self):
+        self.assertEqual(PrometheusFormatter.format_labels({'query': 'SELECT "a"\\n\nFROM t'}), '{query="SELECT \\"a\\"\\\\n\\nFROM t"}')
+        self.assertEqual(PrometheusFormatter.format_labels(None), '')
+
+    def test_format_value(self):
+        self.assertEqual(PrometheusFormatter.format_value(2), '2')
+        self.assertEqual(PrometheusFormatter.format_value(0.5), '0.5')
+        self.assertEqual(PrometheusFormatter.format_value(float('inf')), '+Inf')
+        self.assertEqual(PrometheusFormatter.format_value(None), 'NaN')
+        self.assertEqual(PrometheusFormatter.format_value(True), '1')
+
+    def test_add_histogram(self):
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        histogram.record(('index', 'GET'), 0.05)
+        histogram.record(('index', 'GET'), 2.0)
+        metrics = PrometheusFormatter()
+
+        metrics.add_histogram('http_request_duration_seconds', "Latency.", histogram.snapshot(), ('endpoint', 'method'))
+
+        lines = metrics.render().splitlines()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", lines)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="index",method="GET",le="0.1"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="index",method="GET",le="1.0"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="index",method="GET",le="+Inf"} 2', lines)
+        self.assertIn('http_request_duration_seconds_sum{endpoint="index",method="GET"} 2.05', lines)
+        self.assertIn('http_request_duration_seconds_count{endpoint="index",method="GET"} 2', lines)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest.mock import patch
+from classes.util.requestprofiler import RequestProfiler
+
+def busy(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def test_should_profile(self):
+        self.assertFalse(RequestProfiler(sample_rate=0).should_profile())
+        self.assertTrue(RequestProfiler(sample_rate=0).should_profile(forced=True))
+        self.assertTrue(RequestProfiler(sample_rate=1).should_profile())
+        with patch('classes.util.requestprofiler.random.random', return_value=0.3):
+            self.assertTrue(RequestProfiler(sample_rate=0.5).should_profile())
+            self.assertFalse(RequestProfiler(sample_rate=0.2).should_profile())
+
+    def test_profile_request(self):
+        profiler = RequestProfiler(interval_sec=0.001)
+
+        request_id = profiler.start('generic_challenge', '/challenges/1')
+        busy(0.1)
+        profiler.stop()
+
+        summary = profiler.summary()
+        self.assertEqual(summary['requests'][0]['id'], request_id)
+        self.assertEqual(summary['requests'][0]['path'], '/challenges/1')
+        self.assertGreater(summary['requests'][0]['samples'], 0)
+        self.assertEqual(summary['endpoints']['generic_challenge']['requests'], 1)
+        stacks = profiler.request_stacks(request_id)
+        self.assertIn("test_profile_request (test/test_requestprofiler.py:", stacks)
+        self.assertIn(";busy (test/test_requestprofiler.py:", stacks)
+        self.assertEqual(profiler.endpoint_stacks('generic_challenge'), stacks)
+
+    def test_only_profiled_threads_are_sampled(self):
+        profiler = RequestProfiler(interval_sec=0.001)
+        other = threading.Thread(target=busy, args=(0.1,))
+        other.start()
+
+        profiler.start('index', '/')
+        time.sleep(0.05)
+        profiler.stop()
+        other.join()
+
+        self.assertNotIn("busy", profiler.endpoint_stacks('index'))
+
+    def test_stop_without_start(self):
+        profiler = RequestProfiler()
+
+        profiler.stop()
+
+        self.assertEqual(profiler.summary(), {'endpoints': {}, 'requests': []})
+        self.assertIsNone(profiler.endpoint_stacks('index'))
+        self.assertIsNone(profiler.request_stacks(1))
+
+    def test_max_stacks(self):
+        profiler = RequestProfiler(max_stacks=1)
+        for stack in ('a;b', 'a;c'):
+            profiler.start('index', '/')
+            with profiler._lock:
+                profiler._active[threading.get_ident()]['stacks'][stack] += 2
+            profiler.stop()
+
+        self.assertEqual(profiler.endpoint_stacks('index'), "a;b 2\n[other] 2\n")
+
+    def test_max_requests(self):
+        profiler = RequestProfiler(max_requests=2)
+        for _ in range(3):
+            profiler.start('index', '/')
+            profiler.stop()
+
+        self.assertEqual([request['id'] for request in profiler.summary()['requests']], [3, 2])
+        self.assertIsNone(profiler.request_stacks(1))
+        self.assertEqual(profiler.summary()['endpoints']['index']['requests'], 3)
+
+    def test_collapse(self):
+        self.assertEqual(RequestProfiler.collapse(Counter({'a;b': 1, 'a;c': 3})), "a;c 3\na;b 1\n")
+
+if __name__ == '__main__':
+    unittest.main()
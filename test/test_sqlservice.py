@@ -18,6 +18,10 @@ import mysql.connector
 
 class TestSqlService(unittest.TestCase):
 
+    def setUp(self):
+        # Cached reads would hide the stored procedure calls checked below
+        SqlService.clear_caches()
+
     @patch('mysql.connector.connect')
     def test_create_connection(self, mock_connect):
         SqlService.create_connection()
@@ -150,6 +154,41 @@ class TestSqlService(unittest.TestCase):
         mock_cursor.close.assert_called()
         mock_connection.close.assert_called()
 
+    @patch('classes.util.sqlservice.SqlService.create_connection')
+    def test_call_stored_procedure_records_latency(self, mock_create_connection):
+        SqlService.reset_query_stats()
+        mock_cursor = mock_create_connection.return_value.cursor.return_value
+        mock_cursor.stored_results.return_value = []
+
+        SqlService.call_stored_procedure("GetChallengeById", params=(1,))
+        mock_cursor.callproc.side_effect = mysql.connector.Error("Test error")
+        SqlService.call_stored_procedure("GetChallengeById", params=(1,))
+
+        stats = SqlService.get_query_stats()['GetChallengeById']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['errors'], 1)
+
+    @patch('classes.util.sqlservice.SqlService.create_connection')
+    def test_execute_query_records_latency(self, mock_create_connection):
+        SqlService.reset_query_stats()
+        mock_create_connection.return_value.cursor.return_value.fetchall.return_value = []
+
+        SqlService.execute_query("SELECT *\n  FROM challenge WHERE id = %s", (1,))
+
+        self.assertEqual(SqlService.get_query_stats()['SELECT * FROM challenge WHERE id = %s']['count'], 1)
+
+    def test_record_query_logs_slow_queries(self):
+        with patch.object(SqlService, 'SLOW_QUERY_SEC', 0.5), patch('classes.util.sqlservice.time.perf_counter', return_value=10.0):
+            with self.assertLogs('classes.util.sqlservice', level='WARNING') as logs:
+                SqlService.record_query("GetChallengeById", (7,), started_at=9.0)
+                SqlService.record_query("GetAccountByUsernameAndPassword", ('karel', 'hash'), started_at=9.0)
+                SqlService.record_query("GetAllChallenges", (), started_at=9.9)
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("GetChallengeById took 1.000s, parameters: (7,)", logs.output[0])
+        self.assertIn("<redacted>", logs.output[1])
+        self.assertNotIn("hash", logs.output[1])
+
     @patch('classes.util.sqlservice.SqlService.create_connection')
     def test_call_stored_procedure_update_or_delete(self, mock_create_connection):
         # Setup a mock connection and cursor
@@ -179,6 +218,24 @@ class TestSqlService(unittest.TestCase):
         self.assertEqual(mock_cursor.close.call_count, 1)
         self.assertEqual(mock_connection.close.call_count, 2)
 
+    @patch('classes.util.sqlservice.SqlService.create_connection')
+    def test_call_stored_procedure_result_sets(self, mock_create_connection):
+        # Setup a mock connection and cursor returning two result sets
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_create_connection.return_value = mock_connection
+        mock_connection.cursor.return_value = mock_cursor
+        first, second = MagicMock(), MagicMock()
+        first.fetchall.return_value = [{'id': 1}]
+        second.fetchall.return_value = [{'id': 2}, {'id': 3}]
+        mock_cursor.stored_results.return_value = [first, second]
+
+        result = SqlService.call_stored_procedure("GetChallengeWithTestsById", params=(1,), result_sets=True)
+
+        self.assertEqual(result, [[{'id': 1}], [{'id': 2}, {'id': 3}]])
+        mock_cursor.close.assert_called()
+        mock_connection.close.assert_called()
+
     @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
     def test_insert_account(self, mock_call_proc):
         usergroup, username, password, email = 'user', 'testuser', 'password', 'test@example.com'
@@ -219,6 +276,68 @@ class TestSqlService(unittest.TestCase):
         SqlService.insert_challenge_submission(challenge_id, account_id, exec_time, exec_chars, exec_src)
         mock_call_proc.assert_called_with("InsertChallengeSubmission", params=(challenge_id, account_id, exec_time, exec_chars, exec_src))
 
+    @patch('classes.util.sqlservice.SqlService.execute_many')
+    def test_insert_challenge_submission_metrics(self, mock_execute_many):
+        mock_execute_many.return_value = 2
+        test_results = [
+            {'id': 2, 'wall_time': 0.5, 'cpu_user': 0.4, 'cpu_sys': 0.1, 'peak_rss_kb': 9000},
+            {'id': 3, 'wall_time': 0.2, 'cpu_user': 0.1, 'cpu_sys': 0.0, 'peak_rss_kb': 9500}
+        ]
+
+        self.assertTrue(SqlService.insert_challenge_submission_metrics(66, test_results))
+
+        mock_execute_many.assert_called_once()
+        statement, rows = mock_execute_many.call_args[0]
+        self.assertIn("INSERT INTO challenge_submission_metric", statement)
+        self.assertEqual(rows, [(66, 2, 0.5, 0.4, 0.1, 9000), (66, 3, 0.2, 0.1, 0.0, 9500)])
+
+    @patch('classes.util.sqlservice.SqlService.invalidate_challenge')
+    @patch('classes.util.sqlservice.SqlService.execute_many')
+    def test_insert_challenge_tests(self, mock_execute_many, mock_invalidate):
+        mock_execute_many.return_value = 2
+
+        self.assertEqual(SqlService.insert_challenge_tests(7, [('1', '2'), ('3', '4')]), 2)
+
+        statement, rows = mock_execute_many.call_args[0]
+        self.assertIn("INSERT INTO challenge_test", statement)
+        self.assertEqual(rows, [(7, '1', '2'), (7, '3', '4')])
+        mock_invalidate.assert_called_once_with(7)
+
+    @patch('classes.util.sqlservice.SqlService.release_connection')
+    @patch('classes.util.sqlservice.SqlService.get_connection')
+    def test_execute_many(self, mock_get_connection, mock_release_connection):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.rowcount = 2
+        mock_get_connection.return_value = mock_connection
+        rows = [(1,), (2,), (3,), (4,)]
+
+        with patch.object(SqlService, 'BULK_BATCH_SIZE', 2):
+            self.assertEqual(SqlService.execute_many("INSERT INTO t VALUES (%s)", rows), 4)
+
+        self.assertEqual(mock_cursor.executemany.call_count, 2)
+        mock_cursor.executemany.assert_called_with("INSERT INTO t VALUES (%s)", [(3,), (4,)])
+        mock_connection.commit.assert_called_once()
+        mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('classes.util.sqlservice.SqlService.release_connection')
+    @patch('classes.util.sqlservice.SqlService.get_connection')
+    def test_execute_many_exception(self, mock_get_connection, mock_release_connection):
+        mock_connection = MagicMock()
+        mock_connection.cursor.return_value.executemany.side_effect = mysql.connector.Error("Test error")
+        mock_get_connection.return_value = mock_connection
+
+        self.assertIsNone(SqlService.execute_many("INSERT INTO t VALUES (%s)", [(1,)]))
+
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
+        mock_release_connection.assert_called_once_with(mock_connection)
+
+    def test_get_inserted_id(self):
+        self.assertEqual(SqlService.get_inserted_id([{'LAST_INSERT_ID()': 101}]), 101)
+        self.assertIsNone(SqlService.get_inserted_id(None))
+        self.assertIsNone(SqlService.get_inserted_id(True))
+
     def test_raw_account_to_account(self):
         raw_account = {
             'id': 1,
@@ -523,6 +642,141 @@ class TestSqlService(unittest.TestCase):
         self.assertIsNone(result)
         mock_call_proc.assert_called_with("GetChallengeSubmissionsByIdAndAccountId", params=(challenge_id, account_id))
 
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_with_tests_by_id(self, mock_call_proc):
+        mock_call_proc.return_value = [
+            [{'id': 1, 'created_at': datetime.now(), 'account_id': 1, 'is_deleted': 0, 'name': 'Sum', 'difficulty': 'Easy',
+              'description': 'Add', 'stub_name': 'sum', 'stub_block': 'def sum(x, y):', 'time_allowed_sec': 5}],
+            [{'id': 1, 'challenge_id': 1, 'is_deleted': 0, 'input': '1, 2', 'output': '3'}]
+        ]
+
+        challenge, tests = SqlService.get_challenge_with_tests_by_id(1)
+
+        mock_call_proc.assert_called_with("GetChallengeWithTestsById", params=(1, ), result_sets=True)
+        self.assertIsInstance(challenge, Challenge)
+        self.assertEqual(challenge.stub_name, 'sum')
+        self.assertEqual(len(tests), 1)
+        self.assertIsInstance(tests[0], ChallengeTest)
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_with_tests_by_id_not_found(self, mock_call_proc):
+        mock_call_proc.return_value = [[], []]
+        self.assertEqual(SqlService.get_challenge_with_tests_by_id(1), (None, None))
+
+        # A failed procedure call returns None
+        mock_call_proc.return_value = None
+        self.assertEqual(SqlService.get_challenge_with_tests_by_id(1), (None, None))
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    @patch('classes.util.sqlservice.SqlService.raw_submission_summary_to_submission')
+    @patch('classes.util.sqlservice.SqlService.raw_comment_to_comment')
+    @patch('classes.util.sqlservice.SqlService.raw_test_to_test')
+    @patch('classes.util.sqlservice.SqlService.raw_challenge_to_challenge')
+    def test_get_challenge_page_by_id(self, mock_challenge, mock_test, mock_comment, mock_submission, mock_call_proc):
+        mock_call_proc.return_value = [[{'id': 1}], [{'id': 1}, {'id': 2}], [{'id': 1}], []]
+
+        challenge, tests, comments, submissions = SqlService.get_challenge_page_by_id(1, 2)
+
+        mock_call_proc.assert_called_with("GetChallengePageById", params=(1, 2), result_sets=True)
+        mock_challenge.assert_called_with({'id': 1})
+        self.assertEqual(challenge, mock_challenge.return_value)
+        self.assertEqual(len(tests), 2)
+        self.assertEqual(len(comments), 1)
+        self.assertIsNone(submissions)
+        mock_submission.assert_not_called()
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_summaries(self, mock_call_proc):
+        mock_call_proc.return_value = [
+            {'id': 4, 'created_at': datetime.now(), 'account_id': 1, 'name': 'Sum', 'difficulty': 'Easy',
+             'stub_name': 'sum', 'time_allowed_sec': 5}
+        ]
+
+        challenges = SqlService.get_challenge_summaries(after_id=3, limit=2)
+
+        mock_call_proc.assert_called_with("GetChallengeSummariesAfterId", params=(3, 2))
+        self.assertEqual(len(challenges), 1)
+        self.assertIsInstance(challenges[0], Challenge)
+        self.assertEqual(challenges[0].name, 'Sum')
+        self.assertIsNone(challenges[0].description)
+        self.assertIsNone(challenges[0].stub_block)
+
+        # A failed procedure call is an empty page
+        mock_call_proc.return_value = None
+        self.assertEqual(SqlService.get_challenge_summaries(), [])
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_submission_summaries(self, mock_call_proc):
+        mock_call_proc.return_value = [
+            {'id': 9, 'created_at': datetime.now(), 'challenge_id': 1, 'account_id': 2, 'exec_time': 1.2, 'exec_chars': 100},
+            {'id': 7, 'created_at': datetime.now(), 'challenge_id': 1, 'account_id': 2, 'exec_time': 1.5, 'exec_chars': 200}
+        ]
+
+        submissions = SqlService.get_challenge_submission_summaries(1, 2, before_id=10, limit=2)
+
+        mock_call_proc.assert_called_with("GetChallengeSubmissionSummariesByIdAndAccountId", params=(1, 2, 10, 2))
+        self.assertEqual([submission.id for submission in submissions], [9, 7])
+        self.assertIsNone(submissions[0].exec_src)
+
+    def test_raw_submission_summary_to_submission_metrics(self):
+        raw_submission = {'id': 9, 'created_at': datetime.now(), 'challenge_id': 1, 'account_id': 2, 'exec_time': 1.2,
+                          'exec_chars': 100, 'cpu_time': 0.8, 'peak_rss_kb': 9500}
+
+        submission = SqlService.raw_submission_summary_to_submission(raw_submission)
+
+        self.assertEqual(submission.cpu_time, 0.8)
+        self.assertEqual(submission.peak_rss_kb, 9500)
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_page_by_id_error(self, mock_call_proc):
+        mock_call_proc.return_value = None
+        self.assertEqual(SqlService.get_challenge_page_by_id(1), (None, None, None, None))
+        mock_call_proc.assert_called_with("GetChallengePageById", params=(1, None), result_sets=True)
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_by_id_is_cached(self, mock_call_proc):
+        mock_call_proc.return_value = {'id': 1, 'created_at': datetime.now(), 'account_id': 1, 'is_deleted': 0, 'name': 'Sum',
+                                       'difficulty': 'Easy', 'description': 'Add', 'stub_name': 'sum', 'stub_block': 'def sum(x, y):',
+                                       'time_allowed_sec': 5}
+
+        first = SqlService.get_challenge_by_id(1)
+        second = SqlService.get_challenge_by_id(1)
+
+        self.assertIs(first, second)
+        mock_call_proc.assert_called_once()
+        self.assertEqual(SqlService.get_cache_stats()['hits'], 1)
+
+        # Writers invalidate the cached challenge
+        SqlService.update_challenge_name_by_id(1, 'New name')
+        SqlService.get_challenge_by_id(1)
+        self.assertEqual(mock_call_proc.call_count, 3)
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    @patch('classes.util.sqlservice.SqlService.raw_test_to_test')
+    def test_get_challenge_tests_by_id_is_cached(self, mock_transform, mock_call_proc):
+        mock_call_proc.return_value = [{'id': 1}, {'id': 2}]
+
+        tests = SqlService.get_challenge_tests_by_id(1)
+        tests.pop()
+        self.assertEqual(len(SqlService.get_challenge_tests_by_id(1)), 2)
+        mock_call_proc.assert_called_once()
+
+        SqlService.insert_challenge_test(1, '1, 2', '3')
+        SqlService.get_challenge_tests_by_id(1)
+        self.assertEqual(mock_call_proc.call_count, 3)
+
+    @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
+    def test_get_challenge_submission_counts(self, mock_call_proc):
+        mock_call_proc.return_value = [{'challenge_id': 1, 'submission_count': 4}, {'challenge_id': 3, 'submission_count': 1}]
+
+        result = SqlService.get_challenge_submission_counts()
+
+        mock_call_proc.assert_called_with("GetChallengeSubmissionCounts")
+        self.assertEqual(result, {1: 4, 3: 1})
+
+        mock_call_proc.return_value = None
+        self.assertEqual(SqlService.get_challenge_submission_counts(), {})
+
     @patch('classes.util.sqlservice.SqlService.call_stored_procedure')
     def test_update_challenge_name_by_id(self, mock_call_proc):
         challenge_id, name = 1, 'New Challenge Name'
@@ -0,0 +1,162 @@
+import io
+import os
+import sys
+import unittest
+from unittest.mock import patch
+from classes.util import harnessruntime, zygoteruntime
+from classes.util.harness import Harness
+from classes.util.zygote import Zygote
+from classes.util.localexecutor import LocalExecutor
+
+READY = {'event': 'ready', 'pid': 7}
+
+class FakeStream:
+    # Records the frames written to the zygote and answers with the given events
+    def __init__(self, events):
+        self.written = b""
+        self.output = io.BytesIO(b"".join(harnessruntime.encode_frame(event) for event in events))
+        self.closed = False
+
+    def write(self, data):
+        self.written += data
+
+    def read(self, size):
+        return self.output.read(size)
+
+    def close(self):
+        self.closed = True
+
+class TestZygote(unittest.TestCase):
+
+    def test_run_sends_job_frame(self):
+        stream = FakeStream([READY, {'event': 'load', 'prints': [], 'exception': None}, {'event': 'end', 'timeout': False}])
+        zygote = Zygote(stream)
+
+        payload = zygote.run({'user_code': "pass", 'stub_name': 'sum', 'tests': [], 'stop_on_failure': True}, time_limit_sec=3)
+        zygote.close()
+
+        self.assertEqual(payload['tests'], [])
+        job = harnessruntime.read_frame(io.BytesIO(stream.written))
+        self.assertEqual(job['time_limit_sec'], 3)
+        self.assertEqual(job['stub_name'], 'sum')
+        self.assertTrue(stream.closed)
+
+    def test_run_returns_none_when_zygote_died(self):
+        self.assertIsNone(Zygote(FakeStream([READY, {'event': 'load', 'prints': [], 'exception': None}])).run({'tests': []}))
+        self.assertIsNone(Zygote(FakeStream([])).run({'tests': []}))
+
+    def test_zygote_is_ready_again_after_its_job(self):
+        job_events = [{'event': 'load', 'prints': [], 'exception': None}, {'event': 'end', 'timeout': False}]
+        zygote = Zygote(FakeStream([READY] + job_events + [dict(READY, pid=8)] + job_events))
+
+        self.assertIsNotNone(zygote.run({'tests': []}))
+        self.assertTrue(zygote.ready)
+        self.assertEqual(zygote.pid, 8)
+        self.assertIsNotNone(zygote.run({'tests': []}))
+        self.assertFalse(zygote.ready)  # It died after its second job
+
+    def test_run_rejects_oversized_frame(self):
+        stream = FakeStream([READY, {'event': 'load', 'prints': ["x" * 1000], 'exception': None}])
+
+        with patch.object(Harness, 'MAX_FRAME_BYTES', 500), self.assertRaises(ValueError):
+            Zygote(stream).run({'tests': []})
+
+    def test_run_rejects_unexpected_ready_frame(self):
+        with self.assertRaises(ValueError):
+            Zygote(FakeStream([{'event': 'load', 'prints': [], 'exception': None}])).run({'tests': []})
+
+    def test_run_stops_at_until(self):
+        entry = {'id': 1, 'result': '12', 'prints': ['6']}
+        stream = FakeStream([READY, {'event': 'load', 'prints': [], 'exception': None}, dict(entry, event='test'), dict(entry, id=2, event='test')])
+        events = []
+        zygote = Zygote(stream)
+
+        payload = zygote.run({'tests': []}, on_event=lambda kind, event: events.append(kind), until=lambda entry: True)
+
+        self.assertEqual(payload['tests'], [entry])
+        self.assertEqual(events, ['load', 'test'])
+        self.assertFalse(zygote.ready)  # Still running the job, it has to be replaced
+
+    def test_source_starts_the_zygote(self):
+        source = Zygote.get_source()
+        self.assertIn("def run_test(", source)
+        self.assertIn("def serve(", source)
+        self.assertTrue(source.strip().endswith("serve(sys.modules[__name__], reap=False)"))
+        self.assertTrue(Zygote.get_source(reap=True).strip().endswith("serve(sys.modules[__name__], reap=True)"))
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "the zygote relies on fork")
+class TestZygoteRuntime(unittest.TestCase):
+
+    def build_job(self, user_code, tests, time_limit_sec=None):
+        return {
+            'user_code': user_code,
+            'stub_name': 'sum',
+            'tests': [{'id': i, 'input': test_input, 'output': test_output} for i, (test_input, test_output) in enumerate(tests)],
+            'stop_on_failure': True,
+            'time_limit_sec': time_limit_sec
+        }
+
+    def run_submission(self, job):
+        # Run in a worker like the zygote does, so the test process keeps its print
+        read_fd, write_fd = os.pipe()
+        status = harnessruntime.relay_events(job, lambda emit: zygoteruntime.run_submission(harnessruntime, job, emit), write_fd)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as stream:
+            payload = Harness.collect_events(iter(lambda: harnessruntime.read_frame(stream), None))
+        self.assertEqual(status, 'ok')
+        return payload
+
+    def test_tests_start_from_pristine_state(self):
+        job = self.build_job("calls = []\ndef sum(x, y):\n    calls.append(x)\n    print(len(calls))\n    return x + y",
+                             [("6, 12", "18"), ("4, 7", "11")])
+
+        payload = self.run_submission(job)
+
+        self.assertEqual([entry['passed'] for entry in payload['tests']], [True, True])
+        self.assertEqual([entry['prints'] for entry in payload['tests']], [['1'], ['1']])
+
+    def test_stops_on_failure(self):
+        payload = self.run_submission(self.build_job("def sum(x, y):\n    return x + x", [("6, 12", "18"), ("4, 7", "11")]))
+
+        self.assertEqual(len(payload['tests']), 1)
+        self.assertEqual(payload['tests'][0]['result'], '12')
+
+    def test_load_exception(self):
+        payload = self.run_submission(self.build_job("def sum(x, y):\n    ret x + y", [("6, 12", "18")]))
+
+        self.assertEqual(payload['exception'], "SyntaxError: invalid syntax")
+
+    def test_dying_test_process(self):
+        payload = self.run_submission(self.build_job("import os\ndef sum(x, y):\n    os._exit(1)", [("6, 12", "18")]))
+
+        self.assertEqual(payload['tests'][0]['exception'], "Error: the test process died")
+
+    def test_test_timeout(self):
+        payload = self.run_submission(self.build_job("def sum(x, y):\n    while True: pass", [("6, 12", "18")], time_limit_sec=0.2))
+
+        self.assertTrue(payload['timeout'])
+        self.assertEqual(payload['tests'], [])
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "the zygote relies on fork")
+class TestZygoteProcess(unittest.TestCase):
+
+    def test_zygote_serves_several_jobs(self):
+        executor = LocalExecutor(isolate_network=False, read_only=False)
+        sandbox = executor.acquire(cpu=None, time_limit_sec=5)
+        self.addCleanup(executor.release, sandbox)
+        zygote = Zygote(executor.open_stream(sandbox, ["python", "-c", Zygote.get_source()]))
+        self.addCleanup(zygote.close)
+
+        job = {
+            'user_code': "import os\ndef sum(x, y):\n    os.write(1, b'RESULT: 0')\n    return x + y",
+            'stub_name': 'sum',
+            'tests': [{'id': 1, 'input': "6, 12", 'output': "18"}],
+            'stop_on_failure': True
+        }
+        for _ in range(2):
+            payload = zygote.run(job, time_limit_sec=5)
+            self.assertTrue(payload['tests'][0]['passed'])
+            self.assertTrue(zygote.ready)
+
+if __name__ == '__main__':
+    unittest.main()